@@ -59,6 +59,34 @@ class Settings(BaseSettings):
     MAX_RETRIES_PER_PAGE: int = 3  # Maximum retries for failed pages
     RETRY_BACKOFF_BASE: int = 5  # Base seconds for exponential backoff (5s, 10s, 20s)
     PAGE_PROCESSING_TIMEOUT: int = 120  # Timeout per page in seconds
+    BANK_STATEMENT_PIPELINED: bool = True  # Bank statements: extract all pages while headers are detected, re-prompt only mismatching pages (False = sequential detection + batches)
+    
+    # LLM Page Batching (opt-in, without_template_extraction only)
+    LLM_PAGE_BATCHING_ENABLED: bool = False  # Extract consecutive sparse pages with one multi-image LLM request
+    LLM_PAGE_BATCH_TOKEN_BUDGET: int = 12000  # Estimated input + output tokens per multi-page request
+    LLM_PAGE_BATCH_MAX_PAGES: int = 4  # Page images per multi-page request
+    LLM_PAGE_BATCH_IMAGE_MAX_KB: int = 150  # Pages whose JPEG is larger than this are sent alone
+    
+    # Async Page Engine (opt-in worker mode)
+    ASYNC_ENGINE_ENABLED: bool = False  # Stream pages render -> LLM -> insert on one long-lived asyncio engine per worker process
+    ASYNC_ENGINE_MAX_INFLIGHT_LLM: int = 32  # LLM calls in flight per worker process (each prefork child has its own engine)
+    ASYNC_ENGINE_RENDER_WORKERS: int = 4  # Render threads per worker process
+    ASYNC_ENGINE_RENDER_QUEUE: int = 8  # Rendered pages per document waiting for an LLM slot (bounds memory)
+    ASYNC_ENGINE_DOCUMENT_TIMEOUT: int = 1440  # Seconds before a document run on the engine is cancelled (inside the 1500s Celery soft limit)
+    
+    # Field persistence (worker)
+    BULK_COPY_INSERT_ENABLED: bool = True  # Save extracted fields with binary COPY (asyncpg) instead of ORM inserts
+    FIELD_COPY_BATCH_ROWS: int = 5000  # Buffered field rows that trigger a COPY flush (rows are batched across pages)
+    FIELD_COPY_FLUSH_INTERVAL_S: float = 5.0  # Flush at the next checkpoint once this long has passed, so progress keeps moving
+    
+    # Fair-share Job Scheduler
+    FAIR_SCHEDULER_ENABLED: bool = True  # Feed documents to Celery from per-job queues, fair across users (False = queue every document up front)
+    FAIR_SCHEDULER_MAX_INFLIGHT: int = 50  # Documents handed to Celery at once across all jobs (~ total worker slots)
+    FAIR_SCHEDULER_SLOT_TIMEOUT_S: int = 2400  # A dispatched document not finished or restarted within this long frees its slot
+    FAIR_SCHEDULER_TICK_S: float = 10.0  # Beat interval for reclaiming lost slots and dispatching
+    
+    # Source Discovery
+    DISCOVERY_PAGE_SIZE: int = 100  # Documents listed, inserted and queued per discovery page when the job sets no discovery_batch_size
     
     # LLM Configuration
     LLM_PROVIDER: str = "gemini"  # "gemini" or "litellm"
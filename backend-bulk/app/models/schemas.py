@@ -54,6 +54,7 @@ class ProcessingConfig(BaseModel):
 
 class ProcessingOptions(BaseModel):
     priority: int = Field(default=3, ge=1, le=5)
+    scheduling_weight: float = Field(default=1.0, gt=0, le=100, description="Share of the owner's worker slots relative to their other jobs")
     max_retries: int = Field(default=3, ge=0, le=10)
     parallel_workers: int = Field(default=10, ge=1, le=100)
     signature_detection: bool = True
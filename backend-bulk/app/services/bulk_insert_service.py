@@ -5,13 +5,51 @@ Handles inserting 3,600+ fields per document in ~100ms
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Sequence
 from datetime import datetime
 import asyncpg
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Column order of the tuples passed to BulkInsertService.copy_extracted_fields
+EXTRACTED_FIELD_COPY_COLUMNS = (
+    'document_id',
+    'job_id',
+    'field_name',
+    'field_label',
+    'field_type',
+    'field_value',
+    'field_group',
+    'confidence_score',
+    'page_number',
+    'field_order',
+    'extraction_method',
+    'tokens_used',
+    'processing_time_ms',
+    'model_version',
+    'validation_status',
+    'needs_manual_review',
+    'section_name',
+    'source_location',
+    'extraction_context',
+    'field_metadata',  # JSON text (no jsonb codec on the pool)
+)
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """
+    DATABASE_URL as a DSN asyncpg accepts
+    
+    DATABASE_URL is written for SQLAlchemy (postgresql+asyncpg://...), while
+    asyncpg only takes postgresql:// or postgres://, so the +driver suffix is dropped.
+    """
+    scheme, separator, rest = database_url.partition("://")
+    if not separator:
+        return database_url
+    return f"{scheme.split('+', 1)[0]}://{rest}"
+
 
 class BulkInsertService:
     """
@@ -40,7 +78,7 @@ class BulkInsertService:
             
             try:
                 self.pool = await asyncpg.create_pool(
-                    settings.DATABASE_URL,
+                    asyncpg_dsn(settings.DATABASE_URL),
                     min_size=1,
                     max_size=5,  # Transaction pooler handles actual pooling
                     max_queries=50000,
@@ -189,6 +227,58 @@ class BulkInsertService:
             
             raise
     
+    async def copy_extracted_fields(
+        self,
+        document_id: str,
+        records: Sequence[tuple],
+        total_fields_extracted: int,
+        pages_processed: int,
+        processing_stage: str
+    ) -> int:
+        """
+        COPY worker field rows and update the document's progress in one transaction
+        
+        Unlike bulk_insert_fields, the document is not marked completed: this is
+        called for every checkpoint flush while the document is still processing.
+        
+        Args:
+            document_id: UUID of the document
+            records: Tuples in EXTRACTED_FIELD_COPY_COLUMNS order
+            total_fields_extracted: Fields saved for the document so far, these included
+            pages_processed: Pages processed so far
+            processing_stage: Progress text shown in the UI
+            
+        Returns:
+            Number of rows copied
+        """
+        if not self.pool:
+            await self.initialize_pool()
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if records:
+                    await conn.copy_records_to_table(
+                        'bulk_extracted_fields',
+                        records=records,
+                        columns=list(EXTRACTED_FIELD_COPY_COLUMNS)
+                    )
+                
+                await conn.execute("""
+                    UPDATE bulk_job_documents
+                    SET
+                        total_fields_extracted = $1,
+                        pages_processed = $2,
+                        processing_stage = $3
+                    WHERE id = $4
+                """,
+                    total_fields_extracted,
+                    pages_processed,
+                    processing_stage,
+                    document_id
+                )
+        
+        return len(records)
+    
     def _prepare_records(
         self,
         document_id: str,
@@ -310,6 +400,83 @@ async def get_bulk_insert_service() -> BulkInsertService:
     return _bulk_insert_service
 
 
+class SyncBulkInserter:
+    """
+    Blocking facade over BulkInsertService for Celery worker threads
+    
+    The asyncpg pool is bound to the loop that created it, so each worker process
+    keeps one BulkInsertService on a private loop thread and every task thread
+    (prefork, threads pool or page engine I/O threads) submits to that loop.
+    """
+    
+    def __init__(self):
+        self.service = BulkInsertService()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="bulk-insert", daemon=True)
+        self._thread.start()
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+    
+    def _run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=timeout)
+    
+    def copy_extracted_fields(
+        self,
+        document_id: str,
+        records: Sequence[tuple],
+        total_fields_extracted: int,
+        pages_processed: int,
+        processing_stage: str,
+        timeout: Optional[float] = 120
+    ) -> int:
+        """Blocking BulkInsertService.copy_extracted_fields (see there)."""
+        return self._run(
+            self.service.copy_extracted_fields(
+                document_id, records, total_fields_extracted, pages_processed, processing_stage
+            ),
+            timeout=timeout
+        )
+    
+    def close(self):
+        """Close the pool and stop the loop thread."""
+        try:
+            self._run(self.service.close_pool(), timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing bulk insert pool: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+
+_sync_bulk_inserter: Optional[SyncBulkInserter] = None
+_sync_bulk_inserter_lock = threading.Lock()
+
+
+def get_sync_bulk_inserter() -> SyncBulkInserter:
+    """
+    Get or create this worker process's SyncBulkInserter
+    
+    Created lazily inside the task, i.e. after Celery forks the process, so the
+    pool's connections are never shared across processes.
+    """
+    global _sync_bulk_inserter
+    if _sync_bulk_inserter is None:
+        with _sync_bulk_inserter_lock:
+            if _sync_bulk_inserter is None:
+                _sync_bulk_inserter = SyncBulkInserter()
+    return _sync_bulk_inserter
+
+
+def shutdown_sync_bulk_inserter():
+    """Close this process's SyncBulkInserter if one was started."""
+    global _sync_bulk_inserter
+    with _sync_bulk_inserter_lock:
+        if _sync_bulk_inserter is not None:
+            _sync_bulk_inserter.close()
+            _sync_bulk_inserter = None
+
+
 async def shutdown_bulk_insert_service():
     """
     Close connection pool on application shutdown
@@ -6,12 +6,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 from typing import Optional
 from datetime import datetime
+import asyncio
 import uuid
 import logging
 
 from app.models.schemas import BulkJobDocumentResponse, BulkJobDocumentListResponse, DocumentStatus
 from app.models.database import BulkJobDocument, BulkJob
-from app.workers.processing import process_document
+from app.workers.scheduler import enqueue_documents
 
 logger = logging.getLogger(__name__)
 
@@ -160,12 +161,8 @@ class DocumentService:
                     "processing_options": job.processing_options
                 }
                 
-                process_result = process_document.delay(
-                    str(document.id),
-                    str(job.id),
-                    job_config
-                )
-                logger.info(f"🔄 Queued retry task for document {document_id}: {process_result.id}")
+                await asyncio.to_thread(enqueue_documents, job, [str(document.id)], job_config)
+                logger.info(f"🔄 Queued retry for document {document_id}")
             
             except Exception as e:
                 logger.error(f"❌ Error queueing retry task: {e}")
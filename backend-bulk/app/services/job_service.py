@@ -7,6 +7,7 @@ from sqlalchemy import select, func, and_
 from sqlalchemy.orm import selectinload
 from typing import Optional
 from datetime import datetime
+import asyncio
 import uuid
 import logging
 
@@ -15,6 +16,7 @@ from app.models.schemas import (
 )
 from app.models.database import BulkJob, BulkJobDocument
 from app.workers.discovery import discover_documents
+from app.workers.scheduler import enqueue_documents, get_job_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -306,6 +308,10 @@ class JobService:
             
             await self.db.commit()
             
+            scheduler = get_job_scheduler()
+            if scheduler:
+                await asyncio.to_thread(scheduler.cancel, job_id)
+            
             logger.info(f"✅ Deleted job and all related data: {job_id}")
             return True
         
@@ -352,30 +358,8 @@ class JobService:
             if existing_doc_count > 0:
                 # Documents already exist (from upload) - queue processing directly
                 logger.info(f"📄 Job {job_id} has {existing_doc_count} documents - skipping discovery, starting processing")
-                
-                # Get all pending documents
-                docs_result = await self.db.execute(
-                    select(BulkJobDocument).where(
-                        and_(
-                            BulkJobDocument.job_id == uuid.UUID(job_id),
-                            BulkJobDocument.status == 'pending'
-                        )
-                    )
-                )
-                documents = docs_result.scalars().all()
-                
-                # Queue processing tasks for each document
-                from app.workers.processing import process_document
-                for doc in documents:
-                    job_config = {
-                        'source_config': job.source_config,
-                        'processing_options': job.processing_options,
-                        'extraction_task': 'without_template_extraction'
-                    }
-                    process_document.delay(str(doc.id), str(job.id), job_config)
-                    logger.info(f"   📄 Queued processing for document: {doc.filename}")
-                
-                logger.info(f"✅ Started job {job_id} with {len(documents)} documents")
+                queued = await self._queue_pending_documents(job)
+                logger.info(f"✅ Started job {job_id} with {queued} documents")
             else:
                 # No documents yet - need to discover from source
                 try:
@@ -413,6 +397,26 @@ class JobService:
             logger.error(f"❌ Error starting job {job_id}: {e}")
             raise
     
+    async def _queue_pending_documents(self, job: BulkJob) -> int:
+        """Queue all pending documents of a job for processing (replacing its scheduler queue)"""
+        docs_result = await self.db.execute(
+            select(BulkJobDocument.id).where(
+                and_(
+                    BulkJobDocument.job_id == job.id,
+                    BulkJobDocument.status == 'pending'
+                )
+            )
+        )
+        document_ids = [str(doc_id) for doc_id in docs_result.scalars().all()]
+        
+        job_config = {
+            'source_config': job.source_config,
+            'processing_options': job.processing_options,
+            'extraction_task': 'without_template_extraction'
+        }
+        # Redis lock + a Celery publish per dispatched document: keep it off the event loop
+        return await asyncio.to_thread(enqueue_documents, job, document_ids, job_config, replace=True)
+    
     async def pause_job(self, job_id: str) -> Optional[BulkJobResponse]:
         """Pause a running job"""
         try:
@@ -433,6 +437,11 @@ class JobService:
             await self.db.commit()
             await self.db.refresh(job)
             
+            # Documents already dispatched finish; the rest wait in the scheduler
+            scheduler = get_job_scheduler()
+            if scheduler:
+                await asyncio.to_thread(scheduler.pause, job_id)
+            
             logger.info(f"⏸️ Paused job: {job_id}")
             return BulkJobResponse.from_orm(job)
         
@@ -463,6 +472,12 @@ class JobService:
             await self.db.commit()
             await self.db.refresh(job)
             
+            scheduler = get_job_scheduler()
+            if scheduler and not await asyncio.to_thread(scheduler.resume, job_id):
+                # Scheduler lost the job's queue (e.g. Redis was flushed) - rebuild it from the database
+                queued = await self._queue_pending_documents(job)
+                logger.info(f"   📄 Re-queued {queued} pending documents")
+            
             logger.info(f"▶️ Resumed job: {job_id}")
             return BulkJobResponse.from_orm(job)
         
@@ -494,7 +509,10 @@ class JobService:
             await self.db.commit()
             await self.db.refresh(job)
             
-            # TODO: Cancel pending Celery tasks for this job
+            # Drop documents not yet dispatched (documents in flight finish)
+            scheduler = get_job_scheduler()
+            if scheduler:
+                await asyncio.to_thread(scheduler.cancel, job_id)
             
             logger.info(f"🛑 Stopped job: {job_id}")
             return BulkJobResponse.from_orm(job)
@@ -12,7 +12,7 @@ import asyncio
 import time
 import re
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 from fastapi import HTTPException
 from dotenv import load_dotenv
@@ -171,7 +171,7 @@ class LLMClient:
 
 
     
-    def _prepare_request_body(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    def _prepare_request_body(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """
         Prepare request body for LiteLLM API
         
@@ -181,7 +181,7 @@ class LLMClient:
         # LiteLLM/OpenRouter handles response format conversion internally
         return self._prepare_litellm_request_body(prompt, image_data, response_format, document_name, content_type)
     
-    def _prepare_litellm_request_body(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    def _prepare_litellm_request_body(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """Prepare request body for LiteLLM API using chat/completions format (supports images and text)"""
         # Use the same model from EXTRACTION_MODEL for both text and image requests
         model = self.extraction_model
@@ -217,13 +217,15 @@ class LLMClient:
         
         # Add image only if image_data is provided, not empty, and content_type is "image"
         # When content_type is "text", image_data contains the extracted text (already included in prompt)
-        if content_type == "image" and image_data and image_data.strip():
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": image_data
-                }
-            })
+        # A list of images (multi-page request) is attached in order
+        if content_type == "image":
+            for image in self._image_list(image_data):
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image
+                    }
+                })
         
         # Always use chat/completions format for vision support
         request_body = {
@@ -242,7 +244,13 @@ class LLMClient:
         
         return request_body
 
-    def _prepare_google_ai_request(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    @staticmethod
+    def _image_list(image_data: Optional[Union[str, List[str]]]) -> List[str]:
+        """Non-empty images from a single image or a list of page images"""
+        images = image_data if isinstance(image_data, list) else [image_data]
+        return [image for image in images if image and image.strip()]
+
+    def _prepare_google_ai_request(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """Prepare request body for Google AI native API (generativelanguage.googleapis.com)"""
         # Build prompt text
         if content_type == "text":
@@ -257,16 +265,16 @@ class LLMClient:
         # Build parts array for Google AI format
         parts = [{"text": full_prompt}]
         
-        # Add image if provided (Google AI uses inline_data format)
-        if content_type == "image" and image_data and image_data.strip():
+        # Add images if provided (Google AI uses inline_data format)
+        for image in (self._image_list(image_data) if content_type == "image" else []):
             # Extract base64 data and mime type from data URL
-            if image_data.startswith("data:"):
+            if image.startswith("data:"):
                 # Parse data URL: data:image/png;base64,<base64_data>
-                header, base64_data = image_data.split(",", 1)
+                header, base64_data = image.split(",", 1)
                 mime_type = header.split(":")[1].split(";")[0]
             else:
                 # Assume it's raw base64 PNG
-                base64_data = image_data
+                base64_data = image
                 mime_type = "image/png"
             
             parts.append({
@@ -342,6 +350,42 @@ class LLMClient:
         
         raise last_exception or Exception("All retries failed for Google AI API")
     
+    async def _call_google_ai(self, request_body: Dict[str, Any], max_retries: int = 3) -> Dict[str, Any]:
+        """Make asynchronous call to Google AI native API (same contract as _call_google_ai_sync)"""
+        model_name = self.extraction_model.split("/")[-1] if "/" in self.extraction_model else self.extraction_model
+        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={self.gemini_api_key}"
+        
+        client = await self._get_http_client()
+        last_exception = None
+        
+        for attempt in range(max_retries):
+            try:
+                logger.debug(f"🌐 Making Google AI API call (attempt {attempt + 1}/{max_retries})")
+                request_submit_time = time.time()
+                response = await client.post(
+                    api_url,
+                    json=request_body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=90.0
+                )
+                http_duration = time.time() - request_submit_time
+                logger.info(f"⏱️ Google AI HTTP duration: {http_duration:.2f}s, Status: {response.status_code}")
+                
+                if response.status_code == 200:
+                    return self._convert_google_ai_response(response.json())
+                error_text = response.text
+                logger.error(f"❌ Google AI API error {response.status_code}: {error_text}")
+                raise Exception(f"Google AI API Error: {response.status_code} - {error_text}")
+                
+            except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.WriteTimeout,
+                    httpx.ConnectError, httpx.RemoteProtocolError) as e:
+                last_exception = e
+                wait_time = 2 ** attempt
+                logger.warning(f"⚠️ Network error on attempt {attempt + 1}: {e}, retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
+        
+        raise last_exception or Exception("All retries failed for Google AI API")
+    
     def _convert_google_ai_response(self, google_response: Dict[str, Any]) -> Dict[str, Any]:
         """Convert Google AI response format to OpenAI-compatible format"""
         try:
@@ -441,9 +485,12 @@ class LLMClient:
         logger.error(f"❌ All retries failed for endpoint: {api_url}")
         raise last_exception or Exception(f"All retries failed for endpoint: {api_url}")
 
-    async def call_api(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
-                      task: str, document_name: Optional[str] = None) -> Dict[str, Any]:
-        """Make API call to LLM provider through LiteLLM using vision-capable endpoint with optional LangSmith monitoring"""
+    async def call_api(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], 
+                      task: str, document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+        """
+        Make API call to LLM provider through LiteLLM using vision-capable endpoint with optional LangSmith monitoring
+        Non-blocking counterpart of call_api_sync (shares the pooled httpx.AsyncClient)
+        """
         start_time = time.time()
         
         # Determine which model will be used
@@ -460,13 +507,29 @@ class LLMClient:
                 trace_name = f"llm_call_{task}_page_{page_number}"
         
         # Execute the call (LangSmith tracing is now inside _execute_call, wrapping only the HTTP request)
-        return await self._execute_call(prompt, image_data, response_format, task, document_name, start_time, model_to_use, page_number, trace_name)
+        return await self._execute_call(prompt, image_data, response_format, task, document_name, start_time, model_to_use, page_number, trace_name, content_type)
     
-    async def _execute_call(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
+    async def _execute_call(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], 
                            task: str, document_name: Optional[str],
-                           start_time: float, model_to_use: str, page_number: Optional[int] = None, trace_name: Optional[str] = None) -> Dict[str, Any]:
+                           start_time: float, model_to_use: str, page_number: Optional[int] = None, trace_name: Optional[str] = None,
+                           content_type: str = "image") -> Dict[str, Any]:
         """Execute the actual LLM API call"""
         try:
+            # Use Google AI direct API if detected
+            if self.is_google_ai_direct:
+                request_body = self._prepare_google_ai_request(prompt, image_data, response_format, document_name, content_type)
+                result = await self._call_google_ai(request_body)
+                processed_result = self.process_api_result(result, task)
+                duration = time.time() - start_time
+                logger.info(f"⏱️ LLM call completed - Task: {task}, Model: {model_to_use}, Duration: {duration:.2f}s")
+                if isinstance(processed_result, dict):
+                    processed_result["_timing"] = {
+                        "start_time": start_time,
+                        "end_time": time.time(),
+                        "duration_seconds": duration
+                    }
+                return processed_result
+            
             # Determine API URL for LiteLLM
             base_url = self.litellm_api_url.rstrip('/')
             # Check if URL already contains the endpoint to avoid doubling
@@ -478,7 +541,7 @@ class LLMClient:
             logger.debug(f"🔍 Using LiteLLM endpoint: {api_url}")
             
             # Prepare request body (provider-specific format) - NOT included in LangSmith timing
-            request_body = self._prepare_request_body(prompt, image_data, response_format, document_name)
+            request_body = self._prepare_request_body(prompt, image_data, response_format, document_name, content_type)
             
             # Wrap only the HTTP request with LangSmith tracing (pure LLM response time)
             if self.langsmith_enabled and self.traceable:
@@ -486,7 +549,8 @@ class LLMClient:
                     "task": task,
                     "model": model_to_use,
                     "document_name": document_name or "unknown",
-                    "has_image": bool(image_data)
+                    "has_image": bool(image_data),
+                    "content_type": content_type
                 }
                 if page_number is not None:
                     metadata["page_number"] = page_number
@@ -730,11 +794,12 @@ class LLMClient:
         logger.error(f"❌ All retries failed for endpoint: {api_url}")
         raise last_exception or Exception(f"All retries failed for endpoint: {api_url}")
     
-    def call_api_sync(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
+    def call_api_sync(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], 
                      task: str, document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """
         Synchronous version: Make API call to LLM provider through LiteLLM
         Thread-safe for use in ThreadPoolExecutor
+        image_data may be a list of page images for a multi-page request
         """
         start_time = time.time()
         
@@ -754,7 +819,7 @@ class LLMClient:
         # Execute the call (LangSmith tracing is now inside _execute_call_sync, wrapping only the HTTP request)
         return self._execute_call_sync(prompt, image_data, response_format, task, document_name, start_time, model_to_use, content_type, page_number, trace_name)
     
-    def _execute_call_sync(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
+    def _execute_call_sync(self, prompt: str, image_data: Optional[Union[str, List[str]]], response_format: Dict[str, Any], 
                            task: str, document_name: Optional[str],
                            start_time: float, model_to_use: str, content_type: str, page_number: Optional[int] = None, trace_name: Optional[str] = None) -> Dict[str, Any]:
         """Execute the actual synchronous LLM API call"""
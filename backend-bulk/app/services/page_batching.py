@@ -0,0 +1,186 @@
+"""
+Multi-page batching of page extraction calls.
+
+process_document sends one LLM request per page image and repeats the full
+extraction prompt from PromptService with every page. Sparse pages (cover
+sheets, short letters, signature pages) are cheap to extract, so the prompt is
+a large share of their cost. With page batching on, consecutive
+low-complexity pages are packed into one request under a token budget:
+
+- a page is batchable when its JPEG is at most LLM_PAGE_BATCH_IMAGE_MAX_KB
+  (dense pages compress worse); larger pages are sent alone as before;
+- the model answers {"pages": [{"page_number": n, "data": {...}}, ...]} and
+  split_multi_page_result turns that back into one regular result per page;
+- pages missing from the answer, and the last page of a truncated answer, are
+  re-sent through process_single_page_with_retry.
+
+BatchStats counts requests, fallbacks and the prompt tokens saved per document.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BATCHABLE_TASKS = ("without_template_extraction",)
+IMAGE_INPUT_TOKENS = 1300  # Input tokens per attached page image
+OUTPUT_TOKENS_PER_KB = 15  # Expected output tokens per KB of page JPEG (denser pages produce more JSON)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def image_kb(image: str) -> float:
+    """Decoded size in KB of a base64 image or data URL."""
+    payload = image.split(",", 1)[1] if image.startswith("data:") else image
+    return len(payload) * 3 / 4 / 1024
+
+
+def image_page_cost(image: str) -> int:
+    """Estimated input + output tokens for extracting one page image."""
+    return IMAGE_INPUT_TOKENS + int(image_kb(image) * OUTPUT_TOKENS_PER_KB)
+
+
+def plan_page_groups(
+    page_images: Union[List[str], Dict[int, str]],
+    page_indices: List[int],
+    budget: int,
+    max_pages: int,
+    image_max_kb: float,
+) -> List[List[int]]:
+    """
+    Split page indices into groups of consecutive pages under budget.
+
+    Pages whose image exceeds image_max_kb form a group of their own; a group
+    never spans a gap in page numbers and holds at most max_pages pages.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_cost = 0
+    for page_idx in sorted(page_indices):
+        image = page_images[page_idx]
+        cost = image_page_cost(image)
+        batchable = image_kb(image) <= image_max_kb
+        if current and (
+            not batchable
+            or page_idx != current[-1] + 1
+            or current_cost + cost > budget
+            or len(current) >= max_pages
+        ):
+            groups.append(current)
+            current, current_cost = [], 0
+        current.append(page_idx)
+        current_cost += cost
+        if not batchable:
+            groups.append(current)
+            current, current_cost = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_multi_page_prompt(prompt: str, page_numbers: List[int]) -> str:
+    """Wrap a single-page extraction prompt so the model answers once per page image (1-based page numbers)."""
+    listed = ", ".join(str(n) for n in page_numbers)
+    return (
+        f"{prompt}\n\n"
+        f"**MULTI-PAGE REQUEST:**\n"
+        f"The {len(page_numbers)} images attached are pages {listed} of the document, in that order. "
+        f"Apply the instructions above to each page separately and return ONE JSON object:\n"
+        f"{{\"pages\": [{{\"page_number\": N, \"data\": {{...the JSON object the instructions above ask for, for page N only...}}}}]}}\n"
+        f"- Exactly one entry per image, in the same order, with the page numbers listed above\n"
+        f"- Never move data from one page into another page's entry"
+    )
+
+
+def multi_page_response_format(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Wrap a json_schema response format into the {"pages": [{"page_number", "data"}]} envelope."""
+    if not response_format or response_format.get("type") != "json_schema":
+        return response_format
+    json_schema = response_format.get("json_schema", {})
+    page_schema = json_schema.get("schema", {"type": "object"})
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{json_schema.get('name', 'extraction')}_pages",
+            "strict": False,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "pages": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {"page_number": {"type": "integer"}, "data": page_schema},
+                            "required": ["page_number", "data"],
+                        },
+                    }
+                },
+                "required": ["pages"],
+            },
+        },
+    }
+
+
+def split_multi_page_result(llm_client, result: Dict[str, Any], task: str, page_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Turn a processed multi-page response into regular per-page results.
+
+    Returns the pages (1-based) that came back complete; callers re-send the rest.
+    When the response was truncated, the last page entry may be cut short and
+    is dropped.
+    """
+    parsed = result.get("_parsed", result.get("hierarchical_data")) if isinstance(result, dict) else None
+    entries = parsed.get("pages") if isinstance(parsed, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    if result.get("_truncated"):
+        entries = entries[:-1]
+
+    expected = set(page_numbers)
+    pages: Dict[int, Dict[str, Any]] = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get("data"), dict):
+            continue
+        page_number = entry.get("page_number")
+        if page_number not in expected and position < len(page_numbers):
+            page_number = page_numbers[position]
+        if page_number not in expected or page_number in pages:
+            continue
+        data = entry["data"]
+        normalized = llm_client._normalize_result_structure(data, task)
+        if isinstance(normalized, dict):
+            normalized["_parsed"] = data
+        pages[page_number] = normalized
+    return pages
+
+
+@dataclass
+class BatchStats:
+    """Per-document batching counters."""
+    requests: int = 0  # Multi-page requests sent
+    batched_pages: int = 0  # Pages sent inside multi-page requests
+    fallback_pages: int = 0  # Pages re-sent alone after a truncated / incomplete answer
+    prompt_tokens_saved: int = 0  # Estimated prompt tokens not sent compared to one request per page
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, pages: int, prompt_tokens: int, batch_prompt_tokens: int, fallbacks: int):
+        with self._lock:
+            self.requests += 1
+            self.batched_pages += pages
+            self.fallback_pages += fallbacks
+            # n pages would have sent the prompt n times; fallbacks send it again
+            self.prompt_tokens_saved += pages * prompt_tokens - batch_prompt_tokens - fallbacks * prompt_tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batched_pages": self.batched_pages,
+                "fallback_pages": self.fallback_pages,
+                "prompt_tokens_saved": self.prompt_tokens_saved,
+            }
@@ -5,8 +5,9 @@ import cv2
 import numpy as np
 import asyncio
 import hashlib
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, List, Dict, Tuple, Any
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple, Any, AsyncIterator, Callable, Iterable, Iterator, Union
 from PIL import Image
 import logging
 
@@ -100,12 +101,29 @@ class PDFProcessor:
         Returns: Dictionary with text, blocks, text_blocks, image_blocks or None
         """
         try:
-            text = page.get_text("text")  # Plain text
-            blocks = page.get_text("dict")["blocks"]  # Structured text with positions
-            
-            # Count actual text blocks (not images)
-            text_blocks = [b for b in blocks if b.get("type") == 0]  # type 0 = text block
-            image_blocks = [b for b in blocks if b.get("type") == 1]  # type 1 = image block
+            # One TextPage parse serves text, text blocks and image-block metadata; image
+            # payloads are never extracted ("dict" mode copied every image's bytes)
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_DICT)
+            text = textpage.extractText()  # Plain text (same as page.get_text("text"))
+            
+            text_blocks = [  # type 0 = text block
+                {"type": 0, "number": number, "bbox": (x0, y0, x1, y1), "text": block_text}
+                for x0, y0, x1, y1, block_text, number, block_type in textpage.extractBLOCKS()
+                if block_type == 0
+            ]
+            image_blocks = [  # type 1 = image block (bbox, transform, size - no image bytes)
+                {
+                    "type": 1,
+                    "number": info["number"],
+                    "bbox": info["bbox"],
+                    "transform": info["transform"],
+                    "width": info["width"],
+                    "height": info["height"],
+                    "size": info["size"]
+                }
+                for info in textpage.extractIMGINFO()
+            ]
+            blocks = sorted(text_blocks + image_blocks, key=lambda block: block["number"])
             
             logger.debug(f"📝 Step 1.4: Text extracted - {len(text.strip())} chars, {len(text_blocks)} text blocks, {len(image_blocks)} image blocks")
             
@@ -854,10 +872,149 @@ class PDFProcessor:
         logger.debug(f"Encoded image: {len(img_bytes)} bytes in JPEG format (quality=90)")
         return f"data:image/jpeg;base64,{img_base64}"
 
+    def render_page_image(self, pdf_document: fitz.Document, page_number: int, render_lock: threading.Lock) -> Optional[str]:
+        """
+        Render one page of an open document to a base64 JPEG data URL
+        Same steps as convert_pdf_page_to_image + _encode_image_simple; only the
+        PyMuPDF render holds render_lock (documents are not safe for concurrent use)
+        
+        Returns:
+            Data URL, or None if the page could not be rendered
+        """
+        try:
+            with render_lock:
+                pix = self.step2_render_pdf_page(pdf_document[page_number])
+            if not pix:
+                return None
+            img = self.step3_create_pil_image(pix)
+            del pix
+            if not img:
+                return None
+            img = self.step4_convert_to_a4(img)
+            processed_img, _ = self.step5_apply_text_enhancement(img)
+            return self._encode_image_simple(processed_img)
+        except Exception as e:
+            logger.warning(f"Failed to convert page {page_number + 1}: {e}")
+            return None
+    
+    async def iter_page_images(
+        self,
+        pdf_data: Union[bytes, str],
+        window: asyncio.Semaphore,
+        page_numbers: Optional[Iterable[int]] = None,
+        executor: Optional[Executor] = None
+    ) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """
+        Render PDF pages ahead of the consumer, yielding (page_number, image) in page order
+        
+        Backpressure: every page takes a slot from `window` before it is rendered
+        and keeps it until the consumer calls window.release() - once per yielded
+        page, when it is done with the image (e.g. its LLM call finished). Rendered
+        pages held at any time never exceed the window size, and rendering runs
+        ahead of extraction by exactly the free slots.
+        
+        Args:
+            pdf_data: Raw PDF bytes, or base64 PDF data / data URL
+            window: Semaphore sized to the pages allowed in memory at once
+            page_numbers: 0-indexed pages to render (default: all)
+            executor: Render threads to use (default: a private pool of PDF_PROCESSING_MAX_WORKERS)
+        
+        Yields:
+            (page_number, data URL or None if the page failed to render)
+        """
+        from ..core.config import settings
+        
+        def open_document() -> fitz.Document:
+            pdf_bytes = pdf_data if isinstance(pdf_data, bytes) else base64.b64decode(self.extract_base64_from_data_url(pdf_data))
+            return fitz.open(stream=pdf_bytes, filetype="pdf")
+        
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=settings.PDF_PROCESSING_MAX_WORKERS, thread_name_prefix="pdf-render")
+        loop = asyncio.get_running_loop()
+        # Decoding and parsing the PDF can take a while; keep it off the event loop
+        try:
+            pdf_document = await loop.run_in_executor(executor, open_document)
+        except BaseException:
+            if own_executor:
+                executor.shutdown(wait=False)
+            raise
+        pages = list(page_numbers) if page_numbers is not None else list(range(len(pdf_document)))
+        render_lock = threading.Lock()
+        scheduled: asyncio.Queue = asyncio.Queue()
+        
+        async def schedule():
+            # Start renders in page order as window slots free up
+            for page_number in pages:
+                await window.acquire()
+                scheduled.put_nowait((page_number, loop.run_in_executor(executor, self.render_page_image, pdf_document, page_number, render_lock)))
+            scheduled.put_nowait(None)
+        
+        producer = asyncio.ensure_future(schedule())
+        try:
+            while True:
+                item = await scheduled.get()
+                if item is None:
+                    break
+                page_number, render = item
+                yield page_number, await render
+        finally:
+            producer.cancel()
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            def close_document():
+                with render_lock:
+                    pdf_document.close()
+            
+            # Closing waits for a render still holding the lock; do it off the event loop
+            loop.run_in_executor(None, close_document)
+    
+    def stream_page_images(
+        self,
+        pdf_data: Union[bytes, str],
+        window_size: int,
+        page_numbers: Optional[Iterable[int]] = None
+    ) -> Iterator[Tuple[int, Optional[str], Callable[[], None]]]:
+        """
+        Synchronous view of iter_page_images for thread-based callers
+        
+        Rendering runs on a private event loop thread, so it continues while the
+        caller extracts. Each page comes with a release callback to call once
+        the caller is done with it (frees a window slot for the next page).
+        
+        Yields:
+            (page_number, data URL or None, release)
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="pdf-render-stream", daemon=True)
+        thread.start()
+        window = asyncio.Semaphore(max(1, window_size))
+        pages = self.iter_page_images(pdf_data, window, page_numbers)
+        
+        def release():
+            loop.call_soon_threadsafe(window.release)
+        
+        try:
+            while True:
+                try:
+                    page_number, image = asyncio.run_coroutine_threadsafe(pages.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+                yield page_number, image, release
+        finally:
+            try:
+                asyncio.run_coroutine_threadsafe(pages.aclose(), loop).result()
+            finally:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+
     async def convert_pdf_to_images(self, pdf_data: str) -> List[str]:
         """
         Convert all pages of a PDF to images (parallel version)
-        Uses cached PDF document for improved performance
+        Materializes every page; prefer iter_page_images / stream_page_images
+        to bound memory on long documents
         
         Args:
             pdf_data: Base64 encoded PDF data or data URL
@@ -866,8 +1023,6 @@ class PDFProcessor:
             List of base64 encoded image data URLs
         """
         try:
-            from ..core.config import settings
-            
             # Get page count first
             page_count = self.get_pdf_page_count(pdf_data)
             if page_count == 0:
@@ -876,67 +1031,12 @@ class PDFProcessor:
             
             logger.info(f"Converting PDF with {page_count} pages to images (parallel)")
             
-            # Use thread pool executor for parallel conversion
-            max_workers = settings.PDF_PROCESSING_MAX_WORKERS
-            thread_pool = ThreadPoolExecutor(max_workers=max_workers)
+            # Window covers the whole document: every page is kept
+            window = asyncio.Semaphore(page_count)
+            images = [image async for _, image in self.iter_page_images(pdf_data, window) if image is not None]
             
-            # CRITICAL FIX #1: Wrap in try-finally to ensure thread pool shutdown
-            try:
-                loop = asyncio.get_event_loop()
-                
-                async def convert_page_async(page_num: int) -> Optional[str]:
-                    """Convert a single page asynchronously and encode to base64"""
-                    try:
-                        # Convert PDF page to PIL Image (in thread pool)
-                        # Use submit() + wrap_future() for better event loop integration
-                        from concurrent.futures import Future
-                        future: Future = thread_pool.submit(
-                            self.convert_pdf_page_to_image,
-                            pdf_data,
-                            page_num
-                        )
-                        image_data = await asyncio.wrap_future(future)
-                        if image_data and isinstance(image_data, dict):
-                            processed_image_pil = image_data.get("processed")
-                            if processed_image_pil:
-                                # Encode to base64 in async context (not blocking thread pool)
-                                processed_image_base64 = self._encode_image_simple(processed_image_pil)
-                                
-                                # CRITICAL FIX #6: Delete PIL image after encoding to free memory
-                                try:
-                                    del processed_image_pil
-                                except Exception:
-                                    pass
-                                
-                                logger.debug(f"Converted and encoded page {page_num + 1}/{page_count}")
-                                return processed_image_base64
-                    except Exception as e:
-                        logger.warning(f"Failed to convert page {page_num + 1}: {e}")
-                    return None
-                
-                # Convert all pages in parallel
-                tasks = [convert_page_async(page_num) for page_num in range(page_count)]
-                results = await asyncio.gather(*tasks)
-                
-                # Filter out None results and maintain order
-                images = [img for img in results if img is not None]
-                
-                logger.info(f"Successfully converted {len(images)} pages to images")
-                return images
-                
-            finally:
-                # CRITICAL FIX #1: Always shutdown thread pool, even on errors
-                try:
-                    thread_pool.shutdown(wait=True)
-                    logger.debug("✅ Thread pool shut down in convert_pdf_to_images")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error shutting down thread pool: {e}")
-                
-                # CRITICAL FIX #2: Always clear PDF cache, even on errors
-                try:
-                    self.clear_pdf_cache()
-                except Exception as e:
-                    logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            logger.info(f"Successfully converted {len(images)} pages to images")
+            return images
             
         except Exception as e:
             logger.error(f"Error converting PDF to images: {e}")
@@ -1283,7 +1383,7 @@ class PDFProcessor:
         
         Args:
             page: PyMuPDF page object
-            image_blocks: List of image blocks from page.get_text("dict")["blocks"]
+            image_blocks: Image blocks from step1_4_extract_text_content (or page.get_text("dict")["blocks"])
         
         Returns:
             List of dicts with image data and block metadata
@@ -4,8 +4,10 @@ Abstract base class for different document sources
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
+from contextlib import contextmanager
+import os
 
 
 @dataclass
@@ -18,6 +20,36 @@ class DocumentInfo:
     metadata: Optional[Dict[str, Any]] = None
 
 
+@dataclass
+class DocumentPage:
+    """One page of a paged discovery"""
+    documents: List[DocumentInfo]
+    cursor: Optional[Any] = None  # JSON-serializable position after this page; pass back to resume
+
+
+PROXY_ENV_VARS = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']
+
+
+@contextmanager
+def _without_proxy_env():
+    """Clear proxy environment variables to avoid httpx/supabase conflict"""
+    saved_proxies = {var: os.environ.pop(var) for var in PROXY_ENV_VARS if var in os.environ}
+    try:
+        yield
+    finally:
+        os.environ.update(saved_proxies)
+
+
+def _first_documents(pages: Iterator[DocumentPage], limit: int) -> List[DocumentInfo]:
+    """Collect up to limit documents from a paged discovery"""
+    documents = []
+    for page in pages:
+        documents.extend(page.documents)
+        if len(documents) >= limit:
+            break
+    return documents[:limit]
+
+
 class SourceAdapter(ABC):
     """Abstract base class for source adapters"""
     
@@ -39,6 +71,25 @@ class SourceAdapter(ABC):
         """
         pass
     
+    def iter_document_pages(
+        self,
+        config: Dict[str, Any],
+        cursor: Optional[Any] = None,
+        page_size: int = 50
+    ) -> Iterator[DocumentPage]:
+        """
+        Discover every document of the source, one page at a time
+        
+        Args:
+            config: Source-specific configuration
+            cursor: Cursor of the last page already handled (None = from the start)
+            page_size: Documents per page (sources may return shorter pages)
+        
+        Yields:
+            Pages in a stable order; each carries the cursor to resume after it
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support paged discovery")
+    
     @abstractmethod
     def get_document_content(self, source_path: str) -> bytes:
         """
@@ -96,27 +147,22 @@ class FolderSourceAdapter(SourceAdapter):
             bucket_name = parts[0] if len(parts) > 0 else settings.SUPABASE_STORAGE_BUCKET
             prefix = parts[1] if len(parts) > 1 else ""
             
-            # Clear proxy environment variables to avoid httpx/supabase conflict
-            proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']
-            saved_proxies = {}
-            for var in proxy_vars:
-                if var in os.environ:
-                    saved_proxies[var] = os.environ.pop(var)
-            
             try:
-                supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-                file_list = supabase.storage.from_(bucket_name).list(prefix)
+                with _without_proxy_env():
+                    supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
                 
                 count = 0
                 file_types_lower = [ext.lower().lstrip('.') for ext in file_types]
                 
-                for file_obj in file_list:
-                    filename = file_obj.get('name', '')
-                    ext = filename.split('.')[-1].lower() if '.' in filename else ''
-                    if ext in file_types_lower:
-                        count += 1
-                        if max_count and count >= max_count:
-                            return count
+                # Storage caps a single listing (100 entries by default), so page through it
+                for file_list, _ in self._list_supabase(supabase.storage.from_(bucket_name), prefix):
+                    for file_obj in file_list:
+                        filename = file_obj.get('name', '')
+                        ext = filename.split('.')[-1].lower() if '.' in filename else ''
+                        if ext in file_types_lower:
+                            count += 1
+                            if max_count and count >= max_count:
+                                return count
                 
                 return count
                 
@@ -125,10 +171,6 @@ class FolderSourceAdapter(SourceAdapter):
                 logger = logging.getLogger(__name__)
                 logger.error(f"❌ Failed to count documents in Supabase Storage: {e}")
                 raise ValueError(f"Failed to count documents in Supabase Storage: {e}")
-            finally:
-                # Restore proxy environment variables
-                for var, value in saved_proxies.items():
-                    os.environ[var] = value
         
         # Local folder path
         if not os.path.exists(folder_path):
@@ -171,10 +213,16 @@ class FolderSourceAdapter(SourceAdapter):
         config: Dict[str, Any],
         batch_size: int = 50
     ) -> List[DocumentInfo]:
-        """Discover documents from folder or Supabase Storage"""
-        import os
-        from pathlib import Path
-        
+        """Discover the first batch_size documents from folder or Supabase Storage"""
+        return _first_documents(self.iter_document_pages(config, page_size=batch_size), batch_size)
+    
+    def iter_document_pages(
+        self,
+        config: Dict[str, Any],
+        cursor: Optional[Any] = None,
+        page_size: int = 50
+    ) -> Iterator[DocumentPage]:
+        """Page through a folder (sorted walk, cursor = last relative path) or Supabase Storage (cursor = listing offset)"""
         folder_path = config.get("path")
         file_types = config.get("file_types", ["pdf", "jpg", "jpeg", "png"])
         recursive = config.get("recursive", True)
@@ -182,46 +230,122 @@ class FolderSourceAdapter(SourceAdapter):
         if not folder_path:
             raise ValueError("Folder path is required")
         
+        # Normalize file types to lowercase for case-insensitive matching
+        file_types_lower = [ext.lower().lstrip('.') for ext in file_types]
+        
         # Check if it's a Supabase Storage path
         if folder_path.startswith('supabase://'):
-            # Extract bucket and session path from supabase://bucket/session-id
-            from app.core.config import settings
-            from supabase import create_client
-            import os as os_module
-            
-            # Parse: supabase://backendbucket/session-id
-            parts = folder_path.replace('supabase://', '').split('/', 1)
-            bucket_name = parts[0] if len(parts) > 0 else settings.SUPABASE_STORAGE_BUCKET
-            prefix = parts[1] if len(parts) > 1 else ""
-            
-            # Clear proxy environment variables to avoid httpx/supabase conflict
-            proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']
-            saved_proxies = {}
-            for var in proxy_vars:
-                if var in os_module.environ:
-                    saved_proxies[var] = os_module.environ.pop(var)
+            return self._iter_supabase_pages(folder_path, file_types_lower, cursor or {}, page_size)
+        
+        # Local folder path
+        if not os.path.exists(folder_path):
+            raise ValueError(f"Folder path does not exist: {folder_path}")
+        
+        return self._iter_local_pages(folder_path, file_types_lower, recursive, cursor or {}, page_size)
+    
+    def _iter_local_pages(
+        self,
+        folder_path: str,
+        file_types_lower: List[str],
+        recursive: bool,
+        cursor: Dict[str, Any],
+        page_size: int
+    ) -> Iterator[DocumentPage]:
+        """Page through a local folder, files matched on extension (case-insensitive)"""
+        documents = []
+        last_path = None
+        for relative_path, entry in self._walk_local(folder_path, recursive, cursor.get("after")):
+            name = entry.name
+            ext = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+            if ext not in file_types_lower:
+                continue
             
+            documents.append(DocumentInfo(
+                source_path=entry.path,
+                filename=name,
+                file_size=entry.stat().st_size,
+                mime_type=self._guess_mime_type(f'.{ext}')
+            ))
+            last_path = relative_path
+            if len(documents) >= page_size:
+                yield DocumentPage(documents, {"after": last_path})
+                documents = []
+        
+        if documents:
+            yield DocumentPage(documents, {"after": last_path})
+    
+    def _walk_local(self, folder_path: str, recursive: bool, after: Optional[str] = None):
+        """
+        Walk a folder depth-first with each directory's entries sorted by name
+        
+        The order is the order of relative paths compared component by component,
+        so a walk resumed after a relative path skips whole directories that sort
+        before it without scanning them.
+        
+        Yields:
+            (relative path with '/' separators, os.DirEntry) for every file
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        after_parts = tuple(after.split('/')) if after else ()
+        
+        def walk(directory: str, parts: tuple):
             try:
+                with os.scandir(directory) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError as e:
+                logger.warning(f"⚠️ Cannot list {directory}: {e}")
+                return
+            
+            for entry in entries:
+                entry_parts = parts + (entry.name,)
+                if entry.is_dir(follow_symlinks=False):
+                    # Descend unless the cursor lies past this whole directory
+                    if recursive and (entry_parts > after_parts or after_parts[:len(entry_parts)] == entry_parts):
+                        yield from walk(entry.path, entry_parts)
+                elif entry_parts > after_parts and entry.is_file():
+                    yield '/'.join(entry_parts), entry
+        
+        yield from walk(folder_path, ())
+    
+    def _iter_supabase_pages(
+        self,
+        folder_path: str,
+        file_types_lower: List[str],
+        cursor: Dict[str, Any],
+        page_size: int
+    ) -> Iterator[DocumentPage]:
+        """Page through a Supabase Storage prefix (supabase://bucket/prefix), listing sorted by name"""
+        import json
+        import logging
+        from app.core.config import settings
+        from supabase import create_client
+        
+        logger = logging.getLogger(__name__)
+        
+        # Parse: supabase://backendbucket/session-id
+        parts = folder_path.replace('supabase://', '').split('/', 1)
+        bucket_name = parts[0] if len(parts) > 0 else settings.SUPABASE_STORAGE_BUCKET
+        prefix = parts[1] if len(parts) > 1 else ""
+        
+        # Storage caps a listing at 1000 entries
+        limit = max(1, min(page_size, 1000))
+        
+        try:
+            with _without_proxy_env():
                 supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+                bucket = supabase.storage.from_(bucket_name)
                 
                 # Try to load filename mapping
                 filename_mapping = {}
                 mapping_path = f"{prefix}/.filenames.json" if prefix else ".filenames.json"
                 try:
-                    mapping_content = supabase.storage.from_(bucket_name).download(mapping_path)
-                    import json
-                    filename_mapping = json.loads(mapping_content.decode('utf-8'))
-                    import logging
-                    logger = logging.getLogger(__name__)
+                    filename_mapping = json.loads(bucket.download(mapping_path).decode('utf-8'))
                     logger.info(f"✅ Loaded filename mapping with {len(filename_mapping)} entries")
                 except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
                     logger.warning(f"⚠️ No filename mapping found: {e}")
-                
-                # List files in the bucket with prefix
-                file_list = supabase.storage.from_(bucket_name).list(prefix)
-                
+            
+            for file_list, offset in self._list_supabase(bucket, prefix, cursor.get("offset", 0), limit):
                 documents = []
                 for file_obj in file_list:
                     storage_filename = file_obj.get('name', '')
@@ -230,78 +354,44 @@ class FolderSourceAdapter(SourceAdapter):
                     if storage_filename == '.filenames.json':
                         continue
                     
-                    file_path = f"{prefix}/{storage_filename}" if prefix else storage_filename
-                    
-                    # Get original filename from mapping, fallback to storage filename
-                    original_filename = filename_mapping.get(storage_filename, storage_filename)
-                    
                     # Check file extension
                     ext = storage_filename.split('.')[-1].lower() if '.' in storage_filename else ''
-                    if ext in [ft.lower().lstrip('.') for ft in file_types]:
-                        documents.append(DocumentInfo(
-                            source_path=file_path,  # Relative path in bucket (UUID filename)
-                            filename=original_filename,  # Original filename for display
-                            file_size=file_obj.get('metadata', {}).get('size'),
-                            mime_type=file_obj.get('metadata', {}).get('mimetype', self._guess_mime_type(f'.{ext}'))
-                        ))
-                        
-                        if len(documents) >= batch_size:
-                            break
-                
-                return documents[:batch_size]
+                    if ext not in file_types_lower:
+                        continue
+                    
+                    metadata = file_obj.get('metadata') or {}
+                    documents.append(DocumentInfo(
+                        source_path=f"{prefix}/{storage_filename}" if prefix else storage_filename,  # Relative path in bucket (UUID filename)
+                        filename=filename_mapping.get(storage_filename, storage_filename),  # Original filename for display
+                        file_size=metadata.get('size'),
+                        mime_type=metadata.get('mimetype', self._guess_mime_type(f'.{ext}'))
+                    ))
                 
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"❌ Failed to discover documents from Supabase Storage: {e}")
-                raise ValueError(f"Failed to discover documents from Supabase Storage: {e}")
-            finally:
-                # Restore proxy environment variables
-                for var, value in saved_proxies.items():
-                    os_module.environ[var] = value
+                if documents:
+                    yield DocumentPage(documents, {"offset": offset})
         
-        # Local folder path
-        if not os.path.exists(folder_path):
-            raise ValueError(f"Folder path does not exist: {folder_path}")
-        
-        documents = []
-        path = Path(folder_path)
-        
-        # Normalize file types to lowercase for case-insensitive matching
-        file_types_lower = [ext.lower() for ext in file_types]
-        
-        # Search for files - iterate through all files and check extension
-        # This is more reliable than pattern matching, especially for case sensitivity
-        if recursive:
-            for file_path in path.rglob("*"):
-                if file_path.is_file():
-                    # Get file extension (case-insensitive)
-                    ext = file_path.suffix.lower().lstrip('.')
-                    if ext in file_types_lower:
-                        documents.append(DocumentInfo(
-                            source_path=str(file_path),
-                            filename=file_path.name,
-                            file_size=file_path.stat().st_size,
-                            mime_type=self._guess_mime_type(file_path.suffix)
-                        ))
-                        if len(documents) >= batch_size:
-                            break
-        else:
-            for file_path in path.iterdir():
-                if file_path.is_file():
-                    # Get file extension (case-insensitive)
-                    ext = file_path.suffix.lower().lstrip('.')
-                    if ext in file_types_lower:
-                        documents.append(DocumentInfo(
-                            source_path=str(file_path),
-                            filename=file_path.name,
-                            file_size=file_path.stat().st_size,
-                            mime_type=self._guess_mime_type(file_path.suffix)
-                        ))
-                        if len(documents) >= batch_size:
-                            break
+        except Exception as e:
+            logger.error(f"❌ Failed to discover documents from Supabase Storage: {e}")
+            raise ValueError(f"Failed to discover documents from Supabase Storage: {e}")
+    
+    def _list_supabase(self, bucket, prefix: str, offset: int = 0, limit: int = 1000):
+        """
+        Page through a Supabase Storage listing sorted by name
         
-        return documents[:batch_size]
+        Yields:
+            (entries of one listing call, offset of the next call)
+        """
+        while True:
+            with _without_proxy_env():
+                file_list = bucket.list(prefix, {
+                    "limit": limit,
+                    "offset": offset,
+                    "sortBy": {"column": "name", "order": "asc"},
+                })
+            offset += len(file_list)
+            yield file_list, offset
+            if len(file_list) < limit:
+                return
     
     def get_document_content(self, source_path: str) -> bytes:
         """Read document from file system or Supabase Storage"""
@@ -434,6 +524,8 @@ class CloudSourceAdapter(SourceAdapter):
 class GoogleDriveSourceAdapter(SourceAdapter):
     """Adapter for Google Drive"""
     
+    FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+    
     def __init__(self):
         self._service = None
         self._credentials = None
@@ -499,52 +591,82 @@ class GoogleDriveSourceAdapter(SourceAdapter):
         config: Dict[str, Any],
         batch_size: int = 50
     ) -> List[DocumentInfo]:
-        """Discover documents from Google Drive"""
+        """Discover the first batch_size documents from Google Drive"""
+        return _first_documents(self.iter_document_pages(config, page_size=batch_size), batch_size)
+    
+    def iter_document_pages(
+        self,
+        config: Dict[str, Any],
+        cursor: Optional[Any] = None,
+        page_size: int = 50
+    ) -> Iterator[DocumentPage]:
+        """
+        Page through Google Drive with files.list page tokens
+        
+        With recursive, subfolders found on a page are queued and listed after
+        the current folder. The cursor is the folder queue plus the page token
+        of the current folder.
+        """
         service = self._get_service(config)
         
         folder_id = config.get("folder_id")
         file_types = config.get("file_types", ["application/pdf", "image/jpeg", "image/png"])
-        recursive = config.get("recursive", True)
+        recursive = config.get("recursive", True) and bool(folder_id)
         shared_drive_id = config.get("shared_drive_id")
         
-        documents = []
-        
-        # Build query
-        query_parts = []
-        
-        # Filter by folder
-        if folder_id:
-            query_parts.append(f"'{folder_id}' in parents")
-        
-        # Filter by MIME types
-        if file_types:
-            mime_queries = [f"mimeType='{mime}'" for mime in file_types]
-            query_parts.append(f"({' or '.join(mime_queries)})")
-        
-        # Exclude trashed files
-        query_parts.append("trashed=false")
-        
-        query = " and ".join(query_parts) if query_parts else None
-        
-        # Build request parameters
-        params = {
-            'pageSize': min(batch_size, 1000),
-            'fields': 'files(id, name, mimeType, size, parents, createdTime, modifiedTime)',
-            'q': query
-        }
+        cursor = cursor or {}
+        folders = list(cursor.get("folders", [folder_id]))
+        page_token = cursor.get("page_token")
         
-        if shared_drive_id:
-            params['driveId'] = shared_drive_id
-            params['includeItemsFromAllDrives'] = True
-            params['supportsAllDrives'] = True
-            params['corpora'] = 'drive'
+        # Build MIME type filter (subfolders too when walking recursively)
+        mime_types = list(file_types or [])
+        if recursive and mime_types:
+            mime_types.append(self.FOLDER_MIME_TYPE)
         
-        try:
-            # Execute request
-            results = service.files().list(**params).execute()
-            files = results.get('files', [])
+        while folders:
+            # Build query
+            query_parts = []
+            
+            # Filter by folder
+            if folders[0]:
+                query_parts.append(f"'{folders[0]}' in parents")
+            
+            # Filter by MIME types
+            if mime_types:
+                mime_queries = [f"mimeType='{mime}'" for mime in mime_types]
+                query_parts.append(f"({' or '.join(mime_queries)})")
+            
+            # Exclude trashed files
+            query_parts.append("trashed=false")
+            
+            # Build request parameters
+            params = {
+                'pageSize': max(1, min(page_size, 1000)),
+                'fields': 'nextPageToken, files(id, name, mimeType, size, parents, createdTime, modifiedTime)',
+                'q': " and ".join(query_parts)
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            
+            if shared_drive_id:
+                params['driveId'] = shared_drive_id
+                params['includeItemsFromAllDrives'] = True
+                params['supportsAllDrives'] = True
+                params['corpora'] = 'drive'
+            
+            try:
+                # Execute request
+                results = service.files().list(**params).execute()
+            except Exception as e:
+                raise RuntimeError(f"Failed to discover Google Drive documents: {e}")
             
-            for file in files[:batch_size]:
+            documents = []
+            for file in results.get('files', []):
+                if file.get('mimeType') == self.FOLDER_MIME_TYPE:
+                    if recursive:
+                        folders.append(file['id'])
+                    continue
+                
                 documents.append(DocumentInfo(
                     source_path=file['id'],  # Store file ID as source_path
                     filename=file['name'],
@@ -558,13 +680,12 @@ class GoogleDriveSourceAdapter(SourceAdapter):
                     }
                 ))
             
-            # TODO: Implement recursive discovery if needed
-            # This would require iterating through subfolders
+            # Next page of this folder, or the next folder
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                folders.pop(0)
             
-        except Exception as e:
-            raise RuntimeError(f"Failed to discover Google Drive documents: {e}")
-        
-        return documents
+            yield DocumentPage(documents, {"folders": list(folders), "page_token": page_token})
     
     def get_document_content(self, source_path: str, config: Optional[Dict[str, Any]] = None) -> bytes:
         """
@@ -697,7 +818,7 @@ class OneDriveSourceAdapter(SourceAdapter):
         raise ValueError("No valid authentication method provided for OneDrive. Provide access_token, token_file, or client credentials")
     
     def _make_graph_request(self, endpoint: str, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Make a request to Microsoft Graph API"""
+        """Make a request to Microsoft Graph API (endpoint path, or an absolute URL such as @odata.nextLink)"""
         try:
             import requests
         except ImportError:
@@ -709,7 +830,8 @@ class OneDriveSourceAdapter(SourceAdapter):
             'Content-Type': 'application/json'
         }
         
-        response = requests.get(f"https://graph.microsoft.com/v1.0{endpoint}", headers=headers)
+        url = endpoint if endpoint.startswith('https://') else f"https://graph.microsoft.com/v1.0{endpoint}"
+        response = requests.get(url, headers=headers)
         response.raise_for_status()
         return response.json()
     
@@ -718,64 +840,92 @@ class OneDriveSourceAdapter(SourceAdapter):
         config: Dict[str, Any],
         batch_size: int = 50
     ) -> List[DocumentInfo]:
-        """Discover documents from OneDrive"""
+        """Discover the first batch_size documents from OneDrive"""
+        return _first_documents(self.iter_document_pages(config, page_size=batch_size), batch_size)
+    
+    def iter_document_pages(
+        self,
+        config: Dict[str, Any],
+        cursor: Optional[Any] = None,
+        page_size: int = 50
+    ) -> Iterator[DocumentPage]:
+        """
+        Page through OneDrive children with @odata.nextLink
+        
+        With recursive (default), subfolders found on a page are queued and
+        listed after the current folder. The cursor is the queue of folder
+        endpoints plus the next link of the current folder.
+        """
         folder_path = config.get("folder_path")
         file_types = config.get("file_types", [".pdf", ".jpg", ".jpeg", ".png"])
         drive_id = config.get("drive_id")
         site_id = config.get("site_id")
+        recursive = config.get("recursive", True)
         
-        documents = []
+        file_types_lower = [ft.lower() for ft in file_types]
         
-        # Build endpoint
+        # Build drive endpoint
         if site_id and drive_id:
             # SharePoint site
-            endpoint = f"/sites/{site_id}/drives/{drive_id}/root"
+            drive_endpoint = f"/sites/{site_id}/drives/{drive_id}"
         elif drive_id:
             # Specific drive
-            endpoint = f"/drives/{drive_id}/root"
+            drive_endpoint = f"/drives/{drive_id}"
         else:
             # Default user drive
-            endpoint = "/me/drive/root"
+            drive_endpoint = "/me/drive"
         
-        # Add folder path if specified
+        # Add folder path if specified, then list children
+        root_endpoint = f"{drive_endpoint}/root"
         if folder_path:
-            endpoint += f":/{folder_path.strip('/')}:"
+            root_endpoint += f":/{folder_path.strip('/')}:"
+        root_endpoint += "/children"
         
-        # List children
-        endpoint += "/children"
+        cursor = cursor or {}
+        folders = list(cursor.get("folders", [root_endpoint]))
+        next_link = cursor.get("next_link")
         
-        try:
-            response = self._make_graph_request(endpoint, config)
-            items = response.get('value', [])
+        while folders:
+            try:
+                response = self._make_graph_request(next_link or f"{folders[0]}?$top={max(1, min(page_size, 1000))}", config)
+            except Exception as e:
+                raise RuntimeError(f"Failed to discover OneDrive documents: {e}")
             
-            for item in items[:batch_size]:
-                # Check if it's a file (not a folder)
-                if 'file' in item:
-                    # Check file extension
-                    name = item.get('name', '')
-                    ext = '.' + name.split('.')[-1].lower() if '.' in name else ''
-                    
-                    if ext in [ft.lower() for ft in file_types]:
-                        documents.append(DocumentInfo(
-                            source_path=item['id'],  # Store item ID as source_path
-                            filename=name,
-                            file_size=item.get('size'),
-                            mime_type=item.get('file', {}).get('mimeType'),
-                            metadata={
-                                'onedrive_id': item['id'],
-                                'web_url': item.get('webUrl'),
-                                'created_time': item.get('createdDateTime'),
-                                'modified_time': item.get('lastModifiedDateTime'),
-                                'download_url': item.get('@microsoft.graph.downloadUrl')
-                            }
-                        ))
+            documents = []
+            for item in response.get('value', []):
+                # Queue subfolders, keep files
+                if 'folder' in item:
+                    if recursive:
+                        folders.append(f"{drive_endpoint}/items/{item['id']}/children")
+                    continue
+                if 'file' not in item:
+                    continue
+                
+                # Check file extension
+                name = item.get('name', '')
+                ext = '.' + name.split('.')[-1].lower() if '.' in name else ''
+                
+                if ext in file_types_lower:
+                    documents.append(DocumentInfo(
+                        source_path=item['id'],  # Store item ID as source_path
+                        filename=name,
+                        file_size=item.get('size'),
+                        mime_type=item.get('file', {}).get('mimeType'),
+                        metadata={
+                            'onedrive_id': item['id'],
+                            'web_url': item.get('webUrl'),
+                            'created_time': item.get('createdDateTime'),
+                            'modified_time': item.get('lastModifiedDateTime'),
+                            'download_url': item.get('@microsoft.graph.downloadUrl')
+                        }
+                    ))
             
-            # TODO: Implement recursive discovery and pagination if needed
+            # Next page of this folder, or the next folder
+            next_link = response.get('@odata.nextLink')
+            if not next_link:
+                folders.pop(0)
             
-        except Exception as e:
-            raise RuntimeError(f"Failed to discover OneDrive documents: {e}")
-        
-        return documents
+            yield DocumentPage(documents, {"folders": list(folders), "next_link": next_link})
     
     def get_document_content(self, source_path: str) -> bytes:
         """Retrieve document content from OneDrive"""
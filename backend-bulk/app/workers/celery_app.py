@@ -2,9 +2,14 @@
 Celery Application Configuration
 """
 
+import logging
+
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create Celery app
 celery_app = Celery(
     'bulk_processing',
@@ -51,6 +56,11 @@ celery_app.conf.beat_schedule = {
         'task': 'app.workers.celery_app.db_heartbeat',
         'schedule': 900.0,  # Run every 15 minutes
     },
+    # Fair-share scheduler safety net: frees slots of lost tasks and dispatches
+    'scheduler-tick': {
+        'task': 'app.workers.celery_app.scheduler_tick',
+        'schedule': settings.FAIR_SCHEDULER_TICK_S,
+    },
     # 'discover-new-documents': {
     #     'task': 'app.workers.discovery.periodic_discovery',
     #     'schedule': 60.0,  # Run every 60 seconds
@@ -70,3 +80,67 @@ def db_heartbeat():
     except Exception as e:
         return f"Error: {e}"
 
+
+@celery_app.task(name='app.workers.celery_app.scheduler_tick')
+def scheduler_tick():
+    """Free scheduler slots of lost document tasks and dispatch queued documents"""
+    from app.workers.scheduler import get_job_scheduler
+    scheduler = get_job_scheduler()
+    if scheduler is None:
+        return 0
+    scheduler.reap_stale()
+    return scheduler.dispatch()
+
+
+# task_id -> stop event of the slot keep-alive of a running process_document
+_slot_keepalives = {}
+
+
+@task_prerun.connect
+def mark_document_started(sender=None, task_id=None, args=None, **kwargs):
+    """Keep a scheduled document's slot alive while its task runs (restarts after a retry included)"""
+    if sender is None or sender.name != 'app.workers.processing.process_document' or not args:
+        return
+    from app.workers.scheduler import get_job_scheduler
+    try:
+        scheduler = get_job_scheduler()
+        if scheduler is not None:
+            scheduler.started(args[1], args[0])
+            _slot_keepalives[task_id] = scheduler.keep_alive(args[1], args[0])
+    except Exception as e:
+        logger.warning(f"⚠️ Scheduler start hook failed: {e}")
+
+
+@task_postrun.connect
+def release_document_slot(sender=None, task_id=None, args=None, state=None, **kwargs):
+    """Free a scheduled document's slot once its task is done (a pending retry keeps it) and dispatch the next one"""
+    if sender is None or sender.name != 'app.workers.processing.process_document' or not args:
+        return
+    keepalive = _slot_keepalives.pop(task_id, None)
+    if keepalive is not None:
+        keepalive.set()
+    if state == 'RETRY':
+        return
+    from app.workers.scheduler import get_job_scheduler
+    try:
+        scheduler = get_job_scheduler()
+        if scheduler is not None:
+            scheduler.release(args[1], args[0])
+    except Exception as e:
+        logger.warning(f"⚠️ Scheduler release hook failed (slot is freed by the next tick): {e}")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_page_engine(**kwargs):
+    """Stop the process's async page engine (if one was started) when the worker exits"""
+    from app.workers.page_engine import shutdown_page_engine
+    shutdown_page_engine()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_bulk_inserter(**kwargs):
+    """Close the process's COPY connection pool (if one was opened) when the worker exits"""
+    from app.services.bulk_insert_service import shutdown_sync_bulk_inserter
+    shutdown_sync_bulk_inserter()
@@ -7,27 +7,37 @@ from app.workers.celery_app import celery_app
 from typing import Dict, Any, List
 import logging
 import os
+import time
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime
 from app.core.database import get_sync_db
 from app.models.database import BulkJob, BulkJobDocument
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+DISCOVERY_MAX_RETRIES = 3
+
 
 @celery_app.task(bind=True, name='app.workers.discovery.discover_documents')
 def discover_documents(self, job_id: str, source_config: Dict[str, Any]):
     """
     Discover documents from a source
     
+    Folder, Supabase Storage, Google Drive and OneDrive sources are paged
+    through; each page is inserted and queued for processing before the next
+    one is listed, and a retry resumes after the last saved page.
+    
     Args:
         job_id: Bulk job ID
         source_config: Source configuration (type, path, etc.)
     
     Returns:
-        List of discovered document IDs
+        List with the document ID for a single file, otherwise the discovery
+        summary (status, cursor, discovered, pages)
     """
     logger.info(f"🔍 Starting document discovery for job {job_id}")
     logger.info(f"📋 Source config: {source_config}")
@@ -77,85 +87,215 @@ def discover_documents(self, job_id: str, source_config: Dict[str, Any]):
             finally:
                 db.close()
         
-        # Handle folder-based discovery (Google Drive folder, local folder, etc.)
-        if provider in ['google_drive', 'onedrive']:
-            # Use appropriate source adapter
-            from app.services.source_adapter import SourceAdapterFactory
-            
-            adapter = SourceAdapterFactory.create(provider)
-            discovered_docs = adapter.discover_documents(source_config, batch_size=100)
-            
-            logger.info(f"📄 Found {len(discovered_docs)} documents from {provider}")
-            
-        else:
-            # Folder source (local or Supabase Storage)
-            # Use FolderSourceAdapter for both local and Supabase Storage
-            from app.services.source_adapter import SourceAdapterFactory
-            
-            adapter = SourceAdapterFactory.create('folder')
-            discovered_docs = adapter.discover_documents(source_config, batch_size=100)
-            
-            folder_path = source_config.get('path', '')
-            logger.info(f"📁 Scanned folder: {folder_path}")
-            logger.info(f"📄 Found {len(discovered_docs)} documents")
+        # Handle folder-based discovery (Google Drive folder, local folder, Supabase Storage)
+        from app.services.source_adapter import SourceAdapterFactory
         
-        # Create database records for all discovered documents
-        db = next(get_sync_db())
-        try:
-            # Get job
-            job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
-            if not job:
-                logger.error(f"❌ Job not found: {job_id}")
-                return []
-            
-            # Create document records
-            document_ids = []
-            for doc_info in discovered_docs:
-                doc = BulkJobDocument(
-                    id=uuid4(),
-                    job_id=job_id,
-                    source_path=doc_info.source_path,
-                    filename=doc_info.filename,
-                    file_size=doc_info.file_size,
-                    status='pending'
-                )
-                db.add(doc)
-                document_ids.append(str(doc.id))
-                logger.info(f"  ✅ {doc_info.filename}")
+        adapter = SourceAdapterFactory.create(provider if provider in ['google_drive', 'onedrive'] else 'folder')
+        return _discover_pages(job_id, source_config, adapter)
+    
+    except Exception as exc:
+        logger.error(f"❌ Discovery failed for job {job_id}: {exc}", exc_info=True)
+        if self.request.retries >= DISCOVERY_MAX_RETRIES:
+            _mark_discovery_failed(job_id, exc)
+        raise self.retry(exc=exc, countdown=60, max_retries=DISCOVERY_MAX_RETRIES)
+
+
+def _discover_pages(job_id: str, source_config: Dict[str, Any], adapter) -> Dict[str, Any]:
+    """
+    Page through the source, inserting and queueing each page as it arrives
+    
+    Progress lives in job.processing_config['discovery'] (status, cursor,
+    discovered, pages) and is committed with each page's rows, so a retried
+    task continues after the last page it saved. Processing of a page starts
+    while later pages are still being listed.
+    """
+    from app.core.config import settings
+    from app.workers.scheduler import enqueue_documents
+    
+    db = next(get_sync_db())
+    try:
+        # Get job
+        job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+        if not job:
+            logger.error(f"❌ Job not found: {job_id}")
+            return {"job_id": job_id, "discovered": 0}
+        
+        job_config = {
+            'source_config': source_config,
+            'processing_options': job.processing_options if job.processing_options else {},
+            'extraction_task': 'without_template_extraction'
+        }
+        
+        state = dict((job.processing_config or {}).get('discovery') or {})
+        if state.get('status') == 'completed':
+            logger.info(f"✅ Discovery already complete for job {job_id}: {state.get('discovered', 0)} documents")
+            if state.get('requeue_pending'):
+                _requeue_pending(db, job, job_config, state)
+            return {"job_id": job_id, **state}
+        
+        cursor = state.get('cursor')
+        if cursor:
+            logger.info(f"🔁 Resuming discovery for job {job_id} after {state.get('discovered', 0)} documents")
+        state.update(status='running', cursor=cursor, discovered=state.get('discovered', 0), pages=state.get('pages', 0))
+        _save_discovery_state(job, state)
+        db.commit()
+        
+        page_size = (job.processing_config or {}).get('discovery_batch_size') or settings.DISCOVERY_PAGE_SIZE
+        
+        started = time.monotonic()
+        queued_total = 0
+        queue_failed = False
+        first_queued = False
+        for page in adapter.iter_document_pages(source_config, cursor=cursor, page_size=page_size):
+            # Stop listing once the job is stopped, failed or deleted (paused jobs keep filling their queue)
+            status = db.query(BulkJob.status).filter(BulkJob.id == job_id).scalar()
+            if status not in ('running', 'paused'):
+                logger.info(f"🛑 Job {job_id} is {status or 'deleted'} - stopping discovery")
+                if status:
+                    state['status'] = 'stopped'
+                    _save_discovery_state(job, state)
+                    db.commit()
+                return {"job_id": job_id, **state}
             
-            # Update job total_documents
-            job.total_documents = len(document_ids)
+            # Create document records and save the cursor in one transaction
+            document_ids = _insert_page(db, job_id, page.documents)
+            state.update(cursor=page.cursor, discovered=state['discovered'] + len(document_ids), pages=state['pages'] + 1)
+            job.total_documents = BulkJob.total_documents + len(document_ids)
+            _save_discovery_state(job, state)
             db.commit()
             
-            logger.info(f"✅ Discovery complete for job {job_id}: {len(document_ids)} documents")
-            
-            # Queue processing tasks for discovered documents
-            from app.workers.processing import process_document
-            
-            job_config = {
-                'source_config': source_config,
-                'processing_options': job.processing_options if job.processing_options else {},
-                'extraction_task': 'without_template_extraction'
-            }
+            if not document_ids:
+                continue
             
-            queued_count = 0
-            for doc_id in document_ids:
-                try:
-                    process_document.delay(doc_id, job_id, job_config)
-                    queued_count += 1
-                except Exception as e:
-                    logger.error(f"   ❌ Failed to queue document {doc_id}: {e}")
-            
-            logger.info(f"📤 Queued {queued_count}/{len(document_ids)} documents for processing")
-            
-            return document_ids
-            
-        finally:
-            db.close()
+            # Queue processing tasks for this page (fair-share scheduler when enabled)
+            try:
+                queued_total += enqueue_documents(job, document_ids, job_config)
+            except Exception as e:
+                queue_failed = True
+                logger.error(f"   ❌ Failed to queue documents for job {job_id}: {e}")
             
-    except Exception as exc:
-        logger.error(f"❌ Discovery failed for job {job_id}: {exc}", exc_info=True)
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+            if not first_queued:
+                first_queued = True
+                logger.info(f"🚀 First {len(document_ids)} documents of job {job_id} queued {time.monotonic() - started:.1f}s into discovery")
+            logger.info(f"📄 Discovery page {state['pages']}: +{len(document_ids)} documents ({state['discovered']} total)")
+        
+        state['status'] = 'completed'
+        if queue_failed:
+            state['requeue_pending'] = True
+        _save_discovery_state(job, state)
+        db.commit()
+        
+        logger.info(
+            f"✅ Discovery complete for job {job_id}: {state['discovered']} documents "
+            f"in {state['pages']} pages, {queued_total} queued ({time.monotonic() - started:.1f}s)"
+        )
+        
+        if state.get('requeue_pending'):
+            _requeue_pending(db, job, job_config, state)
+        
+        _complete_job_if_done(db, job)
+        return {"job_id": job_id, **state}
+    
+    finally:
+        db.close()
+
+
+def _insert_page(db: Session, job_id: str, documents: List[Any]) -> List[str]:
+    """Insert a page of discovered documents, skipping files the job already has; returns the new document IDs"""
+    if not documents:
+        return []
+    
+    rows = {}
+    for doc_info in documents:
+        rows.setdefault(doc_info.source_path, {
+            'id': uuid4(),
+            'job_id': job_id,
+            'source_path': doc_info.source_path,
+            'filename': doc_info.filename,
+            'file_size': doc_info.file_size,
+            'mime_type': doc_info.mime_type,
+            'status': 'pending'
+        })
+    
+    # A resumed discovery may list its last page again. ON CONFLICT relies on the
+    # (job_id, source_path) unique index (migration 007); the lookup keeps
+    # databases without it duplicate-free.
+    existing = {
+        source_path for (source_path,) in db.query(BulkJobDocument.source_path).filter(
+            BulkJobDocument.job_id == job_id,
+            BulkJobDocument.source_path.in_(list(rows))
+        )
+    }
+    values = [row for source_path, row in rows.items() if source_path not in existing]
+    if not values:
+        return []
+    
+    result = db.execute(
+        pg_insert(BulkJobDocument).values(values).on_conflict_do_nothing().returning(BulkJobDocument.id)
+    )
+    return [str(doc_id) for doc_id in result.scalars()]
+
+
+def _requeue_pending(db: Session, job: BulkJob, job_config: Dict[str, Any], state: Dict[str, Any]):
+    """Queue every pending document of a running job in one go (replacing its scheduler queue) after a page failed to queue"""
+    from app.workers.scheduler import enqueue_documents
+    
+    if job.status != 'running':
+        return
+    
+    pending_ids = [
+        str(doc_id) for (doc_id,) in db.query(BulkJobDocument.id).filter(
+            BulkJobDocument.job_id == job.id,
+            BulkJobDocument.status == 'pending'
+        )
+    ]
+    requeued = enqueue_documents(job, pending_ids, job_config, replace=True)
+    logger.info(f"📤 Re-queued {requeued} pending documents for job {job.id}")
+    
+    state.pop('requeue_pending', None)
+    _save_discovery_state(job, state)
+    db.commit()
+
+
+def _save_discovery_state(job: BulkJob, state: Dict[str, Any]):
+    """Store discovery progress in processing_config (reassigned so the JSON column is flagged dirty)"""
+    job.processing_config = {**(job.processing_config or {}), 'discovery': dict(state)}
+
+
+def _mark_discovery_failed(job_id: str, exc: Exception):
+    """Record that discovery gave up, so processing can complete the job with what was found"""
+    db = next(get_sync_db())
+    try:
+        job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+        if not job:
+            return
+        state = dict((job.processing_config or {}).get('discovery') or {})
+        state.update(status='failed', error=str(exc)[:500])
+        _save_discovery_state(job, state)
+        db.commit()
+        _complete_job_if_done(db, job)
+    except Exception as e:
+        logger.error(f"❌ Failed to record discovery failure for job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+def _complete_job_if_done(db: Session, job: BulkJob):
+    """Complete a running job whose documents all finished before discovery did"""
+    total_docs = db.query(func.count(BulkJobDocument.id)).filter(
+        BulkJobDocument.job_id == job.id
+    ).scalar()
+    
+    completed_docs = db.query(func.count(BulkJobDocument.id)).filter(
+        BulkJobDocument.job_id == job.id,
+        BulkJobDocument.status.in_(['completed', 'failed', 'needs_review'])
+    ).scalar()
+    
+    if total_docs and completed_docs == total_docs and job.status == 'running':
+        job.status = 'completed'
+        job.completed_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"✅ Job {job.id} completed! {completed_docs}/{total_docs} documents processed")
 
 
 @celery_app.task(name='app.workers.discovery.periodic_discovery')
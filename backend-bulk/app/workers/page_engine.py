@@ -0,0 +1,361 @@
+"""
+Async Page Engine - long-lived per-process pipeline for document extraction
+
+The thread path in process_document builds a PDFProcessor, LLMClient and event
+loop per task, renders every page to base64 up front and then blocks a thread
+per page batch (time.sleep backoff included). With ASYNC_ENGINE_ENABLED each
+worker process instead hosts one PageEngine:
+
+- one asyncio event loop on a background thread, plus the clients every
+  document reuses (PDFProcessor, LLMClient with its pooled httpx.AsyncClient);
+- per document, pages stream through render -> LLM -> insert:
+    render   PDFProcessor.iter_page_images on ASYNC_ENGINE_RENDER_WORKERS threads,
+             at most ASYNC_ENGINE_RENDER_QUEUE pages ahead of the LLM calls
+    LLM      `concurrency` coroutines per document; at most
+             ASYNC_ENGINE_MAX_INFLIGHT_LLM calls in flight per process
+    insert   one coroutine saving results every checkpoint_interval pages
+- retries back off with asyncio.sleep, so waiting pages hold no thread.
+
+Memory per document is bounded by the render queue plus pages in flight, not
+by page count. Celery tasks call PageEngine.run() and block on the result.
+Workers stay on the prefork pool: each child creates its own engine after the
+fork, so rendering is spread over processes rather than one GIL, and Celery's
+time limits keep working. The document timeout is enforced on the engine loop,
+and run() only returns once the document's pipeline (including a checkpoint
+that is writing) has unwound, so the task can safely reuse its db session.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DocumentOutcome:
+    """Counters and page results of one document run on the engine."""
+    extracted_pages: List[Dict[str, Any]] = field(default_factory=list)
+    successful_pages: int = 0
+    failed_pages: List[int] = field(default_factory=list)
+    total_tokens_used: int = 0
+    total_fields_inserted: int = 0
+    render_time_s: float = 0.0  # Wall time until the last page was rendered (overlaps extraction)
+    peak_pages_in_memory: int = 0  # Highest number of rendered page images held at once
+
+
+class PageEngine:
+    """
+    Per-process asyncio engine streaming pages render -> LLM -> insert.
+
+    Thread-safe: run() may be called from any number of Celery task threads;
+    all documents share the loop, the clients and the LLM in-flight limit.
+    """
+
+    def __init__(self, max_inflight_llm: int = 32, render_workers: int = 4, render_queue_size: int = 8):
+        from app.services.pdf_processor import PDFProcessor
+        from app.services.llm_client import LLMClient
+        from app.services.prompt_service import PromptService
+
+        self.pdf_processor = PDFProcessor()
+        self.llm_client = LLMClient()
+        self.prompt_service = PromptService()
+        self.render_workers = max(1, render_workers)
+        self.render_queue_size = max(1, render_queue_size)
+
+        self._render_pool = ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix="engine-render")
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="engine-io")  # Blocking DB checkpoints
+        self._loop = asyncio.new_event_loop()
+        self._llm_slots = asyncio.Semaphore(max(1, max_inflight_llm))
+        self._thread = threading.Thread(target=self._run_loop, name="page-engine", daemon=True)
+        self._thread.start()
+
+        logger.info(
+            f"🚀 Page engine started: {max_inflight_llm} LLM calls in flight, "
+            f"{self.render_workers} render threads, render queue {self.render_queue_size}"
+        )
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    # Seconds run() waits for a cancelled document to unwind before giving up on it
+    CANCEL_GRACE_S = 60
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        Run a coroutine on the engine loop and block the calling thread until it finishes.
+
+        The timeout is applied on the loop (asyncio.TimeoutError once the coroutine has been
+        cancelled and has unwound). If the caller is interrupted instead (soft time limit,
+        worker shutdown), the coroutine is cancelled and run() waits for it to unwind.
+        """
+        finished = threading.Event()
+
+        async def bounded():
+            try:
+                return await asyncio.wait_for(coro, timeout)
+            finally:
+                finished.set()
+
+        future = asyncio.run_coroutine_threadsafe(bounded(), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            # Its checkpoint callback may still be using the caller's db session
+            if not finished.wait(timeout=self.CANCEL_GRACE_S):
+                logger.warning(f"⚠️ Engine document did not stop within {self.CANCEL_GRACE_S}s of cancellation")
+            raise
+
+    def shutdown(self):
+        """Close the HTTP client and stop the loop (worker process shutdown)."""
+        try:
+            asyncio.run_coroutine_threadsafe(self.llm_client.close(), self._loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing LLM client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._render_pool.shutdown(wait=False)
+        self._io_pool.shutdown(wait=False)
+        logger.info("🛑 Page engine stopped")
+
+    @staticmethod
+    def count_pages(pdf_bytes: bytes) -> int:
+        """Page count of a PDF given as raw bytes."""
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            return len(pdf_document)
+
+    async def extract_document(
+        self,
+        pdf_bytes: bytes,
+        prompt: str,
+        response_format: Dict[str, Any],
+        extraction_task: str,
+        document_filename: str,
+        concurrency: int,
+        max_retries: int,
+        retry_backoff_base: float,
+        checkpoint_interval: int,
+        on_checkpoint: Callable[[List[Dict[str, Any]], int], int],
+    ) -> DocumentOutcome:
+        """
+        Extract every page of a PDF, saving results as they complete.
+
+        Args:
+            concurrency: LLM calls this document may have in flight
+            on_checkpoint: Blocking callback (page_results, pages_done) -> fields inserted;
+                runs off the loop, one call at a time per document
+
+        Returns:
+            DocumentOutcome with page results in page order
+        """
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(self._render_pool, self.count_pages, pdf_bytes)
+        concurrency = max(1, concurrency)
+        # Window slots are held from render until the page's LLM call is done, so rendering
+        # runs at most render_queue_size pages ahead of the calls in flight
+        window = asyncio.Semaphore(concurrency + self.render_queue_size)
+        rendered: asyncio.Queue = asyncio.Queue()  # Bounded by the window
+        results: asyncio.Queue = asyncio.Queue()
+        outcome = DocumentOutcome()
+        in_memory = 0
+        render_start = time.time()
+
+        def hold(delta: int):
+            nonlocal in_memory
+            in_memory += delta
+            outcome.peak_pages_in_memory = max(outcome.peak_pages_in_memory, in_memory)
+
+        async def render_stage():
+            async for page_idx, image in self.pdf_processor.iter_page_images(pdf_bytes, window, executor=self._render_pool):
+                hold(1)
+                rendered.put_nowait((page_idx, image))
+            outcome.render_time_s = time.time() - render_start
+            for _ in range(concurrency):
+                rendered.put_nowait(None)
+
+        async def extract():
+            while True:
+                item = await rendered.get()
+                if item is None:
+                    return
+                page_idx, image = item
+                try:
+                    if image is None:
+                        result = {
+                            'page_number': page_idx + 1,
+                            'error': 'Failed to render page',
+                            'error_type': 'RenderError',
+                            'extraction_time_s': 0
+                        }
+                    else:
+                        result = await self.extract_page(
+                            page_idx, image, prompt, response_format, extraction_task,
+                            document_filename, max_retries, retry_backoff_base
+                        )
+                finally:
+                    del image
+                    hold(-1)
+                    window.release()
+                await results.put(result)
+
+        async def persist():
+            pending: List[Dict[str, Any]] = []
+            for done in range(1, page_count + 1):
+                result = await results.get()
+                outcome.extracted_pages.append(result)
+                pending.append(result)
+                if 'error' not in result:
+                    outcome.successful_pages += 1
+                    outcome.total_tokens_used += result.get('tokens_used', 0)
+                else:
+                    outcome.failed_pages.append(result['page_number'])
+                if len(pending) >= checkpoint_interval or done == page_count:
+                    checkpoint = loop.run_in_executor(self._io_pool, on_checkpoint, pending, done)
+                    try:
+                        outcome.total_fields_inserted += await asyncio.shield(checkpoint)
+                    except asyncio.CancelledError:
+                        # A running checkpoint cannot be interrupted; let it finish before unwinding
+                        await asyncio.wait([checkpoint])
+                        raise
+                    except Exception as checkpoint_error:
+                        logger.error(f"   ⚠️ Checkpoint failed: {checkpoint_error}")
+                    pending = []
+
+        tasks = [asyncio.ensure_future(render_stage()), asyncio.ensure_future(persist())]
+        tasks += [asyncio.ensure_future(extract()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        outcome.extracted_pages.sort(key=lambda page: page['page_number'])
+        return outcome
+
+    async def extract_page(
+        self,
+        page_num: int,
+        page_image: str,
+        prompt: str,
+        response_format: Dict[str, Any],
+        extraction_task: str,
+        document_filename: str,
+        max_retries: int = 3,
+        retry_backoff_base: float = 5,
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of process_single_page_with_retry (same result shape).
+
+        Network and timeout errors are retried with exponential backoff; the LLM
+        slot is released while waiting.
+        """
+        import httpx
+
+        page_start = time.time()
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                async with self._llm_slots:
+                    result = await self.llm_client.call_api(
+                        prompt=prompt,
+                        image_data=page_image,
+                        response_format=response_format,
+                        task=extraction_task,
+                        document_name=f"{document_filename} (page {page_num + 1})",
+                        content_type="image"
+                    )
+
+                page_time = time.time() - page_start
+                hierarchical_data = result.get('hierarchical_data', {})
+                fields = result.get('fields', [])
+                usage = result.get('usage', {})
+                tokens_used = usage.get('total_tokens', 0)
+                field_count = len(fields) if fields else len(hierarchical_data.keys())
+
+                logger.info(
+                    f"   ✅ Page {page_num + 1}: {field_count} fields, "
+                    f"{tokens_used} tokens, {page_time:.2f}s"
+                )
+
+                return {
+                    'page_number': page_num + 1,
+                    'extraction_time_s': round(page_time, 2),
+                    'tokens_used': tokens_used,
+                    'fields_extracted': field_count,
+                    'hierarchical_data': hierarchical_data,
+                    'fields': fields,
+                    'usage': usage,
+                    'finish_reason': result.get('finish_reason')
+                }
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                last_error = error
+                error_type = type(error).__name__
+                is_network_error = isinstance(error, (httpx.TimeoutException, httpx.NetworkError))
+
+                if attempt < max_retries and (is_network_error or 'timeout' in str(error).lower() or 'connection' in str(error).lower()):
+                    wait_time = retry_backoff_base * (2 ** (attempt - 1))
+                    logger.warning(
+                        f"   ⚠️ Page {page_num + 1}: {error_type} on attempt {attempt}/{max_retries}, "
+                        f"retrying in {wait_time}s..."
+                    )
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error(f"   ❌ Page {page_num + 1}: {error_type} - {str(error)[:100]}")
+                    break
+
+        return {
+            'page_number': page_num + 1,
+            'error': str(last_error),
+            'error_type': type(last_error).__name__,
+            'extraction_time_s': round(time.time() - page_start, 2)
+        }
+
+
+# ============================================================================
+# SINGLETON INSTANCE
+# ============================================================================
+
+_page_engine: Optional[PageEngine] = None
+_page_engine_lock = threading.Lock()
+
+
+def get_page_engine() -> PageEngine:
+    """
+    Get or create this worker process's PageEngine
+
+    Created lazily inside the task, i.e. after Celery forks the process, so the
+    loop thread and HTTP connections are never shared across processes.
+    """
+    global _page_engine
+    if _page_engine is None:
+        with _page_engine_lock:
+            if _page_engine is None:
+                from app.core.config import settings
+                _page_engine = PageEngine(
+                    max_inflight_llm=settings.ASYNC_ENGINE_MAX_INFLIGHT_LLM,
+                    render_workers=settings.ASYNC_ENGINE_RENDER_WORKERS,
+                    render_queue_size=settings.ASYNC_ENGINE_RENDER_QUEUE,
+                )
+    return _page_engine
+
+
+def shutdown_page_engine():
+    """Stop this process's PageEngine if one was started."""
+    global _page_engine
+    with _page_engine_lock:
+        if _page_engine is not None:
+            _page_engine.shutdown()
+            _page_engine = None
@@ -4,207 +4,205 @@ Processes PDFs using Gemini Vision for OCR and structured data extraction
 """
 
 from app.workers.celery_app import celery_app
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Union
 from uuid import UUID
+import json
 import logging
+import threading
 import time
 from datetime import datetime
 import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
 import math
 
 logger = logging.getLogger(__name__)
 
 
-def insert_extracted_fields_batch(
-    db,
-    document_id: str,
-    job_id: str,
-    page_results: List[Dict[str, Any]],
-    extraction_model: str,
-    extraction_task: str
-) -> int:
+def flatten_data(data: Any, prefix: str = "", group: str = None) -> List[Dict[str, Any]]:
     """
-    Insert extracted fields from multiple pages into bulk_extracted_fields table
-    
-    This function performs 100% GRANULAR extraction - every single piece of data
-    is stored, including:
-    - Nested objects (flattened with dot notation: "address.street")
-    - Tables/arrays (each row becomes separate fields with index: "items[0].name")
-    - All primitive values (strings, numbers, booleans, even empty strings and punctuation)
-    
-    Args:
-        db: Database session
-        document_id: Document UUID
-        job_id: Job UUID
-        page_results: List of page extraction results
-        extraction_model: Model used for extraction
-        extraction_task: Task type (e.g., 'without_template_extraction')
+    Recursively flatten any data structure into individual fields
     
-    Returns:
-        Number of fields inserted
+    Examples:
+    - {"name": "John"} → [{"field_name": "name", "field_value": "John"}]
+    - {"address": {"street": "123 Main"}} → [{"field_name": "address.street", "field_value": "123 Main"}]
+    - {"items": [{"name": "A"}, {"name": "B"}]} → [
+        {"field_name": "items[0].name", "field_value": "A"},
+        {"field_name": "items[1].name", "field_value": "B"}
+      ]
     """
-    from app.models.database import BulkExtractedField
-    import json
+    fields = []
     
-    def flatten_data(data: Any, prefix: str = "", group: str = None) -> List[Dict[str, Any]]:
-        """
-        Recursively flatten any data structure into individual fields
-        
-        Examples:
-        - {"name": "John"} → [{"field_name": "name", "field_value": "John"}]
-        - {"address": {"street": "123 Main"}} → [{"field_name": "address.street", "field_value": "123 Main"}]
-        - {"items": [{"name": "A"}, {"name": "B"}]} → [
-            {"field_name": "items[0].name", "field_value": "A"},
-            {"field_name": "items[1].name", "field_value": "B"}
-          ]
-        """
-        fields = []
-        
-        if data is None:
-            # Store null values too
-            if prefix:
-                fields.append({
-                    'field_name': prefix,
-                    'field_label': prefix.replace('_', ' ').replace('.', ' > ').title(),
-                    'field_type': 'null',
-                    'field_value': None,
-                    'field_group': group,
-                    'confidence_score': None
-                })
-            return fields
-        
-        if isinstance(data, dict):
-            # Check if this is a special typed field (e.g., {"_type": "table", "value": [...]})
-            if '_type' in data:
-                field_type = data.get('_type', 'text')
-                field_value = data.get('value')
-                
-                # For tables, flatten the rows
-                if field_type == 'table' and isinstance(field_value, list):
-                    for idx, row in enumerate(field_value):
-                        if isinstance(row, dict):
-                            for col_name, col_value in row.items():
-                                full_name = f"{prefix}[{idx}].{col_name}" if prefix else f"[{idx}].{col_name}"
-                                fields.append({
-                                    'field_name': full_name,
-                                    'field_label': f"{prefix.replace('_', ' ').title()} Row {idx+1} - {col_name.replace('_', ' ').title()}" if prefix else f"Row {idx+1} - {col_name.replace('_', ' ').title()}",
-                                    'field_type': 'table_cell',
-                                    'field_value': str(col_value) if col_value is not None else None,
-                                    'field_group': group or prefix or 'table',
-                                    'confidence_score': None
-                                })
-                        else:
-                            full_name = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
+    if data is None:
+        # Store null values too
+        if prefix:
+            fields.append({
+                'field_name': prefix,
+                'field_label': prefix.replace('_', ' ').replace('.', ' > ').title(),
+                'field_type': 'null',
+                'field_value': None,
+                'field_group': group,
+                'confidence_score': None
+            })
+        return fields
+    
+    if isinstance(data, dict):
+        # Check if this is a special typed field (e.g., {"_type": "table", "value": [...]})
+        if '_type' in data:
+            field_type = data.get('_type', 'text')
+            field_value = data.get('value')
+            
+            # For tables, flatten the rows
+            if field_type == 'table' and isinstance(field_value, list):
+                for idx, row in enumerate(field_value):
+                    if isinstance(row, dict):
+                        for col_name, col_value in row.items():
+                            full_name = f"{prefix}[{idx}].{col_name}" if prefix else f"[{idx}].{col_name}"
                             fields.append({
                                 'field_name': full_name,
-                                'field_label': f"{prefix.replace('_', ' ').title()} Item {idx+1}" if prefix else f"Item {idx+1}",
+                                'field_label': f"{prefix.replace('_', ' ').title()} Row {idx+1} - {col_name.replace('_', ' ').title()}" if prefix else f"Row {idx+1} - {col_name.replace('_', ' ').title()}",
                                 'field_type': 'table_cell',
-                                'field_value': str(row) if row is not None else None,
+                                'field_value': str(col_value) if col_value is not None else None,
                                 'field_group': group or prefix or 'table',
                                 'confidence_score': None
                             })
-                else:
-                    # Regular typed field
-                    fields.append({
-                        'field_name': prefix if prefix else 'value',
-                        'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Value',
-                        'field_type': field_type,
-                        'field_value': str(field_value) if field_value is not None else None,
-                        'field_group': group,
-                        'confidence_score': None
-                    })
-                return fields
-            
-            # Regular dictionary - recurse into each key
-            current_group = group
-            for key, value in data.items():
-                # Skip metadata keys
-                if key.startswith('_'):
-                    continue
-                
-                new_prefix = f"{prefix}.{key}" if prefix else key
-                
-                # Determine group: use top-level key as group if not yet set
-                if group is None and not prefix:
-                    current_group = key
-                
-                # Recurse
-                fields.extend(flatten_data(value, new_prefix, current_group))
-            
-            return fields
-        
-        elif isinstance(data, list):
-            # Array - could be table rows or simple list
-            if len(data) == 0:
-                # Store empty array as well
+                    else:
+                        full_name = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
+                        fields.append({
+                            'field_name': full_name,
+                            'field_label': f"{prefix.replace('_', ' ').title()} Item {idx+1}" if prefix else f"Item {idx+1}",
+                            'field_type': 'table_cell',
+                            'field_value': str(row) if row is not None else None,
+                            'field_group': group or prefix or 'table',
+                            'confidence_score': None
+                        })
+            else:
+                # Regular typed field
                 fields.append({
-                    'field_name': prefix if prefix else 'array',
-                    'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Array',
-                    'field_type': 'array',
-                    'field_value': '[]',
+                    'field_name': prefix if prefix else 'value',
+                    'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Value',
+                    'field_type': field_type,
+                    'field_value': str(field_value) if field_value is not None else None,
                     'field_group': group,
                     'confidence_score': None
                 })
-                return fields
-            
-            # Process each item in array
-            for idx, item in enumerate(data):
-                item_prefix = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
-                
-                if isinstance(item, dict):
-                    # Object in array - flatten it
-                    for item_key, item_value in item.items():
-                        if item_key.startswith('_'):
-                            continue
-                        full_name = f"{item_prefix}.{item_key}"
-                        fields.extend(flatten_data(item_value, full_name, group or prefix))
-                elif isinstance(item, list):
-                    # Nested array
-                    fields.extend(flatten_data(item, item_prefix, group or prefix))
-                else:
-                    # Primitive in array
-                    fields.append({
-                        'field_name': item_prefix,
-                        'field_label': f"{prefix.replace('_', ' ').title()} Item {idx+1}" if prefix else f"Item {idx+1}",
-                        'field_type': type(item).__name__ if item is not None else 'null',
-                        'field_value': str(item) if item is not None else None,
-                        'field_group': group or prefix,
-                        'confidence_score': None
-                    })
-            
             return fields
         
-        else:
-            # Primitive value (string, number, boolean)
-            # This captures EVERYTHING including punctuation, empty strings, etc.
-            value_str = str(data) if data is not None else None
+        # Regular dictionary - recurse into each key
+        current_group = group
+        for key, value in data.items():
+            # Skip metadata keys
+            if key.startswith('_'):
+                continue
             
-            # Determine field type
-            if isinstance(data, bool):
-                field_type = 'boolean'
-            elif isinstance(data, int):
-                field_type = 'integer'
-            elif isinstance(data, float):
-                field_type = 'number'
-            elif isinstance(data, str):
-                field_type = 'text'
-            else:
-                field_type = type(data).__name__
+            new_prefix = f"{prefix}.{key}" if prefix else key
+            
+            # Determine group: use top-level key as group if not yet set
+            if group is None and not prefix:
+                current_group = key
             
+            # Recurse
+            fields.extend(flatten_data(value, new_prefix, current_group))
+        
+        return fields
+    
+    elif isinstance(data, list):
+        # Array - could be table rows or simple list
+        if len(data) == 0:
+            # Store empty array as well
             fields.append({
-                'field_name': prefix if prefix else 'value',
-                'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Value',
-                'field_type': field_type,
-                'field_value': value_str,
+                'field_name': prefix if prefix else 'array',
+                'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Array',
+                'field_type': 'array',
+                'field_value': '[]',
                 'field_group': group,
                 'confidence_score': None
             })
             return fields
+        
+        # Process each item in array
+        for idx, item in enumerate(data):
+            item_prefix = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
+            
+            if isinstance(item, dict):
+                # Object in array - flatten it
+                for item_key, item_value in item.items():
+                    if item_key.startswith('_'):
+                        continue
+                    full_name = f"{item_prefix}.{item_key}"
+                    fields.extend(flatten_data(item_value, full_name, group or prefix))
+            elif isinstance(item, list):
+                # Nested array
+                fields.extend(flatten_data(item, item_prefix, group or prefix))
+            else:
+                # Primitive in array
+                fields.append({
+                    'field_name': item_prefix,
+                    'field_label': f"{prefix.replace('_', ' ').title()} Item {idx+1}" if prefix else f"Item {idx+1}",
+                    'field_type': type(item).__name__ if item is not None else 'null',
+                    'field_value': str(item) if item is not None else None,
+                    'field_group': group or prefix,
+                    'confidence_score': None
+                })
+        
+        return fields
     
-    fields_inserted = 0
-    global_field_order = 0  # Track order across all pages for document-level ordering
+    else:
+        # Primitive value (string, number, boolean)
+        # This captures EVERYTHING including punctuation, empty strings, etc.
+        value_str = str(data) if data is not None else None
+        
+        # Determine field type
+        if isinstance(data, bool):
+            field_type = 'boolean'
+        elif isinstance(data, int):
+            field_type = 'integer'
+        elif isinstance(data, float):
+            field_type = 'number'
+        elif isinstance(data, str):
+            field_type = 'text'
+        else:
+            field_type = type(data).__name__
+        
+        fields.append({
+            'field_name': prefix if prefix else 'value',
+            'field_label': prefix.replace('_', ' ').replace('.', ' > ').title() if prefix else 'Value',
+            'field_type': field_type,
+            'field_value': value_str,
+            'field_group': group,
+            'confidence_score': None
+        })
+        return fields
+
 
+def build_field_rows(
+    document_id: str,
+    job_id: str,
+    page_results: List[Dict[str, Any]],
+    extraction_model: str,
+    extraction_task: str,
+    start_order: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Build bulk_extracted_fields rows (column -> value) from page extraction results
+    
+    Failed pages are skipped. Pages without an explicit fields array are flattened
+    from hierarchical_data with flatten_data (100% granular extraction).
+    
+    Args:
+        document_id: Document UUID
+        job_id: Job UUID
+        page_results: List of page extraction results
+        extraction_model: Model used for extraction
+        extraction_task: Task type (e.g., 'without_template_extraction')
+        start_order: field_order of the first row (fields already saved for the document)
+    
+    Returns:
+        Rows in document order
+    """
+    rows = []
+    field_order = start_order  # Track order across all pages for document-level ordering
+    
     for page_result in page_results:
         if 'error' in page_result:
             # Skip failed pages
@@ -223,7 +221,6 @@ def insert_extracted_fields_batch(
             fields = flatten_data(hierarchical_data)
             logger.debug(f"   📊 Page {page_num}: Flattened {len(fields)} fields from hierarchical data")
         
-        # Insert each field
         for field in fields:
             try:
                 confidence = field.get('confidence_score') or field.get('confidence')
@@ -247,50 +244,222 @@ def insert_extracted_fields_batch(
                     context_str = str(field_value)[:200]
                     extraction_context = context_str if context_str else None
                 
-                extracted_field = BulkExtractedField(
-                    document_id=document_id,
-                    job_id=job_id,
-                    field_name=field.get('field_name', 'unknown'),
-                    field_label=field.get('field_label') or field.get('field_name', 'unknown'),
-                    field_type=field.get('field_type', 'text'),
-                    field_value=field_value,
-                    field_group=field.get('field_group'),
-                    confidence_score=confidence,
-                    page_number=page_num,
-                    field_order=global_field_order,  # Set explicit order
-                    extraction_method='gemini_vision',
-                    tokens_used=tokens_used,
-                    processing_time_ms=int(extraction_time_s * 1000),
-                    model_version=extraction_model,
-                    validation_status='pending',
-                    needs_manual_review=needs_review,
-                    # NEW: Transcript metadata
-                    section_name=section_name,
-                    source_location=source_location,
-                    extraction_context=extraction_context,
-                    field_metadata={
+                rows.append({
+                    'document_id': document_id,
+                    'job_id': job_id,
+                    'field_name': field.get('field_name', 'unknown'),
+                    'field_label': field.get('field_label') or field.get('field_name', 'unknown'),
+                    'field_type': field.get('field_type', 'text'),
+                    'field_value': field_value,
+                    'field_group': field.get('field_group'),
+                    'confidence_score': confidence,
+                    'page_number': page_num,
+                    'field_order': field_order,  # Set explicit order
+                    'extraction_method': 'gemini_vision',
+                    'tokens_used': tokens_used,
+                    'processing_time_ms': int(extraction_time_s * 1000),
+                    'model_version': extraction_model,
+                    'validation_status': 'pending',
+                    'needs_manual_review': needs_review,
+                    # Transcript metadata
+                    'section_name': section_name,
+                    'source_location': source_location,
+                    'extraction_context': extraction_context,
+                    'field_metadata': {
                         'extraction_task': extraction_task,
                         'bounding_box': field.get('bounding_box'),
                         'ocr_text': field.get('ocr_text')
                     }
-                )
-                db.add(extracted_field)
-                fields_inserted += 1
-                global_field_order += 1  # Increment order for next field
+                })
+                field_order += 1  # Increment order for next field
                 
             except Exception as field_error:
-                logger.warning(f"Failed to insert field {field.get('field_name')}: {field_error}")
+                logger.warning(f"Failed to prepare field {field.get('field_name')}: {field_error}")
                 continue
     
+    return rows
+
+
+def insert_extracted_fields_batch(
+    db,
+    document_id: str,
+    job_id: str,
+    page_results: List[Dict[str, Any]],
+    extraction_model: str,
+    extraction_task: str,
+    start_order: int = 0
+) -> int:
+    """
+    Insert extracted fields from multiple pages into bulk_extracted_fields table (ORM path)
+    
+    This function performs 100% GRANULAR extraction - every single piece of data
+    is stored, including:
+    - Nested objects (flattened with dot notation: "address.street")
+    - Tables/arrays (each row becomes separate fields with index: "items[0].name")
+    - All primitive values (strings, numbers, booleans, even empty strings and punctuation)
+    
+    The worker uses FieldSink (COPY) unless BULK_COPY_INSERT_ENABLED is off.
+    
+    Args:
+        db: Database session
+        document_id: Document UUID
+        job_id: Job UUID
+        page_results: List of page extraction results
+        extraction_model: Model used for extraction
+        extraction_task: Task type (e.g., 'without_template_extraction')
+        start_order: field_order of the first inserted field
+    
+    Returns:
+        Number of fields inserted
+    """
+    rows = build_field_rows(document_id, job_id, page_results, extraction_model, extraction_task, start_order)
+    insert_field_rows(db, rows)
+    logger.info(f"   💾 Inserted {len(rows)} fields into database (100% granular extraction)")
+    return len(rows)
+
+
+def insert_field_rows(db, rows: List[Dict[str, Any]]) -> int:
+    """Insert prepared bulk_extracted_fields rows (build_field_rows) with the ORM and commit"""
+    from app.models.database import BulkExtractedField
+    
+    db.add_all(BulkExtractedField(**row) for row in rows)
+    
     try:
         db.commit()
-        logger.info(f"   💾 Inserted {fields_inserted} fields into database (100% granular extraction)")
     except Exception as commit_error:
         logger.error(f"Failed to commit fields: {commit_error}")
         db.rollback()
         raise
     
-    return fields_inserted
+    return len(rows)
+
+
+class FieldSink:
+    """
+    Buffers a document's field rows across checkpoints and writes them with COPY
+    
+    A flush is one binary COPY of every buffered row plus a single progress
+    UPDATE of the document, in one transaction. Rows are flushed once
+    `batch_rows` are buffered or `flush_interval_s` has passed since the last
+    flush, and by close(). Thread-safe (engine I/O threads, bank pipeline).
+    
+    A failed COPY keeps its rows buffered for the next flush. Once `batch_rows`
+    are held back, and on close(), they go through `fallback` (ORM insert of
+    row dicts) instead, so a broken COPY path never drops fields.
+    """
+    
+    def __init__(
+        self,
+        document_id: str,
+        job_id: str,
+        extraction_model: str,
+        extraction_task: str,
+        page_count: int,
+        batch_rows: int = 5000,
+        flush_interval_s: float = 5.0,
+        inserter=None,
+        fallback=None
+    ):
+        if inserter is None:
+            from app.services.bulk_insert_service import get_sync_bulk_inserter
+            inserter = get_sync_bulk_inserter()
+        
+        self.document_id = document_id
+        self.job_id = job_id
+        self.extraction_model = extraction_model
+        self.extraction_task = extraction_task
+        self.page_count = page_count
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval_s = flush_interval_s
+        self.fields_saved = 0
+        self.flushes = 0
+        self.copy_time_s = 0.0
+        self.copy_failures = 0
+        self.fallback_rows = 0
+        self._inserter = inserter
+        self._fallback = fallback
+        self._records: List[tuple] = []
+        self._fields_queued = 0  # Saved + buffered (next field_order)
+        self._pages_done = 0
+        self._pages_saved = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def add(self, page_results: List[Dict[str, Any]], pages_done: int) -> int:
+        """Queue the fields of a checkpoint's pages; flushes when a batch is due. Returns fields queued."""
+        from app.services.bulk_insert_service import EXTRACTED_FIELD_COPY_COLUMNS
+        
+        with self._lock:
+            rows = build_field_rows(
+                self.document_id,
+                self.job_id,
+                page_results,
+                self.extraction_model,
+                self.extraction_task,
+                start_order=self._fields_queued
+            )
+            for row in rows:
+                row['field_metadata'] = json.dumps(row['field_metadata'])
+                self._records.append(tuple(row[column] for column in EXTRACTED_FIELD_COPY_COLUMNS))
+            self._fields_queued += len(rows)
+            self._pages_done = max(self._pages_done, pages_done)
+            
+            if (len(self._records) >= self.batch_rows
+                    or time.monotonic() - self._last_flush >= self.flush_interval_s):
+                self._flush()
+            return len(rows)
+    
+    def close(self):
+        """Write whatever is still buffered."""
+        with self._lock:
+            self._flush(final=True)
+    
+    def _flush(self, final: bool = False):
+        if not self._records and self._pages_done == self._pages_saved:
+            return
+        
+        records = self._records
+        self._last_flush = time.monotonic()
+        flush_start = time.perf_counter()
+        try:
+            self._inserter.copy_extracted_fields(
+                self.document_id,
+                records,
+                total_fields_extracted=self.fields_saved + len(records),
+                pages_processed=self._pages_done,
+                processing_stage=f'Extracting page {self._pages_done}/{self.page_count}...'
+            )
+            self.copy_time_s += time.perf_counter() - flush_start
+            self.flushes += 1
+            logger.info(f"   💾 Copied {len(records)} fields ({self.fields_saved + len(records)} saved)")
+        except Exception as copy_error:
+            self.copy_failures += 1
+            if self._fallback is None or not records or (not final and len(records) < self.batch_rows):
+                # Rows stay buffered and are retried by the next flush
+                logger.error(
+                    f"   ⚠️ COPY of {len(records)} fields failed for document {self.document_id}: {copy_error}"
+                    f"{' (kept for the next flush)' if not final else ''}"
+                )
+                if final:
+                    raise
+                return
+            
+            logger.warning(
+                f"   ⚠️ COPY of {len(records)} fields failed for document {self.document_id}: {copy_error} "
+                f"- inserting them with the ORM"
+            )
+            from app.services.bulk_insert_service import EXTRACTED_FIELD_COPY_COLUMNS
+            rows = []
+            for record in records:
+                row = dict(zip(EXTRACTED_FIELD_COPY_COLUMNS, record))
+                row['field_metadata'] = json.loads(row['field_metadata'])
+                rows.append(row)
+            self._fallback(rows)
+            self.fallback_rows += len(records)
+        
+        self._records = []
+        self.fields_saved += len(records)
+        self._pages_saved = self._pages_done
 
 
 def process_single_page_with_retry(
@@ -402,7 +571,7 @@ def process_single_page_with_retry(
 
 def process_page_batch(
     page_indices: List[int],
-    page_images: List[str],
+    page_images: Union[List[str], Dict[int, str]],
     prompt: str,
     response_format: Dict,
     extraction_mode: str,
@@ -419,7 +588,7 @@ def process_page_batch(
     
     Args:
         page_indices: List of page indices to process in this batch
-        page_images: Full list of all page images (base64)
+        page_images: Page images (base64), indexed by page index
         prompt: Extraction prompt
         response_format: Response schema
         extraction_mode: 'normal' or 'bank_statement'
@@ -454,6 +623,355 @@ def process_page_batch(
     return batch_results
 
 
+def process_multi_page_group(
+    page_indices: List[int],
+    page_images: Union[List[str], Dict[int, str]],
+    prompt: str,
+    response_format: Dict,
+    extraction_task: str,
+    document_filename: str,
+    llm_client,
+    max_retries: int,
+    retry_backoff_base: int,
+    stats
+) -> List[Dict[str, Any]]:
+    """
+    Extract a group of consecutive pages with one multi-image LLM request.
+    
+    Pages the answer does not cover (truncated or incomplete response, failed
+    request) are re-sent through process_single_page_with_retry, so every page
+    gets a result in the same shape as process_page_batch returns.
+    
+    Args:
+        page_indices: Consecutive page indices planned by plan_page_groups
+        stats: BatchStats collecting per-document batching counters
+    
+    Returns:
+        List of results (one per page in group)
+    """
+    from app.services.page_batching import (
+        build_multi_page_prompt, estimate_tokens, multi_page_response_format, split_multi_page_result
+    )
+    
+    def single(page_idx: int) -> Dict[str, Any]:
+        return process_single_page_with_retry(
+            page_num=page_idx,
+            page_image=page_images[page_idx],
+            prompt=prompt,
+            response_format=response_format,
+            extraction_task=extraction_task,
+            document_filename=document_filename,
+            llm_client=llm_client,
+            max_retries=max_retries,
+            retry_backoff_base=retry_backoff_base
+        )
+    
+    if len(page_indices) == 1:
+        return [single(page_indices[0])]
+    
+    page_numbers = [idx + 1 for idx in page_indices]
+    batch_prompt = build_multi_page_prompt(prompt, page_numbers)
+    group_start = time.time()
+    recovered = {}
+    usage = {}
+    finish_reason = None
+    
+    logger.info(f"   📦 Processing pages {page_numbers[0]}-{page_numbers[-1]} with one request")
+    try:
+        result = llm_client.call_api_sync(
+            prompt=batch_prompt,
+            image_data=[page_images[idx] for idx in page_indices],
+            response_format=multi_page_response_format(response_format),
+            task=extraction_task,
+            document_name=f"{document_filename} (pages {page_numbers[0]}-{page_numbers[-1]})",
+            content_type="image"
+        )
+        recovered = split_multi_page_result(llm_client, result, extraction_task, page_numbers)
+        usage = result.get('usage', {}) or {}
+        finish_reason = result.get('finish_reason')
+    except Exception as error:
+        logger.warning(
+            f"   ⚠️ Pages {page_numbers[0]}-{page_numbers[-1]}: multi-page request failed, "
+            f"sending pages singly: {str(error)[:100]}"
+        )
+    
+    group_time = time.time() - group_start
+    # Tokens of the shared request are attributed evenly to the pages it returned
+    tokens_per_page = usage.get('total_tokens', 0) // max(1, len(recovered))
+    group_results = []
+    fallbacks = 0
+    for page_idx in page_indices:
+        page_result = recovered.get(page_idx + 1)
+        if page_result is None:
+            fallbacks += 1
+            group_results.append(single(page_idx))
+            continue
+        hierarchical_data = page_result.get('hierarchical_data', {})
+        fields = page_result.get('fields', [])
+        group_results.append({
+            'page_number': page_idx + 1,
+            'extraction_time_s': round(group_time, 2),
+            'tokens_used': tokens_per_page,
+            'fields_extracted': len(fields) if fields else len(hierarchical_data.keys()),
+            'hierarchical_data': hierarchical_data,
+            'fields': fields,
+            'usage': usage,
+            'finish_reason': finish_reason,
+            'batched_with': page_numbers
+        })
+    
+    stats.record(len(page_indices), estimate_tokens(prompt), estimate_tokens(batch_prompt), fallbacks)
+    logger.info(
+        f"   ✅ Pages {page_numbers[0]}-{page_numbers[-1]}: {len(page_indices) - fallbacks}/{len(page_indices)} "
+        f"from one request, {fallbacks} re-sent singly, {group_time:.2f}s"
+    )
+    return group_results
+
+
+def _normalize_header(header: Any) -> str:
+    """Compare column names ignoring case, spacing and punctuation ("Withdrawal Amt." == "withdrawal amt")"""
+    return ''.join(ch for ch in str(header).lower() if ch.isalnum())
+
+
+def page_table_headers(hierarchical_data: Any) -> List[str]:
+    """Transaction table headers a page reported (_table_headers), or inferred from its first row"""
+    if not isinstance(hierarchical_data, dict):
+        return []
+    found_headers = hierarchical_data.get('_table_headers', [])
+    if found_headers:
+        return list(found_headers)
+    transactions = hierarchical_data.get('transactions', [])
+    if transactions and isinstance(transactions, list):
+        first_row = transactions[0]
+        if isinstance(first_row, dict) and len(first_row.keys()) > 2:
+            return list(first_row.keys())
+    return []
+
+
+def headers_consistent(hierarchical_data: Any, table_headers: List[str]) -> bool:
+    """
+    Whether a page extracted without known headers used the document's table columns
+    
+    Pages without transaction rows have nothing to correct. Otherwise every row key
+    must be one of the table headers - a continuation page read in detection mode
+    typically invents column names (no header row on the page).
+    """
+    transactions = hierarchical_data.get('transactions', []) if isinstance(hierarchical_data, dict) else []
+    if not transactions or not isinstance(transactions, list):
+        return True
+    allowed = {_normalize_header(h) for h in table_headers}
+    row_keys = {_normalize_header(k) for row in transactions if isinstance(row, dict) for k in row.keys()}
+    return row_keys <= allowed
+
+
+BANK_HEADER_CANDIDATES = 3  # Pages searched for table headers before falling back to per-page detection
+
+
+def bank_pipeline_window(parallel_workers: int, header_candidates: int = BANK_HEADER_CANDIDATES) -> int:
+    """
+    Render window for process_bank_statement_pipelined
+    
+    Speculative pages hold their images until the headers are resolved, so a
+    window smaller than the header candidates fills up before the last candidate
+    is taken (nothing left in flight, headers never resolved). One page per
+    worker on top keeps the workers busy meanwhile.
+    """
+    return max(2 * parallel_workers, header_candidates + parallel_workers)
+
+
+def process_bank_statement_pipelined(
+    page_stream,
+    page_count: int,
+    prompt_service,
+    templates,
+    document_type: str,
+    extraction_task: str,
+    document_filename: str,
+    llm_client,
+    parallel_workers: int,
+    window_size: int,
+    checkpoint_interval: int,
+    max_retries: int,
+    retry_backoff_base: int,
+    on_checkpoint,
+    header_candidates: int = BANK_HEADER_CANDIDATES
+) -> Dict[str, Any]:
+    """
+    Bank statement extraction with speculative header detection and a sliding window
+    
+    The sequential mode runs up to header_candidates pages one by one until table
+    headers are found, then the rest in checkpoint batches that each wait for their
+    slowest page. Here every page starts as soon as a worker is free:
+    
+    - pages started before the headers are known use the detection prompt;
+    - headers come from the first candidate page reporting them (earlier candidates
+      must have finished, as in the sequential mode);
+    - once known, speculative results after the header page are checked with
+      headers_consistent and only mismatching pages are re-prompted with the
+      continuation prompt; pages started afterwards get that prompt directly;
+    - results are saved every checkpoint_interval completed pages, with no barrier.
+    
+    Args:
+        page_stream: PDFProcessor.stream_page_images(...) iterator of (page_idx, image, release)
+        window_size: Window the stream was opened with (rendered pages held at most);
+            at least header_candidates, see bank_pipeline_window
+        on_checkpoint: (page_results, pages_done) -> fields inserted
+    
+    Returns:
+        Dict with extracted_pages, successful_pages, failed_pages, total_tokens_used,
+        total_fields_inserted, table_headers, reprompted_pages
+    """
+    from concurrent.futures import wait, FIRST_COMPLETED
+    
+    def page_prompt(page_idx: int, table_headers: Optional[List[str]]):
+        return prompt_service.get_task_prompt(
+            task=extraction_task,
+            templates=templates,
+            content_type="image",
+            document_type=document_type,
+            context={
+                "is_first_page": not table_headers,  # Detection mode until headers are known
+                "table_headers": table_headers or [],
+                "page_number": page_idx + 1
+            }
+        )
+    
+    candidates = list(range(min(header_candidates, page_count)))
+    if window_size < len(candidates):
+        # Speculative pages would fill the window before the last candidate is taken
+        raise ValueError(f"window_size {window_size} cannot hold {len(candidates)} header candidates")
+    candidate_results: Dict[int, Dict[str, Any]] = {}
+    table_headers: Optional[List[str]] = None  # None until resolved, [] if no candidate had headers
+    header_page = -1
+    awaiting: Dict[int, Tuple[Dict[str, Any], str, Any]] = {}  # Speculative results waiting for headers
+    in_flight = {}
+    held = 0  # Pages taken from the stream and not released yet
+    pending_save: List[Dict[str, Any]] = []
+    outcome = {
+        'extracted_pages': [],
+        'successful_pages': 0,
+        'failed_pages': [],
+        'total_tokens_used': 0,
+        'total_fields_inserted': 0,
+        'table_headers': [],
+        'reprompted_pages': []
+    }
+    
+    def finish(result: Dict[str, Any], release):
+        nonlocal held, pending_save
+        release()
+        held -= 1
+        outcome['extracted_pages'].append(result)
+        pending_save.append(result)
+        if 'error' not in result:
+            outcome['successful_pages'] += 1
+            outcome['total_tokens_used'] += result.get('tokens_used', 0)
+        else:
+            outcome['failed_pages'].append(result['page_number'])
+        pages_done = len(outcome['extracted_pages'])
+        if len(pending_save) >= checkpoint_interval or pages_done == page_count:
+            try:
+                outcome['total_fields_inserted'] += on_checkpoint(pending_save, pages_done)
+            except Exception as e:
+                logger.error(f"   ⚠️ Batch save error: {e}")
+            pending_save = []
+    
+    def submit(page_idx: int, image: str, release, speculative: bool):
+        prompt, response_format = page_prompt(page_idx, table_headers)
+        future = executor.submit(
+            process_single_page_with_retry,
+            page_idx,
+            image,
+            prompt,
+            response_format,
+            extraction_task,
+            document_filename,
+            llm_client,
+            max_retries,
+            retry_backoff_base
+        )
+        in_flight[future] = (page_idx, image, release, speculative)
+    
+    def resolve_headers() -> bool:
+        nonlocal table_headers, header_page
+        for page_idx in candidates:
+            if page_idx not in candidate_results:
+                return False
+            found_headers = page_table_headers(candidate_results[page_idx].get('hierarchical_data', {}))
+            if found_headers:
+                table_headers, header_page = found_headers, page_idx
+                logger.info(f"   📋 Found table headers on page {page_idx + 1}: {table_headers}")
+                return True
+        table_headers = []
+        logger.warning(f"   ⚠️ No table headers found in first {len(candidates)} pages, will let LLM detect per page")
+        return True
+    
+    stream_exhausted = False
+    with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
+        while in_flight or awaiting or not stream_exhausted:
+            # Keep every worker busy; never take more pages than the window can hold
+            while not stream_exhausted and len(in_flight) < parallel_workers and held < window_size:
+                try:
+                    page_idx, image, release = next(page_stream)
+                except StopIteration:
+                    stream_exhausted = True
+                    break
+                held += 1
+                if image is None:
+                    result = {'page_number': page_idx + 1, 'error': 'Failed to render page', 'error_type': 'RenderError'}
+                    if page_idx in candidates:
+                        candidate_results[page_idx] = result
+                    finish(result, release)
+                    continue
+                submit(page_idx, image, release, speculative=table_headers is None)
+            
+            if in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_idx, image, release, speculative = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        logger.error(f"   ❌ Page {page_idx + 1} exception: {exc}")
+                        result = {'page_number': page_idx + 1, 'error': str(exc)}
+                    if page_idx in candidates:
+                        candidate_results[page_idx] = result
+                    if speculative:
+                        awaiting[page_idx] = (result, image, release)
+                    else:
+                        finish(result, release)
+            
+            if table_headers is None and not resolve_headers():
+                continue
+            
+            # Headers known: settle speculative results
+            for page_idx in sorted(awaiting):
+                result, image, release = awaiting.pop(page_idx)
+                if (
+                    'error' in result
+                    or not table_headers
+                    or page_idx <= header_page
+                    or headers_consistent(result.get('hierarchical_data', {}), table_headers)
+                ):
+                    finish(result, release)
+                else:
+                    # Speculative read used the wrong columns: re-prompt with the detected headers
+                    outcome['total_tokens_used'] += result.get('tokens_used', 0)
+                    outcome['reprompted_pages'].append(page_idx + 1)
+                    logger.info(f"   🔁 Page {page_idx + 1}: columns differ from detected headers, re-prompting")
+                    submit(page_idx, image, release, speculative=False)
+    
+    if pending_save:
+        try:
+            outcome['total_fields_inserted'] += on_checkpoint(pending_save, len(outcome['extracted_pages']))
+        except Exception as e:
+            logger.error(f"   ⚠️ Batch save error: {e}")
+    
+    outcome['extracted_pages'].sort(key=lambda page: page['page_number'])
+    outcome['table_headers'] = table_headers or []
+    return outcome
+
+
 @celery_app.task(bind=True, name='app.workers.processing.process_document', max_retries=3)
 def process_document(self, document_id: str, job_id: str, job_config: Dict[str, Any]):
     """
@@ -487,11 +1005,6 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
         from app.services.llm_client import LLMClient
         from app.services.prompt_service import PromptService
         
-        # Initialize services
-        pdf_processor = PDFProcessor()
-        llm_client = LLMClient()
-        prompt_service = PromptService()
-        
         # Get extraction task from job config
         extraction_task = job_config.get('extraction_task', 'without_template_extraction')
         templates = job_config.get('templates', None)
@@ -504,6 +1017,25 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
         if is_bank_statement:
             logger.info(f"📊 Bank Statement mode - multi-page table handling enabled")
         
+        # Pipelined bank statements: header detection overlaps the remaining pages (sequential mode otherwise)
+        bank_pipelined = is_bank_statement and processing_options.get('bank_pipelined', settings.BANK_STATEMENT_PIPELINED)
+        
+        # Async engine mode: pages stream render -> LLM -> insert on this process's long-lived engine,
+        # which also owns the clients reused across tasks (bank statements keep the threaded path)
+        use_engine = processing_options.get('async_engine', settings.ASYNC_ENGINE_ENABLED) and not is_bank_statement
+        
+        # Initialize services
+        if use_engine:
+            from app.workers.page_engine import get_page_engine
+            engine = get_page_engine()
+            pdf_processor = engine.pdf_processor
+            llm_client = engine.llm_client
+            prompt_service = engine.prompt_service
+        else:
+            pdf_processor = PDFProcessor()
+            llm_client = LLMClient()
+            prompt_service = PromptService()
+        
         # Get configuration - use job-specific config if available, otherwise fall back to settings
         parallel_workers = processing_options.get('parallel_workers', settings.PARALLEL_PAGE_WORKERS)
         pages_per_thread = processing_options.get('pages_per_thread', getattr(settings, 'PAGES_PER_THREAD', 5))
@@ -511,6 +1043,16 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
         max_retries = processing_options.get('max_retries', settings.MAX_RETRIES_PER_PAGE)
         retry_backoff = processing_options.get('retry_delay', settings.RETRY_BACKOFF_BASE)
         
+        # Multi-page batching: consecutive sparse pages share one LLM request (normal mode only)
+        from app.services.page_batching import BATCHABLE_TASKS, BatchStats, plan_page_groups
+        page_batching = (
+            processing_options.get('page_batching', settings.LLM_PAGE_BATCHING_ENABLED)
+            and extraction_task in BATCHABLE_TASKS
+            and not is_bank_statement
+            and not use_engine
+        )
+        batch_stats = BatchStats()
+        
         logger.info(
             f"📊 Processing Config: workers={parallel_workers}, pages/thread={pages_per_thread}, "
             f"checkpoint={checkpoint_interval}, retries={max_retries}"
@@ -556,16 +1098,17 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
             if not pdf_bytes:
                 raise ValueError(f"Failed to load document from {document.source_path}")
             
-            # Convert to base64 for PDFProcessor
-            import base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            pdf_data_url = f"data:application/pdf;base64,{pdf_base64}"
+            if not use_engine:
+                # Convert to base64 for PDFProcessor (the engine renders from the bytes directly)
+                import base64
+                pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
+                pdf_data_url = f"data:application/pdf;base64,{pdf_base64}"
             
             load_time = time.time() - start_time
             logger.info(f"[2/5] ✅ PDF loaded ({len(pdf_bytes)} bytes) in {load_time:.2f}s")
             
             # Step 3: Convert PDF to images
-            page_count = pdf_processor.get_pdf_page_count(pdf_data_url)
+            page_count = engine.count_pages(pdf_bytes) if use_engine else pdf_processor.get_pdf_page_count(pdf_data_url)
             
             # Update stage - Converting to images
             document.processing_stage = f'Converting {page_count} pages to images...'
@@ -576,21 +1119,30 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
             
             convert_start = time.time()
             
-            # Use async function in sync context
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                page_images = loop.run_until_complete(
-                    pdf_processor.convert_pdf_to_images(pdf_data_url)
-                )
-            finally:
-                loop.close()
+            # Engine, normal and pipelined bank mode stream pages (rendered while earlier pages
+            # are extracted); sequential bank statement mode still converts every page up front
+            streamed = use_engine or not is_bank_statement or bank_pipelined
+            if streamed:
+                page_images = []
+                stream_mode = 'async engine' if use_engine else 'sliding window' if bank_pipelined else 'by checkpoint'
+                logger.info(f"[3/5] ⏩ Pages will be rendered while extracting ({stream_mode})")
+            else:
+                # Use async function in sync context
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    page_images = loop.run_until_complete(
+                        pdf_processor.convert_pdf_to_images(pdf_data_url)
+                    )
+                finally:
+                    loop.close()
             
             convert_time = time.time() - convert_start
-            logger.info(f"[3/5] ✅ Converted {len(page_images)} pages to images in {convert_time:.2f}s")
+            if not streamed:
+                logger.info(f"[3/5] ✅ Converted {len(page_images)} pages to images in {convert_time:.2f}s")
             
             # Update stage - Extracting data
-            document.processing_stage = f'Extracting data from {len(page_images)} pages...'
+            document.processing_stage = f'Extracting data from {page_count if streamed else len(page_images)} pages...'
             document.pages_processed = 0
             db.commit()
             
@@ -610,7 +1162,130 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
             # For bank statements, we need special sequential processing for header carryover
             bank_statement_headers = []  # Table headers from first page with table
             
-            if is_bank_statement:
+            # COPY path: field rows are buffered across checkpoints and written with one
+            # binary COPY + progress update per flush (ORM inserts when disabled)
+            field_sink = None
+            if processing_options.get('copy_insert', settings.BULK_COPY_INSERT_ENABLED):
+                field_sink = FieldSink(
+                    document_id,
+                    job_id,
+                    llm_client.extraction_model,
+                    extraction_task,
+                    page_count,
+                    batch_rows=settings.FIELD_COPY_BATCH_ROWS,
+                    flush_interval_s=settings.FIELD_COPY_FLUSH_INTERVAL_S,
+                    fallback=lambda rows: insert_field_rows(db, rows)
+                )
+            
+            def save_checkpoint(page_results: List[Dict[str, Any]], pages_done: int) -> int:
+                """Persist a checkpoint of page results (any mode; engine I/O thread included)"""
+                nonlocal total_fields_inserted
+                if field_sink is not None:
+                    fields_queued = field_sink.add(page_results, pages_done)
+                    total_fields_inserted = field_sink.fields_saved
+                    logger.info(
+                        f"   ✅ Checkpoint: {pages_done}/{page_count} pages processed, "
+                        f"{fields_queued} fields queued, {field_sink.fields_saved} saved"
+                    )
+                    return fields_queued
+                
+                fields_inserted = insert_extracted_fields_batch(
+                    db=db,
+                    document_id=document_id,
+                    job_id=job_id,
+                    page_results=page_results,
+                    extraction_model=llm_client.extraction_model,
+                    extraction_task=extraction_task,
+                    start_order=total_fields_inserted
+                )
+                total_fields_inserted += fields_inserted
+                document.total_fields_extracted = total_fields_inserted
+                document.pages_processed = pages_done
+                document.processing_stage = f'Extracting page {pages_done}/{page_count}...'
+                db.commit()
+                logger.info(
+                    f"   ✅ Checkpoint: {pages_done}/{page_count} pages processed, "
+                    f"{total_fields_inserted} fields saved"
+                )
+                return fields_inserted
+            
+            if use_engine:
+                # ==========================================
+                # ASYNC ENGINE MODE - Streamed render -> LLM -> insert
+                # ==========================================
+                prompt, response_format = prompt_service.get_task_prompt(
+                    task=extraction_task,
+                    templates=templates,
+                    content_type="image"
+                )
+                
+                outcome = engine.run(
+                    engine.extract_document(
+                        pdf_bytes,
+                        prompt,
+                        response_format,
+                        extraction_task,
+                        document.filename,
+                        concurrency=parallel_workers,
+                        max_retries=max_retries,
+                        retry_backoff_base=retry_backoff,
+                        checkpoint_interval=checkpoint_interval,
+                        on_checkpoint=save_checkpoint
+                    ),
+                    timeout=settings.ASYNC_ENGINE_DOCUMENT_TIMEOUT
+                )
+                extracted_pages = outcome.extracted_pages
+                successful_pages = outcome.successful_pages
+                failed_pages = outcome.failed_pages
+                total_tokens_used = outcome.total_tokens_used
+                convert_time = outcome.render_time_s  # Rendering overlapped extraction
+                logger.info(
+                    f"   🚀 Async engine: at most {outcome.peak_pages_in_memory} page images held at once "
+                    f"({page_count} pages)"
+                )
+                
+            elif bank_pipelined:
+                # ==========================================
+                # BANK STATEMENT MODE - Pipelined, speculative header detection
+                # ==========================================
+                # All pages start right away (sliding window, no batch barriers); pages read
+                # before the headers were known are re-prompted only if their columns differ
+                logger.info("   📊 Bank Statement mode: Pipelined header detection enabled")
+                
+                window_size = bank_pipeline_window(parallel_workers)
+                page_stream = pdf_processor.stream_page_images(pdf_bytes, window_size=window_size)
+                try:
+                    bank_outcome = process_bank_statement_pipelined(
+                        page_stream,
+                        page_count,
+                        prompt_service,
+                        templates,
+                        document_type,
+                        extraction_task,
+                        document.filename,
+                        llm_client,
+                        parallel_workers=parallel_workers,
+                        window_size=window_size,
+                        checkpoint_interval=checkpoint_interval,
+                        max_retries=max_retries,
+                        retry_backoff_base=retry_backoff,
+                        on_checkpoint=save_checkpoint
+                    )
+                finally:
+                    page_stream.close()
+                
+                extracted_pages = bank_outcome['extracted_pages']
+                successful_pages = bank_outcome['successful_pages']
+                failed_pages = bank_outcome['failed_pages']
+                total_tokens_used = bank_outcome['total_tokens_used']
+                bank_statement_headers = bank_outcome['table_headers']
+                convert_time = 0.0  # Rendering overlapped extraction
+                logger.info(
+                    f"   📋 Pipelined bank statement: {len(bank_outcome['reprompted_pages'])} page(s) re-prompted "
+                    f"with detected headers {bank_outcome['reprompted_pages'] or ''}"
+                )
+                
+            elif is_bank_statement:
                 # ==========================================
                 # BANK STATEMENT MODE - Smart Header Detection
                 # ==========================================
@@ -685,19 +1360,7 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                     
                     # Save this page's results
                     try:
-                        fields_inserted = insert_extracted_fields_batch(
-                            db=db,
-                            document_id=document_id,
-                            job_id=job_id,
-                            page_results=[result],
-                            extraction_model=llm_client.extraction_model,
-                            extraction_task=extraction_task
-                        )
-                        total_fields_inserted += fields_inserted
-                        document.total_fields_extracted = total_fields_inserted
-                        document.pages_processed = pages_processed_for_headers
-                        document.processing_stage = f'Extracting page {pages_processed_for_headers}/{len(page_images)}...'
-                        db.commit()
+                        fields_inserted = save_checkpoint([result], pages_processed_for_headers)
                         logger.info(f"   ✅ Page {page_idx + 1}: {fields_inserted} fields saved")
                     except Exception as e:
                         logger.error(f"   ⚠️ Error saving page {page_idx + 1}: {e}")
@@ -790,20 +1453,10 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                         
                         # Save batch
                         try:
-                            fields_inserted = insert_extracted_fields_batch(
-                                db=db,
-                                document_id=document_id,
-                                job_id=job_id,
-                                page_results=batch_results,
-                                extraction_model=llm_client.extraction_model,
-                                extraction_task=extraction_task
+                            save_checkpoint(
+                                batch_results,
+                                remaining_start_idx + len(extracted_pages) - pages_processed_for_headers
                             )
-                            total_fields_inserted += fields_inserted
-                            document.total_fields_extracted = total_fields_inserted
-                            document.pages_processed = remaining_start_idx + len(extracted_pages) - pages_processed_for_headers
-                            document.processing_stage = f'Extracting page {document.pages_processed}/{len(page_images)}...'
-                            db.commit()
-                            logger.info(f"   ✅ Batch complete: {total_fields_inserted} total fields saved")
                         except Exception as e:
                             logger.error(f"   ⚠️ Batch save error: {e}")
                 
@@ -818,46 +1471,81 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                     content_type="image"
                 )
             
+                # Pages are rendered on a background thread while the previous checkpoint is
+                # extracted; at most two checkpoints of page images are held at once
+                page_stream = pdf_processor.stream_page_images(pdf_bytes, window_size=2 * checkpoint_interval)
+                
                 # Process pages in checkpoints with batch-based threading
-                for checkpoint_start in range(0, len(page_images), checkpoint_interval):
-                    checkpoint_end = min(checkpoint_start + checkpoint_interval, len(page_images))
-                    checkpoint_images = page_images[checkpoint_start:checkpoint_end]
+                while True:
+                    wait_start = time.time()
+                    checkpoint_pages = list(itertools.islice(page_stream, checkpoint_interval))
+                    convert_time += time.time() - wait_start  # Rendering not hidden behind extraction
+                    if not checkpoint_pages:
+                        break
+                    checkpoint_start = checkpoint_pages[0][0]
+                    checkpoint_end = checkpoint_pages[-1][0] + 1
+                    checkpoint_images = {page_idx: image for page_idx, image, _ in checkpoint_pages if image is not None}
                     
-                    logger.info(f"   Processing checkpoint: pages {checkpoint_start + 1}-{checkpoint_end} ({len(checkpoint_images)} pages)")
+                    logger.info(f"   Processing checkpoint: pages {checkpoint_start + 1}-{checkpoint_end} ({len(checkpoint_pages)} pages)")
                     
                     # Divide checkpoint pages into batches for threading
                     # Each thread will process pages_per_thread pages sequentially
-                    total_pages_in_checkpoint = len(checkpoint_images)
+                    rendered_indices = sorted(checkpoint_images)
+                    total_pages_in_checkpoint = len(rendered_indices)
                     num_batches = math.ceil(total_pages_in_checkpoint / pages_per_thread)
                     
                     page_batches = []
                     for batch_idx in range(num_batches):
                         batch_start_idx = batch_idx * pages_per_thread
                         batch_end_idx = min((batch_idx + 1) * pages_per_thread, total_pages_in_checkpoint)
-                        # Create list of page indices for this batch (relative to checkpoint_start)
-                        batch_page_indices = list(range(batch_start_idx, batch_end_idx))
-                        # Convert to absolute page indices
-                        absolute_indices = [checkpoint_start + idx for idx in batch_page_indices]
-                        page_batches.append(absolute_indices)
+                        # Absolute page indices of the rendered pages in this batch
+                        page_batches.append(rendered_indices[batch_start_idx:batch_end_idx])
+                    
+                    if page_batching:
+                        # Replace the fixed batches with groups of consecutive sparse pages, one request each
+                        page_batches = plan_page_groups(
+                            checkpoint_images,
+                            rendered_indices,
+                            processing_options.get('page_batch_token_budget', settings.LLM_PAGE_BATCH_TOKEN_BUDGET),
+                            processing_options.get('page_batch_max_pages', settings.LLM_PAGE_BATCH_MAX_PAGES),
+                            settings.LLM_PAGE_BATCH_IMAGE_MAX_KB
+                        )
+                        logger.info(
+                            f"   📦 Planned {len(page_batches)} requests for {total_pages_in_checkpoint} pages "
+                            f"(multi-page batching)"
+                        )
+                    else:
+                        logger.info(f"   Divided into {num_batches} batches ({pages_per_thread} pages/batch)")
                     
-                    logger.info(f"   Divided into {num_batches} batches ({pages_per_thread} pages/batch)")
+                    # Pages that failed to render are recorded as failed instead of being sent
+                    checkpoint_results = []
+                    for page_idx, image, _ in checkpoint_pages:
+                        if image is None:
+                            checkpoint_results.append({
+                                'page_number': page_idx + 1,
+                                'error': 'Failed to render page',
+                                'error_type': 'RenderError'
+                            })
+                            failed_pages.append(page_idx + 1)
                     
                     # Process batches in parallel using ThreadPoolExecutor
-                    checkpoint_results = []
                     with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
                         # Submit each batch to a thread
+                        batch_args = (
+                            checkpoint_images,  # Pages of this checkpoint by page index, functions index into it
+                            prompt,
+                            response_format,
+                            extraction_task,
+                            document.filename,
+                            llm_client,
+                            max_retries,
+                            retry_backoff
+                        )
                         future_to_batch = {
-                            executor.submit(
-                                process_page_batch,
-                                batch_indices,
-                                page_images,  # Pass full list, function will index into it
-                                prompt,
-                                response_format,
-                                extraction_task,
-                                document.filename,
-                                llm_client,
-                                max_retries,
-                                retry_backoff
+                            (
+                                executor.submit(process_multi_page_group, batch_indices, *batch_args, batch_stats)
+                                if page_batching
+                                else executor.submit(process_page_batch, batch_indices, *batch_args)
                             ): batch_indices
                             for batch_indices in page_batches
                         }
@@ -893,30 +1581,27 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                     
                     # CHECKPOINT: Insert batch into database
                     try:
-                        fields_inserted = insert_extracted_fields_batch(
-                            db=db,
-                            document_id=document_id,
-                            job_id=job_id,
-                            page_results=checkpoint_results,
-                            extraction_model=llm_client.extraction_model,
-                            extraction_task=extraction_task
-                        )
-                        total_fields_inserted += fields_inserted
-                        
-                        # Update document progress
-                        document.total_fields_extracted = total_fields_inserted
-                        document.pages_processed = checkpoint_end
-                        document.processing_stage = f'Extracting page {checkpoint_end}/{page_count}...'
-                        db.commit()
-                        
-                        logger.info(
-                            f"   ✅ Checkpoint: {checkpoint_end}/{page_count} pages processed, "
-                            f"{total_fields_inserted} fields saved"
-                        )
-                        
+                        save_checkpoint(checkpoint_results, checkpoint_end)
                     except Exception as checkpoint_error:
                         logger.error(f"   ⚠️ Checkpoint failed: {checkpoint_error}")
                     # Continue processing even if checkpoint fails
+                    
+                    # Done with this checkpoint's images: let the next pages render
+                    del checkpoint_images
+                    for _, _, release in checkpoint_pages:
+                        release()
+            
+            if field_sink is not None:
+                # Write the rows still buffered (and the final progress) before the status update
+                try:
+                    field_sink.close()
+                except Exception as flush_error:
+                    logger.error(f"   ⚠️ Final field flush failed: {flush_error}")
+                total_fields_inserted = field_sink.fields_saved
+                logger.info(
+                    f"   💾 COPY: {field_sink.fields_saved} fields in {field_sink.flushes} flushes, "
+                    f"{field_sink.copy_time_s:.2f}s"
+                )
             
             extract_time = time.time() - extract_start
             logger.info(
@@ -926,6 +1611,13 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
             if failed_pages:
                 logger.warning(f"   ⚠️ {len(failed_pages)} pages failed: {failed_pages[:10]}")
             
+            if page_batching:
+                batching_summary = batch_stats.as_dict()
+                logger.info(
+                    f"   📦 Page batching: {batching_summary['batched_pages']} pages in {batching_summary['requests']} requests, "
+                    f"{batching_summary['fallback_pages']} re-sent singly, ~{batching_summary['prompt_tokens_saved']} prompt tokens saved"
+                )
+            
             # Step 4.5: Generate transcript for template-based mapping
             document.processing_stage = 'Generating searchable transcript...'
             db.commit()
@@ -990,9 +1682,18 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                     'extract_time_s': round(extract_time, 2),
                     'total_time_s': round(total_time, 2)
                 },
-                'processing_mode': 'parallel',
+                'processing_mode': 'async_engine' if use_engine else 'parallel',
                 'parallel_workers': parallel_workers
             }
+            if page_batching:
+                document.token_usage['page_batching'] = batch_stats.as_dict()
+            if field_sink is not None:
+                document.token_usage['field_copy'] = {
+                    'flushes': field_sink.flushes,
+                    'copy_time_s': round(field_sink.copy_time_s, 3),
+                    'copy_failures': field_sink.copy_failures,
+                    'orm_fallback_fields': field_sink.fallback_rows
+                }
             
             # Determine final status
             if failed_pages and successful_pages == 0:
@@ -1058,8 +1759,9 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                     BulkJobDocument.status.in_(['completed', 'failed', 'needs_review'])
                 ).scalar()
                 
-                # Update job status if all documents are done
-                if completed_docs == total_docs and job.status == 'running':
+                # Update job status if all documents are done (and discovery is not still adding more)
+                discovery = (job.processing_config or {}).get('discovery') or {}
+                if completed_docs == total_docs and job.status == 'running' and discovery.get('status') != 'running':
                     job.status = 'completed'
                     job.completed_at = datetime.utcnow()
                     logger.info(f"✅ Job {job_id} completed! {completed_docs}/{total_docs} documents processed")
@@ -1075,7 +1777,7 @@ def process_document(self, document_id: str, job_id: str, job_config: Dict[str,
                 "fields_extracted": total_fields_inserted,
                 "tokens_used": total_tokens_used,
                 "processing_time_s": round(total_time, 2),
-                "processing_mode": "parallel"
+                "processing_mode": "async_engine" if use_engine else "parallel"
             }
             
         finally:
@@ -0,0 +1,463 @@
+"""
+Fair-share Job Scheduler - feeds documents to Celery from per-job queues
+
+start_job and discover_documents used to call process_document.delay for every
+document of a job up front, so all of a 10k-document job sat in the single
+default queue ahead of every job created after it. With FAIR_SCHEDULER_ENABLED
+documents wait in per-job queues in Redis instead and only
+FAIR_SCHEDULER_MAX_INFLIGHT of them (about the total worker slots) are handed
+to Celery at a time:
+
+- each freed slot goes to the user with the fewest documents in flight, so
+  one tenant's huge job cannot starve another tenant's jobs;
+- among that user's jobs: most urgent priority first (ProcessingOptions.priority,
+  1 = highest), then the job with the smallest in-flight count per unit of
+  scheduling_weight (weighted round robin), then the least recently served;
+- a job never has more than its worker_concurrency documents in flight;
+- pause / stop simply stop dispatching the job's queue (documents already in
+  flight finish); resume dispatches again. A paused job stays registered while
+  its queue is empty, so pages discovered later keep waiting for resume.
+
+Redis layout (prefix bulk:sched:):
+
+    jobs                    SET   active job ids
+    job:<id>                HASH  user, priority, weight, max_inflight, paused, stopped, last_dispatch, config
+    job:<id>:pending        LIST  document ids waiting to be dispatched
+    job:<id>:inflight       ZSET  dispatched document ids -> time dispatched / last seen running
+
+Dispatching runs whenever documents are queued or a process_document task
+finishes (task_postrun in celery_app), plus on a beat tick that also frees
+slots of tasks that were lost. A running task refreshes its slot from a
+keep-alive thread, so only tasks that stopped reporting are reaped. Mutations take one Redis lock; a dispatch
+request that finds the lock held leaves a flag the holder picks up.
+
+plan_dispatch is the whole policy and does not touch Redis;
+benchmark_job_scheduler.py replays it against the old single-queue FIFO.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY = 3  # ProcessingOptions.priority default (1 = most urgent, 5 = least)
+
+
+@dataclass
+class JobShare:
+    """Scheduling state of one job (a snapshot of its Redis hash and queue sizes)."""
+    job_id: str
+    user_id: str
+    priority: int = DEFAULT_PRIORITY
+    weight: float = 1.0
+    max_inflight: int = 50
+    paused: bool = False
+    pending: int = 0
+    inflight: int = 0
+    last_dispatch: int = 0  # Dispatch sequence number of the job's latest document (round-robin order)
+
+
+def plan_dispatch(jobs: List[JobShare], slots: int, seq: int = 0) -> List[str]:
+    """
+    Decide where the next `slots` documents come from.
+
+    Updates pending, inflight and last_dispatch of the given JobShare objects
+    as if the documents were dispatched.
+
+    Args:
+        jobs: Active jobs
+        slots: Free in-flight slots
+        seq: Last dispatch sequence number handed out
+
+    Returns:
+        One job id per document to dispatch, in dispatch order
+    """
+    picks: List[str] = []
+    user_inflight: Dict[str, int] = defaultdict(int)
+    user_last: Dict[str, int] = defaultdict(int)
+    for job in jobs:
+        user_inflight[job.user_id] += job.inflight
+        user_last[job.user_id] = max(user_last[job.user_id], job.last_dispatch)
+
+    for _ in range(max(0, slots)):
+        runnable = [job for job in jobs if not job.paused and job.pending > 0 and job.inflight < job.max_inflight]
+        if not runnable:
+            break
+        # Users share the slots equally; ties go to the least recently served user
+        user = min({job.user_id for job in runnable}, key=lambda u: (user_inflight[u], user_last[u], u))
+        job = min(
+            (job for job in runnable if job.user_id == user),
+            key=lambda j: (j.priority, j.inflight / j.weight, j.last_dispatch, j.job_id)
+        )
+        seq += 1
+        job.pending -= 1
+        job.inflight += 1
+        job.last_dispatch = seq
+        user_inflight[user] += 1
+        user_last[user] = seq
+        picks.append(job.job_id)
+    return picks
+
+
+class JobScheduler:
+    """Redis-backed per-job document queues dispatched to Celery by plan_dispatch."""
+
+    def __init__(self, redis_client, max_inflight: int = 50, slot_timeout_s: float = 2400.0, prefix: str = "bulk:sched:"):
+        self.redis = redis_client
+        self.max_inflight = max(1, max_inflight)
+        self.slot_timeout_s = slot_timeout_s
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return self.prefix + ":".join(parts)
+
+    def _lock(self, blocking_timeout: Optional[float] = 10):
+        return self.redis.lock(self._key("lock"), timeout=30, blocking_timeout=blocking_timeout)
+
+    # ------------------------------------------------------------------
+    # Queueing and job control (API, discovery)
+    # ------------------------------------------------------------------
+    def enqueue(
+        self,
+        job_id: str,
+        document_ids: List[str],
+        job_config: Dict[str, Any],
+        user_id: Optional[str] = None,
+        priority: int = DEFAULT_PRIORITY,
+        weight: float = 1.0,
+        max_inflight: Optional[int] = None,
+        replace: bool = False,
+        paused: bool = False
+    ) -> int:
+        """
+        Add documents to a job's queue (registering the job if needed).
+
+        Args:
+            job_id: Bulk job ID
+            document_ids: Documents to process
+            job_config: process_document job_config (kept from the first call for the job)
+            user_id: Owner; jobs without one are their own tenant
+            priority: 1 (most urgent) to 5, compared between the user's own jobs
+            weight: Share of the user's slots relative to their other jobs
+            max_inflight: Most documents of this job in flight at once (None = global limit)
+            replace: Replace the queue instead of appending (documents in flight are skipped)
+                and un-pause the job - it is being (re)started
+            paused: The job is paused (in the database) - keep its documents queued until resume
+
+        Returns:
+            Number of documents queued
+        """
+        job_key = self._key("job", job_id)
+        with self._lock():
+            if replace:
+                inflight = set(self.redis.zrange(self._key("job", job_id, "inflight"), 0, -1))
+                document_ids = [doc_id for doc_id in document_ids if doc_id not in inflight]
+            pipe = self.redis.pipeline()
+            pipe.sadd(self._key("jobs"), job_id)
+            pipe.hset(job_key, mapping={
+                "user": user_id or f"job:{job_id}",
+                "priority": int(priority),
+                "weight": max(float(weight), 0.01),
+                "max_inflight": int(max_inflight or self.max_inflight),
+            })
+            if paused:
+                pipe.hset(job_key, "paused", 1)
+            elif replace:
+                pipe.hset(job_key, "paused", 0)
+            else:
+                pipe.hsetnx(job_key, "paused", 0)
+            if replace:
+                pipe.hdel(job_key, "stopped")
+            pipe.hsetnx(job_key, "last_dispatch", 0)
+            pipe.hsetnx(job_key, "config", json.dumps(job_config, default=str))
+            if replace:
+                pipe.delete(self._key("job", job_id, "pending"))
+            if document_ids:
+                pipe.rpush(self._key("job", job_id, "pending"), *document_ids)
+            pipe.execute()
+        logger.info(f"📥 Scheduler: queued {len(document_ids)} documents for job {job_id}")
+        return len(document_ids)
+
+    def has_job(self, job_id: str) -> bool:
+        return bool(self.redis.sismember(self._key("jobs"), job_id))
+
+    def pause(self, job_id: str) -> bool:
+        """
+        Stop dispatching the job's documents, including ones queued later.
+
+        The flag is recorded even when the job has nothing queued yet (discovery
+        hasn't queued its first page, or its queue drained). Returns whether the
+        job had been registered.
+        """
+        with self._lock():
+            known = self.has_job(job_id)
+            pipe = self.redis.pipeline()
+            pipe.sadd(self._key("jobs"), job_id)
+            pipe.hset(self._key("job", job_id), "paused", 1)
+            pipe.execute()
+        logger.info(f"⏸️ Scheduler: job {job_id} paused")
+        return known
+
+    def resume(self, job_id: str) -> bool:
+        """Dispatch the job's documents again. False if the scheduler doesn't know the job."""
+        with self._lock():
+            if not self.has_job(job_id):
+                return False
+            self.redis.hset(self._key("job", job_id), "paused", 0)
+        logger.info(f"▶️ Scheduler: job {job_id} resumed")
+        self.dispatch()
+        return True
+
+    def cancel(self, job_id: str) -> int:
+        """Drop the job's queued documents (documents in flight finish). Returns documents dropped."""
+        with self._lock():
+            pending_key = self._key("job", job_id, "pending")
+            dropped = self.redis.llen(pending_key)
+            self.redis.delete(pending_key)
+            # Stopped: unlike a pause, the job leaves the scheduler once its documents in flight finish
+            self.redis.sadd(self._key("jobs"), job_id)
+            self.redis.hset(self._key("job", job_id), mapping={"paused": 1, "stopped": 1})
+        if dropped:
+            logger.info(f"🛑 Scheduler: dropped {dropped} queued documents of job {job_id}")
+        return dropped
+
+    # ------------------------------------------------------------------
+    # Task lifecycle (celery_app signals)
+    # ------------------------------------------------------------------
+    def started(self, job_id: str, document_id: str):
+        """A dispatched document started (or restarted): its slot is still in use."""
+        self.redis.zadd(self._key("job", job_id, "inflight"), {document_id: time.time()}, xx=True)
+
+    def keep_alive(self, job_id: str, document_id: str, interval_s: Optional[float] = None) -> threading.Event:
+        """
+        Refresh a running document's slot until the returned event is set.
+
+        reap_stale frees slots older than slot_timeout_s; a long document that is
+        still running must not lose its slot (its job would go over its cap).
+        """
+        stop = threading.Event()
+        interval_s = interval_s or max(1.0, self.slot_timeout_s / 4)
+
+        def beat():
+            while not stop.wait(interval_s):
+                try:
+                    self.started(job_id, document_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ Scheduler: slot refresh failed for document {document_id}: {e}")
+
+        threading.Thread(target=beat, name="scheduler-slot-keepalive", daemon=True).start()
+        return stop
+
+    def release(self, job_id: str, document_id: str):
+        """A dispatched document finished: free its slot and dispatch the next one."""
+        self.redis.zrem(self._key("job", job_id, "inflight"), document_id)
+        self.dispatch()
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    def dispatch(self) -> int:
+        """Hand documents to Celery until the slots are full. Returns documents dispatched."""
+        dirty_key = self._key("dirty")
+        self.redis.set(dirty_key, 1)
+        dispatched = 0
+        while True:
+            lock = self._lock(blocking_timeout=None)
+            if not lock.acquire(blocking=False):
+                return dispatched  # The holder sees the flag and dispatches for us
+            try:
+                while self.redis.getdel(dirty_key):
+                    dispatched += self._dispatch_once()
+            finally:
+                try:
+                    lock.release()
+                except Exception:
+                    pass  # Expired while dispatching; the next caller takes over
+            # A request that arrived between the last check and the release
+            if not self.redis.exists(dirty_key):
+                return dispatched
+
+    def _load_jobs(self) -> List[JobShare]:
+        job_ids = sorted(self.redis.smembers(self._key("jobs")))
+        if not job_ids:
+            return []
+        pipe = self.redis.pipeline()
+        for job_id in job_ids:
+            pipe.hgetall(self._key("job", job_id))
+            pipe.llen(self._key("job", job_id, "pending"))
+            pipe.zcard(self._key("job", job_id, "inflight"))
+        replies = pipe.execute()
+
+        jobs, drained = [], []
+        for index, job_id in enumerate(job_ids):
+            info, pending, inflight = replies[3 * index:3 * index + 3]
+            if not info or (pending == 0 and inflight == 0 and (info.get("paused") != "1" or info.get("stopped") == "1")):
+                drained.append(job_id)
+                continue
+            jobs.append(JobShare(
+                job_id=job_id,
+                user_id=info.get("user", f"job:{job_id}"),
+                priority=int(info.get("priority", DEFAULT_PRIORITY)),
+                weight=float(info.get("weight", 1.0)),
+                max_inflight=int(info.get("max_inflight", self.max_inflight)),
+                paused=info.get("paused") == "1",
+                pending=pending,
+                inflight=inflight,
+                last_dispatch=int(info.get("last_dispatch", 0)),
+            ))
+
+        if drained:
+            # Finished (or stopped and drained) jobs leave the scheduler; paused ones stay until resumed
+            pipe = self.redis.pipeline()
+            for job_id in drained:
+                pipe.srem(self._key("jobs"), job_id)
+                pipe.delete(self._key("job", job_id), self._key("job", job_id, "pending"), self._key("job", job_id, "inflight"))
+            pipe.execute()
+        return jobs
+
+    def _dispatch_once(self) -> int:
+        from app.workers.processing import process_document
+
+        jobs = self._load_jobs()
+        slots = self.max_inflight - sum(job.inflight for job in jobs)
+        if not jobs or slots <= 0:
+            return 0
+
+        seq = int(self.redis.get(self._key("seq")) or 0)
+        picks = Counter(plan_dispatch(jobs, slots, seq))
+        if not picks:
+            return 0
+        by_id = {job.job_id: job for job in jobs}
+
+        dispatched = 0
+        for job_id, count in picks.items():
+            job_key = self._key("job", job_id)
+            document_ids = self.redis.lpop(self._key("job", job_id, "pending"), count) or []
+            if not document_ids:
+                continue
+            config = json.loads(self.redis.hget(job_key, "config") or "{}")
+            now = time.time()
+            self.redis.zadd(self._key("job", job_id, "inflight"), {doc_id: now for doc_id in document_ids})
+            self.redis.hset(job_key, "last_dispatch", by_id[job_id].last_dispatch)
+            for index, document_id in enumerate(document_ids):
+                try:
+                    process_document.apply_async(args=(document_id, job_id, config))
+                    dispatched += 1
+                except Exception as e:
+                    # Broker unavailable: put the rest back in order and stop
+                    logger.error(f"❌ Scheduler: failed to dispatch document {document_id} of job {job_id}: {e}")
+                    remaining = document_ids[index:]
+                    self.redis.zrem(self._key("job", job_id, "inflight"), *remaining)
+                    self.redis.lpush(self._key("job", job_id, "pending"), *reversed(remaining))
+                    self.redis.set(self._key("seq"), max(job.last_dispatch for job in jobs))
+                    return dispatched
+        self.redis.set(self._key("seq"), max(job.last_dispatch for job in jobs))
+
+        if dispatched:
+            logger.debug(f"📤 Scheduler: dispatched {dispatched} documents ({dict(picks)})")
+        return dispatched
+
+    def reap_stale(self) -> int:
+        """Free slots of documents dispatched or started longer than slot_timeout_s ago (lost tasks)."""
+        cutoff = time.time() - self.slot_timeout_s
+        reaped = 0
+        with self._lock():
+            for job_id in self.redis.smembers(self._key("jobs")):
+                reaped += self.redis.zremrangebyscore(self._key("job", job_id, "inflight"), "-inf", cutoff)
+        if reaped:
+            logger.warning(f"⚠️ Scheduler: freed {reaped} slots of documents that never finished")
+        return reaped
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = self._load_jobs()
+        return {
+            "max_inflight": self.max_inflight,
+            "inflight": sum(job.inflight for job in jobs),
+            "pending": sum(job.pending for job in jobs),
+            "jobs": {
+                job.job_id: {
+                    "user": job.user_id,
+                    "priority": job.priority,
+                    "weight": job.weight,
+                    "pending": job.pending,
+                    "inflight": job.inflight,
+                    "max_inflight": job.max_inflight,
+                    "paused": job.paused,
+                }
+                for job in jobs
+            },
+        }
+
+
+# ============================================================
+# SINGLETON SCHEDULER
+# ============================================================
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> Optional[JobScheduler]:
+    """Get the process's scheduler client, or None when FAIR_SCHEDULER_ENABLED is off."""
+    global _scheduler
+    from app.core.config import settings
+
+    if not settings.FAIR_SCHEDULER_ENABLED:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                import redis
+
+                _scheduler = JobScheduler(
+                    redis.Redis.from_url(settings.REDIS_URL, decode_responses=True),
+                    max_inflight=settings.FAIR_SCHEDULER_MAX_INFLIGHT,
+                    slot_timeout_s=settings.FAIR_SCHEDULER_SLOT_TIMEOUT_S,
+                )
+    return _scheduler
+
+
+def enqueue_documents(job, document_ids: List[str], job_config: Dict[str, Any], replace: bool = False) -> int:
+    """
+    Queue documents of a job for process_document.
+
+    Goes through the fair-share scheduler when it is enabled, straight to
+    Celery (one process_document.delay per document) otherwise.
+
+    Args:
+        job: BulkJob the documents belong to (owner and processing_options are read)
+        document_ids: Documents to process
+        job_config: process_document job_config
+        replace: Replace the job's queued documents instead of appending (and un-pause it
+            unless the job is paused)
+
+    Returns:
+        Number of documents queued
+    """
+    scheduler = get_job_scheduler()
+    if scheduler is None:
+        from app.workers.processing import process_document
+
+        for document_id in document_ids:
+            process_document.delay(document_id, str(job.id), job_config)
+        return len(document_ids)
+
+    options = job.processing_options or {}
+    queued = scheduler.enqueue(
+        str(job.id),
+        document_ids,
+        job_config,
+        user_id=str(job.user_id) if job.user_id else None,
+        priority=options.get('priority', DEFAULT_PRIORITY),
+        weight=options.get('scheduling_weight', 1.0),
+        max_inflight=options.get('worker_concurrency'),
+        replace=replace,
+        paused=job.status == 'paused',
+    )
+    scheduler.dispatch()
+    return queued
+
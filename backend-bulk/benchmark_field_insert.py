@@ -0,0 +1,158 @@
+"""
+Field persistence benchmark: ORM inserts vs binary COPY
+
+Compares the two ways the worker can save a document's extracted fields:
+
+- ORM: insert_extracted_fields_batch, i.e. BulkExtractedField objects added to
+  a sync SQLAlchemy session (psycopg2) and committed once per checkpoint;
+- COPY: FieldSink, i.e. rows buffered across checkpoints and written with
+  asyncpg copy_records_to_table (one COPY per flush).
+
+The document is synthetic: --fields fields spread over --pages pages, saved
+every --checkpoint pages as the worker does. Both paths write into a session
+temp table shaped like bulk_extracted_fields (no foreign keys, nothing left
+behind), so any database reachable through DATABASE_URL will do.
+
+    python benchmark_field_insert.py --fields 10000 --pages 50 --runs 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import sync_engine
+from app.services.bulk_insert_service import EXTRACTED_FIELD_COPY_COLUMNS, asyncpg_dsn
+from app.workers.processing import FieldSink, flatten_data, insert_extracted_fields_batch
+
+TASK = "without_template_extraction"
+CREATE_TEMP_TABLE = (
+    "CREATE TEMP TABLE IF NOT EXISTS bulk_extracted_fields "
+    "(LIKE public.bulk_extracted_fields INCLUDING DEFAULTS)"
+)
+
+
+def make_pages(rng: random.Random, fields: int, pages: int):
+    """Page results whose hierarchical_data flattens to `fields` fields in total."""
+    per_page = [fields // pages + (1 if i < fields % pages else 0) for i in range(pages)]
+    results = []
+    for page_idx, count in enumerate(per_page):
+        rows = [{
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "description": f"Payment reference {rng.randint(10000, 99999)}",
+            "amount": round(rng.uniform(-5000, 5000), 2),
+            "balance": round(rng.uniform(0, 90000), 2),
+        } for _ in range(count // 4)]
+        header = {f"field_{i}": f"value {rng.randint(0, 10 ** 6)}" for i in range(count - 4 * len(rows))}
+        data = {"header": header, "transactions": rows} if rows else {"header": header}
+        assert len(flatten_data(data)) == count
+        results.append({
+            "page_number": page_idx + 1,
+            "hierarchical_data": data,
+            "tokens_used": 1500,
+            "extraction_time_s": 4.2,
+        })
+    return results
+
+
+def checkpoints(page_results, interval: int):
+    for start in range(0, len(page_results), interval):
+        yield page_results[start:start + interval], min(start + interval, len(page_results))
+
+
+def run_orm(page_results, interval: int) -> float:
+    """insert_extracted_fields_batch per checkpoint into the temp table."""
+    document_id, job_id = str(uuid.uuid4()), str(uuid.uuid4())
+    with sync_engine.connect() as conn:
+        conn = conn.execution_options(schema_translate_map={None: "pg_temp"})
+        conn.execute(text(CREATE_TEMP_TABLE))
+        conn.commit()
+        db = Session(bind=conn)
+        saved = 0
+        start = time.perf_counter()
+        for batch, _ in checkpoints(page_results, interval):
+            saved += insert_extracted_fields_batch(
+                db, document_id, job_id, batch, settings.EXTRACTION_MODEL, TASK, start_order=saved
+            )
+        elapsed = time.perf_counter() - start
+        db.close()
+    return elapsed
+
+
+class TempTableInserter:
+    """FieldSink inserter that COPYs into the temp table (no document progress row to update)."""
+
+    def __init__(self, conn: asyncpg.Connection, loop: asyncio.AbstractEventLoop):
+        self.conn = conn
+        self.loop = loop
+
+    def copy_extracted_fields(self, document_id, records, total_fields_extracted, pages_processed, processing_stage):
+        async def copy():
+            async with self.conn.transaction():
+                await self.conn.copy_records_to_table(
+                    "bulk_extracted_fields",
+                    schema_name="pg_temp",
+                    records=records,
+                    columns=list(EXTRACTED_FIELD_COPY_COLUMNS)
+                )
+        return self.loop.run_until_complete(copy())
+
+
+def run_copy(page_results, interval: int, batch_rows: int) -> float:
+    """FieldSink.add per checkpoint + close, COPY into the temp table."""
+    loop = asyncio.new_event_loop()
+    conn = loop.run_until_complete(asyncpg.connect(asyncpg_dsn(settings.DATABASE_URL), statement_cache_size=0))
+    try:
+        loop.run_until_complete(conn.execute(CREATE_TEMP_TABLE))
+        sink = FieldSink(
+            str(uuid.uuid4()), str(uuid.uuid4()), settings.EXTRACTION_MODEL, TASK, len(page_results),
+            batch_rows=batch_rows, flush_interval_s=float("inf"), inserter=TempTableInserter(conn, loop)
+        )
+        start = time.perf_counter()
+        for batch, pages_done in checkpoints(page_results, interval):
+            sink.add(batch, pages_done)
+        sink.close()
+        return time.perf_counter() - start
+    finally:
+        loop.run_until_complete(conn.close())
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=int, default=10000, help="Fields in the document")
+    parser.add_argument("--pages", type=int, default=50, help="Pages the fields are spread over")
+    parser.add_argument("--checkpoint", type=int, default=settings.PROGRESS_CHECKPOINT_INTERVAL, help="Pages per checkpoint")
+    parser.add_argument("--batch-rows", type=int, default=settings.FIELD_COPY_BATCH_ROWS, help="FieldSink rows per COPY")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    page_results = make_pages(random.Random(args.seed), args.fields, args.pages)
+    print(f"{args.fields} fields on {args.pages} pages, checkpoint every {args.checkpoint} pages, "
+          f"COPY batches of {args.batch_rows} rows, {args.runs} runs")
+
+    timings = {"ORM": [], "COPY": []}
+    for _ in range(args.runs):
+        timings["ORM"].append(run_orm(page_results, args.checkpoint))
+        timings["COPY"].append(run_copy(page_results, args.checkpoint, args.batch_rows))
+
+    for name, runs in timings.items():
+        median = statistics.median(runs)
+        print(f"  {name:<5} {median * 1000:9.1f} ms | {args.fields / median:10,.0f} rows/s")
+    print(f"  COPY speedup: {statistics.median(timings['ORM']) / statistics.median(timings['COPY']):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
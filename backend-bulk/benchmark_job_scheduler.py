@@ -0,0 +1,159 @@
+"""
+Job scheduling simulation: single Celery queue (FIFO) vs fair-share scheduler
+
+Replays a synthetic workload on --workers document slots with a discrete-event
+simulation (no Redis, Celery or database needed) and compares:
+
+- FIFO: every document queued with process_document.delay when its job starts,
+  workers take them in queue order (the behaviour before the scheduler);
+- fair: documents dispatched by app.workers.scheduler.plan_dispatch, the same
+  function the Redis scheduler runs, keeping at most --workers in flight.
+
+Workload: one huge job (--huge-docs documents) starts at t=0; --small-jobs
+small jobs (1 to --small-max-docs documents each) from other users arrive at
+random over the first --arrival-window seconds. With --same-user every job
+belongs to the huge job's owner (fairness then comes from the weighted round
+robin between jobs instead of between users). Document processing times are
+log-normal around --doc-seconds.
+
+Reports, for the small jobs, time to first result (first document finished)
+and time to completion, plus the huge job's makespan.
+
+    python benchmark_job_scheduler.py
+    python benchmark_job_scheduler.py --huge-docs 10000 --workers 50 --small-jobs 40 --same-user
+"""
+import argparse
+import heapq
+import math
+import os
+import random
+import statistics
+import sys
+from collections import deque
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.workers.scheduler import JobShare, plan_dispatch
+
+HUGE = "huge"
+
+
+def make_workload(args, rng: random.Random) -> List[Dict]:
+    """Jobs as dicts: id, user, arrival (s), docs (processing seconds per document)."""
+    sigma = 0.6
+    mu = math.log(args.doc_seconds) - sigma ** 2 / 2  # Mean of the log-normal = doc_seconds
+
+    def docs(count: int) -> List[float]:
+        return [rng.lognormvariate(mu, sigma) for _ in range(count)]
+
+    jobs = [{"id": HUGE, "user": "tenant-0", "arrival": 0.0, "docs": docs(args.huge_docs)}]
+    for index in range(args.small_jobs):
+        jobs.append({
+            "id": f"small-{index:03d}",
+            "user": "tenant-0" if args.same_user else f"tenant-{index + 1}",
+            "arrival": rng.uniform(1.0, args.arrival_window),
+            "docs": docs(rng.randint(1, args.small_max_docs)),
+        })
+    return jobs
+
+
+def simulate(jobs: List[Dict], workers: int, policy: str) -> Dict[str, Dict[str, float]]:
+    """Run the workload; per job: arrival, first (first document done), done (last document done)."""
+    events = [(job["arrival"], 0, "arrive", job["id"]) for job in jobs]
+    heapq.heapify(events)
+    by_id = {job["id"]: job for job in jobs}
+    outcome = {job["id"]: {"arrival": job["arrival"], "first": None, "done": None, "left": len(job["docs"])} for job in jobs}
+
+    fifo: deque = deque()  # (job_id, seconds)
+    queues: Dict[str, deque] = {}
+    shares: Dict[str, JobShare] = {}
+    busy = 0
+    seq = 0
+    tiebreak = 1
+
+    while events:
+        now, _, kind, job_id = heapq.heappop(events)
+        if kind == "arrive":
+            docs = by_id[job_id]["docs"]
+            if policy == "fifo":
+                fifo.extend((job_id, seconds) for seconds in docs)
+            else:
+                queues[job_id] = deque(docs)
+                shares[job_id] = JobShare(job_id=job_id, user_id=by_id[job_id]["user"], pending=len(docs))
+        else:
+            busy -= 1
+            result = outcome[job_id]
+            result["left"] -= 1
+            if result["first"] is None:
+                result["first"] = now
+            if result["left"] == 0:
+                result["done"] = now
+            if policy == "fair":
+                shares[job_id].inflight -= 1
+                if result["left"] == 0:
+                    del shares[job_id]
+
+        # Fill free worker slots
+        if policy == "fifo":
+            started = []
+            while busy + len(started) < workers and fifo:
+                started.append(fifo.popleft())
+        else:
+            picks = plan_dispatch(list(shares.values()), workers - busy, seq)
+            seq += len(picks)
+            started = [(pick, queues[pick].popleft()) for pick in picks]
+        for pick, seconds in started:
+            busy += 1
+            heapq.heappush(events, (now + seconds, tiebreak, "done", pick))
+            tiebreak += 1
+    return outcome
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=50, help="Document slots (worker processes / FAIR_SCHEDULER_MAX_INFLIGHT)")
+    parser.add_argument("--huge-docs", type=int, default=10000, help="Documents in the huge job")
+    parser.add_argument("--small-jobs", type=int, default=40, help="Small jobs arriving while it runs")
+    parser.add_argument("--small-max-docs", type=int, default=20, help="Largest small job")
+    parser.add_argument("--arrival-window", type=float, default=3600.0, help="Small jobs arrive within this many seconds")
+    parser.add_argument("--doc-seconds", type=float, default=45.0, help="Mean processing time per document")
+    parser.add_argument("--same-user", action="store_true", help="All jobs belong to the huge job's owner")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    jobs = make_workload(args, random.Random(args.seed))
+    small_docs = sum(len(job["docs"]) for job in jobs if job["id"] != HUGE)
+    print(
+        f"{args.workers} workers | huge job: {args.huge_docs} docs at t=0 | "
+        f"{args.small_jobs} small jobs ({small_docs} docs) over {args.arrival_window:.0f}s | "
+        f"~{args.doc_seconds:.0f}s/doc | {'same user' if args.same_user else 'one user per small job'}"
+    )
+
+    rows = {}
+    for policy in ("fifo", "fair"):
+        outcome = simulate(jobs, args.workers, policy)
+        small = [result for job_id, result in outcome.items() if job_id != HUGE]
+        first = [result["first"] - result["arrival"] for result in small]
+        done = [result["done"] - result["arrival"] for result in small]
+        rows[policy] = (first, done, outcome[HUGE]["done"])
+
+    print(f"  {'':<5} {'first result p50':>17} {'p95':>9} {'max':>9} | {'completion p50':>15} {'p95':>9} | {'huge job makespan':>18}")
+    for policy, (first, done, huge_done) in rows.items():
+        print(
+            f"  {policy:<5} {statistics.median(first):16,.0f}s {percentile(first, 95):8,.0f}s {max(first):8,.0f}s | "
+            f"{statistics.median(done):14,.0f}s {percentile(done, 95):8,.0f}s | {huge_done:17,.0f}s"
+        )
+    fifo_p95, fair_p95 = percentile(rows["fifo"][0], 95), percentile(rows["fair"][0], 95)
+    print(f"  p95 time to first result: {fifo_p95 / fair_p95:,.0f}x lower with the fair-share scheduler; "
+          f"huge job makespan {rows['fair'][2] / rows['fifo'][2] - 1:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Source discovery benchmark: list-then-insert vs paged discovery on a local folder
+
+Builds a folder tree of --files empty PDFs (--dirs subfolders) in a temporary
+directory, or uses --path, and measures with FolderSourceAdapter:
+
+- list: the whole tree walked into one list (rglob, stat per match) before
+  the first document could be inserted - what uncapped list-based discovery
+  costs before processing can start;
+- paged: time until the first page of --page-size documents is ready (when
+  processing starts) and until the last page;
+- resume: time to the first page when resuming from the cursor halfway
+  through the walk (a retried discovery task).
+
+No database, Redis or Celery needed.
+
+    python benchmark_source_discovery.py
+    python benchmark_source_discovery.py --files 200000 --dirs 400 --page-size 100
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.source_adapter import FolderSourceAdapter
+
+
+def build_tree(root: str, files: int, dirs: int):
+    for index in range(files):
+        directory = os.path.join(root, f"batch-{index % dirs:04d}")
+        if index < dirs:
+            os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"doc-{index:07d}.pdf"), "wb").close()
+
+
+def list_all(root: str) -> int:
+    """The old discovery shape without the cap: every match in memory first"""
+    documents = []
+    for file_path in Path(root).rglob("*"):
+        if file_path.is_file() and file_path.suffix.lower().lstrip('.') in ("pdf", "jpg", "jpeg", "png"):
+            documents.append((str(file_path), file_path.stat().st_size))
+    return len(documents)
+
+
+def paged(adapter: FolderSourceAdapter, config, page_size: int, cursor=None):
+    """(seconds to first page, seconds to last page, documents, cursor halfway)"""
+    started = time.perf_counter()
+    first = None
+    count = 0
+    cursors = []
+    for page in adapter.iter_document_pages(config, cursor=cursor, page_size=page_size):
+        if first is None:
+            first = time.perf_counter() - started
+        count += len(page.documents)
+        cursors.append(page.cursor)
+    return first, time.perf_counter() - started, count, cursors[len(cursors) // 2] if cursors else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50000, help="Files to create")
+    parser.add_argument("--dirs", type=int, default=100, help="Subfolders to spread them over")
+    parser.add_argument("--page-size", type=int, default=100, help="Documents per discovery page (discovery_batch_size)")
+    parser.add_argument("--path", help="Benchmark an existing folder instead of a generated tree")
+    args = parser.parse_args()
+
+    root = args.path or tempfile.mkdtemp(prefix="discovery-bench-")
+    try:
+        if not args.path:
+            started = time.perf_counter()
+            build_tree(root, args.files, args.dirs)
+            print(f"Built {args.files} files in {args.dirs} folders ({time.perf_counter() - started:.1f}s)")
+
+        adapter = FolderSourceAdapter()
+        config = {"path": root, "recursive": True}
+
+        started = time.perf_counter()
+        listed = list_all(root)
+        list_s = time.perf_counter() - started
+
+        first_s, total_s, count, halfway = paged(adapter, config, args.page_size)
+        resume_first_s, _, resumed, _ = paged(adapter, config, args.page_size, cursor=halfway)
+
+        print(f"  list   all {listed:>9,} documents before the first insert: {list_s:8.3f}s")
+        print(f"  paged  first {args.page_size} documents: {first_s:8.3f}s | all {count:,}: {total_s:8.3f}s")
+        print(f"  resume from {halfway}: first page {resume_first_s:.3f}s ({resumed:,} documents left)")
+        print(f"  processing can start {list_s / first_s:,.0f}x sooner")
+    finally:
+        if not args.path:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
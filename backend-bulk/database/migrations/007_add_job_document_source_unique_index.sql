@@ -0,0 +1,23 @@
+-- Migration: One row per source file in a bulk job
+-- Date: 2026-10-16
+-- Purpose: Discovery inserts documents page by page and resumes from a saved
+-- cursor after a retry, so a page may be listed twice. The unique index makes
+-- the page insert (INSERT ... ON CONFLICT DO NOTHING) skip files the job already has.
+--
+-- ⚠️ IMPORTANT: Run each statement SEPARATELY in Supabase SQL Editor
+-- Use CONCURRENTLY to avoid locking tables (doesn't block reads/writes)
+
+-- ============================================================
+-- STEP 1: Check for existing duplicates (must return no rows,
+-- otherwise delete the extra rows before STEP 2)
+-- ============================================================
+SELECT job_id, source_path, COUNT(*) AS copies
+FROM public.bulk_job_documents
+GROUP BY job_id, source_path
+HAVING COUNT(*) > 1;
+
+-- ============================================================
+-- STEP 2: Unique index on (job_id, source_path)
+-- ============================================================
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_bulk_job_documents_job_id_source_path
+ON public.bulk_job_documents(job_id, source_path);
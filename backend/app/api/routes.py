@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
+import base64
+import json
 import logging
 from datetime import datetime
 import uuid
@@ -16,6 +19,7 @@ from ..models.schemas import (
     ProcessPendingRequest, ProcessPendingResponse
 )
 from ..core.supabase_client import get_supabase_client
+from ..core.config import settings
 from pydantic import BaseModel
 
 # Direct save request schema
@@ -283,31 +287,15 @@ async def direct_save(request: DirectSaveRequest):
         # Generate vector embeddings (chunked) for semantic search
         chunks_data = None
         try:
-            logger.info("🔍 Generating vector embeddings for manual save...")
+            logger.info("🔍 Preparing chunks for manual save...")
             
-            # Convert analysis result to text
-            text = embedding_service.convert_analysis_result_to_text(request.result)
-            text_length = len(text)
-            
-            # Use chunking for large documents (> 3000 chars)
-            if text_length > 3000:
-                logger.info(f"📊 Text is large ({text_length} chars), using chunked embeddings...")
-                chunks_data = await embedding_service.generate_embeddings_for_chunks(
-                    text, chunk_size=1500, overlap=200
-                )
-                if chunks_data:
-                    logger.info(f"✅ Generated {len(chunks_data)} chunk embeddings")
-                else:
-                    logger.warning("⚠️ Failed to generate chunk embeddings")
+            # Structure-aware chunks: whole sections/fields/table rows packed to a token budget.
+            # Embeddings are generated on save, only for chunks not already stored.
+            chunks_data = embedding_service.chunk_analysis_result(request.result)
+            if chunks_data:
+                logger.info(f"✅ Prepared {len(chunks_data)} chunks")
             else:
-                logger.info(f"📊 Text is small ({text_length} chars), using single embedding...")
-                # For small documents, create a single chunk
-                embedding = await embedding_service.generate_embedding(text)
-                if embedding:
-                    chunks_data = [{"chunk": text, "embedding": embedding}]
-                    logger.info(f"✅ Generated single embedding with {len(embedding)} dimensions")
-                else:
-                    logger.warning("⚠️ Failed to generate vector embedding")
+                logger.warning("⚠️ No chunks produced for vector embeddings")
         except Exception as e:
             logger.error(f"❌ Error generating vector embeddings: {e}")
             chunks_data = None
@@ -320,7 +308,8 @@ async def direct_save(request: DirectSaveRequest):
                 document_id=request.documentId,
                 result=request.result,
                 user_id=request.userId,
-                chunks_data=chunks_data
+                chunks_data=chunks_data,
+                embed_fn=embedding_service.batch_generate_embeddings
             )
             action = "updated"
         else:
@@ -332,7 +321,8 @@ async def direct_save(request: DirectSaveRequest):
                 task=request.task,
                 user_id=request.userId,
                 document_name=request.documentName,
-                chunks_data=chunks_data
+                chunks_data=chunks_data,
+                embed_fn=embedding_service.batch_generate_embeddings
             )
             action = "created"
         
@@ -343,7 +333,7 @@ async def direct_save(request: DirectSaveRequest):
             "documentId": saved_document.get("id") if saved_document else None,
             "savedDocument": saved_document,
             "action": action,
-            "hasEmbedding": chunks_data is not None,
+            "hasEmbedding": bool(chunks_data),
             "chunkCount": len(chunks_data) if chunks_data else 0
         }
         
@@ -1101,14 +1091,11 @@ async def warmup_connections():
     try:
         logger.info("🔥 Connection warm-up requested")
         
-        # Initialize HTTP session with connection pooling
-        # Use a high default (100) to match pool3's max_workers cap
-        # Processing will recreate the session with the actual worker count if needed
-        # This warm-up is mainly for initial connection establishment
-        max_connections = 100  # Match pool3's max cap for LLM calls
-        llm_client._get_sync_session(max_connections=max_connections)
+        # Start the shared LLM transport (event loop + pooled HTTP client) used by all LLM calls;
+        # warm_up() blocks until the loop thread is up, so keep it off this event loop
+        await asyncio.to_thread(llm_client.warm_up)
         
-        logger.info(f"✅ Connection warm-up completed - HTTP session initialized with {max_connections} max connections")
+        logger.info(f"✅ Connection warm-up completed - LLM transport initialized with {settings.LLM_MAX_CONCURRENCY} max connections")
         
         return WarmupResponse(
             success=True,
@@ -1204,128 +1191,251 @@ async def ensure_bucket(request: EnsureBucketRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@analyze_router.get("/documents/{user_id}")
-async def get_user_documents(user_id: str, document_type: Optional[str] = None):
-    """
-    Get all documents for a user, optionally filtered by document type.
-    Returns documents grouped by type with metadata.
-    """
+# Columns returned by the document listing; the heavy ones only with ?include=
+DOCUMENT_LIST_COLUMNS = 'id, user_id, file_name, file_type, file_size, storage_path, created_at, updated_at, processing_status, metadata, document_type, is_deleted, deleted_at'
+DOCUMENT_LIST_HEAVY_COLUMNS = {'extracted_text': 'extracted_text', 'analysis_result': 'analysis_result', 'insights': 'analysis_result'}
+# ?sort= values of the document listing -> column (id breaks ties in the same direction)
+DOCUMENT_LIST_SORT_COLUMNS = {'created_at': 'created_at', 'name': 'file_name', 'size': 'file_size'}
+
+
+def _encode_document_cursor(doc: Dict[str, Any], sort: str, order: str) -> str:
+    """Opaque keyset cursor for the position after doc in the listing ordered by sort/order, then id."""
+    payload = json.dumps({'s': sort, 'o': order, 'v': doc[DOCUMENT_LIST_SORT_COLUMNS[sort]], 'i': doc['id']}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_document_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, str]:
+    """(sort value, id) from a listing cursor; HTTP 400 if it was not produced by _encode_document_cursor for this sort/order."""
     try:
-        from ..core.supabase_client import get_supabase_client
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload['s'] != sort or payload['o'] != order:
+            raise ValueError("cursor belongs to another sort order")
+        value, doc_id = payload['v'], str(uuid.UUID(str(payload['i'])))
+        if sort == 'created_at':
+            datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        elif sort == 'size':
+            value = int(value)
+        else:
+            value = str(value)
+        return value, doc_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _postgrest_quote(value: Any) -> str:
+    """Value as a double-quoted PostgREST filter literal (safe inside or=(...) with commas, dots and parentheses)."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _fetch_document_folders(supabase, doc_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Smart folders per document id (queried in chunks to keep request URLs short)."""
+    folders_map: Dict[str, List[Dict[str, Any]]] = {}
+    for offset in range(0, len(doc_ids), 200):
+        shortcuts_response = supabase.table('document_shortcuts').select(
+            'document_id, folder_id, smart_folders(id, name, folder_color, icon)'
+        ).in_('document_id', doc_ids[offset:offset + 200]).execute()
+        for shortcut in (shortcuts_response.data or []):
+            doc_id = shortcut['document_id']
+            
+            if doc_id not in folders_map:
+                folders_map[doc_id] = []
+            if shortcut.get('smart_folders'):
+                folders_map[doc_id].append({
+                    'id': shortcut['smart_folders']['id'],
+                    'name': shortcut['smart_folders']['name'],
+                    'color': shortcut['smart_folders'].get('folder_color', '#6366f1'),
+                    'icon': shortcut['smart_folders'].get('icon', 'Folder')
+                })
+    return folders_map
+
+
+def _fetch_document_totals(supabase, user_id: str, document_type: Optional[str], search: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Totals over every document matching the listing filters (get_user_document_stats); None if unavailable."""
+    try:
+        rows = supabase.rpc('get_user_document_stats', {
+            'p_user_id': user_id,
+            'p_document_type': document_type,
+            'p_search': search,
+        }).execute().data or []
+    except Exception as e:
+        logger.warning(f"⚠️ Document totals unavailable for user {user_id}: {e}")
+        return None
+    row = rows[0] if rows else {}
+    return {
+        'total_documents': row.get('total_documents') or 0,
+        'total_size': row.get('total_size') or 0,
+        'processed_documents': row.get('processed_documents') or 0,
+        'avg_importance': float(row.get('avg_importance') or 0),
+    }
+
+
+def _list_user_documents(
+    user_id: str,
+    document_type: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[Tuple[Any, str]],
+    heavy_columns: List[str],
+    search: Optional[str] = None,
+    sort: str = 'created_at',
+    order: str = 'desc'
+) -> Dict[str, Any]:
+    """Blocking body of get_user_documents (Supabase client calls)."""
+    supabase = get_supabase_client()
+    
+    columns = DOCUMENT_LIST_COLUMNS + ''.join(f', {column}' for column in heavy_columns)
+    query = supabase.table('documents').select(columns).eq('user_id', user_id).not_.is_('is_deleted', 'true')
+    
+    # Filter by document type if specified
+    if document_type and document_type != 'all':
+        query = query.eq('document_type', document_type)
+    
+    # Search and the keyset position go in one or= tree (PostgREST keeps a single or= parameter)
+    or_groups = []
+    if search:
+        pattern = _postgrest_quote(f'*{search}*')
+        or_groups.append(f'file_name.ilike.{pattern},extracted_text.ilike.{pattern},analysis_result->>summary.ilike.{pattern}')
+    
+    column = DOCUMENT_LIST_SORT_COLUMNS[sort]
+    descending = order == 'desc'
+    if cursor:
+        value, doc_id = cursor
+        op = 'lt' if descending else 'gt'
+        value = _postgrest_quote(value)
+        or_groups.append(f'{column}.{op}.{value},and({column}.eq.{value},id.{op}.{doc_id})')
+    
+    if len(or_groups) == 1:
+        query = query.or_(or_groups[0])
+    elif or_groups:
+        query = query.or_('and(' + ','.join(f'or({group})' for group in or_groups) + ')')
+    
+    # id breaks ties so the keyset cursor is stable
+    query = query.order(column, desc=descending).order('id', desc=descending)
+    if limit:
+        query = query.limit(limit + 1)  # One extra row tells whether another page exists
+    
+    documents = query.execute().data or []
+    
+    next_cursor = None
+    if limit and len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = _encode_document_cursor(documents[-1], sort, order)
+    
+    # Totals over all matching documents come with the first page (the stats cards, not the page)
+    totals = _fetch_document_totals(supabase, user_id, document_type, search) if limit and not cursor else None
+    
+    folders_map = _fetch_document_folders(supabase, [doc['id'] for doc in documents])
+    
+    # One batched signing request per SIGNED_URL_BATCH_SIZE paths, cached until close to expiry
+    from ..services.signed_url_cache import get_signed_url_cache
+    storage_paths = [doc['storage_path'] for doc in documents if doc.get('storage_path')]
+    signed_urls = get_signed_url_cache().get_many(supabase, 'documents', storage_paths, 3600) if storage_paths else {}
+    
+    # Group documents by type
+    grouped = {}
+    all_docs_with_urls = []
+    total_size = 0
+    
+    for doc in documents:
+        doc_type = doc.get('document_type') or 'unknown'
         
-        supabase = get_supabase_client()
+        # Handle None or empty string
+        if not doc_type or doc_type.strip() == '':
+            doc_type = 'unknown'
         
-        # Build query - select all fields including storage_path, is_deleted, deleted_at, analysis_result
-        query = supabase.table('documents').select('id, user_id, file_name, file_type, file_size, storage_path, created_at, updated_at, extracted_text, processing_status, metadata, document_type, is_deleted, deleted_at, analysis_result').eq('user_id', user_id)
+        if doc_type not in grouped:
+            # Create display name from type
+            display_name = doc_type.replace('-', ' ').title() if doc_type else 'Unknown'
+            
+            grouped[doc_type] = {
+                'type': doc_type,
+                'display_name': display_name,
+                'count': 0,
+                'total_size': 0,
+                'documents': []
+            }
         
-        # Filter by document type if specified
-        if document_type and document_type != 'all':
-            query = query.eq('document_type', document_type)
+        grouped[doc_type]['count'] += 1
+        grouped[doc_type]['total_size'] += doc.get('file_size') or 0
         
-        # Order by created_at descending (newest first)
-        response = query.order('created_at', desc=True).execute()
+        doc_with_url = doc.copy()
         
-        documents = response.data or []
+        # Map analysis_result to insights for frontend compatibility
+        # Check if analysis_result is a non-empty dict (not just {})
+        analysis_result = doc.get('analysis_result')
+        if analysis_result and isinstance(analysis_result, dict) and len(analysis_result) > 0:
+            doc_with_url['insights'] = analysis_result
         
-        # Fetch folder relationships for all documents
-        doc_ids = [doc['id'] for doc in documents]
-        folders_map = {}
+        # Add folders array
+        doc_with_url['folders'] = folders_map.get(doc['id'], [])
         
-        if doc_ids:
-            shortcuts_response = supabase.table('document_shortcuts').select('document_id, folder_id, smart_folders(id, name, folder_color, icon)').in_('document_id', doc_ids).execute()
-            for shortcut in (shortcuts_response.data or []):
-                doc_id = shortcut['document_id']
-                
-                if doc_id not in folders_map:
-                    folders_map[doc_id] = []
-                if shortcut.get('smart_folders'):
-                    folders_map[doc_id].append({
-                        'id': shortcut['smart_folders']['id'],
-                        'name': shortcut['smart_folders']['name'],
-                        'color': shortcut['smart_folders'].get('folder_color', '#6366f1'),
-                        'icon': shortcut['smart_folders'].get('icon', 'Folder')
-                    })
-
-        # Group documents by type
-        grouped = {}
-        total_size = 0
-        
-        for doc in documents:
-            # Skip documents marked as deleted
-            if doc.get('is_deleted', False):
-                continue
-            
-            doc_type = doc.get('document_type') or 'unknown'
-            
-            # Handle None or empty string
-            if not doc_type or doc_type.strip() == '':
-                doc_type = 'unknown'
-            
-            if doc_type not in grouped:
-                # Create display name from type
-                display_name = doc_type.replace('-', ' ').title() if doc_type else 'Unknown'
-                
-                grouped[doc_type] = {
-                    'type': doc_type,
-                    'display_name': display_name,
-                    'count': 0,
-                    'total_size': 0,
-                    'documents': []
-                }
-            
-            grouped[doc_type]['count'] += 1
-            grouped[doc_type]['total_size'] += doc.get('file_size', 0)
-            
-            # Add public/signed URL for storage_path
-            doc_with_url = doc.copy()
-            
-            # Map analysis_result to insights for frontend compatibility
-            # Check if analysis_result is a non-empty dict (not just {})
-            analysis_result = doc.get('analysis_result')
-            if analysis_result and isinstance(analysis_result, dict) and len(analysis_result) > 0:
-                doc_with_url['insights'] = analysis_result
-            
-            # Add folders array
-            doc_with_url['folders'] = folders_map.get(doc['id'], [])
-            
-            if doc.get('storage_path'):
-                try:
-                    # Generate a signed URL (valid for 1 hour) since bucket is private
-                    url_response = supabase.storage.from_('documents').create_signed_url(
-                        doc['storage_path'],
-                        3600  # 1 hour expiry
-                    )
-                    
-                    # Extract signed URL from response
-                    if isinstance(url_response, dict):
-                        doc_with_url['storage_url'] = url_response.get('signedURL') or url_response.get('signedUrl') or url_response.get('url')
-                    elif hasattr(url_response, 'get'):
-                        doc_with_url['storage_url'] = url_response.get('signedURL') or url_response.get('signedUrl')
-                    else:
-                        doc_with_url['storage_url'] = getattr(url_response, 'signedURL', None) or str(url_response)
-                        
-                    logger.info(f"Generated signed URL for {doc['file_name']}")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to generate signed URL for {doc['storage_path']}: {str(e)}")
-                    doc_with_url['storage_url'] = None
-            
-            grouped[doc_type]['documents'].append(doc_with_url)
-            total_size += doc.get('file_size', 0)
-        
-        # Flatten documents from all groups to get complete list with storage_url
-        all_docs_with_urls = []
-        for group in grouped.values():
-            all_docs_with_urls.extend(group['documents'])
-        
-        return {
-            'success': True,
-            'total_documents': len(all_docs_with_urls),
-            'total_size': total_size,
-            'document_types': list(grouped.values()),
-            'documents': all_docs_with_urls
-        }
+        if doc.get('storage_path'):
+            doc_with_url['storage_url'] = signed_urls.get(doc['storage_path'])
         
+        grouped[doc_type]['documents'].append(doc_with_url)
+        all_docs_with_urls.append(doc_with_url)
+        total_size += doc.get('file_size') or 0
+    
+    return {
+        'success': True,
+        'total_documents': len(all_docs_with_urls),
+        'total_size': total_size,
+        'document_types': list(grouped.values()),
+        'documents': all_docs_with_urls,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'totals': totals
+    }
+
+
+@analyze_router.get("/documents/{user_id}")
+async def get_user_documents(
+    user_id: str,
+    document_type: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: str = 'created_at',
+    order: str = 'desc'
+):
+    """
+    Get documents for a user, optionally filtered by document type.
+    Returns documents grouped by type with metadata, newest first unless sort/order say otherwise.
+    
+    - limit: page size (max DOCUMENT_LIST_MAX_PAGE_SIZE); without it every document is returned.
+      Counts and sizes describe the returned page; the first page also carries `totals`
+      over every matching document.
+    - cursor: `next_cursor` of the previous page (same search/sort/order).
+    - search: case-insensitive substring of the file name, extracted text or summary.
+    - sort: `created_at`, `name` or `size`; order: `asc` or `desc`.
+    - include: comma-separated heavy fields left out by default
+      (`extracted_text`, `analysis_result` - also returned as `insights`).
+    """
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    if limit is not None:
+        limit = min(limit, settings.DOCUMENT_LIST_MAX_PAGE_SIZE)
+    
+    heavy_columns = []
+    for name in filter(None, (part.strip() for part in (include or '').split(','))):
+        if name not in DOCUMENT_LIST_HEAVY_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Unknown include field: {name}")
+        if DOCUMENT_LIST_HEAVY_COLUMNS[name] not in heavy_columns:
+            heavy_columns.append(DOCUMENT_LIST_HEAVY_COLUMNS[name])
+    
+    if sort not in DOCUMENT_LIST_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+    if order not in ('asc', 'desc'):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    search = (search or '').strip() or None
+    
+    position = _decode_document_cursor(cursor, sort, order) if cursor else None
+    
+    try:
+        return await asyncio.to_thread(
+            _list_user_documents, user_id, document_type, limit, position, heavy_columns, search, sort, order
+        )
     except Exception as e:
         logger.error(f"Error fetching documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
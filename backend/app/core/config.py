@@ -23,6 +23,34 @@ class Settings(BaseSettings):
     # Increase this if you see JSON truncation errors
     LLM_MAX_OUTPUT_TOKENS: int = 16384  # Max output tokens for LLM responses (increase for complex pages)
 
+    # LLM Transport Configuration (shared by async and sync LLM calls)
+    LLM_RATE_LIMIT_RPM: int = 0  # Requests per minute per model (0 = unlimited)
+    LLM_RATE_LIMIT_TPM: int = 0  # Tokens per minute per model (0 = unlimited)
+    LLM_MODEL_RATE_LIMITS: str = ""  # Per-model overrides as JSON, e.g. {"openrouter/google/gemini-2.5-flash": {"rpm": 500, "tpm": 2000000}}
+    LLM_MAX_CONCURRENCY: int = 100  # Upper bound for in-flight requests per model (adaptive limit never exceeds this)
+    LLM_MIN_CONCURRENCY: int = 2  # Floor the adaptive limit backs off to under 429s
+    LLM_INITIAL_CONCURRENCY: int = 16  # Starting in-flight limit per model before any feedback
+    LLM_MAX_RETRIES: int = 4  # Attempts per request for 429 / 5xx / network errors
+    LLM_BACKOFF_BASE_S: float = 1.0  # Base of the full-jitter exponential backoff
+    LLM_BACKOFF_MAX_S: float = 30.0  # Cap on a single backoff sleep
+    LLM_REQUEST_TIMEOUT_S: float = 90.0  # Per-attempt HTTP timeout
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = 2000  # Output tokens reserved per request before the real usage is known
+    LLM_IMAGE_TOKEN_ESTIMATE: int = 1300  # Input tokens assumed per attached page image
+    LLM_STREAMING_ENABLED: bool = False  # Stream JSON responses (SSE) and parse them incrementally; keeps complete sections on truncation
+
+    # LLM Page Batching Configuration (opt-in)
+    LLM_PAGE_BATCHING_ENABLED: bool = False  # Extract consecutive short text pages with one LLM request (without_template_extraction)
+    LLM_PAGE_BATCH_TOKEN_BUDGET: int = 12000  # Estimated input + output tokens per multi-page request
+    LLM_PAGE_BATCH_MAX_PAGES: int = 6  # Pages per multi-page request
+    LLM_PAGE_BATCH_PAGE_MAX_TOKENS: int = 2500  # Pages estimated above this are sent alone
+    LLM_PAGE_BATCH_LINGER_MS: int = 200  # How long a ready page waits for its neighbours
+
+    # LLM Response Cache Configuration (opt-in)
+    LLM_RESPONSE_CACHE_ENABLED: bool = False  # Answer byte-identical LLM requests (prompt + page content) from disk
+    LLM_RESPONSE_CACHE_PATH: str = "cache/llm_responses.sqlite3"  # SQLite store for cached responses
+    LLM_RESPONSE_CACHE_TTL_HOURS: int = 168  # Entries older than this are not reused (default: 7 days)
+    LLM_RESPONSE_CACHE_MAX_MB: int = 256  # Size budget for stored responses (least recently used evicted first)
+
     # Supabase Configuration (read from backend/.env)
     SUPABASE_URL: str = ""
     SUPABASE_SERVICE_ROLE_KEY: str = ""
@@ -48,6 +76,38 @@ class Settings(BaseSettings):
     PDF_PREFER_TEXT_EXTRACTION: bool = True  # Prefer text extraction over image conversion when possible
     PDF_TEXT_CONFIDENCE_THRESHOLD: float = 0.6  # Minimum confidence (0-1) to use text extraction
     
+    # PDF Document Cache Configuration
+    PDF_DOCUMENT_CACHE_MAX_MB: int = 512  # Byte budget for open PDFs shared across requests (unreferenced ones are evicted LRU)
+    PAGE_RENDER_CACHE_MAX_MB: int = 512  # Budget for page renders shared by type detection and extraction
+    
+    # Embedding Configuration
+    EMBEDDING_BATCH_SIZE: int = 64  # Max inputs sent per /embeddings request
+    EMBEDDING_BATCH_MAX_TOKENS: int = 60000  # Approximate token budget per /embeddings request
+    EMBEDDING_BATCH_CONCURRENCY: int = 4  # Max /embeddings requests in flight per batch call
+    EMBEDDING_CHUNK_MAX_TOKENS: int = 500  # Token budget per structure-aware chunk (~1500 characters)
+    EMBEDDING_CACHE_ENABLED: bool = True  # Reuse embeddings for identical (model, text) instead of calling the API
+    EMBEDDING_CACHE_PATH: str = "cache/embeddings.sqlite3"  # SQLite store for cached embeddings (empty = memory only)
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 2048  # In-memory LRU entries in front of the SQLite store
+    
+    # Document Listing Configuration
+    DOCUMENT_LIST_MAX_PAGE_SIZE: int = 500  # Largest `limit` accepted by the paginated document listing
+    SIGNED_URL_BATCH_SIZE: int = 500  # Storage paths signed per create_signed_urls request
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = 50000  # Signed URLs kept in memory (least recently used evicted)
+    SIGNED_URL_MIN_REMAINING_S: int = 300  # Cached signed URLs are re-signed once less than this lifetime is left
+    
+    # In-process Vector Index Configuration (manual similarity search fallback)
+    VECTOR_INDEX_MAX_USERS: int = 64  # Per-user indexes kept in memory (least recently used evicted)
+    VECTOR_INDEX_IVF_MIN_ROWS: int = 20000  # Partition an index IVF-style once it has this many chunks
+    VECTOR_INDEX_IVF_NPROBE: int = 8  # Partitions scanned per query once partitioned
+    SEARCH_INDEX_VERSION_CHECK_S: float = 15.0  # How often a loaded search index checks document_chunks for writes by other workers
+    
+    # Hybrid Search Configuration (BM25 lexical index fused with vector results)
+    HYBRID_SEARCH_ENABLED: bool = True  # Fuse lexical (BM25) matches into semantic search results
+    HYBRID_SEARCH_CANDIDATES: int = 50  # Candidates taken from each ranking before fusion
+    HYBRID_RRF_K: int = 60  # Reciprocal-rank-fusion constant (higher = flatter rank weighting)
+    HYBRID_LEXICAL_MIN_SCORE: float = 1.0  # BM25 hits scoring below this are not fused (terms common to most chunks score ~0)
+    LEXICAL_INDEX_MAX_USERS: int = 64  # Per-user lexical indexes kept in memory (least recently used evicted)
+    
     # Logging Configuration
     LOG_FILE_MAX_SIZE: int = 50  # Maximum log file size in MB before rotation
     LOG_FILE_BACKUP_COUNT: int = 5  # Number of backup log files to keep
@@ -67,13 +127,26 @@ class Settings(BaseSettings):
     
     # Shared YOLO Configuration
     YOLO_USE_GPU: bool = False  # Use GPU for YOLO inference (if available)
+    YOLO_BACKEND: str = "onnx"  # "onnx" = ONNX Runtime in worker processes; "ultralytics" = in-process (force-disabled)
+    YOLO_ONNX_MODEL_PATH: str = ""  # Signature ONNX export (empty = model path with .onnx suffix)
+    YOLO_FACE_ONNX_MODEL_PATH: str = ""  # Face ONNX export (empty = face model path with .onnx suffix)
+    YOLO_SERVICE_WORKERS: int = 1  # Inference worker processes shared by all documents
+    YOLO_SERVICE_THREADS: int = 2  # ONNX Runtime intra-op threads per worker process
+    YOLO_BATCH_MAX_SIZE: int = 8  # Pages per inference batch (across concurrent documents)
+    YOLO_BATCH_MAX_WAIT_MS: int = 15  # Longest a page waits for its batch to fill
+    YOLO_SERVICE_TIMEOUT_S: float = 60.0  # Batch deadline before the worker is killed and restarted
+    YOLO_SERVICE_LOAD_TIMEOUT_S: float = 120.0  # Model load deadline per worker
+    YOLO_SERVICE_MAX_RESTARTS: int = 5  # Consecutive worker failures before YOLO detection is switched off
+    YOLO_PREFILTER_ENABLED: bool = False  # Skip/narrow YOLO using ink analysis of the thresholded page and image blocks (off until recall is measured on a labelled manifest)
+    YOLO_PREFILTER_MAX_ROI_FRACTION: float = 0.6  # Candidate regions covering more of the page than this run on the full page
+    YOLO_PREFILTER_MIN_BLOCK_PT: float = 10.0  # Text-path image blocks smaller than this (PDF points) are not sent to YOLO
     
     # Legacy support - keep YOLO_MODEL_PATH for backward compatibility
     YOLO_MODEL_PATH: str = "models/signature_detector.pt"  # Deprecated: use YOLO_SIGNATURE_MODEL_PATH
     YOLO_CONFIDENCE_THRESHOLD: float = 0.5  # Deprecated: use YOLO_SIGNATURE_CONFIDENCE_THRESHOLD
     YOLO_IOU_THRESHOLD: float = 0.45  # Deprecated: use YOLO_SIGNATURE_IOU_THRESHOLD
     
-    @field_validator('YOLO_SIGNATURE_ENABLED', 'YOLO_FACE_ENABLED', 'YOLO_USE_GPU', mode='before')
+    @field_validator('YOLO_SIGNATURE_ENABLED', 'YOLO_FACE_ENABLED', 'YOLO_USE_GPU', 'YOLO_PREFILTER_ENABLED', mode='before')
     @classmethod
     def parse_bool(cls, value: Any) -> bool:
         """Parse boolean from various string formats (handles 'disable', 'enable', etc.)"""
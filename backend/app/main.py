@@ -303,7 +303,7 @@ async def shutdown_event():
         
         # Close async HTTP client from LLMClient
         from .api.routes import llm_client
-        if llm_client and hasattr(llm_client, '_http_client') and llm_client._http_client:
+        if llm_client:
             try:
                 await llm_client.close()
                 logger.info("✅ Async HTTP client closed")
@@ -316,6 +316,10 @@ async def shutdown_event():
             _cancellation_tokens.clear()
             logger.info("✅ Cancellation tokens cleared")
         
+        # Stop YOLO inference worker processes
+        from .services.yolo_inference_service import shutdown_yolo_inference_service
+        shutdown_yolo_inference_service()
+        
         # Cleanup Supabase connection pool
         from .core.supabase_client import reset_client
         reset_client()
@@ -0,0 +1,210 @@
+"""
+Persistent embedding cache keyed by a content hash of (model, text).
+
+Re-processing, re-versioning and re-indexing a document regenerate embeddings
+for chunk text that has not changed, and popular search queries are embedded
+again on every request. This cache sits in front of the embeddings API: an
+in-memory LRU answers hot lookups, and a local SQLite file keeps vectors across
+restarts and between worker processes on the same host.
+
+Vectors are stored as float32 blobs, the precision embedding models return.
+If the SQLite file cannot be opened the cache degrades to memory-only.
+
+The methods are blocking (SQLite I/O under a lock shared with other threads);
+async callers run them with asyncio.to_thread.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(text: str, model: str) -> str:
+    """Content hash for an embedding input (SHA-256 of model and text)."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """Thread-safe two-level (memory LRU + SQLite) embedding cache."""
+
+    def __init__(self, db_path: Optional[str], max_memory_entries: int = 2048):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                directory = os.path.dirname(db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " key TEXT PRIMARY KEY,"
+                    " model TEXT NOT NULL,"
+                    " dimensions INTEGER NOT NULL,"
+                    " vector BLOB NOT NULL,"
+                    " created_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+                logger.info(f"✅ Embedding cache store opened at {db_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache store unavailable ({db_path}): {e} - using memory only")
+                self._conn = None
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """Cached embedding for text under model, or None."""
+        return self.get_many([text], model)[0]
+
+    def get_many(self, texts: Sequence[str], model: str) -> List[Optional[List[float]]]:
+        """Cached embeddings for texts (None where missing), in input order."""
+        keys = [embedding_cache_key(text, model) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[index] = vector
+                else:
+                    missing.setdefault(key, []).append(index)
+
+            if missing and self._conn is not None:
+                found = self._select_locked(list(missing.keys()))
+                for key, vector in found.items():
+                    for index in missing.pop(key):
+                        results[index] = vector
+                        self.disk_hits += 1
+                    self._remember_locked(key, vector)
+
+            self.misses += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def _select_locked(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        try:
+            # Stay well under SQLite's bound-parameter limit
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = _unpack(blob)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding cache read failed: {e}")
+        return found
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+    def put(self, text: str, model: str, embedding: Sequence[float]):
+        """Store one embedding."""
+        self.put_many([text], model, [embedding])
+
+    def put_many(self, texts: Sequence[str], model: str, embeddings: Sequence[Optional[Sequence[float]]]):
+        """Store embeddings for texts; None entries (failed generations) are skipped."""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                if not embedding:
+                    continue
+                key = embedding_cache_key(text, model)
+                vector = list(embedding)
+                self._remember_locked(key, vector)
+                rows.append((key, model, len(vector), _pack(vector), now))
+
+            if rows and self._conn is not None:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, dimensions, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"⚠️ Embedding cache write failed: {e}")
+
+    def _remember_locked(self, key: str, vector: List[float]):
+        """Insert into the memory LRU, evicting the oldest entries (caller holds the lock)."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stored = 0
+            if self._conn is not None:
+                try:
+                    stored = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                except Exception:
+                    stored = -1
+            return {
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_memory_entries,
+                "stored_entries": stored,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+# ============================================================
+# SINGLETON CACHE
+# ============================================================
+_embedding_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache (None when disabled in config)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _cache_lock:
+            if _embedding_cache is None:
+                from ..core.config import settings
+                if not settings.EMBEDDING_CACHE_ENABLED:
+                    return None
+                _embedding_cache = EmbeddingCache(
+                    settings.EMBEDDING_CACHE_PATH or None,
+                    settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+                )
+    return _embedding_cache
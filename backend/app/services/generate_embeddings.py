@@ -1,9 +1,11 @@
+import asyncio
 import os
 import httpx
 import logging
 from typing import List, Optional, Dict, Any
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from .embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +85,14 @@ class GenerateEmbeddingsService:
             raise
 
     async def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using LiteLLM."""
+        """Generate embedding for text using LiteLLM (served from the embedding cache when possible)."""
+        model = "azure/text-embedding-ada-002"
+        cache = get_embedding_cache()
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, text, model)
+            if cached is not None:
+                return cached
+        
         async with httpx.AsyncClient() as client:
             headers = {
                 self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}",
@@ -91,7 +100,7 @@ class GenerateEmbeddingsService:
             }
             
             request_body = {
-                "model": "azure/text-embedding-ada-002",
+                "model": model,
                 "input": text
             }
             
@@ -108,4 +117,7 @@ class GenerateEmbeddingsService:
                 raise Exception(f"Failed to generate embeddings: {response.status_code}")
             
             embedding_data = response.json()
-            return embedding_data["data"][0]["embedding"]
+            embedding = embedding_data["data"][0]["embedding"]
+            if cache is not None:
+                await asyncio.to_thread(cache.put, text, model, embedding)
+            return embedding
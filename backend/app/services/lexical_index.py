@@ -0,0 +1,251 @@
+"""
+In-process BM25 inverted index for the lexical half of hybrid search.
+
+Dense embeddings rank exact identifiers (invoice numbers, NPWP, NIK, account
+numbers) poorly, and the old text fallback scanned documents without looking at
+the query at all. This module keeps a per-user inverted index over chunk text,
+which the structure-aware chunker renders from the extracted field values
+("Invoice Number: INV-2024-00981"):
+
+- tokens are lowercased alphanumeric runs; identifiers written with separators
+  (INV-2024-00981, 01.234.567.8-901.000) also index their compact form, so a
+  query matches with or without the punctuation;
+- postings are maintained incrementally as DatabaseService saves or deletes a
+  document's chunks, and the index is rebuilt when another worker changed them
+  (same lifecycle and `version` check as the vector index);
+- scoring is Okapi BM25, hits below a minimum score are dropped (a term found in
+  nearly every chunk scores ~0), and reciprocal_rank_fusion() merges the lexical
+  and vector rankings.
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Alphanumeric runs, optionally joined by identifier separators (-, ., /)
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-./][^\W_]+)*")
+_SEPARATOR_RE = re.compile(r"[-./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of text; separated identifiers also yield their compact form."""
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        parts = _SEPARATOR_RE.split(match.group())
+        tokens.extend(parts)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked key lists (best first) by RRF: score = sum of 1 / (k + rank)."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=itemgetter(1), reverse=True)
+
+
+@dataclass
+class LexicalHit:
+    """One search result: a chunk and its BM25 score for the query."""
+
+    document_id: str
+    chunk_index: int
+    chunk_text: str
+    score: float
+
+
+class UserLexicalIndex:
+    """BM25 inverted index over one user's chunks."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._unit_terms: Dict[int, Tuple[str, ...]] = {}
+        self._unit_length: Dict[int, int] = {}
+        self._unit_meta: Dict[int, Tuple[str, int, str]] = {}
+        self._doc_units: Dict[str, List[int]] = {}
+        self._total_length = 0
+        self._next_unit = 0
+        # Chunk-table version the index was built from, and when it was last compared
+        self.version: Optional[Hashable] = None
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._unit_meta)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def upsert_document(self, document_id: str, chunks: Iterable[Tuple[int, str]]):
+        """Replace all postings of document_id with chunks of (chunk_index, chunk_text)."""
+        with self._lock:
+            self._remove_locked(document_id)
+            units = []
+            for chunk_index, chunk_text in chunks:
+                if not chunk_text:
+                    continue
+                counts = Counter(tokenize(chunk_text))
+                if not counts:
+                    continue
+                unit = self._next_unit
+                self._next_unit += 1
+                for term, tf in counts.items():
+                    self._postings.setdefault(term, {})[unit] = tf
+                length = sum(counts.values())
+                self._unit_terms[unit] = tuple(counts)
+                self._unit_length[unit] = length
+                self._unit_meta[unit] = (document_id, chunk_index, chunk_text)
+                self._total_length += length
+                units.append(unit)
+            if units:
+                self._doc_units[document_id] = units
+
+    def remove_document(self, document_id: str):
+        with self._lock:
+            self._remove_locked(document_id)
+
+    def _remove_locked(self, document_id: str):
+        for unit in self._doc_units.pop(document_id, []):
+            for term in self._unit_terms.pop(unit):
+                postings = self._postings[term]
+                del postings[unit]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._unit_length.pop(unit)
+            del self._unit_meta[unit]
+
+    # -------------------------------------------------------------------------
+    # Search
+    # -------------------------------------------------------------------------
+    def search(self, query: str, limit: int, min_score: float = 0.0) -> List[LexicalHit]:
+        """Top-`limit` chunks by BM25 score, highest first (only chunks sharing a term, scoring >= min_score)."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_units = len(self._unit_meta)
+            if not terms or n_units == 0 or limit <= 0:
+                return []
+            avg_length = self._total_length / n_units
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1.0 + (n_units - df + 0.5) / (df + 0.5))
+                for unit, tf in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._unit_length[unit] / avg_length)
+                    scores[unit] = scores.get(unit, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+            hits = []
+            for unit, score in heapq.nlargest(limit, scores.items(), key=itemgetter(1)):
+                if score < min_score:
+                    break
+                document_id, chunk_index, chunk_text = self._unit_meta[unit]
+                hits.append(LexicalHit(document_id, chunk_index, chunk_text, score))
+            return hits
+
+
+class LexicalIndexRegistry:
+    """Process-wide LRU of per-user lexical indexes."""
+
+    def __init__(self, max_users: int = 64):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, UserLexicalIndex]" = OrderedDict()
+        self._doc_owner: Dict[str, str] = {}
+
+    def get(self, user_id: str) -> Optional[UserLexicalIndex]:
+        """Loaded index for user_id, or None if it has not been built (or was evicted)."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+            return index
+
+    def build(
+        self,
+        user_id: str,
+        rows: Iterable[Tuple[str, int, str]],
+        version: Optional[Hashable] = None
+    ) -> UserLexicalIndex:
+        """
+        Build and register a user's index from (document_id, chunk_index, chunk_text) rows.
+        
+        Blocking (reads rows, tokenizes every chunk); call it off the event loop.
+        """
+        by_document: Dict[str, List[Tuple[int, str]]] = {}
+        for document_id, chunk_index, chunk_text in rows:
+            by_document.setdefault(document_id, []).append((chunk_index, chunk_text))
+
+        index = UserLexicalIndex()
+        for document_id, chunks in by_document.items():
+            index.upsert_document(document_id, chunks)
+        index.version = version
+        index.checked_at = time.monotonic()
+
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            for document_id in by_document:
+                self._doc_owner[document_id] = user_id
+            while len(self._indexes) > self.max_users:
+                evicted_user, _ = self._indexes.popitem(last=False)
+                self._doc_owner = {doc: owner for doc, owner in self._doc_owner.items() if owner != evicted_user}
+        logger.info(f"📇 Built lexical index for user {user_id}: {len(index)} chunks from {len(by_document)} documents")
+        return index
+
+    def upsert_document(self, user_id: str, document_id: str, chunks: Iterable[Tuple[int, str]]):
+        """Replace a document's chunks in its owner's index (no-op if that index is not loaded)."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._doc_owner[document_id] = user_id
+        if index is not None:
+            index.upsert_document(document_id, chunks)
+
+    def remove_document(self, document_id: str):
+        with self._lock:
+            user_id = self._doc_owner.pop(document_id, None)
+            index = self._indexes.get(user_id) if user_id else None
+        if index is not None:
+            index.remove_document(document_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "max_users": self.max_users,
+                "chunks": sum(len(index) for index in self._indexes.values()),
+            }
+
+
+# ============================================================
+# SINGLETON REGISTRY
+# ============================================================
+_lexical_index_registry: Optional[LexicalIndexRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_lexical_index_registry() -> LexicalIndexRegistry:
+    """Get the process-wide lexical index registry, creating it on first use."""
+    global _lexical_index_registry
+    if _lexical_index_registry is None:
+        with _registry_lock:
+            if _lexical_index_registry is None:
+                from ..core.config import settings
+                _lexical_index_registry = LexicalIndexRegistry(settings.LEXICAL_INDEX_MAX_USERS)
+    return _lexical_index_registry
@@ -0,0 +1,239 @@
+"""
+Opt-in disk cache of LLM responses keyed by the request content.
+
+Retries through /analyze-document and re-runs in process_pending_documents
+send byte-identical prompts and page images to the LLM again. With
+LLM_RESPONSE_CACHE_ENABLED the processed response of a successful call is
+stored in a local SQLite file under a hash of (model, task, prompt, document
+name, content type, response format, input content hash); an identical request
+is answered from disk without a provider call. Only complete responses that
+parsed cleanly are stored, so a truncated or repaired answer is retried rather
+than replayed. (backend-bulk has its own LLM client and does not use this cache.)
+
+Entries expire after the TTL; when the stored bytes exceed the size budget the
+least recently used entries are evicted. If the SQLite file cannot be opened
+the cache is disabled.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+from .page_image import PageImage, image_to_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def _input_digest(image_data: Optional[Union[str, PageImage]], content_type: str) -> str:
+    """Content hash of the page input (decoded image bytes, or the extracted text)."""
+    if image_data is None:
+        return ""
+    if content_type == "text" and isinstance(image_data, str):
+        payload = image_data.encode("utf-8")
+    else:
+        try:
+            payload = image_to_bytes(image_data)
+        except Exception:
+            payload = image_data.encode("utf-8") if isinstance(image_data, str) else b""
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def llm_response_cache_key(
+    model: str,
+    task: str,
+    prompt: str,
+    image_data: Optional[Union[str, PageImage]],
+    response_format: Optional[Dict[str, Any]],
+    document_name: Optional[str] = None,
+    content_type: str = "image",
+) -> str:
+    """Content hash for an LLM request (SHA-256 over its parts, with the page input hashed separately)."""
+    digest = hashlib.sha256()
+    for part in (
+        model,
+        task,
+        document_name or "",
+        content_type,
+        json.dumps(response_format or {}, sort_keys=True, default=str),
+        prompt,
+        _input_digest(image_data, content_type),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Thread-safe SQLite store of processed LLM responses with TTL and a byte budget."""
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_bytes: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " task TEXT NOT NULL,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses (accessed_at)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+            logger.info(f"✅ LLM response cache opened at {db_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ LLM response cache unavailable ({db_path}): {e} - responses will not be cached")
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response for key, or None (missing or expired)."""
+        if self._conn is None:
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response, size, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                response, size, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._total_bytes -= size
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+            except Exception as e:
+                logger.warning(f"⚠️ LLM response cache read failed: {e}")
+                return None
+        return json.loads(response)
+
+    def put(self, key: str, model: str, task: str, response: Dict[str, Any]):
+        """Store a processed response (skipped if it is not JSON-serializable or larger than the budget)."""
+        if self._conn is None:
+            return
+        try:
+            payload = json.dumps(response)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"🔍 Not caching LLM response for {task}: {e}")
+            return
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                previous = self._conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, model, task, response, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, task, payload, size, now, now),
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict_locked(now)
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ LLM response cache write failed: {e}")
+
+    def _evict_locked(self, now: float):
+        """Drop expired entries, then least recently used ones, until under budget (caller holds the lock)."""
+        # Other worker processes may share the file; start from the stored total
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        cutoff = now - self.ttl_seconds
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses WHERE created_at < ?", (cutoff,)
+        ).fetchone()
+        if count:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (cutoff,))
+            self._total_bytes -= size
+            self.expired += count
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stored = 0
+            if self._conn is not None:
+                try:
+                    stored = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+                except Exception:
+                    stored = -1
+            return {
+                "stored_entries": stored,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+# ============================================================
+# SINGLETON CACHE
+# ============================================================
+_llm_response_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """Get the process-wide LLM response cache (None unless enabled in config)."""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        with _cache_lock:
+            if _llm_response_cache is None:
+                from ..core.config import settings
+                if not settings.LLM_RESPONSE_CACHE_ENABLED:
+                    return None
+                _llm_response_cache = LLMResponseCache(
+                    settings.LLM_RESPONSE_CACHE_PATH,
+                    settings.LLM_RESPONSE_CACHE_TTL_HOURS * 3600,
+                    settings.LLM_RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _llm_response_cache
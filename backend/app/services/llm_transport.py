@@ -0,0 +1,542 @@
+"""
+Shared async transport for LLM chat-completion calls.
+
+LLMClient used to keep an httpx.AsyncClient for async callers and a
+requests.Session per worker thread for sync callers, each with its own fixed
+retry loop and no idea of the provider's limits. With 100 LLM threads a 429
+made every thread back off for the same 1s/2s/4s and then hit the provider
+again together. All calls now go through one LLMTransport:
+
+- one httpx.AsyncClient, running on a dedicated event-loop thread; async
+  callers await it from their own loop and sync callers block on it, so both
+  paths share the connection pool and the limiters below;
+- per model, token buckets for requests/min and tokens/min (token cost is
+  estimated before the call and reconciled with the reported usage);
+- per model, an AIMD concurrency limit: +1/limit per success, halved (once
+  per window) on 429 / 5xx or timeouts (slow successes are not overload:
+  long extractions are legitimately slow);
+- full-jitter exponential backoff for 429 / 5xx / network errors, honoring
+  Retry-After, which also pauses new requests for that model.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# send(client) -> (status, parsed response on 200 / error text otherwise, Retry-After seconds)
+SendFn = Callable[[httpx.AsyncClient], Awaitable[Tuple[int, Any, Optional[float]]]]
+
+NETWORK_ERRORS = (
+    httpx.ReadTimeout, httpx.ConnectTimeout, httpx.WriteTimeout, httpx.PoolTimeout,
+    httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError,
+)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff (uniform in [0, min(cap, base * 2**attempt)]), at least retry_after."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(request_body: Dict[str, Any], output_estimate: int, image_estimate: int) -> int:
+    """Rough token cost of a chat-completion request (~4 characters per text token, fixed cost per image)."""
+    characters = 0
+    images = 0
+    for message in request_body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            characters += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                characters += len(part.get("text", ""))
+    max_tokens = request_body.get("max_tokens") or output_estimate
+    return characters // 4 + images * image_estimate + min(max_tokens, output_estimate)
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; acquire() waits until the amount is available."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """Take amount (capped at capacity) from the bucket; returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+            delay = (amount - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) delta after the fact; the balance may go into debt."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveConcurrencyLimit:
+    """AIMD limit on in-flight requests."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        """Wait for a free slot."""
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self, started: float, overloaded: bool, succeeded: bool):
+        """Free a slot and adapt the limit from the outcome of a request sent at started."""
+        now = time.monotonic()
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                # Requests already in flight when we backed off report the same overload; count it once
+                if started >= self._last_decrease:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            elif succeeded:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+@dataclass
+class ModelLimits:
+    rpm: int = 0
+    tpm: int = 0
+
+
+class ModelLimiter:
+    """Rate and concurrency limits for one model (lives on the transport loop)."""
+
+    def __init__(self, model: str, limits: ModelLimits, concurrency: AdaptiveConcurrencyLimit):
+        self.model = model
+        self.requests = TokenBucket(limits.rpm) if limits.rpm > 0 else None
+        self.tokens = TokenBucket(limits.tpm) if limits.tpm > 0 else None
+        self.concurrency = concurrency
+        self.paused_until = 0.0
+        # Metrics
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        waited_from = time.monotonic()
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            await asyncio.sleep(pause)
+        await self.concurrency.acquire()
+        try:
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(estimated_tokens)
+        except BaseException:
+            await self.concurrency.release(time.monotonic(), overloaded=False, succeeded=False)
+            raise
+        started = time.monotonic()
+        self.calls += 1
+        self.wait_seconds += started - waited_from
+        return started
+
+    async def release(
+        self, started: float, status: Optional[int], estimated_tokens: int, used_tokens: Optional[int], timed_out: bool = False
+    ):
+        if self.tokens and used_tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+        if status == 429:
+            self.throttled += 1
+        overloaded = status in RETRYABLE_STATUS or timed_out
+        await self.concurrency.release(started, overloaded=overloaded, succeeded=status == 200)
+
+    def pause(self, seconds: float):
+        """Hold back new requests for this model (provider asked us to wait)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "wait_seconds": round(self.wait_seconds, 2),
+        }
+
+
+class Permit:
+    """Outcome of a limited call made outside the transport (e.g. a provider SDK)."""
+
+    def __init__(self, limiter: ModelLimiter, started: float, estimated_tokens: int):
+        self.limiter = limiter
+        self.started = started
+        self.estimated_tokens = estimated_tokens
+        self.status: Optional[int] = None
+        self.used_tokens: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+
+class LLMTransport:
+    """Process-wide LLM HTTP transport; safe to call from any thread or event loop."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._default_limits = ModelLimits(rpm=settings.LLM_RATE_LIMIT_RPM, tpm=settings.LLM_RATE_LIMIT_TPM)
+        self._model_limits: Dict[str, ModelLimits] = {}
+        if settings.LLM_MODEL_RATE_LIMITS:
+            try:
+                for model, limits in json.loads(settings.LLM_MODEL_RATE_LIMITS).items():
+                    self._model_limits[model] = ModelLimits(rpm=int(limits.get("rpm", 0)), tpm=int(limits.get("tpm", 0)))
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"⚠️ Ignoring invalid LLM_MODEL_RATE_LIMITS: {e}")
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Event loop bridge
+    # -------------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+
+                    def _run():
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(ready.set)
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=_run, name="llm-transport", daemon=True)
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+                    logger.debug("🌐 Started LLM transport event loop")
+        return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run_sync(self, coro):
+        """Run a transport coroutine from synchronous code (blocks the calling thread)."""
+        return self._submit(coro).result()
+
+    async def run_async(self, coro):
+        """Run a transport coroutine from another event loop."""
+        return await asyncio.wrap_future(self._submit(coro))
+
+    # -------------------------------------------------------------------------
+    # Limits (transport loop only)
+    # -------------------------------------------------------------------------
+    def _limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            concurrency = AdaptiveConcurrencyLimit(
+                initial=self.settings.LLM_INITIAL_CONCURRENCY,
+                minimum=self.settings.LLM_MIN_CONCURRENCY,
+                maximum=self.settings.LLM_MAX_CONCURRENCY,
+            )
+            limiter = ModelLimiter(model, self._model_limits.get(model, self._default_limits), concurrency)
+            self._limiters[model] = limiter
+        return limiter
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_S,
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.settings.LLM_MAX_CONCURRENCY,
+                    max_connections=self.settings.LLM_MAX_CONCURRENCY,
+                    keepalive_expiry=30.0,
+                ),
+            )
+            logger.debug("🌐 Created LLM transport HTTP client")
+        return self._client
+
+    # -------------------------------------------------------------------------
+    # Chat completions
+    # -------------------------------------------------------------------------
+    async def _request(self, url: str, request_body: Dict[str, Any], max_retries: Optional[int], send: SendFn) -> Dict[str, Any]:
+        """Run send(client) under the model's limits, retrying 429 / 5xx / network errors with backoff."""
+        settings = self.settings
+        model = request_body.get("model", "default")
+        limiter = self._limiter(model)
+        attempts = max(1, settings.LLM_MAX_RETRIES if max_retries is None else max_retries)
+        estimated = estimate_request_tokens(request_body, settings.LLM_OUTPUT_TOKEN_ESTIMATE, settings.LLM_IMAGE_TOKEN_ESTIMATE)
+        client = self._get_client()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(attempts):
+            if attempt:
+                limiter.retries += 1
+            started = await limiter.acquire(estimated)
+            status: Optional[int] = None
+            used_tokens: Optional[int] = None
+            retry_after: Optional[float] = None
+            timed_out = False
+            try:
+                status, payload, retry_after = await send(client)
+                if status == 200:
+                    used_tokens = (payload.get("usage") or {}).get("total_tokens")
+                    logger.debug(f"✅ LLM call ok ({model}, attempt {attempt + 1}/{attempts}) in {time.monotonic() - started:.2f}s")
+                    return payload
+                last_error = Exception(f"LLM API Error: {status} - {payload}")
+                if status not in RETRYABLE_STATUS:
+                    logger.error(f"❌ API call failed with status {status}: {payload}")
+                    raise last_error
+            except NETWORK_ERRORS as e:
+                last_error = e
+                timed_out = isinstance(e, httpx.TimeoutException)
+            finally:
+                await limiter.release(started, status, estimated, used_tokens, timed_out)
+
+            if attempt == attempts - 1:
+                break
+            delay = backoff_delay(attempt, settings.LLM_BACKOFF_BASE_S, settings.LLM_BACKOFF_MAX_S, retry_after)
+            if status == 429:
+                limiter.pause(retry_after if retry_after is not None else delay)
+            logger.warning(
+                f"⚠️ LLM call failed ({model}, attempt {attempt + 1}/{attempts}): "
+                f"{status or type(last_error).__name__} - retrying in {delay:.1f}s (limit {limiter.concurrency.limit:.1f})"
+            )
+            await asyncio.sleep(delay)
+
+        logger.error(f"❌ All {attempts} attempts failed for {url}: {last_error}")
+        raise last_error or Exception(f"All retries failed for endpoint: {url}")
+
+    async def _post_json(self, url: str, request_body: Dict[str, Any], headers: Dict[str, str], max_retries: Optional[int]) -> Dict[str, Any]:
+        async def send(client: httpx.AsyncClient):
+            response = await client.post(url, json=request_body, headers=headers)
+            if response.status_code == 200:
+                return 200, response.json(), None
+            return response.status_code, response.text, parse_retry_after(response.headers.get("retry-after"))
+
+        return await self._request(url, request_body, max_retries, send)
+
+    async def post_json(self, url: str, request_body: Dict[str, Any], headers: Dict[str, str], max_retries: Optional[int] = None) -> Dict[str, Any]:
+        """POST a chat-completion request with rate limiting and retries (from any event loop)."""
+        return await self.run_async(self._post_json(url, request_body, headers, max_retries))
+
+    def post_json_sync(self, url: str, request_body: Dict[str, Any], headers: Dict[str, str], max_retries: Optional[int] = None) -> Dict[str, Any]:
+        """Blocking post_json for worker threads."""
+        return self.run_sync(self._post_json(url, request_body, headers, max_retries))
+
+    # -------------------------------------------------------------------------
+    # Streamed chat completions (SSE)
+    # -------------------------------------------------------------------------
+    async def _stream_chat(
+        self,
+        url: str,
+        request_body: Dict[str, Any],
+        headers: Dict[str, str],
+        on_delta: Callable[[str], None],
+        on_restart: Optional[Callable[[], None]],
+        max_retries: Optional[int],
+    ) -> Dict[str, Any]:
+        body = dict(request_body, stream=True, stream_options={"include_usage": True})
+
+        async def send(client: httpx.AsyncClient):
+            if on_restart is not None:
+                on_restart()
+            async with client.stream("POST", url, json=body, headers=headers) as response:
+                if response.status_code != 200:
+                    text = (await response.aread()).decode("utf-8", errors="replace")
+                    return response.status_code, text, parse_retry_after(response.headers.get("retry-after"))
+                return 200, await self._read_sse(response, on_delta), None
+
+        return await self._request(url, request_body, max_retries, send)
+
+    @staticmethod
+    async def _read_sse(response: httpx.Response, on_delta: Callable[[str], None]) -> Dict[str, Any]:
+        """Consume a chat-completion SSE stream into the non-streamed response shape."""
+        parts: List[str] = []
+        finish_reason: Optional[str] = None
+        usage: Dict[str, Any] = {}
+        model: Optional[str] = None
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            model = event.get("model") or model
+            usage = event.get("usage") or usage
+            for choice in event.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+                finish_reason = choice.get("finish_reason") or finish_reason
+        return {
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}, "finish_reason": finish_reason}],
+            "usage": usage,
+        }
+
+    async def stream_chat(
+        self,
+        url: str,
+        request_body: Dict[str, Any],
+        headers: Dict[str, str],
+        on_delta: Callable[[str], None],
+        on_restart: Optional[Callable[[], None]] = None,
+        max_retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a chat completion, passing each content delta to on_delta as it arrives.
+
+        on_delta (and on_restart, called before every attempt) run on the transport
+        thread and must not block. Returns the assembled response in the
+        non-streamed shape, so process_api_result and friends accept it.
+        """
+        return await self.run_async(self._stream_chat(url, request_body, headers, on_delta, on_restart, max_retries))
+
+    def stream_chat_sync(
+        self,
+        url: str,
+        request_body: Dict[str, Any],
+        headers: Dict[str, str],
+        on_delta: Callable[[str], None],
+        on_restart: Optional[Callable[[], None]] = None,
+        max_retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Blocking stream_chat for worker threads."""
+        return self.run_sync(self._stream_chat(url, request_body, headers, on_delta, on_restart, max_retries))
+
+    # -------------------------------------------------------------------------
+    # Calls made outside the transport (provider SDKs)
+    # -------------------------------------------------------------------------
+    async def _acquire_permit(self, model: str, estimated_tokens: int) -> Permit:
+        limiter = self._limiter(model)
+        started = await limiter.acquire(estimated_tokens)
+        return Permit(limiter, started, estimated_tokens)
+
+    async def _release_permit(self, permit: Permit):
+        await permit.limiter.release(permit.started, permit.status, permit.estimated_tokens, permit.used_tokens)
+        if permit.status == 429 and permit.retry_after:
+            permit.limiter.pause(permit.retry_after)
+
+    @contextmanager
+    def limited_sync(self, model: str, estimated_tokens: int) -> Iterator[Permit]:
+        """
+        Hold a rate/concurrency permit for model around a blocking call.
+
+        The caller sets permit.status (200 on success, 429 when throttled) and
+        optionally permit.used_tokens / permit.retry_after before leaving the block.
+        """
+        permit = self.run_sync(self._acquire_permit(model, estimated_tokens))
+        try:
+            yield permit
+        finally:
+            self.run_sync(self._release_permit(permit))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        return backoff_delay(attempt, self.settings.LLM_BACKOFF_BASE_S, self.settings.LLM_BACKOFF_MAX_S, retry_after)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+    async def _warm_up(self):
+        self._get_client()
+
+    def warm_up(self):
+        """Start the transport loop and HTTP client ahead of the first call."""
+        self.run_sync(self._warm_up())
+
+    async def _aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def aclose(self):
+        """Close the pooled HTTP client (it is recreated on next use)."""
+        if self._loop is not None:
+            await self.run_async(self._aclose())
+            logger.debug("🔌 Closed LLM transport HTTP client")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        if self._loop is None:
+            return {}
+
+        async def _collect():
+            return {model: limiter.stats() for model, limiter in self._limiters.items()}
+
+        return self.run_sync(_collect())
+
+
+# ============================================================
+# SINGLETON TRANSPORT
+# ============================================================
+_llm_transport: Optional[LLMTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_llm_transport() -> LLMTransport:
+    """Get the process-wide LLM transport, creating it on first use."""
+    global _llm_transport
+    if _llm_transport is None:
+        with _transport_lock:
+            if _llm_transport is None:
+                from ..core.config import settings
+                _llm_transport = LLMTransport(settings)
+    return _llm_transport
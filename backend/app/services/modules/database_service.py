@@ -4,7 +4,7 @@ Handles all database operations for document analysis
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 import os
 from datetime import datetime, timezone
 import uuid
@@ -12,9 +12,15 @@ import asyncio
 
 # Use the singleton Supabase client for connection pooling
 from app.core.supabase_client import get_supabase_client, SUPABASE_AVAILABLE
+from ..vector_index import get_vector_index_registry
+from ..lexical_index import get_lexical_index_registry
+from .embedding_service import EmbeddingService
 
 logger = logging.getLogger(__name__)
 
+# Async batch embedder: texts -> embeddings (None for failures), in input order
+EmbedFn = Callable[[List[str]], Awaitable[List[Optional[List[float]]]]]
+
 class DatabaseService:
     """Service for database operations - uses shared connection pool"""
     
@@ -29,14 +35,25 @@ class DatabaseService:
     async def save_document_chunks(
         self,
         document_id: str,
-        chunks_data: List[Dict[str, Any]]
+        chunks_data: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        embed_fn: Optional[EmbedFn] = None
     ) -> bool:
         """
-        Save document chunks with embeddings to database.
+        Save document chunks with embeddings to database, re-indexing incrementally.
+        
+        The new chunks are diffed against the stored ones by content hash: unchanged
+        chunks are kept (only their chunk_index is moved if needed), and only new or
+        edited chunks are embedded and inserted, all applied in one
+        apply_document_chunk_diff call. If that function is not available the chunks
+        are replaced wholesale as before.
         
         Args:
             document_id: The document ID to associate chunks with
-            chunks_data: List of dicts with keys: 'chunk', 'embedding', optionally 'token_count'
+            chunks_data: List of dicts with keys: 'chunk', optionally 'embedding', 'chunk_id', 'token_count'
+            user_id: Owner of the document; keeps their in-process search indexes current
+            embed_fn: Async batch embedder for chunks without an 'embedding'
+                      (e.g. EmbeddingService.batch_generate_embeddings)
             
         Returns:
             True if successful, False otherwise
@@ -50,42 +67,82 @@ class DatabaseService:
                 logger.warning("No chunks provided to save")
                 return False
             
-            # First, delete any existing chunks for this document
-            await self.delete_document_chunks(document_id)
-            
-            # Prepare chunk records for insertion
-            chunk_records = []
+            # Hash the new chunks (chunk_id from EmbeddingService is already the content hash)
+            new_chunks = []
             for idx, chunk_data in enumerate(chunks_data):
                 chunk_text = chunk_data.get('chunk', '')
-                chunk_embedding = chunk_data.get('embedding', None)
-                token_count = chunk_data.get('token_count', len(chunk_text) // 4)  # Rough estimate
-                
-                if not chunk_text or not chunk_embedding:
-                    logger.warning(f"Skipping chunk {idx} - missing text or embedding")
+                if not chunk_text:
+                    logger.warning(f"Skipping chunk {idx} - missing text")
                     continue
-                
-                chunk_records.append({
-                    "document_id": document_id,
-                    "chunk_index": idx,
+                new_chunks.append({
+                    "chunk_index": len(new_chunks),
                     "chunk_text": chunk_text,
-                    "chunk_embedding": chunk_embedding,
-                    "token_count": token_count
+                    "chunk_hash": chunk_data.get('chunk_id') or EmbeddingService.chunk_id(chunk_text),
+                    "chunk_embedding": chunk_data.get('embedding'),
+                    "token_count": chunk_data.get('token_count', len(chunk_text) // 4)  # Rough estimate
                 })
             
-            if not chunk_records:
+            if not new_chunks:
                 logger.warning("No valid chunks to save")
                 return False
             
-            # Insert all chunks in batch
-            logger.info(f"💾 Saving {len(chunk_records)} chunks for document {document_id}")
-            chunk_response = self.supabase.table("document_chunks").insert(chunk_records).execute()
+            stored_chunks = self._fetch_stored_chunk_hashes(document_id)
+            if stored_chunks is None:
+                # chunk_hash column not migrated yet
+                return await self._replace_document_chunks(document_id, new_chunks, user_id, embed_fn)
+            
+            # Match new chunks to stored rows by hash (as a multiset: repeated text keeps one row each)
+            stored_by_hash: Dict[str, List[Dict[str, Any]]] = {}
+            for row in stored_chunks:
+                stored_by_hash.setdefault(row["chunk_hash"], []).append(row)
+            
+            to_insert, to_reindex = [], []
+            for chunk in new_chunks:
+                matches = stored_by_hash.get(chunk["chunk_hash"])
+                if matches:
+                    row = matches.pop(0)
+                    if row["chunk_index"] != chunk["chunk_index"] or row["hash_missing"]:
+                        to_reindex.append({"id": row["id"], "chunk_index": chunk["chunk_index"], "chunk_hash": chunk["chunk_hash"]})
+                else:
+                    to_insert.append(chunk)
+            to_delete = [row["id"] for rows in stored_by_hash.values() for row in rows]
             
-            if chunk_response.data:
-                logger.info(f"✅ Saved {len(chunk_response.data)} chunks successfully")
+            if not (to_insert or to_reindex or to_delete):
+                logger.info(f"♻️ Chunks unchanged for document {document_id} ({len(new_chunks)} chunks), nothing to re-index")
                 return True
-            else:
-                logger.error("Failed to save chunks - no response data")
-                return False
+            
+            # Embed only the new/edited chunks; ones the embedder failed on are not stored
+            unchanged = len(new_chunks) - len(to_insert) - len(to_reindex)
+            embedded = await self._embed_missing_chunks(to_insert, embed_fn)
+            skipped = {id(chunk) for chunk in to_insert} - {id(chunk) for chunk in embedded}
+            to_insert = embedded
+            
+            logger.info(
+                f"💾 Re-indexing document {document_id}: {len(to_insert)} new, "
+                f"{len(to_delete)} removed, {len(to_reindex)} moved, {unchanged} unchanged"
+                + (f", {len(skipped)} skipped (no embedding)" if skipped else "")
+            )
+            try:
+                self.supabase.rpc('apply_document_chunk_diff', {
+                    'p_document_id': document_id,
+                    'p_delete_ids': to_delete,
+                    'p_reindex': to_reindex,
+                    'p_insert': to_insert,
+                }).execute()
+            except Exception as rpc_error:
+                logger.warning(f"⚠️ apply_document_chunk_diff unavailable ({rpc_error}), replacing all chunks")
+                return await self._replace_document_chunks(document_id, new_chunks, user_id, embed_fn)
+            
+            logger.info(f"✅ Re-indexed chunks for document {document_id}")
+            if user_id:
+                # Unchanged chunks carry no embedding; the vector index reuses the vector it already holds.
+                # Skipped chunks were not stored, so they stay out of both indexes.
+                self._update_search_indexes(
+                    user_id,
+                    document_id,
+                    [(c["chunk_index"], c["chunk_text"], c["chunk_embedding"]) for c in new_chunks if id(c) not in skipped],
+                )
+            return True
                 
         except Exception as e:
             logger.error(f"Error saving document chunks: {e}")
@@ -93,6 +150,120 @@ class DatabaseService:
             logger.error(f"Traceback: {traceback.format_exc()}")
             return False
     
+    def _fetch_stored_chunk_hashes(self, document_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Stored chunks of a document as {id, chunk_index, chunk_hash, hash_missing}.
+        
+        Rows written before chunk_hash existed are hashed from their text (and flagged
+        so the diff backfills the column). Returns None if the column does not exist.
+        """
+        page_size = 1000
+        rows: List[Dict[str, Any]] = []
+        try:
+            offset = 0
+            while True:
+                response = self.supabase.table("document_chunks").select(
+                    "id, chunk_index, chunk_hash"
+                ).eq("document_id", document_id).range(offset, offset + page_size - 1).execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read stored chunk hashes for {document_id}: {e}")
+            return None
+        
+        legacy_ids = [row["id"] for row in rows if not row.get("chunk_hash")]
+        legacy_text: Dict[str, str] = {}
+        for offset in range(0, len(legacy_ids), page_size):
+            response = self.supabase.table("document_chunks").select(
+                "id, chunk_text"
+            ).in_("id", legacy_ids[offset:offset + page_size]).execute()
+            for row in response.data or []:
+                legacy_text[row["id"]] = row.get("chunk_text") or ""
+        
+        return [
+            {
+                "id": row["id"],
+                "chunk_index": row.get("chunk_index"),
+                "chunk_hash": row.get("chunk_hash") or EmbeddingService.chunk_id(legacy_text.get(row["id"], "")),
+                "hash_missing": not row.get("chunk_hash"),
+            }
+            for row in rows
+        ]
+    
+    async def _embed_missing_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        embed_fn: Optional[EmbedFn]
+    ) -> List[Dict[str, Any]]:
+        """Fill chunk_embedding for chunks that lack one; chunks that still have none are dropped."""
+        missing = [chunk for chunk in chunks if not chunk["chunk_embedding"]]
+        if missing and embed_fn:
+            logger.info(f"🔍 Embedding {len(missing)} new/changed chunks")
+            embeddings = await embed_fn([chunk["chunk_text"] for chunk in missing])
+            for chunk, embedding in zip(missing, embeddings):
+                chunk["chunk_embedding"] = embedding
+        
+        embedded = [chunk for chunk in chunks if chunk["chunk_embedding"]]
+        if len(embedded) < len(chunks):
+            logger.warning(f"Skipping {len(chunks) - len(embedded)} chunks - missing embedding")
+        return embedded
+    
+    async def _replace_document_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict[str, Any]],
+        user_id: Optional[str],
+        embed_fn: Optional[EmbedFn]
+    ) -> bool:
+        """Delete all chunks of a document and insert chunks (pre-migration path)."""
+        # Unchanged chunk text is served from the embedding cache
+        chunks = await self._embed_missing_chunks(chunks, embed_fn)
+        if not chunks:
+            logger.warning("No valid chunks to save")
+            return False
+        
+        # First, delete any existing chunks for this document
+        await self.delete_document_chunks(document_id)
+        
+        chunk_records = [
+            {
+                "document_id": document_id,
+                "chunk_index": chunk["chunk_index"],
+                "chunk_text": chunk["chunk_text"],
+                "chunk_embedding": chunk["chunk_embedding"],
+                "token_count": chunk["token_count"]
+            }
+            for chunk in chunks
+        ]
+        
+        # Insert all chunks in batch
+        logger.info(f"💾 Saving {len(chunk_records)} chunks for document {document_id}")
+        chunk_response = self.supabase.table("document_chunks").insert(chunk_records).execute()
+        
+        if chunk_response.data:
+            logger.info(f"✅ Saved {len(chunk_response.data)} chunks successfully")
+            if user_id:
+                self._update_search_indexes(
+                    user_id,
+                    document_id,
+                    [(r["chunk_index"], r["chunk_text"], r["chunk_embedding"]) for r in chunk_records],
+                )
+            return True
+        else:
+            logger.error("Failed to save chunks - no response data")
+            return False
+    
+    @staticmethod
+    def _update_search_indexes(user_id: str, document_id: str, chunks: List[Tuple[int, str, Optional[List[float]]]]):
+        """Keep the owner's in-process vector and lexical indexes current with a document's chunks."""
+        get_vector_index_registry().upsert_document(user_id, document_id, chunks)
+        get_lexical_index_registry().upsert_document(
+            user_id, document_id, [(chunk_index, chunk_text) for chunk_index, chunk_text, _ in chunks]
+        )
+    
     async def delete_document_chunks(self, document_id: str) -> bool:
         """
         Delete all chunks for a document.
@@ -109,6 +280,8 @@ class DatabaseService:
         try:
             logger.info(f"🗑️ Deleting existing chunks for document {document_id}")
             delete_response = self.supabase.table("document_chunks").delete().eq("document_id", document_id).execute()
+            get_vector_index_registry().remove_document(document_id)
+            get_lexical_index_registry().remove_document(document_id)
             logger.info(f"✅ Deleted old chunks for document {document_id}")
             return True
         except Exception as e:
@@ -146,7 +319,8 @@ class DatabaseService:
         user_id: str,
         document_name: Optional[str] = None,
         chunks_data: Optional[List[Dict[str, Any]]] = None,
-        skip_workflow_trigger: bool = False
+        skip_workflow_trigger: bool = False,
+        embed_fn: Optional[EmbedFn] = None
     ) -> Optional[Dict[str, Any]]:
         """Save document analysis result to database"""
         if not self.supabase:
@@ -413,7 +587,7 @@ class DatabaseService:
             # Save document chunks if provided
             if chunks_data:
                 logger.info(f"💾 Saving {len(chunks_data)} chunks for document {document_id}")
-                chunks_saved = await self.save_document_chunks(document_id, chunks_data)
+                chunks_saved = await self.save_document_chunks(document_id, chunks_data, user_id, embed_fn)
                 if chunks_saved:
                     logger.info(f"✅ Document chunks saved successfully")
                 else:
@@ -499,7 +673,8 @@ class DatabaseService:
         document_id: str,
         result: Dict[str, Any],
         user_id: str,
-        chunks_data: Optional[List[Dict[str, Any]]] = None
+        chunks_data: Optional[List[Dict[str, Any]]] = None,
+        embed_fn: Optional[EmbedFn] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Update existing document in database (for manual save with edited data)
@@ -617,7 +792,7 @@ class DatabaseService:
             # Update document chunks if provided
             if chunks_data:
                 logger.info(f"💾 Updating {len(chunks_data)} chunks for document {document_id}")
-                chunks_saved = await self.save_document_chunks(document_id, chunks_data)
+                chunks_saved = await self.save_document_chunks(document_id, chunks_data, user_id, embed_fn)
                 if chunks_saved:
                     logger.info(f"✅ Document chunks updated successfully")
                 else:
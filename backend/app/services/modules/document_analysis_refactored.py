@@ -117,32 +117,15 @@ class DocumentAnalysisService:
                     # Generate vector embeddings for auto-save
                     if task not in tasks_skip_embeddings:
                         try:
-                            logger.info("🔍 AUTO-SAVE: Generating vector embeddings for semantic search...")
+                            logger.info("🔍 AUTO-SAVE: Preparing chunks for semantic search...")
                             
-                            # Convert analysis result to text first
-                            text = self.embedding_service.convert_analysis_result_to_text(processed_result)
-                            text_length = len(text)
-                            
-                            # Decide whether to use chunking based on text length
-                            # Use chunking if text is longer than 3000 characters (roughly 750 tokens)
-                            if text_length > 3000:
-                                logger.info(f"📊 Text is large ({text_length} chars), using chunked embeddings...")
-                                chunks_data = await self.embedding_service.generate_embeddings_for_chunks(
-                                    text, chunk_size=1500, overlap=200
-                                )
-                                if chunks_data:
-                                    logger.info(f"✅ Generated {len(chunks_data)} chunk embeddings")
-                                else:
-                                    logger.warning("⚠️ Failed to generate chunk embeddings")
+                            # Structure-aware chunks: whole sections/fields/table rows packed to a token budget.
+                            # Embeddings are generated on save, only for chunks not already stored.
+                            chunks_data = self.embedding_service.chunk_analysis_result(processed_result)
+                            if chunks_data:
+                                logger.info(f"✅ Prepared {len(chunks_data)} chunks")
                             else:
-                                logger.info(f"📊 Text is small ({text_length} chars), using single embedding...")
-                                # For small documents, create a single chunk
-                                embedding = await self.embedding_service.generate_embedding(text)
-                                if embedding:
-                                    chunks_data = [{"chunk": text, "embedding": embedding}]
-                                    logger.info(f"✅ Generated single embedding with {len(embedding)} dimensions")
-                                else:
-                                    logger.warning("⚠️ Failed to generate vector embedding")
+                                logger.warning("⚠️ No chunks produced for vector embeddings")
                         except Exception as e:
                             logger.error(f"❌ Error generating vector embedding: {e}")
                             chunks_data = None
@@ -155,7 +138,8 @@ class DocumentAnalysisService:
                             document_id=document_id,
                             result=processed_result,
                             user_id=user_id,
-                            chunks_data=chunks_data
+                            chunks_data=chunks_data,
+                            embed_fn=self.embedding_service.batch_generate_embeddings
                         )
                         if auto_saved_document:
                             logger.info(f"✅ AUTO-SAVE: Document {document_id} updated successfully")
@@ -166,7 +150,8 @@ class DocumentAnalysisService:
                         auto_saved_document = await self.database_service.save_document_to_database(
                             document_data, processed_result, task, user_id, document_name, 
                             chunks_data=chunks_data,  # All embeddings go to document_chunks table
-                            skip_workflow_trigger=skip_workflow_trigger
+                            skip_workflow_trigger=skip_workflow_trigger,
+                            embed_fn=self.embedding_service.batch_generate_embeddings
                         )
                         if auto_saved_document:
                             logger.info(f"✅ AUTO-SAVE: Document saved with ID: {auto_saved_document.get('id')}")
@@ -187,30 +172,12 @@ class DocumentAnalysisService:
                     # Regenerate embeddings in case user edited the data
                     logger.info("🔍 MANUAL SAVE: Regenerating vector embeddings for edited data...")
                     
-                    # Convert analysis result to text
-                    text = self.embedding_service.convert_analysis_result_to_text(processed_result)
-                    text_length = len(text)
-                    
-                    # Regenerate chunks
-                    manual_chunks_data = None
-                    if text_length > 3000:
-                        logger.info(f"📊 Text is large ({text_length} chars), regenerating chunked embeddings...")
-                        manual_chunks_data = await self.embedding_service.generate_embeddings_for_chunks(
-                            text, chunk_size=1500, overlap=200
-                        )
-                        if manual_chunks_data:
-                            logger.info(f"✅ Regenerated {len(manual_chunks_data)} chunk embeddings")
-                        else:
-                            logger.warning("⚠️ Failed to regenerate chunk embeddings")
+                    # Regenerate structure-aware chunks; the save re-embeds only the chunks that changed
+                    manual_chunks_data = self.embedding_service.chunk_analysis_result(processed_result)
+                    if manual_chunks_data:
+                        logger.info(f"✅ Prepared {len(manual_chunks_data)} chunks")
                     else:
-                        logger.info(f"📊 Text is small ({text_length} chars), regenerating single embedding...")
-                        # For small documents, create a single chunk
-                        embedding = await self.embedding_service.generate_embedding(text)
-                        if embedding:
-                            manual_chunks_data = [{"chunk": text, "embedding": embedding}]
-                            logger.info(f"✅ Regenerated single embedding with {len(embedding)} dimensions")
-                        else:
-                            logger.warning("⚠️ Failed to regenerate vector embedding")
+                        logger.warning("⚠️ No chunks produced for vector embeddings")
                 except Exception as e:
                     logger.error(f"❌ Error regenerating vector embedding: {e}")
                     manual_chunks_data = None
@@ -222,12 +189,14 @@ class DocumentAnalysisService:
                 if target_document_id:
                     # Update existing document with new embeddings (user may have edited data)
                     manual_saved_document = await self.database_service.update_document_in_database(
-                        target_document_id, processed_result, user_id, manual_chunks_data
+                        target_document_id, processed_result, user_id, manual_chunks_data,
+                        embed_fn=self.embedding_service.batch_generate_embeddings
                     )
                 else:
                     # Save fresh with embeddings (no existing document)
                     manual_saved_document = await self.database_service.save_document_to_database(
-                        document_data, processed_result, task, user_id, document_name, manual_chunks_data
+                        document_data, processed_result, task, user_id, document_name, manual_chunks_data,
+                        embed_fn=self.embedding_service.batch_generate_embeddings
                     )
             elif task in tasks_skip_embeddings:
                 logger.debug(f"⏭️ Skipping embedding generation for task: {task}")
@@ -275,12 +244,6 @@ class DocumentAnalysisService:
             if original_face_enabled is not None:
                 self.face_detector.enabled = original_face_enabled
                 logger.debug(f"🔧 Restored YOLO face detection to original state: {original_face_enabled}")
-            
-            # CRITICAL FIX #2: Ensure PDF cache is cleared even if processing fails
-            try:
-                self.pdf_processing_service.pdf_processor.clear_pdf_cache()
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache in finally block: {e}")
 
     async def _process_pdf_document(
         self,
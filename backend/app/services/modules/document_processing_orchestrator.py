@@ -11,6 +11,8 @@ from datetime import datetime
 import uuid
 from app.services.modules.processing_queue_service import ProcessingQueueService
 from app.services.workflow_trigger_service import WorkflowTriggerService
+from app.services.pdf_document_cache import fingerprint_pdf_bytes
+from app.services.page_render_cache import get_page_render_cache
 
 logger = logging.getLogger(__name__)
 
@@ -188,24 +190,34 @@ class DocumentProcessingOrchestrator:
         """
         Run type detection and extraction in parallel.
         
+        Both share one render scope for the upload, so the pages type detection
+        looks at are opened and rasterized once and reused by extraction.
+        
         Returns:
             Tuple of (type_result, extraction_result)
         """
-        # Create tasks for parallel execution
-        type_task = asyncio.create_task(
-            self.type_detector.detect_type(pdf_bytes, filename)
-        )
-        
-        extraction_task = asyncio.create_task(
-            self._run_extraction(pdf_bytes, filename, user_id, template_id, options)
-        )
-        
-        # Wait for both to complete
-        type_result, extraction_result = await asyncio.gather(
-            type_task,
-            extraction_task,
-            return_exceptions=True
-        )
+        render_cache = get_page_render_cache()
+        fingerprint = fingerprint_pdf_bytes(pdf_bytes)
+        render_cache.open_scope(fingerprint, range(self.type_detector.PAGES_TO_RENDER))
+        try:
+            # Create tasks for parallel execution
+            type_task = asyncio.create_task(
+                self.type_detector.detect_type(pdf_bytes, filename)
+            )
+            
+            extraction_task = asyncio.create_task(
+                self._run_extraction(pdf_bytes, filename, user_id, template_id, options)
+            )
+            
+            # Wait for both to complete
+            type_result, extraction_result = await asyncio.gather(
+                type_task,
+                extraction_task,
+                return_exceptions=True
+            )
+        finally:
+            stats = render_cache.close_scope(fingerprint)
+            logger.info(f"🖼️ Page render cache for {filename}: {stats['renders']} renders, {stats['renders_saved']} saved ({stats['reuses']} reused, {stats['downscales']} downscaled)")
         
         # Handle exceptions
         if isinstance(type_result, Exception):
@@ -4,12 +4,16 @@ Detects document type using LLM Vision analysis of first 2 pages
 Uses Gemini's native response_schema for guaranteed structured JSON output
 """
 
+import asyncio
 import logging
 import json
 from typing import Optional, Dict, Any, List
-import fitz  # PyMuPDF
 import base64
 
+from ..pdf_document_cache import get_pdf_document_cache
+from ..page_render_cache import get_page_render_cache
+from ..pdf_processor import PDFProcessor
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +24,10 @@ class DocumentTypeDetector:
     Uses Pydantic schema for structured output - Gemini guarantees valid JSON.
     """
 
+    # Pages sent for detection and their render scale
+    PAGES_TO_RENDER = 2
+    RENDER_SCALE = 2.0
+
     def __init__(self, llm_client=None):
         """
         Initialize detector with LLM client.
@@ -98,6 +106,10 @@ class DocumentTypeDetector:
     async def _convert_pdf_to_images(self, pdf_bytes: bytes) -> List[bytes]:
         """
         Convert first 2 pages of PDF to images.
+        
+        Uses the shared PDF document cache and page render cache, so when extraction
+        runs concurrently on the same upload (DocumentProcessingOrchestrator) each
+        page is opened and rasterized only once. Rendering runs in a worker thread.
 
         Args:
             pdf_bytes: PDF file content
@@ -106,29 +118,38 @@ class DocumentTypeDetector:
             List of PNG image bytes for first 2 pages
         """
         try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            return await asyncio.to_thread(self._render_pages_to_png, pdf_bytes)
+        except Exception as e:
+            logger.error(f"Error converting PDF to images: {e}")
+            return []
+
+    def _render_pages_to_png(self, pdf_bytes: bytes) -> List[bytes]:
+        document_cache = get_pdf_document_cache()
+        render_cache = get_page_render_cache()
+        with document_cache.open(pdf_bytes) as handle:
+            doc, fingerprint = handle.document, handle.fingerprint
             images = []
 
             # Process only first 2 pages
-            pages_to_process = min(2, len(doc))
+            pages_to_process = min(self.PAGES_TO_RENDER, len(doc))
             
             for page_num in range(pages_to_process):
-                page = doc[page_num]
+                # Extraction works on the same cached document from its own threads
+                with document_cache.lock_for(doc):
+                    page = doc[page_num]
+                    has_text = bool(page.get_text("text").strip())
+                # Pages without a text layer go down extraction's image path; render those at
+                # the extraction scale so extraction reuses the render (we downscale to 2x)
+                render_scale = PDFProcessor.RENDER_SCALE if not has_text else self.RENDER_SCALE
                 # Render page to image at 2x scale for better quality
-                mat = fitz.Matrix(2, 2)
-                pix = page.get_pixmap(matrix=mat)
-                # Convert to PNG bytes
+                pix = render_cache.get_pixmap(fingerprint, page, self.RENDER_SCALE, render_scale=render_scale)
+                # Convert to PNG bytes (a Pixmap is independent of the document)
                 png_bytes = pix.tobytes("png")
                 images.append(png_bytes)
                 logger.info(f"Converted page {page_num + 1} to image ({len(png_bytes)} bytes)")
 
-            doc.close()
             return images
 
-        except Exception as e:
-            logger.error(f"Error converting PDF to images: {e}")
-            return []
-
     async def _detect_type_from_images(self, images: List[bytes], filename: str) -> Dict[str, Any]:
         """
         Detect document type from images using LLM Vision with Pydantic schema.
@@ -6,14 +6,40 @@ Uses LiteLLM with OpenAI's azure/text-embedding-ada-002 model for semantic searc
 
 import os
 import json
+import hashlib
 import logging
 import httpx
 import asyncio
-from typing import Optional, Dict, Any, List
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
+from ...core.config import settings
+from ..embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
+# Pooled HTTP client shared by all EmbeddingService instances (routes create one per request).
+# httpx.AsyncClient is bound to the event loop it was first used on, so it is recreated
+# if a different loop (e.g. a worker's asyncio.run) asks for it.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the shared embeddings HTTP client for the running event loop."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+            _http_client = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=30.0),
+            )
+            _http_client_loop = loop
+            logger.debug("🌐 Created pooled HTTP client for embeddings")
+        return _http_client
+
 class EmbeddingService:
     """Service for generating vector embeddings from document analysis results."""
     
@@ -32,6 +58,8 @@ class EmbeddingService:
         self.max_tokens = 8191  # Maximum tokens for text-embedding-ada-002
         self.model = "azure/text-embedding-ada-002"
         self.max_tokens = 8191  # Maximum tokens for ada-002
+        # Shared (model, text) -> embedding cache; None when disabled
+        self._cache = get_embedding_cache()
         
         logger.info("✅ EmbeddingService initialized with LiteLLM")
     
@@ -331,18 +359,157 @@ class EmbeddingService:
             start += chunk_size - overlap
         return chunks
 
+    # =========================================================================
+    # Structure-aware chunking
+    # =========================================================================
+    @staticmethod
+    def chunk_id(chunk: str) -> str:
+        """Stable content-derived chunk ID (unchanged chunk text keeps its ID across re-indexes)."""
+        return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _section_units(self, name: str, data: Any, max_tokens: int) -> List[str]:
+        """
+        Text units for one section of an analysis result, as large as fit the budget.
+        
+        The whole section is one unit if it fits; otherwise it is split into its fields,
+        sub-sections and table rows (each prefixed with the section name for context).
+        """
+        if isinstance(data, dict):
+            whole = self._convert_hierarchical_section_to_text(data, name)
+        elif isinstance(data, list):
+            whole = self._convert_array_to_text(data, name)
+        else:
+            if data is None or data == '' or self._is_base64_image_data(str(data)):
+                return []
+            return [f"{name}: {data}"]
+        
+        if self._estimate_tokens(whole) <= max_tokens:
+            # Drop sections that rendered to a bare heading (all values empty or filtered)
+            return [whole] if whole.strip() not in (f"{name}:", f"{name}: (empty)", "") else []
+        
+        units: List[str] = []
+        if isinstance(data, dict):
+            for key, value in data.items():
+                label = key.replace('_', ' ').title()
+                if isinstance(value, dict) and 'value' in value:
+                    field_value = value.get('value')
+                    if field_value is None or field_value == '':
+                        continue
+                    if isinstance(field_value, str) and self._is_base64_image_data(field_value):
+                        continue
+                    units.append(f"{name}: {label}: {field_value}")
+                else:
+                    units.extend(self._section_units(f"{name} > {label}", value, max_tokens))
+        else:
+            for i, item in enumerate(data):
+                if isinstance(item, dict):
+                    units.append(self._convert_nested_object_to_text(item, f"{name} Item {i+1}"))
+                elif isinstance(item, list):
+                    units.append(self._convert_array_to_text(item, f"{name} Item {i+1}"))
+                elif not (isinstance(item, str) and self._is_base64_image_data(item)):
+                    units.append(f"{name} Item {i+1}: {item}")
+        return units
+    
+    def build_analysis_units(self, analysis_result: Dict[str, Any], max_tokens: int) -> List[str]:
+        """
+        Walk an analysis_result and return semantically whole text units in document order.
+        
+        Covers the same structures as convert_analysis_result_to_text: hierarchical_data
+        sections (fields, nested sections, tables), the fields array and the _parsed object.
+        """
+        units: List[str] = []
+        
+        if isinstance(analysis_result.get('hierarchical_data'), dict):
+            for section_key, section_data in analysis_result['hierarchical_data'].items():
+                units.extend(self._section_units(section_key.replace('_', ' ').title(), section_data, max_tokens))
+        
+        if isinstance(analysis_result.get('fields'), list):
+            for field in analysis_result['fields']:
+                if not isinstance(field, dict):
+                    continue
+                field_name = field.get('name', field.get('label', 'Unknown Field'))
+                field_value = field.get('value', '')
+                if isinstance(field_value, (dict, list)):
+                    units.extend(self._section_units(field_name, field_value, max_tokens))
+                elif not (isinstance(field_value, str) and self._is_base64_image_data(field_value)):
+                    units.append(f"{field_name}: {field_value}")
+        
+        if isinstance(analysis_result.get('_parsed'), dict):
+            units.extend(self._section_units("Document Data", analysis_result['_parsed'], max_tokens))
+        
+        return [unit for unit in (self._filter_text_for_embedding(u) for u in units) if unit and unit.strip()]
+    
+    def pack_units(self, units: List[str], max_tokens: int) -> List[str]:
+        """
+        Greedily pack consecutive units into chunks of at most max_tokens.
+        
+        Units are never split unless a single unit exceeds the budget on its own, in
+        which case it falls back to overlapping character windows.
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for unit in units:
+            tokens = self._estimate_tokens(unit) + 1  # plus the " | " separator
+            if tokens > max_tokens:
+                if current:
+                    chunks.append(" | ".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(self.chunk_text(unit, chunk_size=max_tokens * 3, overlap=200))
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" | ".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += tokens
+        if current:
+            chunks.append(" | ".join(current))
+        return chunks
+    
+    def chunk_analysis_result(self, analysis_result: Dict[str, Any], max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Structure-aware chunks for an analysis_result.
+        
+        Returns a list of dicts: [{"chunk": ..., "chunk_id": ..., "token_count": ...}].
+        Falls back to fixed-size windows over convert_analysis_result_to_text when the
+        result has no recognised structure.
+        """
+        max_tokens = max_tokens or settings.EMBEDDING_CHUNK_MAX_TOKENS
+        units = self.build_analysis_units(analysis_result, max_tokens)
+        if units:
+            chunks = self.pack_units(units, max_tokens)
+        else:
+            chunks = self.chunk_text(self.convert_analysis_result_to_text(analysis_result), chunk_size=max_tokens * 3, overlap=200)
+        return [
+            {"chunk": chunk, "chunk_id": self.chunk_id(chunk), "token_count": self._estimate_tokens(chunk)}
+            for chunk in chunks
+        ]
+    
+    async def generate_embeddings_for_analysis_result(self, analysis_result: Dict[str, Any], max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Chunk an analysis_result structure-aware and embed every chunk.
+        Returns a list of dicts: [{"chunk": ..., "chunk_id": ..., "token_count": ..., "embedding": [...]}]
+        """
+        chunks = self.chunk_analysis_result(analysis_result, max_tokens)
+        embeddings = await self.batch_generate_embeddings([chunk["chunk"] for chunk in chunks])
+        return [
+            {**chunk, "embedding": embedding}
+            for chunk, embedding in zip(chunks, embeddings)
+            if embedding
+        ]
+
     async def generate_embeddings_for_chunks(self, text: str, chunk_size: int = 1500, overlap: int = 200) -> List[Dict[str, Any]]:
         """
         Split text into chunks and generate embeddings for each chunk.
         Returns a list of dicts: [{"chunk": ..., "embedding": [...]}]
         """
         chunks = self.chunk_text(text, chunk_size=chunk_size, overlap=overlap)
-        results = []
-        for chunk in chunks:
-            embedding = await self.generate_embedding(chunk)
-            if embedding:
-                results.append({"chunk": chunk, "embedding": embedding})
-        return results
+        embeddings = await self.batch_generate_embeddings(chunks)
+        return [
+            {"chunk": chunk, "embedding": embedding}
+            for chunk, embedding in zip(chunks, embeddings)
+            if embedding
+        ]
 
     async def generate_embedding(self, text: str) -> Optional[List[float]]:
         """
@@ -360,7 +527,13 @@ class EmbeddingService:
                 return None
             
             # Clean and prepare text
-            cleaned_text = text.strip()
+            cleaned_text = self._truncate_to_model_limit(text.strip())
+            
+            if self._cache is not None:
+                cached = await asyncio.to_thread(self._cache.get, cleaned_text, self.model)
+                if cached is not None:
+                    logger.debug(f"♻️ Embedding cache hit ({len(cleaned_text)} chars)")
+                    return cached
             
             # Log the request details at debug level
             logger.debug(f"🚀 Sending embedding request to LiteLLM:")
@@ -378,6 +551,8 @@ class EmbeddingService:
             
             if embedding:
                 logger.info(f"Successfully generated embedding with {len(embedding)} dimensions")
+                if self._cache is not None:
+                    await asyncio.to_thread(self._cache.put, cleaned_text, self.model, embedding)
             
             return embedding
             
@@ -385,43 +560,53 @@ class EmbeddingService:
             logger.error(f"Unexpected error generating embedding: {e}")
             return None
     
+    def _embeddings_url(self) -> str:
+        """Embeddings endpoint derived from the configured chat/completions URL."""
+        # For embeddings, we need the base URL without /chat/completions
+        base_url = self.litellm_api_url
+        if '/chat/completions' in base_url:
+            base_url = base_url.replace('/chat/completions', '')
+        return f"{base_url.rstrip('/')}/embeddings"
+    
     async def _call_litellm_embeddings_api(self, request_body: Dict[str, Any], max_retries: int = 3) -> Optional[List[float]]:
-        """Call LiteLLM embeddings API with retry logic."""
+        """Call LiteLLM embeddings API with retry logic (single input)."""
+        embeddings = await self._request_embeddings(request_body, max_retries)
+        if embeddings:
+            logger.info(f"✅ Embedding generated successfully")
+            return embeddings[0]
+        return None
+    
+    async def _request_embeddings(self, request_body: Dict[str, Any], max_retries: int = 3) -> Optional[List[List[float]]]:
+        """
+        POST to the embeddings endpoint with retry logic.
+        
+        request_body["input"] may be a string or a list of strings; the returned
+        embeddings are ordered to match the inputs (by each item's "index").
+        """
         last_exception = None
+        embeddings_url = self._embeddings_url()
+        headers = {
+            "Content-Type": "application/json",
+            self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}"
+        }
         
         for attempt in range(max_retries):
             try:
                 logger.info(f"🌐 Making LiteLLM embeddings API call (attempt {attempt + 1}/{max_retries})")
                 
-                # For embeddings, we need the base URL without /chat/completions
-                # Extract base URL from the configured URL
-                base_url = self.litellm_api_url
-                if '/chat/completions' in base_url:
-                    # Remove /chat/completions to get base URL for embeddings
-                    base_url = base_url.replace('/chat/completions', '')
+                client = _get_http_client()
+                response = await client.post(embeddings_url, json=request_body, headers=headers)
+                response.raise_for_status()
                 
-                # Construct the embeddings endpoint URL
-                embeddings_url = f"{base_url.rstrip('/')}/embeddings"
+                result = response.json()
                 
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    headers = {
-                        "Content-Type": "application/json",
-                        self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}"
-                    }
-                    
-                    response = await client.post(embeddings_url, json=request_body, headers=headers)
-                    response.raise_for_status()
-                    
-                    result = response.json()
-                    
-                    # Extract embedding from response
-                    if "data" in result and len(result["data"]) > 0:
-                        embedding = result["data"][0]["embedding"]
-                        logger.info(f"✅ Embedding generated successfully")
-                        return embedding
-                    else:
-                        logger.error(f"Unexpected response format: {result}")
-                        return None
+                # Extract embeddings from response
+                if "data" in result and len(result["data"]) > 0:
+                    data = sorted(result["data"], key=lambda item: item.get("index", 0))
+                    return [item["embedding"] for item in data]
+                else:
+                    logger.error(f"Unexpected response format: {result}")
+                    return None
                         
             except httpx.HTTPStatusError as e:
                 last_exception = e
@@ -443,26 +628,127 @@ class EmbeddingService:
         logger.error(f"Failed to generate embedding after {max_retries} attempts: {last_exception}")
         return None
     
-    async def batch_generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough token estimate (~3 characters per token, same ratio as the truncation above)."""
+        return len(text) // 3 + 1
+    
+    def _truncate_to_model_limit(self, text: str) -> str:
+        """Cut text to the model's input limit (same ~3 characters per token ratio); longer inputs fail the whole request."""
+        max_chars = self.max_tokens * 3
+        if len(text) > max_chars:
+            logger.warning(f"Truncated embedding input from {len(text)} to {max_chars} characters to fit model limits")
+            return text[:max_chars]
+        return text
+    
+    def _plan_batches(self, items: List[Tuple[int, str]], batch_size: int, max_tokens: int) -> List[List[Tuple[int, str]]]:
+        """
+        Group (index, cleaned_text) pairs into request-sized batches, preserving input order.
+        
+        A batch closes when it reaches batch_size inputs or adding the next text
+        would exceed max_tokens.
+        """
+        batches: List[List[Tuple[int, str]]] = []
+        current: List[Tuple[int, str]] = []
+        current_tokens = 0
+        for index, cleaned_text in items:
+            tokens = self._estimate_tokens(cleaned_text)
+            if current and (len(current) >= batch_size or current_tokens + tokens > max_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append((index, cleaned_text))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def batch_generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        max_tokens_per_batch: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> List[Optional[List[float]]]:
         """
         Generate embeddings for multiple texts in batch.
         
+        Texts already in the embedding cache are not sent again. The rest are cut to
+        the model's input limit and packed into multi-input /embeddings requests
+        (bounded by input count and an approximate token budget), which run
+        concurrently up to max_concurrency. Batches succeed or fail independently;
+        the inputs of a failed batch are retried one by one, so a single bad input
+        only loses its own embedding.
+        
         Args:
             texts: List of texts to generate embeddings for
+            batch_size: Max inputs per request (default: EMBEDDING_BATCH_SIZE)
+            max_tokens_per_batch: Approximate token budget per request (default: EMBEDDING_BATCH_MAX_TOKENS)
+            max_concurrency: Max requests in flight (default: EMBEDDING_BATCH_CONCURRENCY)
             
         Returns:
-            List of embedding vectors (or None for failed ones)
+            List of embedding vectors in input order (or None for empty / failed ones)
         """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
         try:
-            embeddings = []
-            
-            for text in texts:
-                embedding = await self.generate_embedding(text)
-                embeddings.append(embedding)
-            
-            logger.info(f"Generated {len([e for e in embeddings if e is not None])} embeddings out of {len(texts)} texts")
-            return embeddings
-            
+            # Empty texts are skipped (their embedding stays None)
+            items = [
+                (index, self._truncate_to_model_limit(text.strip()))
+                for index, text in enumerate(texts) if text and text.strip()
+            ]
+            if not items:
+                logger.warning("No non-empty texts provided for batch embedding generation")
+                return embeddings
+            
+            # Serve unchanged chunks from the cache; only misses go to the API
+            # (SQLite lookups run in a thread so they never stall the event loop)
+            if self._cache is not None:
+                cached = await asyncio.to_thread(self._cache.get_many, [text for _, text in items], self.model)
+                for (index, _), vector in zip(items, cached):
+                    embeddings[index] = vector
+                items = [item for item, vector in zip(items, cached) if vector is None]
+                if not items:
+                    logger.info(f"♻️ All {len(texts)} embeddings served from cache")
+                    return embeddings
+            
+            batches = self._plan_batches(
+                items,
+                batch_size or settings.EMBEDDING_BATCH_SIZE,
+                max_tokens_per_batch or settings.EMBEDDING_BATCH_MAX_TOKENS,
+            )
         except Exception as e:
             logger.error(f"Error in batch embedding generation: {e}")
-            return [None] * len(texts)
+            return embeddings
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.EMBEDDING_BATCH_CONCURRENCY))
+        
+        async def request(inputs: List[str], max_retries: int = 3) -> Optional[List[List[float]]]:
+            async with semaphore:
+                vectors = await self._request_embeddings({"model": self.model, "input": inputs}, max_retries)
+            if vectors is not None and len(vectors) != len(inputs):
+                logger.error(f"❌ Embedding request for {len(inputs)} inputs returned {len(vectors)} vectors")
+                return None
+            return vectors
+        
+        async def run_batch(batch: List[Tuple[int, str]]):
+            vectors = await request([text for _, text in batch])
+            if vectors is None:
+                if len(batch) == 1:
+                    return
+                # The batch already went through the retries; one attempt per input isolates bad inputs
+                logger.warning(f"⚠️ Embedding batch of {len(batch)} inputs failed - retrying them one by one")
+                singles = await asyncio.gather(*(request([text], max_retries=1) for _, text in batch), return_exceptions=True)
+                vectors = [single[0] if isinstance(single, list) else None for single in singles]
+            for (index, _), vector in zip(batch, vectors):
+                embeddings[index] = vector
+            generated = [(text, vector) for (_, text), vector in zip(batch, vectors) if vector is not None]
+            if self._cache is not None and generated:
+                await asyncio.to_thread(
+                    self._cache.put_many, [text for text, _ in generated], self.model, [vector for _, vector in generated]
+                )
+        
+        outcomes = await asyncio.gather(*(run_batch(batch) for batch in batches), return_exceptions=True)
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"❌ Embedding batch of {len(batch)} inputs failed: {outcome}")
+        
+        logger.info(f"Generated {len([e for e in embeddings if e is not None])} embeddings out of {len(texts)} texts in {len(batches)} batch(es)")
+        return embeddings
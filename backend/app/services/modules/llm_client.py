@@ -5,18 +5,25 @@ Handles all interactions with LLM APIs through LiteLLM
 
 import json
 import logging
-import httpx
-import requests
 import os
 import asyncio
 import time
 import re
-import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, Tuple, Union
 from datetime import datetime
 from fastapi import HTTPException
 from dotenv import load_dotenv
 from ...core.config import settings
+from ..page_image import PageImage, image_to_bytes, image_to_data_url
+from ..llm_transport import get_llm_transport
+from ..llm_response_cache import get_llm_response_cache, llm_response_cache_key
+from ..streaming_json import IncrementalJSONParser
+
+# Tasks answered in plain text rather than JSON
+PLAIN_TEXT_TASKS = ("rag_question_answering", "document_summarization", "text_completion")
+
+# Called with (path, value) for each completed top-level field / section of a streamed response
+SectionCallback = Callable[[Tuple[Any, ...], Any], None]
 
 logger = logging.getLogger(__name__)
 
@@ -83,16 +90,12 @@ class LLMClient:
             # Model configuration - read from .env
             self.extraction_model = os.getenv("EXTRACTION_MODEL", "openrouter/google/gemini-2.5-flash")
         
-        # HTTP client with connection pooling (lazy initialization)
-        self._http_client: Optional[httpx.AsyncClient] = None
+        # Process-wide transport shared by async and sync calls: one connection pool,
+        # per-model rate limits and adaptive concurrency, jittered retries
+        self._transport = get_llm_transport()
         
-        # Thread-local storage for HTTP sessions (each thread gets its own session)
-        # This prevents thread contention when multiple threads make concurrent requests
-        self._thread_local = threading.local()
-        
-        # Global session for backward compatibility (used when thread-local not needed)
-        self._sync_session: Optional[requests.Session] = None
-        self._current_pool_maxsize: Optional[int] = None
+        # Opt-in disk cache of responses for byte-identical requests (None when disabled)
+        self._response_cache = get_llm_response_cache()
         
         # LangSmith tracing configuration (check after loading env)
         langsmith_tracing_env = os.getenv("LANGSMITH_TRACING", "false").lower()
@@ -144,49 +147,79 @@ class LLMClient:
             "LITELLM_AUTH_SCHEME": os.getenv("LITELLM_AUTH_SCHEME", "Bearer")
         }
     
-    async def _get_http_client(self) -> httpx.AsyncClient:
+    async def close(self):
         """
-        Get or create HTTP client with connection pooling
-        Reuses connections to reduce latency and improve performance
-        
-        Thread-safe initialization to prevent race conditions during parallel processing
-        
-        Returns:
-            Reusable httpx.AsyncClient instance
+        Close the shared transport's HTTP client (call on shutdown)
+        It is recreated on the next call
         """
-        if self._http_client is None:
-            # Use a lock to prevent multiple coroutines from creating clients simultaneously
-            if not hasattr(self, '_client_lock'):
-                self._client_lock = asyncio.Lock()
-            
-            async with self._client_lock:
-                # Double-check after acquiring lock (common pattern for lazy initialization)
-                if self._http_client is None:
-                    limits = httpx.Limits(
-                        max_keepalive_connections=20,
-                        max_connections=100,
-                        keepalive_expiry=30.0
-                    )
-                    self._http_client = httpx.AsyncClient(
-                        timeout=120.0,
-                        limits=limits
-                    )
-                    logger.debug("🌐 Created HTTP client with connection pooling")
-        return self._http_client
-    
-    async def close(self):
+        await self._transport.aclose()
+
+    def warm_up(self):
+        """Start the transport's event loop and connection pool ahead of the first call"""
+        self._transport.warm_up()
+
+    def _cached_response(self, model: str, task: str, prompt: str, image_data: Optional[Union[str, PageImage]],
+                         response_format: Dict[str, Any], document_name: Optional[str], content_type: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a previous response to the same request (model, task, prompt, response format, page content)
+        Returns (cache_key, cached_result); cache_key is None when the cache is disabled
         """
-        Close HTTP client (call on shutdown or when done processing)
-        This should be called to properly clean up connections
+        if self._response_cache is None:
+            return None, None
+        cache_key = llm_response_cache_key(model, task, prompt, image_data, response_format, document_name, content_type)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"💾 LLM response cache hit - Task: {task}, Model: {model}")
+        return cache_key, cached
+
+    # Flags process_api_result / process_streamed_result set on responses that needed repair or are incomplete
+    UNCLEAN_PARSE_FLAGS = ("_partial", "_repaired", "_lenient_parsed", "_json5_parsed")
+
+    def _store_response(self, cache_key: Optional[str], model: str, task: str, result: Dict[str, Any], finish_reason: Optional[str]):
         """
-        if self._http_client:
-            await self._http_client.aclose()
-            self._http_client = None
-            logger.debug("🔌 Closed HTTP client")
+        Cache a processed response if it is complete and parsed cleanly
+        Truncated (finish_reason "length") or repaired responses are not stored: a re-run may do better
+        """
+        if cache_key is None or self._response_cache is None:
+            return
+        if finish_reason == "length":
+            return
+        if isinstance(result, dict) and any(result.get(flag) for flag in self.UNCLEAN_PARSE_FLAGS):
+            return
+        self._response_cache.put(cache_key, model, task, result)
+
+    @staticmethod
+    def _finish_reason(result: Dict[str, Any]) -> Optional[str]:
+        """finish_reason of the first choice of a raw chat-completion response"""
+        return ((result.get("choices") or [{}])[0] or {}).get("finish_reason")
 
+    def _litellm_api_url(self) -> str:
+        """Resolve the chat/completions endpoint from LITELLM_API_URL"""
+        base_url = self.litellm_api_url.rstrip('/')
+        # Allow LITELLM_API_URL to be configured as:
+        # - base host only: https://proxyllm.ximplify.id
+        # - API root:       https://proxyllm.ximplify.id/v1
+        # - full endpoint:  https://proxyllm.ximplify.id/v1/chat/completions
+        if re.search(r"/chat/completions$", base_url):
+            return base_url
+        if re.search(r"/v1$", base_url):
+            return f"{base_url}/chat/completions"
+        return f"{base_url}/v1/chat/completions"
+
+    def _litellm_headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}"
+        }
 
+    @staticmethod
+    def _has_image_payload(image_data: Optional[Union[str, PageImage]]) -> bool:
+        """True if image_data carries an image (non-empty PageImage or non-blank string)"""
+        if isinstance(image_data, PageImage):
+            return len(image_data) > 0
+        return bool(image_data and image_data.strip())
     
-    def _prepare_request_body(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    def _prepare_request_body(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """
         Prepare request body for LiteLLM API
         
@@ -196,7 +229,7 @@ class LLMClient:
         # LiteLLM/OpenRouter handles response format conversion internally
         return self._prepare_litellm_request_body(prompt, image_data, response_format, document_name, content_type)
     
-    def _prepare_litellm_request_body(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    def _prepare_litellm_request_body(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
         """Prepare request body for LiteLLM API using chat/completions format (supports images and text)"""
         # Use the same model from EXTRACTION_MODEL for both text and image requests
         model = self.extraction_model
@@ -232,11 +265,12 @@ class LLMClient:
         
         # Add image only if image_data is provided, not empty, and content_type is "image"
         # When content_type is "text", image_data contains the extracted text (already included in prompt)
-        if content_type == "image" and image_data and image_data.strip():
+        # PageImage bytes are base64-encoded here, at the request edge, and nowhere earlier
+        if content_type == "image" and self._has_image_payload(image_data):
             content.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": image_data
+                    "url": image_to_data_url(image_data)
                 }
             })
         
@@ -257,77 +291,56 @@ class LLMClient:
         
         return request_body
 
-    async def _call_api_with_retry(self, request_body: Dict[str, Any], api_url: str, max_retries: int = 3) -> Dict[str, Any]:
+    async def _call_api_with_retry(self, request_body: Dict[str, Any], api_url: str, max_retries: Optional[int] = None) -> Dict[str, Any]:
         """
-        Call LLM API with retry logic for network issues
-        Uses connection pooling for improved performance
+        Call LLM API through the shared transport
+        Rate limiting, adaptive concurrency and jittered retries (429 / 5xx / network) happen there
         """
-        last_exception = None
-        client = await self._get_http_client()  # Reuse HTTP client with connection pooling
-        
-        # Prepare headers for LiteLLM
-        headers = {
-            "Content-Type": "application/json",
-            self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}"
-        }
-        provider_name = "LiteLLM"
-        
-        for attempt in range(max_retries):
-            try:
-                logger.debug(f"🌐 Making {provider_name} API call (attempt {attempt + 1}/{max_retries}) to {api_url}")
-                
-                # Model logging only (request body keys removed to reduce log size)
-                if "model" in request_body:
-                    logger.debug(f"🔍 Model: {request_body.get('model')}")
-                    
-                    # Fix: Add timeout to async HTTP calls to prevent blocking
-                    response = await client.post(
-                        api_url,
-                        json=request_body,
-                        headers=headers,
-                        timeout=90.0  # 90 second timeout per request
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        logger.debug(f"✅ {provider_name} API call successful on endpoint: {api_url}")
-                        return result
-                    else:
-                        error_msg = f"API call failed with status {response.status_code}: {response.text}"
-                        logger.error(f"❌ {error_msg}")
-                        # Return a more user-friendly error instead of raising HTTPException
-                        raise Exception(f"LLM API Error: {response.status_code} - {response.text}")
-            except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.WriteTimeout, 
-                   httpx.ConnectError, httpx.RemoteProtocolError) as e:
-                last_exception = e
-                wait_time = 2 ** attempt  # Exponential backoff
-                logger.warning(f"⚠️ Network error on attempt {attempt + 1}: {e}")
-                logger.debug(f"⏳ Waiting {wait_time} seconds before retry...")
-                await asyncio.sleep(wait_time)
-                continue
-                
-            except Exception as e:
-                logger.error(f"❌ Unexpected error on attempt {attempt + 1}: {e}")
-                logger.error(f"❌ Error type: {type(e).__name__}")
-                # If it's not a network error, don't retry
-                if not isinstance(e, (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.WriteTimeout, httpx.ConnectError, httpx.RemoteProtocolError)):
-                    raise e
-                last_exception = e
-        
-        # If all retries failed, raise the last exception
-        logger.error(f"❌ All retries failed for endpoint: {api_url}")
-        raise last_exception or Exception(f"All retries failed for endpoint: {api_url}")
+        logger.debug(f"🌐 Making LiteLLM API call to {api_url} (model: {request_body.get('model')})")
+        return await self._transport.post_json(api_url, request_body, self._litellm_headers(), max_retries)
+
+    def _streaming_parser(self, task: str, on_section: Optional[SectionCallback]) -> Optional[IncrementalJSONParser]:
+        """Incremental parser for a streamed JSON response, or None to use a plain (non-streamed) request"""
+        if task in PLAIN_TEXT_TASKS or not (on_section is not None or settings.LLM_STREAMING_ENABLED):
+            return None
+        return IncrementalJSONParser(on_value=on_section)
+
+    async def _send_request(self, request_body: Dict[str, Any], api_url: str, parser: Optional[IncrementalJSONParser]) -> Dict[str, Any]:
+        """Plain request, or SSE stream fed into parser as it arrives"""
+        if parser is None:
+            return await self._call_api_with_retry(request_body, api_url)
+        result = await self._transport.stream_chat(api_url, request_body, self._litellm_headers(), parser.feed, parser.reset)
+        parser.finish()
+        return result
 
-    async def call_api(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
-                      task: str, document_name: Optional[str] = None) -> Dict[str, Any]:
-        """Make API call to LLM provider with optional LangSmith monitoring"""
+    def _send_request_sync(self, request_body: Dict[str, Any], api_url: str, parser: Optional[IncrementalJSONParser]) -> Dict[str, Any]:
+        """Synchronous version of _send_request"""
+        if parser is None:
+            return self._call_api_with_retry_sync(request_body, api_url)
+        result = self._transport.stream_chat_sync(api_url, request_body, self._litellm_headers(), parser.feed, parser.reset)
+        parser.finish()
+        return result
+
+    def _process_result(self, result: Dict[str, Any], task: str, parser: Optional[IncrementalJSONParser]) -> Dict[str, Any]:
+        if parser is None:
+            return self.process_api_result(result, task)
+        return self.process_streamed_result(result, parser, task)
+
+    async def call_api(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], 
+                      task: str, document_name: Optional[str] = None, on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
+        """
+        Make API call to LLM provider with optional LangSmith monitoring
+        
+        on_section: when given (or LLM_STREAMING_ENABLED), the response is streamed and parsed incrementally;
+                    called with (path, value) on the transport thread for each completed field / section
+        """
         start_time = time.time()
         
         # Determine which model will be used
         model_to_use = self.extraction_model
         
         # Determine content type based on whether image_data is provided
-        content_type = "image" if image_data and image_data.strip() else "text"
+        content_type = "image" if self._has_image_payload(image_data) else "text"
         
         # Extract page number from document_name if present (format: "Document.pdf (page X)")
         page_number = None
@@ -341,22 +354,19 @@ class LLMClient:
         
         # Route to appropriate provider
         if self.provider == "gemini_direct":
-            # Use synchronous Gemini direct API in a thread pool to avoid blocking
-            import asyncio
-            from concurrent.futures import ThreadPoolExecutor
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(
-                ThreadPoolExecutor(max_workers=1),
+            # Use synchronous Gemini direct API in a worker thread to avoid blocking
+            return await asyncio.to_thread(
                 self._execute_call_sync,
                 prompt, image_data, response_format, task, document_name, start_time, model_to_use, content_type, page_number, trace_name
             )
         else:
             # Use async LiteLLM for other providers
-            return await self._execute_call(prompt, image_data, response_format, task, document_name, start_time, model_to_use, page_number, trace_name)
+            return await self._execute_call(prompt, image_data, response_format, task, document_name, start_time, model_to_use, page_number, trace_name, on_section)
     
-    async def _execute_call(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
+    async def _execute_call(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], 
                            task: str, document_name: Optional[str],
-                           start_time: float, model_to_use: str, page_number: Optional[int] = None, trace_name: Optional[str] = None) -> Dict[str, Any]:
+                           start_time: float, model_to_use: str, page_number: Optional[int] = None, trace_name: Optional[str] = None,
+                           on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
         """Execute the actual LLM API call for LiteLLM provider (async flow)"""
         try:
             # This method is only called for LiteLLM provider (routing done in call_api)
@@ -364,22 +374,21 @@ class LLMClient:
             if not self.litellm_api_url or self.litellm_api_url.strip() == "":
                 raise ValueError("LiteLLM API URL is empty or not configured. Set LITELLM_API_URL in backend/.env")
             
-            base_url = self.litellm_api_url.rstrip('/')
-            # Allow LITELLM_API_URL to be configured as:
-            # - base host only: https://proxyllm.ximplify.id
-            # - API root:       https://proxyllm.ximplify.id/v1
-            # - full endpoint:  https://proxyllm.ximplify.id/v1/chat/completions
-            if re.search(r"/chat/completions$", base_url):
-                api_url = base_url
-            elif re.search(r"/v1$", base_url):
-                api_url = f"{base_url}/chat/completions"
-            else:
-                api_url = f"{base_url}/v1/chat/completions"
+            cache_key, cached = None, None
+            if self._response_cache is not None:
+                # Hashing the page image and the SQLite lookup stay off the event loop
+                cache_key, cached = await asyncio.to_thread(
+                    self._cached_response, model_to_use, task, prompt, image_data, response_format, document_name, "image"
+                )
+            if cached is not None:
+                return cached
             
+            api_url = self._litellm_api_url()
             logger.debug(f"🔍 Using LiteLLM endpoint: {api_url}")
             
             # Prepare request body (provider-specific format) - NOT included in LangSmith timing
             request_body = self._prepare_request_body(prompt, image_data, response_format, document_name)
+            parser = self._streaming_parser(task, on_section)
             
             # Wrap only the HTTP request with LangSmith tracing (pure LLM response time)
             if self.langsmith_enabled and self.traceable:
@@ -404,16 +413,20 @@ class LLMClient:
                 )
                 async def _traced_http_call():
                     # This traces ONLY the HTTP request/response time
-                    return await self._call_api_with_retry(request_body, api_url)
+                    return await self._send_request(request_body, api_url, parser)
                 
                 result = await _traced_http_call()
             else:
                 # No LangSmith tracing - just make the call
-                result = await self._call_api_with_retry(request_body, api_url)
+                result = await self._send_request(request_body, api_url, parser)
             
             # Process the result to normalize the structure
             # This is NOT included in LangSmith timing
-            processed_result = self.process_api_result(result, task)
+            processed_result = self._process_result(result, task, parser)
+            if cache_key is not None:
+                await asyncio.to_thread(
+                    self._store_response, cache_key, model_to_use, task, processed_result, self._finish_reason(result)
+                )
             
             # Calculate duration (total time including prep and processing)
             duration = time.time() - start_time
@@ -434,208 +447,29 @@ class LLMClient:
             logger.error(f"❌ Error in LLM API call: {e}")
             raise
     
-    def _get_sync_session(self, pool_connections: int = 1, max_connections: Optional[int] = None) -> requests.Session:
+    def _call_api_with_retry_sync(self, request_body: Dict[str, Any], api_url: str, max_retries: Optional[int] = None) -> Dict[str, Any]:
         """
-        Get or create synchronous HTTP session with connection pooling
-        Uses thread-local storage to ensure each thread gets its own session
-        This prevents thread contention and allows true parallelism
-        
-        Thread-safe for use in ThreadPoolExecutor - each thread gets its own session
-        
-        Args:
-            pool_connections: Number of connection pools (default: 1 for single host)
-            max_connections: Maximum number of concurrent connections per pool (default: 20, or matches worker count)
-        """
-        # Use thread-local storage to ensure each thread has its own session
-        # This prevents thread contention when multiple threads make concurrent requests
-        if not hasattr(self._thread_local, 'session') or self._thread_local.session is None:
-            # Determine pool_maxsize
-            if max_connections is not None:
-                pool_maxsize = max_connections
-            elif self._current_pool_maxsize is not None:
-                pool_maxsize = self._current_pool_maxsize
-            else:
-                pool_maxsize = 20  # Default
-            
-            # Create new session for this thread with connection pooling
-            session = requests.Session()
-            adapter = requests.adapters.HTTPAdapter(
-                pool_connections=pool_connections,  # Number of connection pools (typically 1 per unique host)
-                pool_maxsize=pool_maxsize,  # Max connections per pool (allows true parallelism)
-                max_retries=3
-            )
-            session.mount('http://', adapter)
-            session.mount('https://', adapter)
-            
-            # Store session in thread-local storage
-            self._thread_local.session = session
-            self._thread_local.pool_maxsize = pool_maxsize
-            
-            logger.debug(f"🌐 Created thread-local HTTP session (thread: {threading.current_thread().name}) - pool_connections: {pool_connections}, pool_maxsize: {pool_maxsize}")
-        
-        # If max_connections is provided and larger than current, recreate session
-        elif max_connections is not None and max_connections > self._thread_local.pool_maxsize:
-            # CRITICAL FIX #3: Close existing session before creating new one
-            if self._thread_local.session:
-                try:
-                    self._thread_local.session.close()
-                    logger.debug(f"🔒 Closed existing thread-local HTTP session before recreation")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error closing existing session: {e}")
-            
-            # Create new session with larger pool size
-            session = requests.Session()
-            adapter = requests.adapters.HTTPAdapter(
-                pool_connections=pool_connections,
-                pool_maxsize=max_connections,
-                max_retries=3
-            )
-            session.mount('http://', adapter)
-            session.mount('https://', adapter)
-            
-            self._thread_local.session = session
-            self._thread_local.pool_maxsize = max_connections
-            
-            logger.debug(f"🔄 Recreated thread-local HTTP session with larger pool size: {max_connections} (was: {self._thread_local.pool_maxsize})")
-        
-        # Store global pool_maxsize for reference (used when creating new thread-local sessions)
-        if max_connections is not None:
-            self._current_pool_maxsize = max_connections
-        
-        return self._thread_local.session
-    
-    def _cleanup_thread_session(self):
-        """
-        CRITICAL FIX #3: Clean up thread-local HTTP session
-        Call this after processing completes to prevent memory leaks
-        """
-        if hasattr(self._thread_local, 'session') and self._thread_local.session is not None:
-            try:
-                self._thread_local.session.close()
-                self._thread_local.session = None
-                logger.debug(f"🔒 Cleaned up thread-local HTTP session")
-            except Exception as e:
-                logger.warning(f"⚠️ Error cleaning up thread session: {e}")
-    
-    def _call_api_with_retry_sync(self, request_body: Dict[str, Any], api_url: str, max_retries: int = 3) -> Dict[str, Any]:
-        """
-        Synchronous version: Call LLM API with retry logic for network issues
-        Uses connection pooling for improved performance
+        Synchronous version: blocks the calling thread on the shared async transport
         Thread-safe for use in ThreadPoolExecutor
         """
-        last_exception = None
-        session = self._get_sync_session()
-        
-        # Prepare headers for LiteLLM
-        headers = {
-            "Content-Type": "application/json",
-            self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}"
-        }
-        provider_name = "LiteLLM"
-        
-        for attempt in range(max_retries):
-            try:
-                attempt_start = time.time()
-                logger.debug(f"🌐 Making {provider_name} API call (attempt {attempt + 1}/{max_retries}) to {api_url}")
-                
-                # Model logging only (request body keys removed to reduce log size)
-                if "model" in request_body:
-                    logger.debug(f"🔍 Model: {request_body.get('model')}")
-                
-                # Log request size for debugging
-                request_size = len(str(request_body))
-                logger.debug(f"📦 Request size: {request_size} bytes")
-                
-                # Measure HTTP request/response time with accurate timing
-                # Note: response.elapsed is the accurate measure from requests library
-                # It measures from when the HTTP request actually starts (socket connection) to when headers are received
-                request_submit_time = time.time()
-                response = session.post(
-                    api_url,
-                    json=request_body,
-                    headers=headers,
-                    timeout=90  # Fix: Reduced to 90s per request to prevent blocking (with retries, total can be up to 270s)
-                )
-                request_complete_time = time.time()
-                
-                # Use response.elapsed as the accurate HTTP request time (from requests library)
-                # This measures from when HTTP request actually starts to when headers are received
-                if hasattr(response, 'elapsed') and response.elapsed:
-                    ttfb = response.elapsed.total_seconds()
-                    # Total HTTP duration includes TTFB + response body transfer
-                    http_duration = (request_complete_time - request_submit_time)
-                    response_transfer_time = http_duration - ttfb
-                else:
-                    # Fallback if elapsed is not available
-                    http_duration = request_complete_time - request_submit_time
-                    ttfb = http_duration
-                    response_transfer_time = 0.0
-                
-                # Log detailed timing breakdown with accurate measurements
-                logger.info(f"⏱️ HTTP Request Timing Breakdown:")
-                logger.info(f"   📤 Request submitted: {request_submit_time:.3f}s")
-                logger.info(f"   📥 Response completed: {request_complete_time:.3f}s")
-                logger.info(f"   ⚡ Time-to-First-Byte (TTFB): {ttfb:.3f}s (proxy/LLM processing time)")
-                if response_transfer_time > 0:
-                    logger.info(f"   📡 Response transfer time: {response_transfer_time:.3f}s")
-                logger.info(f"   🌐 Total HTTP duration: {http_duration:.3f}s")
-                logger.info(f"   📊 Response status: {response.status_code}")
-                logger.info(f"   📏 Response size: {len(response.content)} bytes")
-                
-                # Check if TTFB is unusually high (indicates network/proxy delay)
-                if ttfb > 10.0:
-                    logger.warning(f"⚠️ Very High TTFB detected ({ttfb:.2f}s) - proxy/LLM is very slow or overloaded")
-                elif ttfb > 5.0:
-                    logger.warning(f"⚠️ High TTFB detected ({ttfb:.2f}s) - possible network/proxy latency issue")
-                elif ttfb > 2.0:
-                    logger.debug(f"ℹ️ Moderate TTFB ({ttfb:.2f}s) - network latency may be affecting performance")
-                
-                if response.status_code == 200:
-                    # Measure response parsing time
-                    parse_start = time.time()
-                    result = response.json()
-                    parse_time = time.time() - parse_start
-                    logger.debug(f"✅ {provider_name} API call successful on endpoint: {api_url}")
-                    logger.debug(f"   🔄 JSON parsing took: {parse_time*1000:.1f}ms")
-                    
-                    # Log total attempt time
-                    attempt_duration = time.time() - attempt_start
-                    logger.debug(f"   ⏱️ Total attempt duration: {attempt_duration:.3f}s")
-                    
-                    return result
-                else:
-                    error_msg = f"API call failed with status {response.status_code}: {response.text}"
-                    logger.error(f"❌ {error_msg}")
-                    raise Exception(f"LLM API Error: {response.status_code} - {response.text}")
-                    
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, 
-                   requests.exceptions.RequestException) as e:
-                last_exception = e
-                wait_time = 2 ** attempt  # Exponential backoff
-                error_type = type(e).__name__
-                logger.warning(f"⚠️ Network error on attempt {attempt + 1} ({error_type}): {e}")
-                logger.debug(f"⏳ Waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
-                continue
-                
-            except Exception as e:
-                logger.error(f"❌ Unexpected error on attempt {attempt + 1}: {e}")
-                logger.error(f"❌ Error type: {type(e).__name__}")
-                # If it's not a network error, don't retry
-                if not isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, 
-                                    requests.exceptions.RequestException)):
-                    raise e
-                last_exception = e
+        logger.debug(f"🌐 Making LiteLLM API call to {api_url} (model: {request_body.get('model')})")
+        request_start = time.time()
+        result = self._transport.post_json_sync(api_url, request_body, self._litellm_headers(), max_retries)
+        http_duration = time.time() - request_start
         
-        # If all retries failed, raise the last exception
-        logger.error(f"❌ All retries failed for endpoint: {api_url}")
-        raise last_exception or Exception(f"All retries failed for endpoint: {api_url}")
+        # Includes time spent waiting for a rate-limit / concurrency permit and any retries
+        logger.info(f"⏱️ HTTP request completed in {http_duration:.3f}s")
+        if http_duration > 10.0:
+            logger.warning(f"⚠️ Very slow LLM response ({http_duration:.2f}s) - proxy/LLM is very slow or overloaded")
+        return result
     
-    def call_api_sync(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
-                     task: str, document_name: Optional[str] = None, content_type: str = "image") -> Dict[str, Any]:
+    def call_api_sync(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], 
+                     task: str, document_name: Optional[str] = None, content_type: str = "image",
+                     on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
         """
         Synchronous version: Make API call to LLM provider through LiteLLM
         Thread-safe for use in ThreadPoolExecutor
+        on_section: see call_api (LiteLLM provider only)
         """
         start_time = time.time()
         
@@ -653,40 +487,37 @@ class LLMClient:
                 trace_name = f"llm_call_{task}_page_{page_number}"
         
         # Execute the call (LangSmith tracing is now inside _execute_call_sync, wrapping only the HTTP request)
-        return self._execute_call_sync(prompt, image_data, response_format, task, document_name, start_time, model_to_use, content_type, page_number, trace_name)
+        return self._execute_call_sync(prompt, image_data, response_format, task, document_name, start_time, model_to_use, content_type, page_number, trace_name, on_section)
     
-    def _execute_call_sync(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any], 
+    def _execute_call_sync(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any], 
                            task: str, document_name: Optional[str],
-                           start_time: float, model_to_use: str, content_type: str, page_number: Optional[int] = None, trace_name: Optional[str] = None) -> Dict[str, Any]:
+                           start_time: float, model_to_use: str, content_type: str, page_number: Optional[int] = None, trace_name: Optional[str] = None,
+                           on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
         """Execute the actual synchronous LLM API call"""
         try:
+            cache_key, cached = self._cached_response(model_to_use, task, prompt, image_data, response_format, document_name, content_type)
+            if cached is not None:
+                return cached
+            
             # Log which provider is being used for this call
             if self.provider == "gemini_direct" and self.gemini_client:
                 logger.info(f"🔧 Using Direct Gemini API for {task} (model: {model_to_use})")
-                return self._execute_gemini_direct_call(prompt, image_data, response_format, task, document_name, start_time, content_type)
+                return self._execute_gemini_direct_call(
+                    prompt, image_data, response_format, task, document_name, start_time, content_type,
+                    cache_key=cache_key, model_to_use=model_to_use
+                )
             else:
                 logger.info(f"🔧 Using LiteLLM provider for {task} (model: {model_to_use})")
             
             # Otherwise use LiteLLM provider
-            # Determine API URL for LiteLLM
-            base_url = self.litellm_api_url.rstrip('/')
-            # Allow LITELLM_API_URL to be configured as:
-            # - base host only: https://proxyllm.ximplify.id
-            # - API root:       https://proxyllm.ximplify.id/v1
-            # - full endpoint:  https://proxyllm.ximplify.id/v1/chat/completions
-            if re.search(r"/chat/completions$", base_url):
-                api_url = base_url
-            elif re.search(r"/v1$", base_url):
-                api_url = f"{base_url}/chat/completions"
-            else:
-                api_url = f"{base_url}/v1/chat/completions"
-            
+            api_url = self._litellm_api_url()
             logger.debug(f"🔍 Using LiteLLM endpoint: {api_url}")
             logger.debug(f"🤖 Using model: {model_to_use} (content_type: {content_type})")
             
             # Prepare request body (provider-specific format) - NOT included in LangSmith timing
             prep_start = time.time()
             request_body = self._prepare_request_body(prompt, image_data, response_format, document_name, content_type)
+            parser = self._streaming_parser(task, on_section)
             prep_time = time.time() - prep_start
             logger.debug(f"📝 Request body preparation took: {prep_time*1000:.1f}ms")
             
@@ -714,18 +545,19 @@ class LLMClient:
                 )
                 def _traced_http_call_sync():
                     # This traces ONLY the HTTP request/response time
-                    return self._call_api_with_retry_sync(request_body, api_url)
+                    return self._send_request_sync(request_body, api_url, parser)
                 
                 result = _traced_http_call_sync()
             else:
                 # No LangSmith tracing - just make the call
-                result = self._call_api_with_retry_sync(request_body, api_url)
+                result = self._send_request_sync(request_body, api_url, parser)
             
             # Process the result to normalize the structure
             # This is NOT included in LangSmith timing
             parse_start = time.time()
-            processed_result = self.process_api_result(result, task)
+            processed_result = self._process_result(result, task, parser)
             parse_time = time.time() - parse_start
+            self._store_response(cache_key, model_to_use, task, processed_result, self._finish_reason(result))
             
             # Calculate duration
             duration = time.time() - start_time
@@ -747,14 +579,15 @@ class LLMClient:
             logger.error(f"❌ Error in LLM API call: {e}")
             raise
 
-    def _execute_gemini_direct_call(self, prompt: str, image_data: Optional[str], response_format: Dict[str, Any],
-                                     task: str, document_name: Optional[str], start_time: float, content_type: str) -> Dict[str, Any]:
+    def _execute_gemini_direct_call(self, prompt: str, image_data: Optional[Union[str, PageImage]], response_format: Dict[str, Any],
+                                     task: str, document_name: Optional[str], start_time: float, content_type: str,
+                                     cache_key: Optional[str] = None, model_to_use: Optional[str] = None) -> Dict[str, Any]:
         """Execute LLM call using direct Gemini API (google-generativeai SDK)
         
         Uses Gemini's native response_schema for structured output when available.
         This ensures valid JSON output without truncation or formatting issues.
+        A clean, complete response is stored in the response cache under cache_key (if given).
         """
-        import base64
         from PIL import Image
         import io
         from .extraction_schemas import get_gemini_schema_for_task, log_schema_usage
@@ -791,17 +624,18 @@ class LLMClient:
                 content_parts.append(full_prompt)
                 
                 if image_data:
-                    # Remove data URL prefix if present
-                    if "," in image_data:
-                        image_data = image_data.split(",", 1)[1]
-                    
-                    # Decode base64 image
-                    image_bytes = base64.b64decode(image_data)
+                    # Raw bytes for PageImage; base64 / data URL strings are decoded
+                    image_bytes = image_to_bytes(image_data)
                     pil_image = Image.open(io.BytesIO(image_bytes))
                     content_parts.append(pil_image)
             
-            # Make API call with retry
-            max_retries = 3
+            # Token cost reserved against the model's tokens/min budget until usage is known
+            estimated_tokens = len(full_prompt) // 4 + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+            if content_type != "text" and image_data:
+                estimated_tokens += settings.LLM_IMAGE_TOKEN_ESTIMATE
+            
+            # Make API call with retry (rate limits and adaptive concurrency shared with LiteLLM calls)
+            max_retries = settings.LLM_MAX_RETRIES
             last_error = None
             
             for attempt in range(max_retries):
@@ -840,11 +674,21 @@ class LLMClient:
                         response_schema=gen_config_params.get("response_schema")
                     )
                     
-                    response = self.gemini_client.models.generate_content(
-                        model=self.gemini_model_name,
-                        contents=content_parts,
-                        config=config
-                    )
+                    with self._transport.limited_sync(self.gemini_model_name, estimated_tokens) as permit:
+                        try:
+                            response = self.gemini_client.models.generate_content(
+                                model=self.gemini_model_name,
+                                contents=content_parts,
+                                config=config
+                            )
+                            permit.status = 200
+                            if response.usage_metadata:
+                                permit.used_tokens = response.usage_metadata.total_token_count
+                        except Exception as e:
+                            error_str = str(e).lower()
+                            if "quota" in error_str or "rate" in error_str or "429" in error_str:
+                                permit.status = 429
+                            raise
                     api_duration = time.time() - api_start
                     
                     # Log timing
@@ -885,6 +729,7 @@ class LLMClient:
                     parse_start = time.time()
                     processed_result = self.process_api_result(result, task)
                     parse_time = time.time() - parse_start
+                    self._store_response(cache_key, model_to_use or "gemini-2.0-flash", task, processed_result, finish_reason)
                     
                     duration = time.time() - start_time
                     logger.info(f"⏱️ LLM call completed - Task: {task}, Model: gemini-2.0-flash, Duration: {duration:.2f}s")
@@ -904,15 +749,15 @@ class LLMClient:
                     error_str = str(e).lower()
                     
                     # Check for rate limit or quota errors
+                    if attempt == max_retries - 1:
+                        raise
+                    # Jittered so throttled threads don't retry in lockstep
+                    wait_time = self._transport.backoff(attempt)
                     if "quota" in error_str or "rate" in error_str or "429" in error_str:
-                        wait_time = (attempt + 1) * 5  # 5s, 10s, 15s
-                        logger.warning(f"⚠️ Gemini rate limit hit, waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                        time.sleep(wait_time)
-                    elif attempt < max_retries - 1:
-                        logger.warning(f"⚠️ Gemini API error on attempt {attempt + 1}: {e}")
-                        time.sleep(1)
+                        logger.warning(f"⚠️ Gemini rate limit hit, waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}")
                     else:
-                        raise
+                        logger.warning(f"⚠️ Gemini API error on attempt {attempt + 1}: {e}")
+                    time.sleep(wait_time)
             
             raise last_error or Exception("Max retries exceeded")
             
@@ -1144,6 +989,37 @@ class LLMClient:
             logger.error(f"Error processing API result: {e}")
             raise
 
+    def process_streamed_result(self, result: Dict[str, Any], parser: IncrementalJSONParser, task: str) -> Dict[str, Any]:
+        """
+        Process a streamed response whose content was already parsed incrementally
+        
+        A closed root value is used as-is; on truncation every complete field / section the parser
+        retained is returned (flagged _partial). Content without any JSON value goes through the
+        regular process_api_result repair pipeline.
+        """
+        if parser.value is None or not isinstance(parser.value, (dict, list)):
+            return self.process_api_result(result, task)
+        
+        finish_reason = (result.get("choices") or [{}])[0].get("finish_reason")
+        parsed_result = parser.value
+        if task == "document_type_detection":
+            if parser.complete:
+                logger.info(f"✅ Returning raw JSON for document_type_detection: {parsed_result}")
+                return parsed_result
+            return self.process_api_result(result, task)
+        
+        normalized_result = self._normalize_result_structure(parsed_result, task)
+        if isinstance(normalized_result, dict):
+            normalized_result["_parsed"] = parsed_result
+            if not parser.complete:
+                normalized_result["_partial"] = True
+                normalized_result["_parse_warning"] = "Response was truncated, complete sections retained"
+        if parser.complete:
+            logger.debug(f"✅ Parsed streamed JSON response for task: {task} ({parser.chars} chars)")
+        else:
+            logger.warning(f"⚠️ Streamed response for {task} ended early (finish_reason: {finish_reason}) - keeping complete sections")
+        return normalized_result
+
     def _sanitize_json_content(self, content: str) -> str:
         """
         Fix: Sanitize JSON content to handle invalid Unicode escape sequences and newlines in strings
@@ -307,10 +307,10 @@ class ParallelPageProcessor:
         pool3_max_workers = min(effective_max_workers, 100)
         
         try:
-            self.llm_client._get_sync_session(pool_connections=1, max_connections=pool3_max_workers)
-            logger.info(f"🌐 Configured thread-local HTTP sessions - pool_maxsize: {pool3_max_workers}")
+            self.llm_client.warm_up()
+            logger.info(f"🌐 LLM transport ready for {pool3_max_workers} LLM workers")
         except Exception as e:
-            logger.warning(f"⚠️ Failed to pre-initialize HTTP session: {e}")
+            logger.warning(f"⚠️ Failed to pre-initialize LLM transport: {e}")
             
         pool4 = ThreadPoolExecutor(max_workers=min(effective_max_workers, 50))
         pool_yolo = ThreadPoolExecutor(max_workers=min(effective_max_workers, 20)) if self.yolo_detector.is_enabled() else None
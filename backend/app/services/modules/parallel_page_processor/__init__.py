@@ -10,6 +10,9 @@ Module Structure:
 - pipeline_stages: Step 8, 9, and encoding/LLM processing stages
 - callbacks: Pipeline callback factory for stage completion handling
 - page_methods: Per-page processing methods for extraction and template matching
+- stage_scheduler: Process-wide shared stage pools with per-request fair queuing
+- page_batching: Multi-page LLM requests for consecutive short text pages
+- region_prefilter: Classical pre-filter deciding which pages/regions need YOLO
 
 Usage:
     from .parallel_page_processor import (
@@ -47,6 +50,11 @@ from .pipeline_stages import (
     process_encoding_and_llm,
 )
 from .callbacks import PipelineCallbackFactory
+from .stage_scheduler import (
+    StageScheduler,
+    RequestStageExecutor,
+    get_stage_scheduler,
+)
 from .page_methods import (
     process_page_for_extraction_sync,
     process_page_for_template_extraction,
@@ -73,6 +81,10 @@ __all__ = [
     "process_encoding_and_llm",
     # Callbacks
     "PipelineCallbackFactory",
+    # Stage scheduler
+    "StageScheduler",
+    "RequestStageExecutor",
+    "get_stage_scheduler",
     # Page methods
     "process_page_for_extraction_sync",
     "process_page_for_template_extraction",
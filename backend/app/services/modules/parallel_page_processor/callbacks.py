@@ -9,13 +9,21 @@ stage of the pipeline completes. The callbacks handle:
 - Memory cleanup
 
 These callbacks form a chain: Stage N completion triggers Stage N+1 submission.
+Every terminal outcome (Stage 9 result or unrecoverable error) goes through
+_finalize_page, which hands the result to the event loop so the pipeline can
+await completion instead of polling.
 """
 
+import asyncio
 import logging
+import threading
 import time
 import traceback
 from typing import Dict, Any, List, Optional, Callable, TYPE_CHECKING
-from concurrent.futures import Future, CancelledError, ThreadPoolExecutor
+from concurrent.futures import Future, CancelledError, Executor
+
+from .page_batching import PageBatcher, resolve_futures, run_text_batch
+from .region_prefilter import RegionPrefilter, get_region_prefilter
 
 if TYPE_CHECKING:
     from ..pdf_processor import PDFProcessor
@@ -98,12 +106,12 @@ class PipelineCallbackFactory:
         self.stage8_futures: Dict[Future, int] = {}
         self.stage9_futures: Dict[Future, int] = {}
         
-        # Thread pools (will be set by the pipeline)
-        self.pool1: Optional[ThreadPoolExecutor] = None
-        self.pool2: Optional[ThreadPoolExecutor] = None
-        self.pool3: Optional[ThreadPoolExecutor] = None
-        self.pool4: Optional[ThreadPoolExecutor] = None
-        self.pool_yolo: Optional[ThreadPoolExecutor] = None
+        # Stage executors (will be set by the pipeline; shared stage pools in production)
+        self.pool1: Optional[Executor] = None
+        self.pool2: Optional[Executor] = None
+        self.pool3: Optional[Executor] = None
+        self.pool4: Optional[Executor] = None
+        self.pool_yolo: Optional[Executor] = None
         
         # Step methods (will be set by the pipeline)
         self._step1_6_yolo_signature_detection: Optional[Callable] = None
@@ -113,22 +121,78 @@ class PipelineCallbackFactory:
         self._step1_6_yolo_face_detection_full_page: Optional[Callable] = None
         self._step8_parse_response: Optional[Callable] = None
         self._step9_process_signatures: Optional[Callable] = None
+        
+        # Multi-page LLM batching for text pages (enabled by the pipeline)
+        self.page_batcher: Optional[PageBatcher] = None
+        
+        # Classical pre-filter deciding where Stage 1.6 YOLO runs (enabled by the pipeline)
+        self.region_prefilter: Optional[RegionPrefilter] = None
+        
+        # Final result delivery (will be bound by the pipeline)
+        self._finalize_lock = threading.Lock()
+        self._finalized_pages: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._result_queue: Optional[asyncio.Queue] = None
+    
+    def bind_result_queue(self, loop: asyncio.AbstractEventLoop, result_queue: asyncio.Queue):
+        """Deliver each finalized (page_num, result) pair to result_queue on loop."""
+        self._loop = loop
+        self._result_queue = result_queue
+    
+    def _finalize_page(self, page_num: int, result: Dict[str, Any]) -> bool:
+        """
+        Record the terminal result for a page and notify the event loop.
+        
+        Called from worker threads. Only the first result per page is kept, so a
+        late error from a stray future cannot overwrite or double-count a page.
+        
+        Returns:
+            True if this call finalized the page, False if it was already final.
+        """
+        with self._finalize_lock:
+            if page_num in self._finalized_pages:
+                return False
+            self._finalized_pages.add(page_num)
+            self.results_dict[page_num] = result
+            self.completion_counts[9] += 1
+        
+        if self._loop is not None and self._result_queue is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._result_queue.put_nowait, (page_num, result))
+            except RuntimeError:
+                # Event loop already closed (pipeline timed out or was abandoned)
+                logger.debug(f"⚠️ [Page {page_num + 1}] Result ready after event loop closed")
+        return True
     
     def set_pools(
         self,
-        pool1: ThreadPoolExecutor,
-        pool2: ThreadPoolExecutor,
-        pool3: ThreadPoolExecutor,
-        pool4: ThreadPoolExecutor,
-        pool_yolo: Optional[ThreadPoolExecutor] = None
+        pool1: Executor,
+        pool2: Executor,
+        pool3: Executor,
+        pool4: Executor,
+        pool_yolo: Optional[Executor] = None
     ):
-        """Set the thread pools used by callbacks."""
+        """Set the stage executors used by callbacks."""
         self.pool1 = pool1
         self.pool2 = pool2
         self.pool3 = pool3
         self.pool4 = pool4
         self.pool_yolo = pool_yolo
     
+    def enable_page_batching(self, budget: int, max_pages: int, page_max_tokens: int, linger_s: float):
+        """Send consecutive short text pages to Stage 7 together (see page_batching.py)."""
+        self.page_batcher = PageBatcher(self._submit_text_group, budget, max_pages, page_max_tokens, linger_s)
+    
+    def enable_region_prefilter(self):
+        """Skip or narrow Stage 1.6 YOLO using the Stage 4 image and Step 1.4 image blocks (see region_prefilter.py)."""
+        self.region_prefilter = get_region_prefilter()
+    
+    def _yolo_wanted(self) -> bool:
+        """Whether Stage 1.6 YOLO can run for this request at all."""
+        if self.process_context.get("task", "") in ("template_matching", "db_template_matching"):
+            return False
+        return self.yolo_detector.is_enabled() or bool(self.face_detector and self.face_detector.is_enabled())
+    
     def set_step_methods(
         self,
         step1_6_yolo: Callable,
@@ -157,7 +221,7 @@ class PipelineCallbackFactory:
         try:
             page = future.result()
             if not page:
-                self.results_dict[page_num] = {"error": f"Step 1.3 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 1.3 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
 
             self.page_data[page_num]["page"] = page
@@ -170,7 +234,7 @@ class PipelineCallbackFactory:
                 stage1_4_future.add_done_callback(self.on_stage1_4_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 1.3 for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 1.4 Callback: Extract Text Content → Stage 1.5
@@ -181,7 +245,7 @@ class PipelineCallbackFactory:
         try:
             text_data = future.result()
             if not text_data:
-                self.results_dict[page_num] = {"error": f"Step 1.4 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 1.4 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
 
             self.page_data[page_num]["text_data"] = text_data
@@ -199,7 +263,7 @@ class PipelineCallbackFactory:
             stage1_5_future.add_done_callback(self.on_stage1_5_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 1.4 for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 1.5 Callback: Analyze Text Quality → Decision Point
@@ -210,7 +274,7 @@ class PipelineCallbackFactory:
         try:
             quality_data = future.result()
             if not quality_data:
-                self.results_dict[page_num] = {"error": f"Step 1.5 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 1.5 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
             
             text_data = self.page_data[page_num].get("text_data", {})
@@ -229,7 +293,7 @@ class PipelineCallbackFactory:
                 self._handle_image_fallback_path(page_num)
         except Exception as e:
             logger.error(f"❌ Error in Step 1.5 for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
     
     def _handle_text_path(self, page_num: int, text_data: Dict, quality_data: Dict, confidence: float):
         """Handle the TEXT extraction path after quality check passes."""
@@ -251,6 +315,8 @@ class PipelineCallbackFactory:
         skip_yolo_tasks = ["template_matching", "db_template_matching"]
         
         image_blocks = self.page_data[page_num].get("image_blocks", [])
+        if self.region_prefilter and image_blocks and task not in skip_yolo_tasks:
+            image_blocks = self.region_prefilter.filter_image_blocks(image_blocks)
         if self.yolo_detector.is_enabled() and image_blocks and len(image_blocks) > 0 and task not in skip_yolo_tasks:
             page = self.page_data[page_num].get("page")
             if page and self.pool_yolo:
@@ -276,6 +342,17 @@ class PipelineCallbackFactory:
     
     def _handle_image_fallback_path(self, page_num: int):
         """Handle the IMAGE fallback path when text extraction fails."""
+        # Stage 1.3 already resolved the page from the shared (cached) document, so
+        # render it directly instead of decoding and reopening the whole PDF per page
+        page = self.page_data[page_num].get("page")
+        if page is not None:
+            self.completion_counts[1] += 1
+            logger.debug(f"✅ [Page {page_num + 1}] Step 1 (Image conversion fallback) reusing shared page ({self.completion_counts[1]}/{self.total_pages})")
+            stage2_future = self.pool1.submit(self.pdf_processor.step1_10_render_page_to_pixmap, page)
+            self.stage2_futures[stage2_future] = page_num
+            stage2_future.add_done_callback(self.on_stage2_complete)
+            return
+        
         # This method handles the nested fallback callbacks
         pdf_data = self.process_context.get("_pdf_data", "")
         
@@ -288,7 +365,7 @@ class PipelineCallbackFactory:
             try:
                 pdf_bytes = fallback_future.result()
                 if not pdf_bytes:
-                    self.results_dict[page_num_fallback] = {"error": f"Step 1.7 failed for page {page_num_fallback + 1}", "page_num": page_num_fallback + 1}
+                    self._finalize_page(page_num_fallback, {"error": f"Step 1.7 failed for page {page_num_fallback + 1}", "page_num": page_num_fallback + 1})
                     return
                 
                 # Step 1.8: Open PDF Document
@@ -300,7 +377,7 @@ class PipelineCallbackFactory:
                     try:
                         pdf_document = doc_future.result()
                         if not pdf_document:
-                            self.results_dict[page_num_doc] = {"error": f"Step 1.8 failed for page {page_num_doc + 1}", "page_num": page_num_doc + 1}
+                            self._finalize_page(page_num_doc, {"error": f"Step 1.8 failed for page {page_num_doc + 1}", "page_num": page_num_doc + 1})
                             return
                         
                         self.page_data[page_num_doc]["pdf_document"] = pdf_document
@@ -314,7 +391,7 @@ class PipelineCallbackFactory:
                             try:
                                 page = page_future_inner.result()
                                 if not page:
-                                    self.results_dict[page_num_page] = {"error": f"Step 1.9 failed for page {page_num_page + 1}", "page_num": page_num_page + 1}
+                                    self._finalize_page(page_num_page, {"error": f"Step 1.9 failed for page {page_num_page + 1}", "page_num": page_num_page + 1})
                                     return
                                 
                                 self.page_data[page_num_page]["page"] = page
@@ -327,17 +404,17 @@ class PipelineCallbackFactory:
                                 stage2_future.add_done_callback(self.on_stage2_complete)
                             except Exception as e:
                                 logger.error(f"❌ Error in Step 1.9 for page {page_num_page + 1}: {e}")
-                                self.results_dict[page_num_page] = {"error": str(e), "page_num": page_num_page + 1}
+                                self._finalize_page(page_num_page, {"error": str(e), "page_num": page_num_page + 1})
                         
                         page_future.add_done_callback(on_step1_9_complete)
                     except Exception as e:
                         logger.error(f"❌ Error in Step 1.8 for page {page_num_doc + 1}: {e}")
-                        self.results_dict[page_num_doc] = {"error": str(e), "page_num": page_num_doc + 1}
+                        self._finalize_page(page_num_doc, {"error": str(e), "page_num": page_num_doc + 1})
                 
                 pdf_doc_future.add_done_callback(on_step1_8_complete)
             except Exception as e:
                 logger.error(f"❌ Error in Step 1.7 for page {page_num_fallback + 1}: {e}")
-                self.results_dict[page_num_fallback] = {"error": str(e), "page_num": page_num_fallback + 1}
+                self._finalize_page(page_num_fallback, {"error": str(e), "page_num": page_num_fallback + 1})
         
         pdf_bytes_future.add_done_callback(on_step1_7_complete)
 
@@ -419,7 +496,7 @@ class PipelineCallbackFactory:
         try:
             pix = future.result()
             if not pix:
-                self.results_dict[page_num] = {"error": f"Step 2 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 2 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
             
             self.page_data[page_num]["pix"] = pix
@@ -432,7 +509,7 @@ class PipelineCallbackFactory:
             stage3_future.add_done_callback(self.on_stage3_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 2 (PDF rendering) for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 3 Callback: PIL Image Creation → Stage 4
@@ -443,7 +520,7 @@ class PipelineCallbackFactory:
         try:
             img = future.result()
             if not img:
-                self.results_dict[page_num] = {"error": f"Step 3 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 3 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
             
             self.page_data[page_num]["img"] = img
@@ -466,7 +543,7 @@ class PipelineCallbackFactory:
             stage4_future.add_done_callback(self.on_stage4_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 3 (PIL image creation) for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 4 Callback: Store Original + Text Enhancement → Stage 6
@@ -481,13 +558,26 @@ class PipelineCallbackFactory:
             self.completion_counts[4] += 1
             logger.debug(f"✅ [Page {page_num + 1}] Step 4 (Store original + enhancement) complete ({self.completion_counts[4]}/{self.total_pages})")
             
+            # Analyse candidate regions on the thresholded image while the LLM call runs;
+            # Stage 1.6 waits on this future only if the LLM flags a signature / photo
+            if self.region_prefilter and self.pool_yolo and self._yolo_wanted():
+                page = self.page_data[page_num].get("page")
+                # Step 1.4 block bboxes are in unrotated page space; let the ink decide on rotated pages
+                page_size = (page.rect.width, page.rect.height) if page is not None and not page.rotation else None
+                self.page_data[page_num]["region_prefilter"] = self.pool_yolo.submit(
+                    self.region_prefilter.analyze,
+                    processed_img,
+                    self.page_data[page_num].get("image_blocks"),
+                    page_size
+                )
+            
             # Skip Stage 5 - directly submit to Stage 6 (encoding)
-            stage6_future = self.pool2.submit(self.pdf_processor._encode_image_simple, processed_img)
+            stage6_future = self.pool2.submit(self.pdf_processor._encode_image_bytes, processed_img)
             self.stage6_futures[stage6_future] = page_num
             stage6_future.add_done_callback(self.on_stage6_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 4 (Store original + enhancement) for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 6 Callbacks: Encoding → Stage 7
@@ -508,41 +598,83 @@ class PipelineCallbackFactory:
             self.completion_counts[6] += 1
             logger.debug(f"✅ [Page {page_num + 1}] Step 6 (Text ready) complete ({self.completion_counts[6]}/{self.total_pages})")
             
-            # Submit to Stage 7 (LLM call with text)
-            task = self.process_context.get("task")
-            document_name = self.process_context.get("document_name", "Unknown")
-            templates = self.process_context.get("templates")
-            db_templates = self.process_context.get("db_templates")
-            document_type = self.process_context.get("document_type")
-            is_first_page = self.process_context.get("is_first_page", True)
-            table_headers = self.process_context.get("table_headers", [])
-            
-            # Build prompt context for bank statements
-            prompt_context = {
-                "is_first_page": is_first_page,
-                "table_headers": table_headers,
-                "page_number": page_num + 1
-            }
-            prompt, response_format = self.prompt_service.get_task_prompt(
-                task, templates, db_templates, content_type="text",
-                document_type=document_type, context=prompt_context
-            )
-            
-            logger.info(f"🚀 [Page {page_num + 1}] Submitting to Step 7 (LLM API call with text)")
-            stage7_future = self.pool3.submit(
-                self.llm_client.call_api_sync,
-                prompt, text, response_format, task,
-                f"{document_name} (page {page_num + 1})",
-                "text"
-            )
-            self.stage7_futures[stage7_future] = page_num
-            stage7_future.add_done_callback(self.on_stage7_complete)
+            # Submit to Stage 7 (LLM call with text), or hold it for a multi-page request
+            if self.page_batcher is not None and self.page_batcher.add(page_num, text):
+                logger.debug(f"📦 [Page {page_num + 1}] Queued for a multi-page LLM request")
+                return
+            self._submit_text_llm_call(page_num, text)
         except KeyError as e:
             logger.error(f"❌ Error in Step 6 (Text path): Future not found: {e}")
         except Exception as e:
             logger.error(f"❌ Error in Step 6 (Text path): {e}", exc_info=True)
             if 'page_num' in locals():
-                self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
+
+    def _text_prompt(self, page_num: int):
+        """Prompt and response format for a text-path page."""
+        task = self.process_context.get("task")
+        templates = self.process_context.get("templates")
+        db_templates = self.process_context.get("db_templates")
+        document_type = self.process_context.get("document_type")
+        is_first_page = self.process_context.get("is_first_page", True)
+        table_headers = self.process_context.get("table_headers", [])
+        
+        # Build prompt context for bank statements
+        prompt_context = {
+            "is_first_page": is_first_page,
+            "table_headers": table_headers,
+            "page_number": page_num + 1
+        }
+        return self.prompt_service.get_task_prompt(
+            task, templates, db_templates, content_type="text",
+            document_type=document_type, context=prompt_context
+        )
+
+    def _submit_text_llm_call(self, page_num: int, text: str):
+        """Submit a single text page to Stage 7."""
+        task = self.process_context.get("task")
+        document_name = self.process_context.get("document_name", "Unknown")
+        prompt, response_format = self._text_prompt(page_num)
+        
+        logger.info(f"🚀 [Page {page_num + 1}] Submitting to Step 7 (LLM API call with text)")
+        stage7_future = self.pool3.submit(
+            self.llm_client.call_api_sync,
+            prompt, text, response_format, task,
+            f"{document_name} (page {page_num + 1})",
+            "text"
+        )
+        self.stage7_futures[stage7_future] = page_num
+        stage7_future.add_done_callback(self.on_stage7_complete)
+
+    def _submit_text_group(self, pages: List[tuple]):
+        """Submit consecutive text pages released by the page batcher as one Stage 7 request."""
+        try:
+            if len(pages) == 1:
+                self._submit_text_llm_call(*pages[0])
+                return
+            
+            task = self.process_context.get("task")
+            document_name = self.process_context.get("document_name", "Unknown")
+            prompt, response_format = self._text_prompt(pages[0][0])
+            
+            # One future per page, so Stage 7 completion and retries stay per page
+            page_futures: Dict[int, Future] = {}
+            for page_num, _ in pages:
+                page_future: Future = Future()
+                page_futures[page_num] = page_future
+                self.stage7_futures[page_future] = page_num
+                page_future.add_done_callback(self.on_stage7_complete)
+            
+            logger.info(f"🚀 [Pages {pages[0][0] + 1}-{pages[-1][0] + 1}] Submitting to Step 7 (one LLM call for {len(pages)} text pages)")
+            batch_future = self.pool3.submit(
+                run_text_batch,
+                self.llm_client, prompt, response_format, task, document_name, pages, self.page_batcher.stats
+            )
+            batch_future.add_done_callback(lambda f: resolve_futures(page_futures, f))
+        except Exception as e:
+            logger.error(f"❌ Error submitting pages {[p + 1 for p, _ in pages]} to Step 7: {e}", exc_info=True)
+            for page_num, _ in pages:
+                self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     def on_stage6_complete(self, future: Future):
         """Callback: Move to Stage 7 immediately when Stage 6 completes (image path)"""
@@ -598,7 +730,7 @@ class PipelineCallbackFactory:
         except Exception as e:
             logger.error(f"❌ Error in Step 6 (Base64 encoding): {e}", exc_info=True)
             if 'page_num' in locals():
-                self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
 
     # =========================================================================
     # Stage 7 Callback: LLM API Call → Stage 8
@@ -637,7 +769,8 @@ class PipelineCallbackFactory:
                         stage1_6_future = self.pool_yolo.submit(
                             self._step1_6_yolo_signature_detection_full_page_from_pil,
                             page_num,
-                            original_img
+                            original_img,
+                            self.page_data[page_num].get("region_prefilter")
                         )
                         self.stage1_6_futures[stage1_6_future] = page_num
                         stage1_6_future.add_done_callback(self.on_stage1_6_complete)
@@ -667,7 +800,8 @@ class PipelineCallbackFactory:
                         face_future = self.pool_yolo.submit(
                             self._step1_6_yolo_face_detection_full_page_from_pil,
                             page_num,
-                            original_img
+                            original_img,
+                            self.page_data[page_num].get("region_prefilter")
                         )
                         self.stage1_6_face_futures[face_future] = page_num
                         face_future.add_done_callback(self.on_stage1_6_face_complete)
@@ -740,13 +874,12 @@ class PipelineCallbackFactory:
             stage7_future.add_done_callback(self.on_stage7_complete)
         else:
             logger.error(f"❌ [Page {page_num + 1}] Step 7 failed after {retry_count} retries: {error}")
-            self.results_dict[page_num] = {
+            self._finalize_page(page_num, {
                 "error": str(error),
                 "page_num": page_num + 1,
                 "retry_count": retry_count,
                 "failed_stage": "LLM API call"
-            }
-            self.completion_counts[9] += 1
+            })
 
     # =========================================================================
     # Stage 8 Callback: Response Parsing → Stage 9
@@ -791,22 +924,20 @@ class PipelineCallbackFactory:
                 stage8_future.add_done_callback(self.on_stage8_complete)
             else:
                 logger.error(f"❌ [Page {page_num + 1}] Cannot retry Step 8: LLM result not available")
-                self.results_dict[page_num] = {
+                self._finalize_page(page_num, {
                     "error": str(error),
                     "page_num": page_num + 1,
                     "retry_count": retry_count,
                     "failed_stage": "Response parsing"
-                }
-                self.completion_counts[9] += 1
+                })
         else:
             logger.error(f"❌ [Page {page_num + 1}] Step 8 failed after {retry_count} retries: {error}")
-            self.results_dict[page_num] = {
+            self._finalize_page(page_num, {
                 "error": str(error),
                 "page_num": page_num + 1,
                 "retry_count": retry_count,
                 "failed_stage": "Response parsing"
-            }
-            self.completion_counts[9] += 1
+            })
 
     # =========================================================================
     # Stage 9 Callback: Signature Processing → Final Result
@@ -816,8 +947,7 @@ class PipelineCallbackFactory:
         page_num = self.stage9_futures[future]
         try:
             final_result = future.result()
-            self.results_dict[page_num] = final_result
-            self.completion_counts[9] += 1
+            self._finalize_page(page_num, final_result)
             
             # Log progress at INFO level for every 5 pages or first/last page
             if self.completion_counts[9] == 1 or self.completion_counts[9] == self.total_pages or self.completion_counts[9] % 5 == 0:
@@ -839,6 +969,8 @@ class PipelineCallbackFactory:
                     del self.page_data[page_num]["img"]
                 if "img_a4" in self.page_data[page_num]:
                     del self.page_data[page_num]["img_a4"]
+                if "region_prefilter" in self.page_data[page_num]:
+                    del self.page_data[page_num]["region_prefilter"]
             except Exception:
                 pass
         except Exception as e:
@@ -859,13 +991,12 @@ class PipelineCallbackFactory:
             stage9_future.add_done_callback(self.on_stage9_complete)
         else:
             logger.error(f"❌ [Page {page_num + 1}] Step 9 failed after {retry_count} retries: {error}")
-            self.results_dict[page_num] = {
+            self._finalize_page(page_num, {
                 "error": str(error),
                 "page_num": page_num + 1,
                 "retry_count": retry_count,
                 "failed_stage": "Signature processing"
-            }
-            self.completion_counts[9] += 1
+            })
 
     # =========================================================================
     # Skip-Text Mode Callback
@@ -876,7 +1007,7 @@ class PipelineCallbackFactory:
         try:
             page = future.result()
             if not page:
-                self.results_dict[page_num] = {"error": f"Step 1.3 failed for page {page_num + 1}", "page_num": page_num + 1}
+                self._finalize_page(page_num, {"error": f"Step 1.3 failed for page {page_num + 1}", "page_num": page_num + 1})
                 return
             
             self.page_data[page_num]["page"] = page
@@ -888,4 +1019,4 @@ class PipelineCallbackFactory:
             stage2_future.add_done_callback(self.on_stage2_complete)
         except Exception as e:
             logger.error(f"❌ Error in Step 1.3 for page {page_num + 1}: {e}")
-            self.results_dict[page_num] = {"error": str(e), "page_num": page_num + 1}
+            self._finalize_page(page_num, {"error": str(e), "page_num": page_num + 1})
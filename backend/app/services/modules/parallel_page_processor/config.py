@@ -12,6 +12,9 @@ MAX_RETRIES = 1  # Number of retries for failed operations
 # =============================================================================
 # Thread Pool Sizes (for concurrent operations)
 # =============================================================================
+# These are process-wide caps: every request shares one pool per stage
+# (see stage_scheduler.py), so they bound total threads regardless of how
+# many documents are being processed concurrently.
 CONVERSION_POOL_SIZE = 50   # PDF page to image conversion
 ENCODING_POOL_SIZE = 50     # Image encoding to base64
 LLM_POOL_SIZE = 100         # LLM API calls (I/O bound)
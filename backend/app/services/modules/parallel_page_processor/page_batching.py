@@ -0,0 +1,341 @@
+"""
+Multi-page batching of Stage 7 LLM extraction calls.
+
+Stage 7 sends one request per page and repeats the full extraction prompt from
+PromptService with every page. On documents with many short text pages, most of
+each request's input tokens go to the prompt. PageBatcher packs consecutive
+low-complexity text pages into one request under a token budget:
+
+- a page is batchable when its estimated cost (input + expected output tokens)
+  is at most LLM_PAGE_BATCH_PAGE_MAX_TOKENS; larger pages are sent alone as before;
+- ready pages wait up to LLM_PAGE_BATCH_LINGER_MS for their neighbours; a run of
+  consecutive pages is sent as soon as it fills the budget or the page limit;
+- the model answers {"pages": [{"page_number": n, "data": {...}}, ...]} and
+  split_multi_page_result turns that back into one regular result per page;
+- pages missing from the answer, and the last page of a truncated answer, are
+  re-sent as single-page calls.
+
+BatchStats counts requests, fallbacks and the prompt tokens saved per document.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+BATCHABLE_TASKS = ("without_template_extraction",)
+TEXT_OUTPUT_RATIO = 1.5  # Extracted JSON is ~1.5x the tokens of the page text it came from
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def text_page_cost(text: str) -> int:
+    """Estimated input + output tokens for extracting one text page."""
+    tokens = estimate_tokens(text)
+    return tokens + int(tokens * TEXT_OUTPUT_RATIO)
+
+
+def pack_pages(pages: List[Tuple[int, int]], budget: int, max_pages: int) -> List[List[int]]:
+    """
+    Split (page_num, cost) pairs into groups of consecutive pages under budget.
+
+    A group never spans a gap in page numbers, holds at most max_pages pages, and
+    only exceeds budget when a single page does.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_cost = 0
+    previous: Optional[int] = None
+    for page_num, cost in sorted(pages):
+        if current and (page_num != previous + 1 or current_cost + cost > budget or len(current) >= max_pages):
+            groups.append(current)
+            current, current_cost = [], 0
+        current.append(page_num)
+        current_cost += cost
+        previous = page_num
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_multi_page_prompt(prompt: str, page_numbers: List[int]) -> str:
+    """Wrap a single-page extraction prompt so the model answers once per page (1-based page numbers)."""
+    listed = ", ".join(str(n) for n in page_numbers)
+    return (
+        f"{prompt}\n\n"
+        f"**MULTI-PAGE REQUEST:**\n"
+        f"The content below contains {len(page_numbers)} pages ({listed}), each starting with a "
+        f"\"=== Page N ===\" marker. Apply the instructions above to each page separately and return ONE JSON object:\n"
+        f"{{\"pages\": [{{\"page_number\": N, \"data\": {{...the JSON object the instructions above ask for, for page N only...}}}}]}}\n"
+        f"- Exactly one entry per page, in page order, with the page number from its marker\n"
+        f"- Never move data from one page into another page's entry"
+    )
+
+
+def combine_page_texts(pages: List[Tuple[int, str]]) -> str:
+    """Join (1-based page number, text) pairs with the page markers the multi-page prompt refers to."""
+    return "\n\n".join(f"=== Page {page_number} ===\n{text}" for page_number, text in pages)
+
+
+def multi_page_response_format(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Wrap a json_schema response format into the {"pages": [{"page_number", "data"}]} envelope."""
+    if not response_format or response_format.get("type") != "json_schema":
+        return response_format
+    json_schema = response_format.get("json_schema", {})
+    page_schema = json_schema.get("schema", {"type": "object"})
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{json_schema.get('name', 'extraction')}_pages",
+            "strict": False,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "pages": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {"page_number": {"type": "integer"}, "data": page_schema},
+                            "required": ["page_number", "data"],
+                        },
+                    }
+                },
+                "required": ["pages"],
+            },
+        },
+    }
+
+
+def split_multi_page_result(
+    llm_client: 'LLMClient',
+    result: Dict[str, Any],
+    task: str,
+    page_numbers: List[int],
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Turn a processed multi-page response into regular per-page results.
+
+    Returns the pages (1-based) that came back complete; callers re-send the rest.
+    When the response was truncated (partial or repaired JSON), the last page
+    entry may be cut short and is dropped.
+    """
+    parsed = result.get("_parsed", result.get("hierarchical_data")) if isinstance(result, dict) else None
+    entries = parsed.get("pages") if isinstance(parsed, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    if result.get("_partial") or result.get("_repaired"):
+        entries = entries[:-1]
+
+    expected = set(page_numbers)
+    pages: Dict[int, Dict[str, Any]] = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get("data"), dict):
+            continue
+        page_number = entry.get("page_number")
+        if page_number not in expected and position < len(page_numbers):
+            page_number = page_numbers[position]
+        if page_number not in expected or page_number in pages:
+            continue
+        data = entry["data"]
+        normalized = llm_client._normalize_result_structure(data, task)
+        if isinstance(normalized, dict):
+            normalized["_parsed"] = data
+            normalized["_batched_pages"] = list(page_numbers)
+            if "_timing" in result:
+                normalized["_timing"] = result["_timing"]
+        pages[page_number] = normalized
+    return pages
+
+
+@dataclass
+class BatchStats:
+    """Per-document batching counters."""
+    requests: int = 0  # Multi-page requests sent
+    batched_pages: int = 0  # Pages sent inside multi-page requests
+    fallback_pages: int = 0  # Pages re-sent alone after a truncated / incomplete answer
+    prompt_tokens_saved: int = 0  # Estimated prompt tokens not sent compared to one request per page
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, pages: int, prompt_tokens: int, batch_prompt_tokens: int, fallbacks: int):
+        with self._lock:
+            self.requests += 1
+            self.batched_pages += pages
+            self.fallback_pages += fallbacks
+            # n pages would have sent the prompt n times; fallbacks send it again
+            self.prompt_tokens_saved += pages * prompt_tokens - batch_prompt_tokens - fallbacks * prompt_tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batched_pages": self.batched_pages,
+                "fallback_pages": self.fallback_pages,
+                "prompt_tokens_saved": self.prompt_tokens_saved,
+            }
+
+
+def run_text_batch(
+    llm_client: 'LLMClient',
+    prompt: str,
+    response_format: Dict[str, Any],
+    task: str,
+    document_name: str,
+    pages: List[Tuple[int, str]],
+    stats: BatchStats,
+) -> Dict[int, Any]:
+    """
+    Extract several text pages with one LLM call; pages the answer does not cover are sent alone.
+
+    Args:
+        pages: (zero-based page_num, text) pairs of consecutive pages
+
+    Returns:
+        page_num -> result for every page, or the exception its single-page call raised
+    """
+    page_numbers = [page_num + 1 for page_num, _ in pages]
+    batch_prompt = build_multi_page_prompt(prompt, page_numbers)
+    recovered: Dict[int, Dict[str, Any]] = {}
+    try:
+        result = llm_client.call_api_sync(
+            batch_prompt,
+            combine_page_texts([(page_num + 1, text) for page_num, text in pages]),
+            multi_page_response_format(response_format),
+            task,
+            f"{document_name} (pages {page_numbers[0]}-{page_numbers[-1]})",
+            "text",
+        )
+        recovered = split_multi_page_result(llm_client, result, task, page_numbers)
+    except Exception as e:
+        logger.warning(f"⚠️ Multi-page request for pages {page_numbers[0]}-{page_numbers[-1]} failed, sending pages singly: {e}")
+
+    results: Dict[int, Any] = {}
+    fallbacks = 0
+    for page_num, text in pages:
+        page_result = recovered.get(page_num + 1)
+        if page_result is None:
+            fallbacks += 1
+            try:
+                page_result = llm_client.call_api_sync(
+                    prompt, text, response_format, task, f"{document_name} (page {page_num + 1})", "text"
+                )
+            except Exception as e:
+                page_result = e  # Surfaces on this page's future only (Stage 7 retry applies)
+        results[page_num] = page_result
+
+    stats.record(len(pages), estimate_tokens(prompt), estimate_tokens(batch_prompt), fallbacks)
+    if fallbacks:
+        logger.info(f"📦 Pages {page_numbers[0]}-{page_numbers[-1]}: {len(pages) - fallbacks}/{len(pages)} from one request, {fallbacks} re-sent singly")
+    else:
+        logger.debug(f"📦 Pages {page_numbers[0]}-{page_numbers[-1]} extracted with one request")
+    return results
+
+
+class PageBatcher:
+    """
+    Collects text pages ready for Stage 7 and releases them as groups of consecutive pages.
+
+    on_group is called (from the adding thread or the linger timer) with a list of
+    (page_num, text) pairs; a one-page group means the page found no neighbours.
+    """
+
+    def __init__(
+        self,
+        on_group: Callable[[List[Tuple[int, str]]], None],
+        budget: int,
+        max_pages: int,
+        page_max_tokens: int,
+        linger_s: float,
+    ):
+        self.on_group = on_group
+        self.budget = budget
+        self.max_pages = max(1, max_pages)
+        self.page_max_tokens = page_max_tokens
+        self.linger_s = linger_s
+        self.stats = BatchStats()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[str, int]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    def add(self, page_num: int, text: str) -> bool:
+        """Queue a page; False if it is too large to batch (the caller sends it alone)."""
+        cost = text_page_cost(text)
+        if cost > self.page_max_tokens:
+            return False
+        ready: List[List[Tuple[int, str]]] = []
+        with self._lock:
+            if self._closed:
+                return False
+            self._pending[page_num] = (text, cost)
+            run = self._run_around(page_num)
+            if len(run) >= self.max_pages or sum(self._pending[p][1] for p in run) >= self.budget:
+                ready = self._take_locked(run)
+            if self._pending and self._timer is None:
+                self._timer = threading.Timer(self.linger_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        for group in ready:
+            self.on_group(group)
+        return True
+
+    def flush(self):
+        """Release every pending page (called by the linger timer)."""
+        with self._lock:
+            self._timer = None
+            ready = self._take_locked(list(self._pending))
+        for group in ready:
+            self.on_group(group)
+
+    def close(self):
+        """Stop the timer and drop what is still pending (the pipeline is finished or timed out)."""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending.clear()
+
+    def _run_around(self, page_num: int) -> List[int]:
+        """Pending pages forming a consecutive run with page_num (caller holds the lock)."""
+        start = page_num
+        while start - 1 in self._pending:
+            start -= 1
+        end = page_num
+        while end + 1 in self._pending:
+            end += 1
+        return list(range(start, end + 1))
+
+    def _take_locked(self, page_nums: List[int]) -> List[List[Tuple[int, str]]]:
+        groups = pack_pages([(p, self._pending[p][1]) for p in page_nums], self.budget, self.max_pages)
+        taken = [[(p, self._pending[p][0]) for p in group] for group in groups]
+        for p in page_nums:
+            self._pending.pop(p, None)
+        return taken
+
+
+def resolve_futures(futures: Dict[int, Future], results: Future):
+    """Done-callback: fan a batch's page_num -> result mapping out to per-page futures."""
+    try:
+        page_results = results.result()
+    except BaseException as e:
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(e)
+        return
+    for page_num, future in futures.items():
+        page_result = page_results.get(page_num)
+        if isinstance(page_result, BaseException):
+            future.set_exception(page_result)
+        elif page_result is not None:
+            future.set_result(page_result)
+        else:
+            future.set_exception(RuntimeError(f"No result for page {page_num + 1} in multi-page response"))
@@ -14,6 +14,8 @@ from concurrent.futures import CancelledError
 
 from PIL import Image
 
+from ...page_image import image_to_data_url
+
 if TYPE_CHECKING:
     from ..pdf_processor import PDFProcessor
     from ..yolo_detector import YOLODetector
@@ -94,7 +96,7 @@ def step9_process_signatures(
 
         return {
             "page_result": page_result,
-            "page_image_processed": page_data.get("encoded_image"),
+            "page_image_processed": image_to_data_url(page_data.get("encoded_image")),
             "page_image_original": page_image_original,
             "page_fields": page_data.get("page_fields", []),
             "page_hierarchical_data": page_data.get("page_hierarchical_data"),
@@ -313,7 +315,7 @@ def step9_process_signatures(
 
     return {
         "page_result": page_result,
-        "page_image_processed": page_data.get("encoded_image"),
+        "page_image_processed": image_to_data_url(page_data.get("encoded_image")),
         "page_image_original": page_image_original,
         "page_fields": page_data.get("page_fields", []),
         "page_hierarchical_data": page_data.get("page_hierarchical_data"),
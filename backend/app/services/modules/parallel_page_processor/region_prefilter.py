@@ -0,0 +1,360 @@
+"""
+Classical pre-filter deciding which pages (and regions) need Stage 1.6 YOLO.
+
+Full-page YOLO used to run on every IMAGE-path page the LLM flagged with
+has_signature / has_photo_id, whatever the page looked like. RegionPrefilter
+looks at what Stage 4 already produced - the adaptive-threshold image from
+PDFProcessor._apply_text_enhancement - plus the image blocks from Step 1.4:
+
+- signatures: connected components of the ink mask that are taller or wider
+  than the page's typical glyph yet sparse (cursive strokes, not solid shapes
+  or rules) and not part of a row of same-height glyphs (large printed text)
+  are signature candidates; no candidate means no signature YOLO;
+- photos/faces: a page without any raster image block cannot contain a photo,
+  so face YOLO is skipped outright; born-digital pages use their image blocks
+  as candidate regions; on scanned pages (one page-sized image) candidates are
+  clusters of non-glyph ink large enough to be a portrait;
+- when the candidates of a kind cover at most YOLO_PREFILTER_MAX_ROI_FRACTION
+  of the page, detection runs on their padded bounding box instead of the
+  whole page (smaller letterbox scale-down for the detector).
+
+The analysis runs at ~ANALYSIS_MAX_SIDE px on the long side. It is tuned for
+recall: anything it cannot classify counts as a candidate, and without OpenCV
+it returns None so YOLO runs as before. benchmark_region_prefilter.py measures
+recall loss and skipped pages on a labelled sample set. So far it has only been
+measured on the benchmark's synthetic pages, so YOLO_PREFILTER_ENABLED stays off
+until a labelled production manifest confirms the recall.
+
+Text-path image blocks get a separate, purely geometric filter
+(filter_image_blocks): blocks too small to hold a signature are not decoded
+or sent to YOLO.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]  # (x0, y0, x1, y1) in page image pixels
+
+ANALYSIS_MAX_SIDE = 1200  # Long side of the downscaled ink mask
+DEFAULT_GLYPH_HEIGHT = 10  # Assumed glyph height (analysis px) when the page has no text
+SCAN_BLOCK_FRACTION = 0.5  # An image block covering this much of the page is a scan, not a photo
+
+
+@dataclass
+class PageRegions:
+    """Candidate regions for one page (boxes in the analysed image's pixel coordinates)."""
+
+    size: Tuple[int, int]
+    signature_regions: List[Box] = field(default_factory=list)
+    face_regions: List[Box] = field(default_factory=list)
+    signature_roi: Optional[Box] = None  # None = run on the full page
+    face_roi: Optional[Box] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def needs_signature(self) -> bool:
+        return bool(self.signature_regions)
+
+    @property
+    def needs_face(self) -> bool:
+        return bool(self.face_regions)
+
+
+def resolve_regions(regions: Union["PageRegions", Future, None]) -> Optional["PageRegions"]:
+    """PageRegions from a value or the Future computing it; None (= no filtering) on failure."""
+    if isinstance(regions, Future):
+        try:
+            return regions.result()
+        except Exception as e:
+            logger.warning(f"⚠️ Region pre-filter failed, running YOLO on the full page: {e}")
+            return None
+    return regions
+
+
+def crop_to_roi(image: Image.Image, roi: Optional[Box]) -> Tuple[Image.Image, Tuple[int, int]]:
+    """(image cropped to roi, (dx, dy) to add to boxes found in the crop)."""
+    if roi is None:
+        return image, (0, 0)
+    return image.crop(roi), (roi[0], roi[1])
+
+
+def _union(boxes: Sequence[Box]) -> Box:
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+class RegionPrefilter:
+    """Decides per page whether signature / face YOLO is worth running, and where."""
+
+    def __init__(self, max_roi_fraction: float = 0.6, min_block_pt: float = 10.0):
+        self.max_roi_fraction = max_roi_fraction
+        self.min_block_pt = min_block_pt
+        # Metrics
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.signature_skipped = 0
+        self.face_skipped = 0
+        self.blocks_seen = 0
+        self.blocks_skipped = 0
+        self.analysis_time_s = 0.0
+
+    # ------------------------------------------------------------------
+    # IMAGE path: thresholded page + image blocks
+    # ------------------------------------------------------------------
+    def analyze(
+        self,
+        thresholded: Image.Image,
+        image_blocks: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[Tuple[float, float]] = None,
+    ) -> Optional[PageRegions]:
+        """
+        Candidate regions of a page.
+
+        Args:
+            thresholded: Stage 4 output (binary 'L' image, ink = dark)
+            image_blocks: Step 1.4 image blocks (bbox in PDF points), None if unknown
+            page_size: (width, height) of the page in PDF points, to map block bboxes
+
+        Returns:
+            PageRegions, or None when the page cannot be analysed (run YOLO as before)
+        """
+        if not CV2_AVAILABLE:
+            return None
+        start = time.perf_counter()
+        width, height = thresholded.size
+        gray = np.asarray(thresholded if thresholded.mode == "L" else thresholded.convert("L"))
+
+        factor = max(1, -(-max(width, height) // ANALYSIS_MAX_SIDE))
+        ink = (gray < 128).astype(np.uint8) * 255
+        if factor > 1:
+            # INTER_AREA keeps a pixel when >= 1/4 of its cell is ink, so thin strokes survive
+            ink = cv2.resize(ink, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+        ink = (ink >= 64).astype(np.uint8)
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        stats = stats[1:]  # Drop background
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= 4]  # Scanner speckle
+
+        glyph_h = self._glyph_height(stats)
+        signature_small = self._signature_candidates(stats, glyph_h, ink.shape)
+        signature_regions = [self._scale(box, factor, width, height) for box in signature_small]
+        signature_extent = [self._scale(box, factor, width, height) for box in self._grow(signature_small, stats, glyph_h)]
+
+        face_regions = self._face_candidates_from_blocks(image_blocks, page_size, (width, height))
+        if face_regions is None:
+            face_small = self._face_candidates_from_ink(ink, stats, glyph_h)
+            face_regions = [self._scale(box, factor, width, height) for box in face_small]
+
+        pad = int(glyph_h * factor * 2)
+        regions = PageRegions(
+            size=(width, height),
+            signature_regions=signature_regions,
+            face_regions=face_regions,
+            signature_roi=self._roi(signature_extent, pad, width, height),
+            face_roi=self._roi(face_regions, pad, width, height),
+            elapsed_ms=(time.perf_counter() - start) * 1000,
+        )
+        with self._lock:
+            self.pages += 1
+            self.signature_skipped += 0 if regions.needs_signature else 1
+            self.face_skipped += 0 if regions.needs_face else 1
+            self.analysis_time_s += regions.elapsed_ms / 1000
+        return regions
+
+    @staticmethod
+    def _glyph_height(stats) -> float:
+        """Median height of glyph-sized components (the page's text size)."""
+        heights = stats[:, cv2.CC_STAT_HEIGHT]
+        widths = stats[:, cv2.CC_STAT_WIDTH]
+        glyphs = heights[(heights >= 3) & (widths <= heights * 3)]
+        if len(glyphs) < 10:
+            return float(DEFAULT_GLYPH_HEIGHT)
+        return float(np.median(glyphs))
+
+    @staticmethod
+    def _signature_candidates(stats, glyph_h: float, shape: Tuple[int, int]) -> List[Box]:
+        """Sparse components bigger than a glyph: cursive strokes, not text, rules or frames."""
+        page_h, page_w = shape
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        fill = stats[:, cv2.CC_STAT_AREA] / np.maximum(w * h, 1)
+
+        bigger_than_glyph = (h >= 1.6 * glyph_h) | ((w >= 4 * glyph_h) & (h >= 0.8 * glyph_h))
+        sparse = fill <= 0.35
+        not_frame = (w <= 0.8 * page_w) & (h <= 0.4 * page_h) & ~((w >= 0.3 * page_w) & (fill < 0.03))
+        keep = bigger_than_glyph & sparse & not_frame
+
+        boxes = []
+        for i in np.flatnonzero(keep):
+            # Large printed text (titles) sits in a row of same-height neighbours
+            # and is no wider than a glyph; cursive strokes are neither
+            if w[i] < 2 * h[i]:
+                row = (
+                    (np.abs(h - h[i]) <= 0.25 * h[i])
+                    & (np.minimum(y + h, y[i] + h[i]) - np.maximum(y, y[i]) >= 0.7 * h[i])
+                    & (np.abs(x - x[i]) <= 3 * h[i])
+                )
+                if row.sum() >= 3:  # Itself plus two neighbours
+                    continue
+            boxes.append((int(x[i]), int(y[i]), int(x[i] + w[i]), int(y[i] + h[i])))
+        return boxes
+
+    @staticmethod
+    def _grow(boxes: List[Box], stats, glyph_h: float) -> List[Box]:
+        """Extend candidates by the ink next to them (the other strokes of a signature)."""
+        if not boxes:
+            return boxes
+        x0, y0 = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        x1, y1 = x0 + stats[:, cv2.CC_STAT_WIDTH], y0 + stats[:, cv2.CC_STAT_HEIGHT]
+        reach_x, reach_y = 3 * glyph_h, glyph_h
+        grown = []
+        for bx0, by0, bx1, by1 in boxes:
+            near = (
+                (x1 >= bx0 - reach_x) & (x0 <= bx1 + reach_x)
+                & (y1 >= by0 - reach_y) & (y0 <= by1 + reach_y)
+                & (y1 - y0 <= 2 * (by1 - by0 + glyph_h))  # Not a table border or column rule
+            )
+            if near.any():
+                bx0, by0 = min(bx0, int(x0[near].min())), min(by0, int(y0[near].min()))
+                bx1, by1 = max(bx1, int(x1[near].max())), max(by1, int(y1[near].max()))
+            grown.append((bx0, by0, bx1, by1))
+        return grown
+
+    def _face_candidates_from_blocks(
+        self,
+        image_blocks: Optional[List[Dict[str, Any]]],
+        page_size: Optional[Tuple[float, float]],
+        image_size: Tuple[int, int],
+    ) -> Optional[List[Box]]:
+        """
+        Photo candidates from Step 1.4 image blocks, or None if the blocks can't decide.
+
+        No raster blocks: no photo is possible. Blocks on a born-digital page are
+        the candidates. A page-sized block (scan) means the ink has to decide.
+        """
+        if image_blocks is None or not page_size or page_size[0] <= 0 or page_size[1] <= 0:
+            return None
+        if not image_blocks:
+            return []
+        scale_x, scale_y = image_size[0] / page_size[0], image_size[1] / page_size[1]
+        page_area = page_size[0] * page_size[1]
+        boxes = []
+        for block in image_blocks:
+            bbox = block.get("bbox")
+            if not bbox or len(bbox) != 4:
+                return None
+            x0, y0, x1, y1 = bbox
+            if (x1 - x0) * (y1 - y0) >= SCAN_BLOCK_FRACTION * page_area:
+                return None
+            if min(x1 - x0, y1 - y0) < self.min_block_pt:
+                continue
+            boxes.append(self._clip(
+                (int(x0 * scale_x), int(y0 * scale_y), int(x1 * scale_x + 0.5), int(y1 * scale_y + 0.5)),
+                image_size[0], image_size[1]
+            ))
+        return boxes
+
+    @staticmethod
+    def _face_candidates_from_ink(ink, stats, glyph_h: float) -> List[Box]:
+        """Portrait-sized clusters of ink that is not plain text (photo edges and texture)."""
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        glyph_like = (h <= 1.6 * glyph_h) & (w <= 3 * glyph_h)
+        line_like = (h <= 0.5 * glyph_h) | ((w <= 0.5 * glyph_h) & (h >= 4 * glyph_h))
+        other = stats[~glyph_like & ~line_like]
+        if len(other) == 0:
+            return []
+
+        mask = np.zeros_like(ink)
+        for x, y, cw, ch, _ in other:
+            mask[y:y + ch, x:x + cw] = ink[y:y + ch, x:x + cw]
+        radius = max(1, int(glyph_h))
+        mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (2 * radius + 1, 2 * radius + 1)))
+
+        count, _, cluster_stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        boxes = []
+        min_side = 3 * glyph_h
+        for x, y, cw, ch, _ in cluster_stats[1:]:
+            if cw >= min_side and ch >= min_side and 0.25 <= cw / ch <= 4:
+                boxes.append((int(x), int(y), int(x + cw), int(y + ch)))
+        return boxes
+
+    @staticmethod
+    def _clip(box: Box, width: int, height: int) -> Box:
+        return (max(0, box[0]), max(0, box[1]), min(width, box[2]), min(height, box[3]))
+
+    def _scale(self, box: Box, factor: int, width: int, height: int) -> Box:
+        return self._clip(tuple(v * factor for v in box), width, height)
+
+    def _roi(self, boxes: List[Box], pad: int, width: int, height: int) -> Optional[Box]:
+        """Padded union of boxes, or None when it would cover too much of the page anyway."""
+        if not boxes:
+            return None
+        x0, y0, x1, y1 = _union(boxes)
+        roi = self._clip((x0 - pad, y0 - pad, x1 + pad, y1 + pad), width, height)
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) > self.max_roi_fraction * width * height:
+            return None
+        return roi
+
+    # ------------------------------------------------------------------
+    # TEXT path: image blocks only
+    # ------------------------------------------------------------------
+    def filter_image_blocks(self, image_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Image blocks large enough on the page to hold a signature."""
+        kept = []
+        for block in image_blocks:
+            bbox = block.get("bbox")
+            if bbox and len(bbox) == 4 and min(bbox[2] - bbox[0], bbox[3] - bbox[1]) < self.min_block_pt:
+                continue
+            kept.append(block)
+        with self._lock:
+            self.blocks_seen += len(image_blocks)
+            self.blocks_skipped += len(image_blocks) - len(kept)
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "signature_skipped": self.signature_skipped,
+                "face_skipped": self.face_skipped,
+                "blocks_seen": self.blocks_seen,
+                "blocks_skipped": self.blocks_skipped,
+                "avg_analysis_ms": round(self.analysis_time_s / self.pages * 1000, 2) if self.pages else 0.0,
+            }
+
+
+# ============================================================
+# SINGLETON PRE-FILTER
+# ============================================================
+_region_prefilter: Optional[RegionPrefilter] = None
+_prefilter_lock = threading.Lock()
+
+
+def get_region_prefilter() -> RegionPrefilter:
+    """Get the process-wide region pre-filter (shared metrics across requests)."""
+    global _region_prefilter
+    if _region_prefilter is None:
+        with _prefilter_lock:
+            if _region_prefilter is None:
+                from app.core.config import settings
+                _region_prefilter = RegionPrefilter(
+                    max_roi_fraction=settings.YOLO_PREFILTER_MAX_ROI_FRACTION,
+                    min_block_pt=settings.YOLO_PREFILTER_MIN_BLOCK_PT,
+                )
+    return _region_prefilter
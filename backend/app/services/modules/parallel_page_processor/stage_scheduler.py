@@ -0,0 +1,262 @@
+"""
+Process-wide stage scheduler for the parallel page processing pipeline.
+
+Instead of creating fresh ThreadPoolExecutors for every document, all requests
+share one long-lived worker pool per pipeline stage (render, encode, LLM,
+signature, YOLO). Each stage enforces a global concurrency cap sized from
+config, and work is queued per request and served round-robin so a 500-page
+document cannot starve a 2-page document submitted after it.
+
+Callers get a RequestStageExecutor per stage, which exposes the same
+submit()/shutdown() surface as ThreadPoolExecutor so the pipeline callbacks
+do not need to know the pools are shared.
+"""
+
+import itertools
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Stage names, mapped to the pools used by PipelineCallbackFactory
+STAGE_RENDER = "render"        # pool1: page access, text extraction, rendering, PIL
+STAGE_ENCODE = "encode"        # pool2: image encoding
+STAGE_LLM = "llm"              # pool3: LLM API calls
+STAGE_SIGNATURE = "signature"  # pool4: response parsing + signature processing
+STAGE_YOLO = "yolo"            # pool_yolo: YOLO inference
+
+_WorkItem = Tuple[Future, Callable, tuple, dict]
+
+
+class SharedStage:
+    """
+    A fixed-cap worker pool for one pipeline stage with per-request fair queuing.
+
+    Worker threads are started lazily up to max_workers and then kept for the
+    life of the process. Each request has its own FIFO queue; idle workers pick
+    the next request in round-robin order that is below its per-request limit.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)     # work available
+        self._drained = threading.Condition(self._lock)  # a request's work finished
+        self._queues: "OrderedDict[str, Deque[_WorkItem]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        self._closing: set = set()
+        self._threads: list = []
+        self._idle_workers = 0
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+
+    # -------------------------------------------------------------------------
+    # Request registration
+    # -------------------------------------------------------------------------
+    def register(self, request_key: str, max_in_flight: int):
+        """Register a request with a per-request concurrency limit."""
+        with self._cond:
+            self._closing.discard(request_key)
+            self._queues.setdefault(request_key, deque())
+            self._running.setdefault(request_key, 0)
+            self._limits[request_key] = max(1, min(max_in_flight, self.max_workers))
+
+    def unregister(self, request_key: str, cancel_pending: bool = False):
+        """
+        Forget a request, optionally cancelling work that has not started yet.
+
+        If items are still queued or running, the request is dropped as soon as
+        its last item finishes.
+        """
+        cancelled = []
+        with self._cond:
+            queue = self._queues.get(request_key)
+            if queue is None:
+                return
+            if cancel_pending:
+                while queue:
+                    cancelled.append(queue.popleft()[0])
+            self._closing.add(request_key)
+            self._forget_if_idle(request_key)
+        for future in cancelled:
+            future.cancel()
+        if cancelled:
+            with self._lock:
+                self._drained.notify_all()
+
+    def _forget_if_idle(self, request_key: str):
+        """Drop a closing request once it has no queued or running work (caller holds the lock)."""
+        if request_key in self._closing and not self._queues.get(request_key) and self._running.get(request_key, 0) == 0:
+            self._closing.discard(request_key)
+            self._queues.pop(request_key, None)
+            self._running.pop(request_key, None)
+            self._limits.pop(request_key, None)
+
+    def pending_for(self, request_key: str) -> int:
+        """Number of queued plus running items for a request."""
+        with self._cond:
+            return len(self._queues.get(request_key, ())) + self._running.get(request_key, 0)
+
+    # -------------------------------------------------------------------------
+    # Submission and workers
+    # -------------------------------------------------------------------------
+    def submit(self, request_key: str, fn: Callable, *args, **kwargs) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if request_key not in self._queues:
+                raise RuntimeError(f"Request {request_key} is not registered on stage '{self.name}'")
+            self._queues[request_key].append((future, fn, args, kwargs))
+            self.submitted += 1
+            if self._idle_workers == 0 and len(self._threads) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._worker,
+                    name=f"page-stage-{self.name}-{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(worker)
+                worker.start()
+            else:
+                self._cond.notify()
+        return future
+
+    def _next_item(self) -> Optional[Tuple[str, _WorkItem]]:
+        """Pick the next runnable item round-robin across requests (caller holds the lock)."""
+        for request_key in list(self._queues.keys()):
+            queue = self._queues[request_key]
+            if queue and self._running[request_key] < self._limits.get(request_key, self.max_workers):
+                # Rotate this request to the back so the next pick serves someone else
+                self._queues.move_to_end(request_key)
+                return request_key, queue.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                picked = self._next_item()
+                while picked is None:
+                    self._idle_workers += 1
+                    self._cond.wait()
+                    self._idle_workers -= 1
+                    picked = self._next_item()
+                request_key, (future, fn, args, kwargs) = picked
+                self._running[request_key] += 1
+
+            # Run outside the lock: done-callbacks submit follow-up work to stages
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            # Drop references so page images are not pinned while the worker idles
+            future = fn = args = kwargs = result = None
+
+            with self._cond:
+                self._running[request_key] -= 1
+                self.completed += 1
+                self._forget_if_idle(request_key)
+                self._drained.notify_all()
+
+    def wait_idle(self, request_key: str, timeout: Optional[float] = None) -> bool:
+        """Block until a request has nothing queued or running on this stage."""
+        with self._cond:
+            return self._drained.wait_for(
+                lambda: not self._queues.get(request_key) and self._running.get(request_key, 0) == 0,
+                timeout=timeout,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "threads": len(self._threads),
+                "idle_workers": self._idle_workers,
+                "active_requests": len(self._queues),
+                "queued": sum(len(q) for q in self._queues.values()),
+                "running": sum(self._running.values()),
+                "submitted": self.submitted,
+                "completed": self.completed,
+            }
+
+
+class RequestStageExecutor(Executor):
+    """
+    Per-request view of a SharedStage, usable wherever an Executor is expected.
+
+    shutdown() releases the request's share of the stage without stopping the
+    shared worker threads.
+    """
+
+    def __init__(self, stage: SharedStage, request_key: str, max_in_flight: int):
+        self._stage = stage
+        self._request_key = request_key
+        self._shutdown = False
+        stage.register(request_key, max_in_flight)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return self._stage.submit(self._request_key, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self._shutdown = True
+        if wait and not cancel_futures:
+            self._stage.wait_idle(self._request_key)
+        self._stage.unregister(self._request_key, cancel_pending=cancel_futures)
+        if wait and cancel_futures:
+            self._stage.wait_idle(self._request_key)
+
+
+class StageScheduler:
+    """Owns one SharedStage per pipeline stage for the whole process."""
+
+    def __init__(self, stage_sizes: Optional[Dict[str, int]] = None):
+        sizes = stage_sizes or {
+            STAGE_RENDER: config.CONVERSION_POOL_SIZE,
+            STAGE_ENCODE: config.ENCODING_POOL_SIZE,
+            STAGE_LLM: config.LLM_POOL_SIZE,
+            STAGE_SIGNATURE: config.SIGNATURE_POOL_SIZE,
+            STAGE_YOLO: config.YOLO_POOL_SIZE,
+        }
+        self.stages: Dict[str, SharedStage] = {name: SharedStage(name, size) for name, size in sizes.items()}
+        self._request_counter = itertools.count(1)
+
+    def new_request_key(self, request_id: Optional[str] = None) -> str:
+        """Unique key for one pipeline run (request_id alone may repeat on retries)."""
+        return f"{request_id or 'request'}#{next(self._request_counter)}"
+
+    def executor(self, stage: str, request_key: str, max_in_flight: int) -> RequestStageExecutor:
+        return RequestStageExecutor(self.stages[stage], request_key, max_in_flight)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+
+# ============================================================
+# SINGLETON SCHEDULER
+# ============================================================
+_stage_scheduler: Optional[StageScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_stage_scheduler() -> StageScheduler:
+    """Get the process-wide stage scheduler, creating it on first use."""
+    global _stage_scheduler
+    if _stage_scheduler is None:
+        with _scheduler_lock:
+            if _stage_scheduler is None:
+                _stage_scheduler = StageScheduler()
+                logger.info(
+                    "🧵 Page pipeline stage scheduler ready - "
+                    + ", ".join(f"{name}: {stage.max_workers}" for name, stage in _stage_scheduler.stages.items())
+                )
+    return _stage_scheduler
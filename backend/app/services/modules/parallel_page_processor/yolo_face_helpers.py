@@ -4,7 +4,7 @@ YOLO face detection helper methods for ParallelPageProcessor.
 This module contains all YOLO-related face/photo ID detection functionality:
 - step1_6_yolo_face_detection: Detect faces/photos in PyMuPDF image blocks
 - step1_6_yolo_face_detection_full_page_from_pil: Full page detection from PIL Image
-- step1_6_yolo_face_detection_full_page: Full page detection from base64 encoded image
+- step1_6_yolo_face_detection_full_page: Full page detection from encoded page image
 """
 
 import time
@@ -12,10 +12,14 @@ import io
 import base64
 import traceback
 import logging
-from typing import Dict, List, Any, TYPE_CHECKING
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Union, TYPE_CHECKING
 
 from PIL import Image
 
+from ...page_image import PageImage, image_to_bytes
+from .region_prefilter import PageRegions, crop_to_roi, resolve_regions
+
 if TYPE_CHECKING:
     import fitz
     from ..pdf_processor import PDFProcessor
@@ -157,7 +161,8 @@ def step1_6_yolo_face_detection(
 def step1_6_yolo_face_detection_full_page_from_pil(
     face_detector: 'YOLOFaceDetector',
     page_num: int,
-    original_image: Image.Image
+    original_image: Image.Image,
+    regions: Optional[Union[PageRegions, Future]] = None
 ) -> List[Dict[str, Any]]:
     """
     Stage 1.6 (Full Page): Detect faces/photo IDs in original unprocessed full page image using YOLO
@@ -169,6 +174,7 @@ def step1_6_yolo_face_detection_full_page_from_pil(
         face_detector: YOLO face detector instance
         page_num: Zero-based page number
         original_image: Original PIL Image of the full page
+        regions: Region pre-filter result (or its Future) for this page; None = whole page
         
     Returns:
         List of detected faces with bbox, confidence, and image_base64
@@ -177,19 +183,27 @@ def step1_6_yolo_face_detection_full_page_from_pil(
         return []
 
     try:
+        page_regions = resolve_regions(regions)
+        if page_regions is not None and not page_regions.needs_face:
+            logger.debug(f"⏭️ [Page {page_num + 1}] Pre-filter found no photo candidates - skipping YOLO face detection")
+            return []
+        roi = page_regions.face_roi if page_regions is not None else None
+        search_image, (dx, dy) = crop_to_roi(original_image, roi)
+
         logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO face detection on ORIGINAL full page image")
-        logger.debug(f"   Original image: size={original_image.size}, mode={original_image.mode}")
+        logger.debug(f"   Original image: size={original_image.size}, mode={original_image.mode}, region={roi or 'full page'}")
 
-        # Run YOLO detection on original unprocessed image
-        detections = face_detector.detect_faces_in_image(original_image)
+        # Run YOLO detection on original unprocessed image (or its candidate region)
+        detections = face_detector.detect_faces_in_image(search_image)
 
         yolo_faces = []
         for detection in detections:
             if detection.get("is_face"):
-                # YOLO bbox is relative to original full page image
+                # YOLO bbox is relative to the searched image; shift it back to the full page
                 yolo_bbox = detection.get("bbox", [])  # [xmin, ymin, xmax, ymax] in image coordinates
 
                 if len(yolo_bbox) == 4:
+                    yolo_bbox = [yolo_bbox[0] + dx, yolo_bbox[1] + dy, yolo_bbox[2] + dx, yolo_bbox[3] + dy]
                     # Expand bbox to capture the full photo ID, not just the face
                     # Photo IDs typically have the face in the upper portion with info below
                     xmin, ymin, xmax, ymax = [int(coord) for coord in yolo_bbox]
@@ -272,7 +286,7 @@ def step1_6_yolo_face_detection_full_page_from_pil(
 def step1_6_yolo_face_detection_full_page(
     face_detector: 'YOLOFaceDetector',
     page_num: int,
-    encoded_image: str
+    encoded_image: Union[PageImage, str]
 ) -> List[Dict[str, Any]]:
     """
     Stage 1.6 (Full Page): Detect faces/photo IDs in full page image using YOLO (from base64)
@@ -282,7 +296,7 @@ def step1_6_yolo_face_detection_full_page(
     Args:
         face_detector: YOLO face detector instance
         page_num: Zero-based page number
-        encoded_image: Base64 encoded image data (with or without data URL prefix)
+        encoded_image: Encoded page image (PageImage bytes, or base64 with/without data URL prefix)
         
     Returns:
         List of detected faces with bbox, confidence, and image_base64
@@ -291,15 +305,9 @@ def step1_6_yolo_face_detection_full_page(
         return []
 
     try:
-        logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO face detection on full page image (from base64)")
-
-        # Extract base64 data from data URL
-        if "base64," in encoded_image:
-            base64_data = encoded_image.split("base64,")[1]
-        else:
-            base64_data = encoded_image
+        logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO face detection on full page image (from encoded image)")
 
-        image_bytes = base64.b64decode(base64_data)
+        image_bytes = image_to_bytes(encoded_image)
         full_page_image = Image.open(io.BytesIO(image_bytes))
 
         # Run YOLO detection on full page image
@@ -4,7 +4,7 @@ YOLO signature detection helper methods for ParallelPageProcessor.
 This module contains all YOLO-related signature detection functionality:
 - _step1_6_yolo_signature_detection: Detect signatures in PyMuPDF image blocks
 - _step1_6_yolo_signature_detection_full_page_from_pil: Full page detection from PIL Image
-- _step1_6_yolo_signature_detection_full_page: Full page detection from base64 encoded image
+- _step1_6_yolo_signature_detection_full_page: Full page detection from encoded page image
 """
 
 import time
@@ -12,10 +12,14 @@ import io
 import base64
 import traceback
 import logging
-from typing import Dict, List, Any, TYPE_CHECKING
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Union, TYPE_CHECKING
 
 from PIL import Image
 
+from ...page_image import PageImage, image_to_bytes
+from .region_prefilter import PageRegions, crop_to_roi, resolve_regions
+
 if TYPE_CHECKING:
     import fitz
     from ..pdf_processor import PDFProcessor
@@ -157,7 +161,8 @@ def step1_6_yolo_signature_detection(
 def step1_6_yolo_signature_detection_full_page_from_pil(
     yolo_detector: 'YOLODetector',
     page_num: int,
-    original_image: Image.Image
+    original_image: Image.Image,
+    regions: Optional[Union[PageRegions, Future]] = None
 ) -> List[Dict[str, Any]]:
     """
     Stage 1.6 (Full Page): Detect signatures in original unprocessed full page image using YOLO
@@ -169,6 +174,7 @@ def step1_6_yolo_signature_detection_full_page_from_pil(
         yolo_detector: YOLO detector instance
         page_num: Zero-based page number
         original_image: Original PIL Image of the full page
+        regions: Region pre-filter result (or its Future) for this page; None = whole page
         
     Returns:
         List of detected signatures with bbox, confidence, and image_base64
@@ -177,19 +183,27 @@ def step1_6_yolo_signature_detection_full_page_from_pil(
         return []
 
     try:
+        page_regions = resolve_regions(regions)
+        if page_regions is not None and not page_regions.needs_signature:
+            logger.debug(f"⏭️ [Page {page_num + 1}] Pre-filter found no signature-like ink - skipping YOLO")
+            return []
+        roi = page_regions.signature_roi if page_regions is not None else None
+        search_image, (dx, dy) = crop_to_roi(original_image, roi)
+
         logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO detection on ORIGINAL full page image (LLM indicated signature)")
-        logger.debug(f"   Original image: size={original_image.size}, mode={original_image.mode}")
+        logger.debug(f"   Original image: size={original_image.size}, mode={original_image.mode}, region={roi or 'full page'}")
 
-        # Run YOLO detection on original unprocessed image
-        detections = yolo_detector.detect_signatures_in_image(original_image)
+        # Run YOLO detection on original unprocessed image (or its candidate region)
+        detections = yolo_detector.detect_signatures_in_image(search_image)
 
         yolo_signatures = []
         for detection in detections:
             if detection.get("is_signature"):
-                # YOLO bbox is relative to original full page image
+                # YOLO bbox is relative to the searched image; shift it back to the full page
                 yolo_bbox = detection.get("bbox", [])  # [xmin, ymin, xmax, ymax] in image coordinates
 
                 if len(yolo_bbox) == 4:
+                    yolo_bbox = [yolo_bbox[0] + dx, yolo_bbox[1] + dy, yolo_bbox[2] + dx, yolo_bbox[3] + dy]
                     # Crop signature from original full page image using YOLO bbox
                     xmin, ymin, xmax, ymax = [int(coord) for coord in yolo_bbox]
                     cropped_signature = original_image.crop((xmin, ymin, xmax, ymax))
@@ -253,7 +267,7 @@ def step1_6_yolo_signature_detection_full_page_from_pil(
 def step1_6_yolo_signature_detection_full_page(
     yolo_detector: 'YOLODetector',
     page_num: int,
-    encoded_image: str
+    encoded_image: Union[PageImage, str]
 ) -> List[Dict[str, Any]]:
     """
     Stage 1.6 (Full Page): Detect signatures in full page image using YOLO (from base64)
@@ -263,7 +277,7 @@ def step1_6_yolo_signature_detection_full_page(
     Args:
         yolo_detector: YOLO detector instance
         page_num: Zero-based page number
-        encoded_image: Base64 encoded image data (with or without data URL prefix)
+        encoded_image: Encoded page image (PageImage bytes, or base64 with/without data URL prefix)
         
     Returns:
         List of detected signatures with bbox, confidence, and image_base64
@@ -272,15 +286,9 @@ def step1_6_yolo_signature_detection_full_page(
         return []
 
     try:
-        logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO detection on full page image (from base64, LLM indicated signature)")
-
-        # Extract base64 data from data URL
-        if "base64," in encoded_image:
-            base64_data = encoded_image.split("base64,")[1]
-        else:
-            base64_data = encoded_image
+        logger.debug(f"🔍 [Page {page_num + 1}] Running YOLO detection on full page image (from encoded image, LLM indicated signature)")
 
-        image_bytes = base64.b64decode(base64_data)
+        image_bytes = image_to_bytes(encoded_image)
         full_page_image = Image.open(io.BytesIO(image_bytes))
 
         # Run YOLO detection on full page image
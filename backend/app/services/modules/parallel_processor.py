@@ -18,7 +18,7 @@ import time
 import hashlib
 import base64
 from concurrent.futures import ThreadPoolExecutor, Future
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator, Tuple, Union
 from PIL import Image
 import fitz  # PyMuPDF
 from ..pdf_processor import PDFProcessor
@@ -45,6 +45,16 @@ from .parallel_page_processor import (
     process_page_for_template_extraction as modular_process_page_for_template_extraction,
     process_page_for_template_matching as modular_process_page_for_template_matching,
 )
+from .parallel_page_processor.page_batching import BATCHABLE_TASKS
+from .parallel_page_processor.stage_scheduler import (
+    get_stage_scheduler,
+    RequestStageExecutor,
+    STAGE_RENDER,
+    STAGE_ENCODE,
+    STAGE_LLM,
+    STAGE_SIGNATURE,
+    STAGE_YOLO,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -143,12 +153,13 @@ class ParallelPageProcessor:
             page
         )
 
-    def _step1_6_yolo_signature_detection_full_page_from_pil(self, page_num: int, pil_image: Image.Image) -> List[Dict]:
+    def _step1_6_yolo_signature_detection_full_page_from_pil(self, page_num: int, pil_image: Image.Image, regions=None) -> List[Dict]:
         """Step 1.6: YOLO Signature Detection on full page PIL image. Delegates to modular function."""
         return step1_6_yolo_signature_detection_full_page_from_pil(
             self.yolo_detector,
             page_num,
-            pil_image
+            pil_image,
+            regions
         )
 
     def _step1_6_yolo_signature_detection_full_page(self, page_num: int, encoded_image: str) -> List[Dict]:
@@ -172,12 +183,13 @@ class ParallelPageProcessor:
             page
         )
 
-    def _step1_6_yolo_face_detection_full_page_from_pil(self, page_num: int, pil_image: Image.Image) -> List[Dict]:
+    def _step1_6_yolo_face_detection_full_page_from_pil(self, page_num: int, pil_image: Image.Image, regions=None) -> List[Dict]:
         """Step 1.6: YOLO Face Detection on full page PIL image. Delegates to modular function."""
         return step1_6_yolo_face_detection_full_page_from_pil(
             self.face_detector,
             page_num,
-            pil_image
+            pil_image,
+            regions
         )
 
     def _step1_6_yolo_face_detection_full_page(self, page_num: int, encoded_image: str) -> List[Dict]:
@@ -293,7 +305,7 @@ class ParallelPageProcessor:
     # =========================================================================
     async def process_pages_parallel(
         self,
-        pdf_data: str,
+        pdf_data: Union[str, bytes],
         total_pages: int,
         process_page_fn: Callable[[int, str, Dict[str, Any]], Dict[str, Any]],
         process_context: Optional[Dict[str, Any]] = None,
@@ -306,11 +318,56 @@ class ParallelPageProcessor:
         """
         Process multiple PDF pages using multi-stage pipeline with true step-level parallelism.
         
-        This method orchestrates the entire pipeline using PipelineCallbackFactory for
-        stage completion handling.
+        This method collects the output of stream_pages_parallel and returns the
+        results sorted by page number.
+        
+        Args:
+            start_page: Starting page index (0-based). Pages before this are skipped.
+        """
+        results_dict: Dict[int, Dict[str, Any]] = {}
+        async for page_num, page_result in self.stream_pages_parallel(
+            pdf_data,
+            total_pages,
+            process_context,
+            max_workers=max_workers,
+            max_threads=max_threads,
+            cancellation_token=cancellation_token,
+            request_id=request_id,
+            start_page=start_page,
+        ):
+            results_dict[page_num] = page_result
+
+        # Sort results by page number (only return pages we processed)
+        return [results_dict.get(page_num, {"error": f"Missing result for page {page_num + 1}", "page_num": page_num + 1})
+                for page_num in range(start_page, total_pages)]
+
+    async def stream_pages_parallel(
+        self,
+        pdf_data: Union[str, bytes],
+        total_pages: int,
+        process_context: Optional[Dict[str, Any]] = None,
+        max_workers: Optional[int] = None,
+        max_threads: Optional[int] = None,
+        cancellation_token: Optional[Any] = None,
+        request_id: Optional[str] = None,
+        start_page: int = 0,
+        timeout: float = 600,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Run the multi-stage pipeline and yield (page_num, result) as each page finishes.
+        
+        Pages are yielded in completion order, not page order, so callers can persist
+        early pages while later pages are still waiting on the LLM. Stage 9 callbacks
+        push results onto an asyncio.Queue via loop.call_soon_threadsafe, so there is
+        no polling between a page finishing and it being yielded.
         
         Args:
             start_page: Starting page index (0-based). Pages before this are skipped.
+            timeout: Seconds to wait for the whole document before failing the
+                remaining pages with "Pipeline timeout".
+        
+        Yields:
+            Tuple of zero-based page number and that page's final result dict.
         """
         if process_context is None:
             process_context = {}
@@ -324,7 +381,7 @@ class ParallelPageProcessor:
         pages_to_process = total_pages - start_page
         if pages_to_process <= 0:
             logger.info(f"📄 No pages to process (start_page={start_page}, total_pages={total_pages})")
-            return []
+            return
         
         if prefer_text:
             logger.info(f"🔤 Text extraction ENABLED (confidence threshold: {text_confidence_threshold:.1%})")
@@ -333,27 +390,34 @@ class ParallelPageProcessor:
 
         logger.info(f"🚀 Starting parallel processing: pages {start_page + 1}-{total_pages} ({pages_to_process} pages) with {effective_max_workers} concurrent workers")
 
-        # Create thread pools
-        pool1 = ThreadPoolExecutor(max_workers=min(effective_max_workers, 50))
-        pool2 = ThreadPoolExecutor(max_workers=min(effective_max_workers, 50))
-        pool3 = ThreadPoolExecutor(max_workers=min(effective_max_workers, 100))
-        pool3_max_workers = min(effective_max_workers, 100)
+        # Join the process-wide stage pools. effective_max_workers caps this request's
+        # share of each stage; the stage sizes in config cap all requests together.
+        scheduler = get_stage_scheduler()
+        request_key = scheduler.new_request_key(request_id)
+        pool1 = scheduler.executor(STAGE_RENDER, request_key, effective_max_workers)
+        pool2 = scheduler.executor(STAGE_ENCODE, request_key, effective_max_workers)
+        pool3 = scheduler.executor(STAGE_LLM, request_key, effective_max_workers)
+        pool3_max_workers = min(effective_max_workers, pp_config.LLM_POOL_SIZE)
         
         try:
-            self.llm_client._get_sync_session(pool_connections=1, max_connections=pool3_max_workers)
-            logger.info(f"🌐 Configured thread-local HTTP sessions - pool_maxsize: {pool3_max_workers}")
+            self.llm_client.warm_up()
+            logger.info(f"🌐 LLM transport ready for {pool3_max_workers} LLM workers")
         except Exception as e:
-            logger.warning(f"⚠️ Failed to pre-initialize HTTP session: {e}")
+            logger.warning(f"⚠️ Failed to pre-initialize LLM transport: {e}")
             
-        pool4 = ThreadPoolExecutor(max_workers=min(effective_max_workers, 50))
-        pool_yolo = ThreadPoolExecutor(max_workers=min(effective_max_workers, 20)) if self.yolo_detector.is_enabled() else None
+        pool4 = scheduler.executor(STAGE_SIGNATURE, request_key, effective_max_workers)
+        pool_yolo = scheduler.executor(STAGE_YOLO, request_key, effective_max_workers) if self.yolo_detector.is_enabled() else None
 
+        callback_factory: Optional[PipelineCallbackFactory] = None
+        pdf_handle = None
+        page_data: Dict[int, Dict[str, Any]] = {}
+        results_dict: Dict[int, Dict[str, Any]] = {}
         try:
             # Initialize shared data structures
-            page_data: Dict[int, Dict[str, Any]] = {i: {"page_num": i} for i in range(start_page, total_pages)}
-            results_dict: Dict[int, Dict[str, Any]] = {}
+            page_data.update({i: {"page_num": i} for i in range(start_page, total_pages)})
             completion_counts = {i: 0 for i in range(1, 11)}
             page_retry_counts: Dict[int, int] = {}
+            result_queue: asyncio.Queue = asyncio.Queue()
 
             # Store PDF data in context for callbacks
             process_context["_pdf_data"] = pdf_data
@@ -374,6 +438,16 @@ class ParallelPageProcessor:
                 max_retries=1,
                 prefer_text=prefer_text,
             )
+            callback_factory.bind_result_queue(asyncio.get_running_loop(), result_queue)
+            if self._page_batching_applies(process_context):
+                callback_factory.enable_page_batching(
+                    settings.LLM_PAGE_BATCH_TOKEN_BUDGET,
+                    settings.LLM_PAGE_BATCH_MAX_PAGES,
+                    settings.LLM_PAGE_BATCH_PAGE_MAX_TOKENS,
+                    settings.LLM_PAGE_BATCH_LINGER_MS / 1000,
+                )
+            if settings.YOLO_PREFILTER_ENABLED:
+                callback_factory.enable_region_prefilter()
 
             # Set pools and step methods on the factory
             callback_factory.set_pools(pool1, pool2, pool3, pool4, pool_yolo)
@@ -387,16 +461,16 @@ class ParallelPageProcessor:
                 step1_6_face_full=self._step1_6_yolo_face_detection_full_page,
             )
 
-            # Pre-process PDF document (shared across all pages)
-            pdf_bytes_shared = self.pdf_processor.step1_1_decode_base64_pdf(pdf_data)
-            if not pdf_bytes_shared:
-                logger.error("❌ Failed to decode PDF data")
-                return [{"error": "Failed to decode PDF data", "page_num": i + 1} for i in range(total_pages)]
-
-            pdf_document_shared = self.pdf_processor.step1_2_open_pdf_document(pdf_bytes_shared)
-            if not pdf_document_shared:
-                logger.error("❌ Failed to open PDF document")
-                return [{"error": "Failed to open PDF document", "page_num": i + 1} for i in range(total_pages)]
+            # Pre-process PDF document (shared across all pages and with concurrent
+            # requests for the same file via the PDF document cache)
+            try:
+                pdf_handle = self.pdf_processor.open_pdf_document(pdf_data)
+                pdf_document_shared = pdf_handle.document
+            except Exception as e:
+                logger.error(f"❌ Failed to open PDF document: {e}")
+                for page_num in range(start_page, total_pages):
+                    yield page_num, {"error": "Failed to open PDF document", "page_num": page_num + 1}
+                return
 
             # Store shared PDF document in page_data
             for page_num in range(start_page, total_pages):
@@ -418,77 +492,83 @@ class ParallelPageProcessor:
                     skip_futures[future] = page_num
                     future.add_done_callback(lambda f: callback_factory.on_skip_text_get_page_complete(f, skip_futures))
 
-            # Poll for completion
+            # Wait for pages to be finalized by the callbacks
             start_time = time.time()
-            timeout = 600  # 10 minutes timeout
-            poll_interval = 0.1
-
-            while completion_counts[9] < pages_to_process:
-                await asyncio.sleep(poll_interval)
-                elapsed = time.time() - start_time
-                
-                if elapsed > timeout:
-                    logger.error(f"❌ Pipeline timeout after {elapsed:.1f}s")
+            yielded_count = 0
+            while yielded_count < pages_to_process:
+                remaining = timeout - (time.time() - start_time)
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    page_num, page_result = await asyncio.wait_for(result_queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    logger.error(f"❌ Pipeline timeout after {time.time() - start_time:.1f}s")
                     for page_num in range(start_page, total_pages):
-                        if page_num not in results_dict:
-                            results_dict[page_num] = {"error": "Pipeline timeout", "page_num": page_num + 1}
+                        if callback_factory._finalize_page(page_num, {"error": "Pipeline timeout", "page_num": page_num + 1}):
+                            yield page_num, results_dict[page_num]
                     break
-                
-                # Dynamic poll interval
-                if elapsed > 30 and poll_interval < 0.5:
-                    poll_interval = 0.5
-                elif elapsed > 120 and poll_interval < 1.0:
-                    poll_interval = 1.0
+                yielded_count += 1
+                yield page_num, page_result
 
+            elapsed = time.time() - start_time
             logger.info(f"✅ All pages completed: {completion_counts[9]}/{pages_to_process} pages processed in {elapsed:.1f}s")
 
-            # Close shared PDF document
-            if pdf_document_shared:
-                try:
-                    pdf_document_shared.close()
-                    logger.debug(f"🔒 Closed shared PDF document")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error closing shared PDF document: {e}")
-
-            # Sort results by page number (only return pages we processed)
-            page_results = [results_dict.get(page_num, {"error": f"Missing result for page {page_num + 1}", "page_num": page_num + 1})
-                           for page_num in range(start_page, total_pages)]
-
-            success_count = sum(1 for r in page_results if "error" not in r)
+            success_count = sum(1 for r in results_dict.values() if "error" not in r)
             error_count = pages_to_process - success_count
             logger.info(f"📊 Pipeline complete: {success_count} successful, {error_count} errors out of {pages_to_process} pages")
-
-            return page_results
+            if callback_factory.page_batcher is not None:
+                batch_stats = callback_factory.page_batcher.stats.as_dict()
+                process_context["_page_batching"] = batch_stats
+                if batch_stats["requests"]:
+                    logger.info(
+                        f"📦 Page batching: {batch_stats['batched_pages']} pages in {batch_stats['requests']} multi-page requests, "
+                        f"{batch_stats['fallback_pages']} re-sent singly, ~{batch_stats['prompt_tokens_saved']} prompt tokens saved"
+                    )
 
         finally:
+            if callback_factory is not None and callback_factory.page_batcher is not None:
+                callback_factory.page_batcher.close()
+
             # Cleanup thread pools
-            self._cleanup_thread_pools(pool1, pool2, pool3, pool4, pool_yolo, callback_factory if 'callback_factory' in locals() else None)
-            
-            # Clear PDF cache
-            try:
-                self.pdf_processor.clear_pdf_cache()
-                logger.debug("✅ PDF cache cleared")
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            self._cleanup_thread_pools(pool1, pool2, pool3, pool4, pool_yolo, callback_factory)
+
+            # Release the shared PDF document (after the pools, so no stage still reads it).
+            # It is closed by the cache once no request references it.
+            if pdf_handle is not None:
+                pdf_handle.release()
+                logger.debug("✅ Cached PDF released")
 
             # Clear data structures
-            if 'page_data' in locals():
-                page_data.clear()
-            if 'results_dict' in locals():
-                results_dict.clear()
+            page_data.clear()
+            results_dict.clear()
+
+    def _page_batching_applies(self, process_context: Dict[str, Any]) -> bool:
+        """Multi-page LLM requests need one prompt for every page: text extraction without per-page context."""
+        if not process_context.get("page_batching", settings.LLM_PAGE_BATCHING_ENABLED):
+            return False
+        if not process_context.get("prefer_text", True) or process_context.get("task") not in BATCHABLE_TASKS:
+            return False
+        document_type = (process_context.get("document_type") or "").lower()
+        return "bank" not in document_type  # Bank statement prompts carry per-page header context
 
     def _cleanup_thread_pools(
         self,
-        pool1: ThreadPoolExecutor,
-        pool2: ThreadPoolExecutor,
-        pool3: ThreadPoolExecutor,
-        pool4: ThreadPoolExecutor,
-        pool_yolo: Optional[ThreadPoolExecutor],
+        pool1: RequestStageExecutor,
+        pool2: RequestStageExecutor,
+        pool3: RequestStageExecutor,
+        pool4: RequestStageExecutor,
+        pool_yolo: Optional[RequestStageExecutor],
         callback_factory: Optional[PipelineCallbackFactory]
     ):
-        """Clean up all thread pools and clear future dictionaries."""
+        """
+        Release this request's share of the shared stage pools and clear future dictionaries.
+        
+        The worker threads themselves are process-wide and keep running; work this
+        request still has queued (e.g. after a timeout) is cancelled so it does not
+        occupy capacity other documents are waiting for.
+        """
         try:
-            logger.debug("🧹 Shutting down thread pools...")
+            logger.debug("🧹 Releasing stage pools...")
 
             # Shutdown YOLO pool first (if it exists)
             if pool_yolo is not None:
@@ -510,22 +590,22 @@ class ParallelPageProcessor:
                                         pass
                                 if time.time() - yolo_wait_start > yolo_wait_timeout:
                                     break
-                    pool_yolo.shutdown(wait=False)
-                    logger.debug("   ✅ YOLO pool shut down")
+                    pool_yolo.shutdown(wait=False, cancel_futures=True)
+                    logger.debug("   ✅ YOLO pool released")
                 except Exception as e:
                     logger.warning(f"   ⚠️ Error shutting down YOLO pool: {e}")
 
             # Shutdown main thread pools
             for pool_name, pool in [("pool1", pool1), ("pool2", pool2), ("pool3", pool3), ("pool4", pool4)]:
                 try:
-                    pool.shutdown(wait=True)
-                    logger.debug(f"   ✅ {pool_name} shut down")
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    logger.debug(f"   ✅ {pool_name} released")
                 except Exception as e:
-                    logger.warning(f"   ⚠️ Error shutting down {pool_name}: {e}")
+                    logger.warning(f"   ⚠️ Error releasing {pool_name}: {e}")
 
-            logger.debug("✅ All thread pools shut down")
+            logger.debug("✅ All stage pools released")
         except Exception as e:
-            logger.error(f"❌ Critical error shutting down thread pools: {e}")
+            logger.error(f"❌ Critical error releasing stage pools: {e}")
 
         # Clear future dictionaries
         if callback_factory:
@@ -75,24 +75,28 @@ class PDFProcessingService:
         request_id: Optional[str] = None,
     ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], List[str], List[Dict[str, Any]]]:
         """Process PDF with multi-page approach"""
+        pdf_handle = None
         try:
+            # Decode and open the PDF once; everything below works from this handle
+            pdf_handle = self.pdf_processor.open_pdf_document(pdf_data)
+            
             # For template_matching, use field-first approach
             if task == "template_matching":
                 return await self._process_template_matching_field_first(
-                    pdf_data, task, document_name, templates, db_templates, max_workers, max_threads,
+                    pdf_handle, task, document_name, templates, db_templates, max_workers, max_threads,
                     cancellation_token=cancellation_token, request_id=request_id
                 )
             
             # For template_guided_extraction, use two-step approach
             if task == "template_guided_extraction":
                 return await self._process_template_guided_extraction_two_step(
-                    pdf_data, document_name, templates, db_templates, max_workers, max_threads,
+                    pdf_handle, document_name, templates, db_templates, max_workers, max_threads,
                     cancellation_token=cancellation_token, request_id=request_id
                 )
             
             # For other tasks, use original multi-page approach
             # Convert PDF to images
-            converted_images = await self.pdf_processor.convert_pdf_to_images(pdf_data)
+            converted_images = await self.pdf_processor.convert_pdf_to_images(pdf_handle)
             
             if not converted_images:
                 raise ValueError("Failed to convert PDF to images")
@@ -137,11 +141,9 @@ class PDFProcessingService:
             logger.error(f"Error in multi-page PDF processing: {e}")
             raise
         finally:
-            # CRITICAL FIX #2: Ensure PDF cache is cleared even on errors
-            try:
-                self.pdf_processor.clear_pdf_cache()
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            # CRITICAL FIX #2: Ensure the cached PDF is released even on errors
+            if pdf_handle is not None:
+                pdf_handle.release()
 
     async def _process_template_matching_field_first(
         self,
@@ -161,7 +163,11 @@ class PDFProcessingService:
         2. Combine all fields
         3. Send fields + templates to LLM for template matching
         """
+        pdf_handle = None
         try:
+            # Decode and open the PDF once; everything below works from this handle
+            pdf_handle = self.pdf_processor.open_pdf_document(pdf_data)
+            
             logger.info("🎯 Using field-first approach for template matching")
             
             # Step 1: Extract fields from all pages using parallel processing
@@ -171,7 +177,7 @@ class PDFProcessingService:
             total_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
             
             # Get page count
-            page_count = self.pdf_processor.get_pdf_page_count(pdf_data)
+            page_count = self.pdf_processor.get_pdf_page_count(pdf_handle)
             logger.info(f"📄 Processing {page_count} pages for field extraction")
             
             # Process all pages in parallel
@@ -183,7 +189,7 @@ class PDFProcessingService:
                 "db_templates": db_templates
             }
             page_results = await self.parallel_processor.process_pages_parallel(
-                pdf_data,
+                pdf_handle,
                 page_count,
                 self.parallel_processor.process_page_for_template_matching,
                 process_context,
@@ -293,11 +299,9 @@ Please analyze the extracted fields and match them to the most appropriate templ
             logger.error(f"Error in field-first template matching: {e}")
             raise
         finally:
-            # CRITICAL FIX #2: Ensure PDF cache is cleared even on errors
-            try:
-                self.pdf_processor.clear_pdf_cache()
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            # CRITICAL FIX #2: Ensure the cached PDF is released even on errors
+            if pdf_handle is not None:
+                pdf_handle.release()
 
     def _format_fields_for_template_matching(self, fields: List[Dict[str, Any]]) -> str:
         """Format extracted fields for template matching prompt"""
@@ -375,7 +379,11 @@ Please analyze the extracted fields and match them to the most appropriate templ
         1. Extract all data using without_template_extraction (page-by-page)
         2. Use template structure to organize and format the extracted data
         """
+        pdf_handle = None
         try:
+            # Decode and open the PDF once; everything below works from this handle
+            pdf_handle = self.pdf_processor.open_pdf_document(pdf_data)
+            
             logger.info("🎯 Using two-step approach for template-guided extraction")
             
             # Log template sources for debugging
@@ -399,7 +407,7 @@ Please analyze the extracted fields and match them to the most appropriate templ
             total_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
             
             # Get page count
-            page_count = self.pdf_processor.get_pdf_page_count(pdf_data)
+            page_count = self.pdf_processor.get_pdf_page_count(pdf_handle)
             logger.info(f"📄 Processing {page_count} pages for data extraction (Step 1 of template-guided extraction)")
             
             # Process all pages in parallel
@@ -411,7 +419,7 @@ Please analyze the extracted fields and match them to the most appropriate templ
                 "db_templates": db_templates
             }
             page_results = await self.parallel_processor.process_pages_parallel(
-                pdf_data,
+                pdf_handle,
                 page_count,
                 self.parallel_processor.process_page_for_template_extraction,
                 process_context,
@@ -668,11 +676,9 @@ Return:
             logger.error(f"Error in two-step template-guided extraction: {e}")
             raise
         finally:
-            # CRITICAL FIX #2: Ensure PDF cache is cleared even on errors
-            try:
-                self.pdf_processor.clear_pdf_cache()
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            # CRITICAL FIX #2: Ensure the cached PDF is released even on errors
+            if pdf_handle is not None:
+                pdf_handle.release()
 
     def _format_template_structure_for_organization(self, templates: List[Dict[str, Any]]) -> str:
         """Format template structure for data organization - only uses metadata.template_structure"""
@@ -895,9 +901,13 @@ Return:
     ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], List[str]]:
         """Process PDF with page-by-page approach"""
         logger.debug(f"🚀 PDF Processing Service: Starting process_pdf_page_by_page for task: {task}")
+        pdf_handle = None
         try:
+            # Decode and open the upload once; every page stage below works from this handle
+            pdf_handle = self.pdf_processor.open_pdf_document(pdf_data)
+            
             # Get total page count
-            total_pages = self.pdf_processor.get_pdf_page_count(pdf_data)
+            total_pages = self.pdf_processor.get_pdf_page_count(pdf_handle)
             logger.debug(f"📄 Processing PDF with {total_pages} pages individually")
             
             # Process all pages (no limit)
@@ -918,7 +928,7 @@ Return:
             if is_bank_statement:
                 logger.info(f"🏦 Bank Statement mode - sequential header detection enabled")
                 page_results = await self._process_bank_statement_pages(
-                    pdf_data, total_pages, task, document_name, templates, db_templates,
+                    pdf_handle, total_pages, task, document_name, templates, db_templates,
                     document_type, max_workers, max_threads, cancellation_token, request_id
                 )
             else:
@@ -933,7 +943,7 @@ Return:
                     "document_type": document_type
                 }
                 page_results = await self.parallel_processor.process_pages_parallel(
-                    pdf_data,
+                    pdf_handle,
                     max_pages_to_process,
                     self.parallel_processor.process_page_for_extraction_sync,
                     process_context,
@@ -1182,11 +1192,9 @@ Return:
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             raise
         finally:
-            # CRITICAL FIX #2: Ensure PDF cache is cleared even on errors
-            try:
-                self.pdf_processor.clear_pdf_cache()
-            except Exception as e:
-                logger.warning(f"⚠️ Error clearing PDF cache: {e}")
+            # CRITICAL FIX #2: Ensure the cached PDF is released even on errors
+            if pdf_handle is not None:
+                pdf_handle.release()
     
     def _convert_hierarchical_to_fields(self, hierarchical_data: Dict[str, Any], page_num: int) -> List[Dict[str, Any]]:
         """Convert hierarchical data structure to flat fields array"""
@@ -3,9 +3,11 @@ Semantic Search Service
 Handles vector similarity search for document retrieval using embeddings.
 """
 
+import asyncio
 import logging
 import os
-from typing import Dict, Any, List, Optional, Tuple
+import time
+from typing import Dict, Any, Callable, Hashable, Iterable, List, Optional, Tuple
 from datetime import datetime
 import json
 from dotenv import load_dotenv
@@ -13,7 +15,10 @@ from dotenv import load_dotenv
 # Use the singleton Supabase client for connection pooling
 from app.core.supabase_client import get_supabase_client
 
+from ...core.config import settings
 from .embedding_service import EmbeddingService
+from ..vector_index import get_vector_index_registry
+from ..lexical_index import get_lexical_index_registry, reciprocal_rank_fusion
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +45,11 @@ class SemanticSearchService:
         filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Search documents using semantic similarity.
+        Search documents using semantic similarity, fused with BM25 keyword matches.
+        
+        Vector results and lexical (BM25) results are merged by reciprocal-rank
+        fusion, so exact identifiers (invoice numbers, NPWP, NIK) are found even
+        when their embedding similarity is below the threshold.
         
         Args:
             query: The search query text
@@ -63,18 +72,29 @@ class SemanticSearchService:
             
             logger.info(f"🔍 Starting semantic search for query: '{query}'")
             
+            hybrid = settings.HYBRID_SEARCH_ENABLED
+            candidates = max(limit, settings.HYBRID_SEARCH_CANDIDATES) if hybrid else limit
+            
             # Generate embedding for the query
             query_embedding = await self.embedding_service.generate_embedding(query.strip())
             if not query_embedding:
                 logger.error("Failed to generate query embedding")
-                return {"results": [], "total": 0, "error": "Failed to generate query embedding"}
-            
-            logger.info(f"✅ Generated query embedding with {len(query_embedding)} dimensions")
-            
-            # Perform vector similarity search
-            search_results = await self._perform_vector_search(
-                query_embedding, user_id, limit, similarity_threshold, filters
-            )
+                if not hybrid:
+                    return {"results": [], "total": 0, "error": "Failed to generate query embedding"}
+                vector_results = []
+            else:
+                logger.info(f"✅ Generated query embedding with {len(query_embedding)} dimensions")
+                
+                # Perform vector similarity search
+                vector_results = await self._perform_vector_search(
+                    query_embedding, user_id, candidates, similarity_threshold, filters
+                )
+            
+            if hybrid:
+                lexical_results = await self._lexical_search(query.strip(), user_id, candidates, filters)
+                search_results = self._fuse_results(vector_results, lexical_results, limit)
+            else:
+                search_results = vector_results
             
             # Process and rank results
             processed_results = self._process_search_results(search_results, query)
@@ -242,88 +262,214 @@ class SemanticSearchService:
                                       similarity_threshold: float, limit: int) -> List[Dict[str, Any]]:
         """
         Manual similarity search fallback using document_chunks table.
-        Python-based cosine similarity calculation when SQL vector operations fail.
+        Uses the per-user in-process vector index (loaded from document_chunks on first use,
+        kept current by DatabaseService and rebuilt when another worker changed the chunks)
+        and fetches document metadata for the winners only.
         """
         try:
-            import json
-            import numpy as np
+            logger.info("🔄 Performing MANUAL SEARCH on document_chunks (in-process vector index)...")
             
-            logger.info("🔄 Performing MANUAL SEARCH on document_chunks (Python-based similarity)...")
+            registry = get_vector_index_registry()
+            index = await self._current_index(registry, user_id, self._load_user_chunk_embeddings)
             
-            # Get all chunks for the user's documents
-            response = self.supabase.table("document_chunks").select(
-                "id, document_id, chunk_index, chunk_text, chunk_embedding, "
-                "documents!inner(id, user_id, file_name, file_type, file_size, storage_path, "
-                "processing_status, analysis_result, created_at, updated_at)"
-            ).eq("documents.user_id", user_id).execute()
+            # Search (and a first IVF build) is CPU-bound numpy work
+            hits = await asyncio.to_thread(index.search, query_embedding, limit, similarity_threshold)
+            if not hits:
+                logger.info("No chunks above similarity threshold in manual search")
+                return []
             
-            logger.info(f"📋 Database response: {len(response.data) if response.data else 0} chunks")
+            results = await asyncio.to_thread(
+                self._attach_documents,
+                [(hit.document_id, hit.chunk_index, hit.chunk_text, hit.similarity) for hit in hits],
+                registry
+            )
             
-            if not response.data:
-                logger.info("No chunks found for manual search")
-                return []
+            logger.info(f"✅ MANUAL SEARCH completed - returned {len(results)} results from chunks")
+            return results
             
-            results = []
-            query_vector = np.array(query_embedding)
-            query_norm = query_vector / np.linalg.norm(query_vector)
+        except Exception as e:
+            logger.error(f"Error in manual similarity search: {e}")
+            return []
+    
+    async def _current_index(self, registry, user_id: str, load_rows: Callable[[str], Iterable[tuple]]):
+        """
+        The user's loaded index from registry, (re)built in a worker thread when it is
+        missing or document_chunks changed since it was built (e.g. a save handled by
+        another API worker). The version is compared at most every
+        SEARCH_INDEX_VERSION_CHECK_S seconds.
+        """
+        index = registry.get(user_id)
+        if index is not None and time.monotonic() - index.checked_at < settings.SEARCH_INDEX_VERSION_CHECK_S:
+            return index
+        
+        try:
+            version = await asyncio.to_thread(self._chunk_version, user_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read chunk version for user {user_id}: {e}")
+            if index is not None:
+                return index
+            version = None
+        
+        if index is not None:
+            if index.version == version:
+                index.checked_at = time.monotonic()
+                return index
+            logger.info(f"🔄 Chunks of user {user_id} changed since the search index was built, rebuilding")
+        return await asyncio.to_thread(lambda: registry.build(user_id, load_rows(user_id), version))
+    
+    def _chunk_version(self, user_id: str) -> Hashable:
+        """(chunk count, newest created_at) of a user's chunks; any insert or delete changes it."""
+        response = self.supabase.table("document_chunks").select(
+            "created_at, documents!inner(user_id)", count="exact"
+        ).eq("documents.user_id", user_id).order("created_at", desc=True).limit(1).execute()
+        newest = response.data[0].get("created_at") if response.data else None
+        return (response.count or 0, newest)
+    
+    def _attach_documents(self, hits: List[Tuple[str, int, str, float]], registry) -> List[Dict[str, Any]]:
+        """
+        Result rows for index hits of (document_id, chunk_index, chunk_text, score).
+        Fetches document metadata only for the documents that won; hits on documents
+        deleted since the index was built are dropped from it.
+        """
+        document_ids = list(dict.fromkeys(document_id for document_id, _, _, _ in hits))
+        doc_response = self.supabase.table("documents").select(
+            "id, user_id, file_name, file_type, file_size, storage_path, "
+            "processing_status, analysis_result, created_at, updated_at"
+        ).in_("id", document_ids).execute()
+        documents = {doc["id"]: doc for doc in (doc_response.data or [])}
+        
+        results = []
+        for document_id, chunk_index, chunk_text, score in hits:
+            doc_data = documents.get(document_id)
+            if not doc_data:
+                # Deleted since the index was built
+                registry.remove_document(document_id)
+                continue
+            results.append({
+                'id': doc_data.get('id'),
+                'user_id': doc_data.get('user_id'),
+                'file_name': doc_data.get('file_name'),
+                'file_type': doc_data.get('file_type'),
+                'file_size': doc_data.get('file_size'),
+                'storage_path': doc_data.get('storage_path'),
+                'processing_status': doc_data.get('processing_status'),
+                'analysis_result': doc_data.get('analysis_result'),
+                'created_at': doc_data.get('created_at'),
+                'updated_at': doc_data.get('updated_at'),
+                'chunk_text': chunk_text,
+                'chunk_index': chunk_index,
+                'similarity_score': score
+            })
+        return results
+    
+    async def _lexical_search(
+        self,
+        query: str,
+        user_id: str,
+        limit: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword search over the user's chunks with the in-process BM25 index
+        (loaded from document_chunks on first use, kept current by DatabaseService and
+        rebuilt when another worker changed the chunks). Hits below
+        HYBRID_LEXICAL_MIN_SCORE are dropped; similarity_score is the BM25 score
+        relative to the best hit (0-1).
+        """
+        try:
+            registry = get_lexical_index_registry()
+            index = await self._current_index(registry, user_id, self._load_user_chunk_texts)
             
-            for chunk in response.data:
-                try:
-                    chunk_embedding = chunk.get('chunk_embedding')
-                    if not chunk_embedding:
-                        continue
-                    
-                    # Parse vector from JSON string if needed
-                    if isinstance(chunk_embedding, str):
-                        chunk_vector = json.loads(chunk_embedding)
-                    else:
-                        chunk_vector = chunk_embedding
-                    
-                    if not isinstance(chunk_vector, list) or len(chunk_vector) != len(query_embedding):
-                        continue
-                    
-                    # Calculate cosine similarity
-                    chunk_vector_np = np.array(chunk_vector)
-                    chunk_norm = chunk_vector_np / np.linalg.norm(chunk_vector_np)
-                    similarity = float(np.dot(query_norm, chunk_norm))
-                    
-                    if similarity >= similarity_threshold:
-                        # Get document data (nested in chunks query)
-                        doc_data = chunk.get('documents', {})
-                        
-                        result = {
-                            'id': doc_data.get('id'),
-                            'user_id': doc_data.get('user_id'),
-                            'file_name': doc_data.get('file_name'),
-                            'file_type': doc_data.get('file_type'),
-                            'file_size': doc_data.get('file_size'),
-                            'storage_path': doc_data.get('storage_path'),
-                            'processing_status': doc_data.get('processing_status'),
-                            'analysis_result': doc_data.get('analysis_result'),
-                            'created_at': doc_data.get('created_at'),
-                            'updated_at': doc_data.get('updated_at'),
-                            'chunk_text': chunk.get('chunk_text'),
-                            'chunk_index': chunk.get('chunk_index'),
-                            'similarity_score': similarity
-                        }
-                        
-                        results.append(result)
-                        
-                except Exception as e:
-                    logger.warning(f"Error processing chunk: {e}")
-                    continue
+            hits = await asyncio.to_thread(index.search, query, limit, settings.HYBRID_LEXICAL_MIN_SCORE)
+            if not hits:
+                return []
             
-            # Sort by similarity score (descending) and limit results
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
-            results = results[:limit]
+            top_score = hits[0].score
+            results = await asyncio.to_thread(
+                self._attach_documents,
+                [(hit.document_id, hit.chunk_index, hit.chunk_text, hit.score / top_score) for hit in hits],
+                registry
+            )
+            if filters:
+                if filters.get("file_type"):
+                    results = [r for r in results if r.get("file_type") == filters["file_type"]]
+                if filters.get("date_from"):
+                    results = [r for r in results if (r.get("created_at") or "") >= filters["date_from"]]
+                if filters.get("date_to"):
+                    results = [r for r in results if (r.get("created_at") or "") <= filters["date_to"]]
             
-            logger.info(f"✅ MANUAL SEARCH completed - returned {len(results)} results from chunks")
+            logger.info(f"🔤 LEXICAL SEARCH returned {len(results)} results")
             return results
             
         except Exception as e:
-            logger.error(f"Error in manual similarity search: {e}")
+            logger.error(f"Error in lexical search: {e}")
             return []
     
+    def _fuse_results(
+        self,
+        vector_results: List[Dict[str, Any]],
+        lexical_results: List[Dict[str, Any]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Merge vector and lexical result rows (per chunk) by reciprocal-rank fusion."""
+        rows: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+        rankings = []
+        for match_type, results in (("vector", vector_results), ("lexical", lexical_results)):
+            ranking = []
+            for result in results:
+                key = (result.get("id"), result.get("chunk_index"))
+                if key in rows:
+                    if rows[key]["match_type"] != match_type:
+                        rows[key]["match_type"] = "hybrid"
+                else:
+                    # Vector rows come first, so a chunk found by both keeps its cosine similarity
+                    rows[key] = {**result, "match_type": match_type}
+                ranking.append(key)
+            rankings.append(ranking)
+        
+        fused = []
+        for key, score in reciprocal_rank_fusion(rankings, settings.HYBRID_RRF_K)[:limit]:
+            fused.append({**rows[key], "hybrid_score": score})
+        return fused
+    
+    def _load_user_chunk_texts(self, user_id: str, page_size: int = 1000):
+        """Yield (document_id, chunk_index, chunk_text) for all of a user's chunks, page by page."""
+        offset = 0
+        while True:
+            response = self.supabase.table("document_chunks").select(
+                "document_id, chunk_index, chunk_text, documents!inner(user_id)"
+            ).eq("documents.user_id", user_id).order("id").range(offset, offset + page_size - 1).execute()
+            rows = response.data or []
+            for chunk in rows:
+                if chunk.get('chunk_text'):
+                    yield chunk.get('document_id'), chunk.get('chunk_index'), chunk.get('chunk_text')
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    
+    def _load_user_chunk_embeddings(self, user_id: str, page_size: int = 1000):
+        """Yield (document_id, chunk_index, chunk_text, embedding) for all of a user's chunks, page by page."""
+        offset = 0
+        while True:
+            response = self.supabase.table("document_chunks").select(
+                "document_id, chunk_index, chunk_text, chunk_embedding, documents!inner(user_id)"
+            ).eq("documents.user_id", user_id).order("id").range(offset, offset + page_size - 1).execute()
+            rows = response.data or []
+            for chunk in rows:
+                chunk_embedding = chunk.get('chunk_embedding')
+                if not chunk_embedding:
+                    continue
+                # Parse vector from JSON string if needed
+                if isinstance(chunk_embedding, str):
+                    try:
+                        chunk_embedding = json.loads(chunk_embedding)
+                    except ValueError:
+                        continue
+                yield chunk.get('document_id'), chunk.get('chunk_index'), chunk.get('chunk_text'), chunk_embedding
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    
     def _process_search_results(
         self,
         results: List[Dict[str, Any]],
@@ -345,6 +491,8 @@ class SemanticSearchService:
                     "created_at": result.get("created_at"),
                     "updated_at": result.get("updated_at"),
                     "similarity_score": result.get("similarity_score", 0.0),
+                    "hybrid_score": result.get("hybrid_score"),
+                    "match_type": result.get("match_type", "vector"),
                     "analysis_result": result.get("analysis_result", {}),  # Include full analysis_result
                     "analysis_summary": self._extract_analysis_summary(result.get("analysis_result", {})),
                     "relevant_fields": self._find_relevant_fields(result.get("analysis_result", {}), query)
@@ -352,8 +500,11 @@ class SemanticSearchService:
                 
                 processed_results.append(processed_result)
             
-            # Sort by similarity score (highest first)
-            processed_results.sort(key=lambda x: x["similarity_score"], reverse=True)
+            # Sort by fused rank when hybrid, else by similarity score (highest first)
+            processed_results.sort(
+                key=lambda x: x["hybrid_score"] if x["hybrid_score"] is not None else x["similarity_score"],
+                reverse=True
+            )
             
             return processed_results
             
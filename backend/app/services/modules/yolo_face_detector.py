@@ -29,6 +29,8 @@ class YOLOFaceDetector:
         self.confidence_threshold = float(os.getenv("YOLO_FACE_CONFIDENCE_THRESHOLD", "0.5"))
         self.iou_threshold = float(os.getenv("YOLO_FACE_IOU_THRESHOLD", "0.45"))
         self.use_gpu = os.getenv("YOLO_USE_GPU", "false").lower() == "true"
+        self.backend = os.getenv("YOLO_BACKEND", "onnx").lower()
+        self.onnx_model_path = os.getenv("YOLO_FACE_ONNX_MODEL_PATH") or os.path.splitext(self.model_path)[0] + ".onnx"
         self.model = None
         
         if self.enabled:
@@ -38,6 +40,9 @@ class YOLOFaceDetector:
     
     def _load_model(self):
         """Load YOLO model for face detection with compatibility handling"""
+        if self.backend == "onnx":
+            self._load_onnx_model()
+            return
         try:
             # Try to import ultralytics (YOLOv8/v11)
             try:
@@ -110,6 +115,73 @@ class YOLOFaceDetector:
             logger.warning("⚠️ YOLO face detection will be disabled.")
             self.enabled = False
     
+    def _load_onnx_model(self):
+        """Register the ONNX export with the out-of-process inference service"""
+        if not os.path.exists(self.onnx_model_path):
+            logger.warning(f"⚠️ YOLO face ONNX model not found at {self.onnx_model_path}. Face detection will be disabled.")
+            logger.info(f"💡 Export it with: yolo export model={self.model_path} format=onnx dynamic=True")
+            self.enabled = False
+            return
+        
+        try:
+            from ..yolo_inference_service import get_yolo_inference_service
+            # Same low pre-threshold as the ultralytics path; confidence_threshold is applied per detection
+            self.model = get_yolo_inference_service().load_model(
+                "face", self.onnx_model_path, conf=0.1, iou=self.iou_threshold
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to load YOLO face ONNX model: {e}")
+            logger.warning("⚠️ YOLO face detection will be disabled.")
+            self.enabled = False
+            self.model = None
+            return
+        
+        class_names = list(self.model.names.values())
+        logger.info(f"✅ YOLO face detector loaded - Model: {self.onnx_model_path}, Backend: ONNX Runtime (worker process)")
+        logger.info(f"   Classes: {len(class_names)} - {class_names}")
+        logger.info(f"   Confidence threshold: {self.confidence_threshold}, IoU threshold: {self.iou_threshold}")
+        if class_names and not any(name.lower() in ["face", "person", "photo", "photo_id", "portrait"] for name in class_names):
+            logger.warning(f"⚠️  Model classes don't explicitly include 'face': {class_names}")
+            logger.info("   Will treat class 0 detections as faces.")
+    
+    def _detect_onnx(self, images: List[Image.Image]) -> List[List[Dict[str, Any]]]:
+        """
+        Detect faces/photo IDs through the inference service
+        
+        Pages are micro-batched with pages of other documents in the worker
+        process; a page whose inference failed gets no detections.
+        """
+        all_faces = []
+        for img_idx, detections in enumerate(self.model.detect(images, return_exceptions=True)):
+            if isinstance(detections, Exception):
+                logger.error(f"❌ YOLO face detection error for image {img_idx} ({type(detections).__name__}): {detections}")
+                all_faces.append([])
+                continue
+            
+            faces = []
+            for detection in detections:
+                cls = detection["class_id"]
+                conf = detection["confidence"]
+                bbox = detection["bbox"]
+                class_name = self.model.names.get(cls, "unknown")
+                is_face = class_name.lower() in ["face", "person", "photo", "photo_id", "portrait"] or cls == 0
+                
+                if is_face and conf >= self.confidence_threshold:
+                    faces.append({
+                        "bbox": [int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])],
+                        "confidence": conf,
+                        "is_face": True,
+                        "class": class_name,
+                        "type": "photo_id"
+                    })
+            all_faces.append(faces)
+        
+        if len(images) > 1:
+            logger.info(f"✅ Batch face detection complete: {len([f for f in all_faces if f])} images with faces out of {len(images)}")
+        elif all_faces and all_faces[0]:
+            logger.info(f"✅ YOLO detected {len(all_faces[0])} face(s)/photo ID(s) in image")
+        return all_faces
+    
     def detect_faces_in_image(self, image: Image.Image) -> List[Dict[str, Any]]:
         """
         Detect faces/photo IDs in an image using YOLO
@@ -124,6 +196,9 @@ class YOLOFaceDetector:
         if not self.enabled or self.model is None:
             return []
         
+        if self.backend == "onnx":
+            return self._detect_onnx([image])[0]
+        
         try:
             # Ensure image is in RGB format (YOLO expects RGB)
             if image.mode != "RGB":
@@ -225,6 +300,9 @@ class YOLOFaceDetector:
         if not self.enabled or self.model is None or not images:
             return [[] for _ in images]
         
+        if self.backend == "onnx":
+            return self._detect_onnx(images)
+        
         try:
             # Preprocess all images to RGB format
             rgb_images = []
@@ -25,6 +25,8 @@ class YOLOSignatureDetector:
         self.confidence_threshold = float(os.getenv("YOLO_CONFIDENCE_THRESHOLD", "0.5"))
         self.iou_threshold = float(os.getenv("YOLO_IOU_THRESHOLD", "0.45"))
         self.use_gpu = os.getenv("YOLO_USE_GPU", "false").lower() == "true"
+        self.backend = os.getenv("YOLO_BACKEND", "onnx").lower()
+        self.onnx_model_path = os.getenv("YOLO_ONNX_MODEL_PATH") or os.path.splitext(self.model_path)[0] + ".onnx"
         self.model = None
         
         if self.enabled:
@@ -34,6 +36,9 @@ class YOLOSignatureDetector:
     
     def _load_model(self):
         """Load YOLO model with compatibility handling"""
+        if self.backend == "onnx":
+            self._load_onnx_model()
+            return
         try:
             # Try to import ultralytics (YOLOv8)
             try:
@@ -120,6 +125,70 @@ class YOLOSignatureDetector:
             logger.warning("⚠️ YOLO signature detection will be disabled.")
             self.enabled = False
     
+    def _load_onnx_model(self):
+        """Register the ONNX export with the out-of-process inference service"""
+        if not os.path.exists(self.onnx_model_path):
+            logger.warning(f"⚠️ YOLO ONNX model not found at {self.onnx_model_path}. YOLO detection will be disabled.")
+            logger.info(f"💡 Export it with: yolo export model={self.model_path} format=onnx dynamic=True")
+            self.enabled = False
+            return
+        
+        try:
+            from ..yolo_inference_service import get_yolo_inference_service
+            # Same low pre-threshold as the ultralytics path; confidence_threshold is applied per detection
+            self.model = get_yolo_inference_service().load_model(
+                "signature", self.onnx_model_path, conf=0.1, iou=self.iou_threshold
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to load YOLO ONNX model: {e}")
+            logger.warning("⚠️ YOLO signature detection will be disabled.")
+            self.enabled = False
+            self.model = None
+            return
+        
+        logger.info(f"✅ YOLO signature detector loaded - Model: {self.onnx_model_path}, Backend: ONNX Runtime (worker process)")
+        logger.info(f"   Confidence threshold: {self.confidence_threshold}, IoU threshold: {self.iou_threshold}")
+        if "signature" not in str(self.model.names).lower() and "sig" not in str(self.model.names).lower():
+            logger.warning("⚠️  WARNING: This model doesn't appear to have a 'signature' class.")
+            logger.warning("💡  The model may not detect signatures correctly. Consider using a signature-specific model.")
+    
+    def _detect_onnx(self, images: List[Image.Image]) -> List[List[Dict[str, Any]]]:
+        """
+        Detect signatures through the inference service
+        
+        Pages are micro-batched with pages of other documents in the worker
+        process; a page whose inference failed gets no detections.
+        """
+        all_signatures = []
+        for img_idx, detections in enumerate(self.model.detect(images, return_exceptions=True)):
+            if isinstance(detections, Exception):
+                logger.error(f"❌ YOLO detection error for image {img_idx} ({type(detections).__name__}): {detections}")
+                all_signatures.append([])
+                continue
+            
+            signatures = []
+            for detection in detections:
+                cls = detection["class_id"]
+                conf = detection["confidence"]
+                bbox = detection["bbox"]
+                class_name = self.model.names.get(cls, "unknown")
+                is_signature = class_name.lower() in ["signature", "sig"] or cls == 0
+                
+                if is_signature and conf >= self.confidence_threshold:
+                    signatures.append({
+                        "bbox": [int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])],
+                        "confidence": conf,
+                        "is_signature": True,
+                        "class": class_name
+                    })
+            all_signatures.append(signatures)
+        
+        if len(images) > 1:
+            logger.info(f"✅ Batch YOLO detection complete: {len([s for s in all_signatures if s])} images with signatures out of {len(images)}")
+        elif all_signatures and all_signatures[0]:
+            logger.info(f"✅ YOLO detected {len(all_signatures[0])} signature(s) in image")
+        return all_signatures
+    
     def detect_signatures_in_image(self, image: Image.Image) -> List[Dict[str, Any]]:
         """
         Detect signatures in an image block using YOLO
@@ -134,6 +203,9 @@ class YOLOSignatureDetector:
         if not self.enabled or self.model is None:
             return []
         
+        if self.backend == "onnx":
+            return self._detect_onnx([image])[0]
+        
         try:
             # Ensure image is in RGB format (YOLO expects RGB)
             if image.mode != "RGB":
@@ -264,6 +336,9 @@ class YOLOSignatureDetector:
         if not self.enabled or self.model is None or not images:
             return [[] for _ in images]
         
+        if self.backend == "onnx":
+            return self._detect_onnx(images)
+        
         try:
             # Preprocess all images to RGB format
             rgb_images = []
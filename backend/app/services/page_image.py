@@ -0,0 +1,54 @@
+"""
+Encoded page image carried through the page pipeline as raw bytes.
+
+Page images used to be base64 data URLs from the moment they were encoded,
+which costs ~33% extra memory per image and a full copy every time the string
+is sliced or decoded. PageImage keeps the encoded PNG/JPEG bytes and only
+produces base64 at the edge: when an LLM request body or an API response is
+built.
+"""
+
+import base64
+from dataclasses import dataclass
+from typing import Union
+
+
+@dataclass(frozen=True)
+class PageImage:
+    """Encoded image bytes plus their MIME type"""
+
+    data: bytes
+    mime_type: str = "image/png"
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.to_base64()}"
+
+    @classmethod
+    def from_data_url(cls, data_url: str) -> "PageImage":
+        """Parse a data URL (or bare base64 string, assumed PNG)"""
+        if data_url.startswith("data:") and "base64," in data_url:
+            header, payload = data_url.split("base64,", 1)
+            mime_type = header[len("data:"):].rstrip(";") or "image/png"
+        else:
+            payload, mime_type = data_url, "image/png"
+        return cls(data=base64.b64decode(payload), mime_type=mime_type)
+
+
+def image_to_data_url(image: Union[PageImage, str, None]) -> Union[str, None]:
+    """Data URL for a PageImage; strings (already data URLs) and None pass through"""
+    if isinstance(image, PageImage):
+        return image.to_data_url()
+    return image
+
+
+def image_to_bytes(image: Union[PageImage, str]) -> bytes:
+    """Raw encoded bytes for a PageImage or a base64 / data URL string"""
+    if isinstance(image, PageImage):
+        return image.data
+    return PageImage.from_data_url(image).data
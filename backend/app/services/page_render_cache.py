@@ -0,0 +1,247 @@
+"""
+Render-once cache of rasterized PDF pages, shared by type detection and extraction.
+
+DocumentProcessingOrchestrator runs DocumentTypeDetector (first pages at 2x) and
+extraction (image-path pages at 5x) concurrently on the same upload, and each
+used to open the PDF and rasterize its pages on its own. Within a render scope
+opened for the upload's fingerprint, pixmaps are cached by
+(fingerprint, page, scale, colorspace):
+
+- a request for a page already rendered (or being rendered) at the same or a
+  higher scale waits for / reuses that render, downscaling if needed, instead
+  of rasterizing again;
+- only the pages declared when opening the scope are kept, and they are
+  dropped when the last scope for the fingerprint closes;
+- outside a scope pages are rendered directly, exactly as before.
+
+Counters report renders, and reuses / downscales of another consumer's render
+(each of which is a render saved), process-wide in stats() and per document in
+the dict close_scope() returns. Rasterization holds the document cache's lock
+for the page's document, since the consumers run on different threads.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import fitz  # PyMuPDF
+
+from .pdf_document_cache import get_pdf_document_cache
+
+logger = logging.getLogger(__name__)
+
+# (fingerprint, page_number, scale, colorspace)
+RenderKey = Tuple[str, int, float, str]
+
+
+def _pixmap_size(pix: fitz.Pixmap) -> int:
+    return pix.stride * pix.height
+
+
+@dataclass
+class _Scope:
+    count: int = 0
+    pages: Set[int] = field(default_factory=set)
+    renders: int = 0
+    reuses: int = 0
+    downscales: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "renders": self.renders,
+            "reuses": self.reuses,
+            "downscales": self.downscales,
+            "renders_saved": self.reuses + self.downscales,
+        }
+
+
+class PageRenderCache:
+    """Thread-safe, byte-budgeted cache of page pixmaps with in-flight de-duplication."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[RenderKey, fitz.Pixmap]" = OrderedDict()
+        self._inflight: Dict[RenderKey, threading.Event] = {}
+        self._scopes: Dict[str, _Scope] = {}
+        self._total_bytes = 0
+        # Metrics
+        self.renders = 0
+        self.reuses = 0
+        self.downscales = 0
+
+    # -------------------------------------------------------------------------
+    # Scopes
+    # -------------------------------------------------------------------------
+    def open_scope(self, fingerprint: str, pages: Iterable[int]):
+        """Start caching renders of `pages` of the document with this fingerprint."""
+        with self._lock:
+            scope = self._scopes.setdefault(fingerprint, _Scope())
+            scope.count += 1
+            scope.pages.update(pages)
+
+    def close_scope(self, fingerprint: str) -> Dict[str, int]:
+        """
+        End one scope; the document's cached renders are dropped when the last one closes.
+
+        Returns the render counters of this document since its scope was first opened
+        (shared by concurrent scopes of the same file).
+        """
+        with self._lock:
+            scope = self._scopes.get(fingerprint)
+            if scope is None:
+                return _Scope().stats()
+            if scope.count > 1:
+                scope.count -= 1
+                return scope.stats()
+            del self._scopes[fingerprint]
+            for key in [key for key in self._entries if key[0] == fingerprint]:
+                self._total_bytes -= _pixmap_size(self._entries.pop(key))
+            return scope.stats()
+
+    # -------------------------------------------------------------------------
+    # Rendering
+    # -------------------------------------------------------------------------
+    def get_pixmap(
+        self,
+        fingerprint: Optional[str],
+        page: fitz.Page,
+        scale: float,
+        colorspace: str = "rgb",
+        render_scale: Optional[float] = None,
+    ) -> fitz.Pixmap:
+        """
+        Pixmap of page at scale (no alpha), rendered at most once per scope.
+
+        If the page has to be rendered, it is rendered at render_scale (>= scale,
+        default scale) so a later, larger request can reuse it, then downscaled.
+        The returned pixmap is shared; callers must not modify it.
+        """
+        page_number = page.number
+        render_scale = max(scale, render_scale or scale)
+        if not fingerprint or not self._in_scope(fingerprint, page_number):
+            return self._render(page, scale, colorspace)
+
+        while True:
+            with self._lock:
+                source_key = self._best_source_locked(fingerprint, page_number, scale, colorspace)
+                if source_key is not None:
+                    source = self._entries[source_key]
+                    self._entries.move_to_end(source_key)
+                    if source_key[2] == scale:
+                        self.reuses += 1
+                        self._count_locked(fingerprint, "reuses")
+                        return source
+                    break
+                pending = self._pending_source_locked(fingerprint, page_number, scale, colorspace)
+                if pending is None:
+                    key = (fingerprint, page_number, render_scale, colorspace)
+                    done = threading.Event()
+                    self._inflight[key] = done
+                    break
+            # Another consumer is rendering this page at a usable scale; wait for it
+            pending.wait()
+
+        if source_key is not None:
+            with self._lock:
+                self.downscales += 1
+                self._count_locked(fingerprint, "downscales")
+            return self._downscale(source, scale, source_key[2])
+
+        try:
+            pix = self._render(page, render_scale, colorspace, fingerprint)
+            self._store(key, pix)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+        if render_scale == scale:
+            return pix
+        return self._downscale(pix, scale, render_scale)
+
+    def _in_scope(self, fingerprint: str, page_number: int) -> bool:
+        with self._lock:
+            scope = self._scopes.get(fingerprint)
+            return scope is not None and page_number in scope.pages
+
+    def _count_locked(self, fingerprint: str, counter: str):
+        scope = self._scopes.get(fingerprint)
+        if scope is not None:
+            setattr(scope, counter, getattr(scope, counter) + 1)
+
+    def _best_source_locked(self, fingerprint: str, page_number: int, scale: float, colorspace: str) -> Optional[RenderKey]:
+        """Smallest cached render of the page at >= scale."""
+        candidates = [
+            key for key in self._entries
+            if key[0] == fingerprint and key[1] == page_number and key[3] == colorspace and key[2] >= scale
+        ]
+        return min(candidates, key=lambda key: key[2]) if candidates else None
+
+    def _pending_source_locked(self, fingerprint: str, page_number: int, scale: float, colorspace: str) -> Optional[threading.Event]:
+        for key, event in self._inflight.items():
+            if key[0] == fingerprint and key[1] == page_number and key[3] == colorspace and key[2] >= scale:
+                return event
+        return None
+
+    def _render(self, page: fitz.Page, scale: float, colorspace: str, fingerprint: Optional[str] = None) -> fitz.Pixmap:
+        with get_pdf_document_cache().lock_for(page.parent):
+            pix = page.get_pixmap(
+                matrix=fitz.Matrix(scale, scale),
+                colorspace=fitz.csGRAY if colorspace == "gray" else fitz.csRGB,
+                alpha=False,
+            )
+        with self._lock:
+            self.renders += 1
+            if fingerprint:
+                self._count_locked(fingerprint, "renders")
+        return pix
+
+    def _downscale(self, source: fitz.Pixmap, scale: float, source_scale: float) -> fitz.Pixmap:
+        ratio = scale / source_scale
+        return fitz.Pixmap(source, max(1, round(source.width * ratio)), max(1, round(source.height * ratio)), None)
+
+    def _store(self, key: RenderKey, pix: fitz.Pixmap):
+        with self._lock:
+            if key[0] not in self._scopes:
+                return  # Scope closed while rendering
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= _pixmap_size(previous)
+            self._entries[key] = pix
+            self._total_bytes += _pixmap_size(pix)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= _pixmap_size(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "scopes": len(self._scopes),
+                "renders": self.renders,
+                "reuses": self.reuses,
+                "downscales": self.downscales,
+                "renders_saved": self.reuses + self.downscales,
+            }
+
+
+# ============================================================
+# SINGLETON CACHE
+# ============================================================
+_page_render_cache: Optional[PageRenderCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_render_cache() -> PageRenderCache:
+    """Get the process-wide page render cache, creating it on first use."""
+    global _page_render_cache
+    if _page_render_cache is None:
+        with _cache_lock:
+            if _page_render_cache is None:
+                from ..core.config import settings
+                _page_render_cache = PageRenderCache(settings.PAGE_RENDER_CACHE_MAX_MB * 1024 * 1024)
+    return _page_render_cache
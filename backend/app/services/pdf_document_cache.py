@@ -0,0 +1,228 @@
+"""
+Process-wide cache of opened PyMuPDF documents.
+
+Documents are keyed by a content fingerprint of the PDF bytes, so concurrent
+requests for the same file share one fitz.Document. Each request opens a
+PDFHandle (one reference) once, passes it to its per-page work and releases it
+when done; an entry is only closed when nobody holds it and the cache is over
+its byte budget (least recently used first). This
+replaces the per-processor dict that any request could wipe with
+clear_pdf_cache() while another request was still rendering pages from it.
+
+A fitz.Document is not thread-safe, so each entry carries a lock (lock_for)
+that consumers on different threads hold around MuPDF calls on it.
+"""
+
+import contextlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import ContextManager, Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_pdf_bytes(pdf_bytes: bytes) -> str:
+    """Content fingerprint for PDF bytes (BLAKE2b-128 plus length)."""
+    digest = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+    return f"{len(pdf_bytes)}-{digest}"
+
+
+@dataclass
+class _CacheEntry:
+    document: fitz.Document
+    pdf_bytes: bytes
+    size: int
+    refcount: int = 0
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+class PDFHandle:
+    """
+    One holder's reference to a cached document, returned by PDFDocumentCache.open().
+
+    Pass the handle itself to per-page work: reading document/pdf_bytes from it needs
+    no decoding, hashing or cache lookup. release() drops the reference and is
+    idempotent; the handle is also a context manager.
+    """
+
+    def __init__(self, cache: "PDFDocumentCache", fingerprint: str, document: fitz.Document, pdf_bytes: bytes):
+        self.fingerprint = fingerprint
+        self.document = document
+        self.pdf_bytes = pdf_bytes
+        self._cache = cache
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def share(self) -> "PDFHandle":
+        """A second, independently released reference to the same document."""
+        if self._released:
+            raise ValueError("PDF handle already released")
+        self._cache._retain(self.fingerprint)
+        return PDFHandle(self._cache, self.fingerprint, self.document, self.pdf_bytes)
+
+    def release(self):
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        self._cache.release(self.fingerprint)
+
+    def __enter__(self) -> "PDFHandle":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class PDFDocumentCache:
+    """Thread-safe, byte-budgeted LRU cache of open PDF documents with reference counting."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        # id(document) -> fingerprint, for callers that only hold a page (page.parent)
+        self._fingerprints: Dict[int, str] = {}
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def open(self, pdf_bytes: bytes, fingerprint: Optional[str] = None) -> PDFHandle:
+        """Take one reference to the document for pdf_bytes, fingerprinting them unless given."""
+        fingerprint = fingerprint or fingerprint_pdf_bytes(pdf_bytes)
+        document = self.acquire(fingerprint, pdf_bytes)
+        return PDFHandle(self, fingerprint, document, pdf_bytes)
+
+    def acquire(self, fingerprint: str, pdf_bytes: bytes) -> fitz.Document:
+        """
+        Get the open document for fingerprint (opening pdf_bytes on a miss) and take a reference.
+
+        Every acquire must be paired with release(fingerprint); prefer open(), whose handle
+        does that bookkeeping.
+        """
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                entry.refcount += 1
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return entry.document
+
+        # Open outside the lock; another thread may race us to the same fingerprint
+        document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        if not document:
+            raise ValueError("Failed to open PDF document")
+
+        duplicate = None
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                duplicate = document
+                self.hits += 1
+            else:
+                entry = _CacheEntry(document=document, pdf_bytes=pdf_bytes, size=len(pdf_bytes))
+                self._entries[fingerprint] = entry
+                self._fingerprints[id(document)] = fingerprint
+                self._total_bytes += entry.size
+                self.misses += 1
+                logger.debug(f"📄 Cached PDF document ({fingerprint[:16]}..., pages: {len(document)})")
+            entry.refcount += 1
+            self._entries.move_to_end(fingerprint)
+            evicted = self._evict_locked()
+
+        if duplicate is not None:
+            duplicate.close()
+        self._close_evicted(evicted)
+        return entry.document
+
+    def _retain(self, fingerprint: str):
+        """Extra reference for a holder that already has one (not counted as a hit)."""
+        with self._lock:
+            entry = self._entries[fingerprint]
+            entry.refcount += 1
+            self._entries.move_to_end(fingerprint)
+
+    def fingerprint_of(self, document: fitz.Document) -> Optional[str]:
+        """Fingerprint of a document owned by this cache, or None for documents opened elsewhere."""
+        with self._lock:
+            return self._fingerprints.get(id(document))
+
+    def lock_for(self, document: fitz.Document) -> ContextManager:
+        """Lock serializing MuPDF calls on a cached document; a no-op for documents opened elsewhere."""
+        with self._lock:
+            fingerprint = self._fingerprints.get(id(document))
+            entry = self._entries.get(fingerprint) if fingerprint else None
+            return entry.lock if entry is not None else contextlib.nullcontext()
+
+    def release(self, fingerprint: str):
+        """Drop one reference; unreferenced entries become eligible for eviction."""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            evicted = self._evict_locked()
+        self._close_evicted(evicted)
+
+    def _evict_locked(self) -> list:
+        """Remove unreferenced LRU entries until under budget (caller holds the lock)."""
+        evicted = []
+        if self._total_bytes <= self.max_bytes:
+            return evicted
+        for fingerprint in list(self._entries.keys()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            entry = self._entries[fingerprint]
+            if entry.refcount > 0:
+                continue
+            del self._entries[fingerprint]
+            del self._fingerprints[id(entry.document)]
+            self._total_bytes -= entry.size
+            self.evictions += 1
+            evicted.append((fingerprint, entry))
+        return evicted
+
+    def _close_evicted(self, evicted: list):
+        for fingerprint, entry in evicted:
+            try:
+                entry.document.close()
+                logger.debug(f"🔒 Evicted cached PDF document ({fingerprint[:16]}...)")
+            except Exception as e:
+                logger.warning(f"⚠️ Error closing PDF document ({fingerprint[:16]}...): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "referenced": sum(1 for e in self._entries.values() if e.refcount > 0),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# ============================================================
+# SINGLETON CACHE
+# ============================================================
+_pdf_document_cache: Optional[PDFDocumentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_document_cache() -> PDFDocumentCache:
+    """Get the process-wide PDF document cache, creating it on first use."""
+    global _pdf_document_cache
+    if _pdf_document_cache is None:
+        with _cache_lock:
+            if _pdf_document_cache is None:
+                from ..core.config import settings
+                _pdf_document_cache = PDFDocumentCache(settings.PDF_DOCUMENT_CACHE_MAX_MB * 1024 * 1024)
+    return _pdf_document_cache
@@ -14,11 +14,14 @@ except ImportError:
     NUMPY_AVAILABLE = False
     np = None
 import asyncio
-import hashlib
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, List, Dict, Tuple, Any
+from typing import Optional, List, Dict, Tuple, Any, Union
 from PIL import Image
 import logging
+from .pdf_document_cache import get_pdf_document_cache, fingerprint_pdf_bytes, PDFHandle
+from .page_render_cache import get_page_render_cache
+from .page_image import PageImage
 
 logger = logging.getLogger(__name__)
 
@@ -29,28 +32,52 @@ class PDFProcessor:
     Supports dynamic page sizes - no fixed A4 constraint
     """
     
+    # Page render scale for extraction (5x = 360 DPI for 72 DPI base)
+    RENDER_SCALE = 5.0
+    
     def __init__(self):
         # PDF processing settings optimized for high accuracy and minimal hallucination
         # Scaling: 5x (360 DPI), dynamic page size, grayscale + adaptive thresholding
         self._last_debug_image = None  # Legacy - kept for backward compatibility
         self._debug_images_by_page: Dict[int, str] = {}  # Store debug images per page number
-        # PDF document cache to avoid reopening for each page
-        self._pdf_cache: Dict[str, fitz.Document] = {}
-        self._pdf_bytes_cache: Dict[str, bytes] = {}
+        # Shared, reference-counted PDF document cache (process-wide)
+        self._pdf_cache = get_pdf_document_cache()
+        # Shared page renders (render-once between type detection and extraction)
+        self._render_cache = get_page_render_cache()
+        # Handles opened on behalf of callers that pass raw PDF data instead of a PDFHandle,
+        # keyed by content fingerprint (released by release_pdf_document / clear_pdf_cache)
+        self._pdf_handles: Dict[str, PDFHandle] = {}
+        self._pdf_handles_lock = threading.Lock()
     
-    def get_pdf_page_count(self, pdf_data: str) -> int:
+    def to_pdf_bytes(self, pdf_data: Union[str, bytes, bytearray, memoryview, PDFHandle]) -> bytes:
+        """
+        Raw PDF bytes for pdf_data
+        
+        Handles and bytes pass through untouched (no copy); base64 strings and data URLs are decoded.
+        Decode once at the request boundary and hand the bytes to the rest of the pipeline.
+        """
+        if isinstance(pdf_data, PDFHandle):
+            return pdf_data.pdf_bytes
+        if isinstance(pdf_data, bytes):
+            return pdf_data
+        if isinstance(pdf_data, (bytearray, memoryview)):
+            return bytes(pdf_data)
+        return base64.b64decode(self.extract_base64_from_data_url(pdf_data))
+    
+    def get_pdf_page_count(self, pdf_data: Union[str, bytes, PDFHandle]) -> int:
         """
         Get the total number of pages in a PDF
         
         Args:
-            pdf_data: Base64 encoded PDF data or data URL
+            pdf_data: PDFHandle, raw PDF bytes, base64 encoded PDF data or data URL
             
         Returns:
             Number of pages in the PDF
         """
         try:
-            base64_data = self.extract_base64_from_data_url(pdf_data)
-            pdf_bytes = base64.b64decode(base64_data)
+            if isinstance(pdf_data, PDFHandle):
+                return len(pdf_data.document)
+            pdf_bytes = self.to_pdf_bytes(pdf_data)
             pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
             page_count = len(pdf_document)
             pdf_document.close()
@@ -59,14 +86,13 @@ class PDFProcessor:
             logger.error(f"Error getting PDF page count: {e}")
             return 0
     
-    def step1_1_decode_base64_pdf(self, pdf_data: str) -> Optional[bytes]:
+    def step1_1_decode_base64_pdf(self, pdf_data: Union[str, bytes]) -> Optional[bytes]:
         """
         Step 1.1: Decode Base64 PDF Data
         Returns: PDF bytes or None
         """
         try:
-            base64_data = self.extract_base64_from_data_url(pdf_data)
-            pdf_bytes = base64.b64decode(base64_data)
+            pdf_bytes = self.to_pdf_bytes(pdf_data)
             logger.debug(f"📄 Step 1.1: Base64 PDF data decoded ({len(pdf_bytes)} bytes)")
             return pdf_bytes
         except Exception as e:
@@ -111,12 +137,29 @@ class PDFProcessor:
         Returns: Dictionary with text, blocks, text_blocks, image_blocks or None
         """
         try:
-            text = page.get_text("text")  # Plain text
-            blocks = page.get_text("dict")["blocks"]  # Structured text with positions
-            
-            # Count actual text blocks (not images)
-            text_blocks = [b for b in blocks if b.get("type") == 0]  # type 0 = text block
-            image_blocks = [b for b in blocks if b.get("type") == 1]  # type 1 = image block
+            # One TextPage parse serves text, text blocks and image-block metadata; image
+            # payloads are never extracted ("dict" mode copied every image's bytes)
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_DICT)
+            text = textpage.extractText()  # Plain text (same as page.get_text("text"))
+            
+            text_blocks = [  # type 0 = text block
+                {"type": 0, "number": number, "bbox": (x0, y0, x1, y1), "text": block_text}
+                for x0, y0, x1, y1, block_text, number, block_type in textpage.extractBLOCKS()
+                if block_type == 0
+            ]
+            image_blocks = [  # type 1 = image block (bbox, transform, size - no image bytes)
+                {
+                    "type": 1,
+                    "number": info["number"],
+                    "bbox": info["bbox"],
+                    "transform": info["transform"],
+                    "width": info["width"],
+                    "height": info["height"],
+                    "size": info["size"]
+                }
+                for info in textpage.extractIMGINFO()
+            ]
+            blocks = sorted(text_blocks + image_blocks, key=lambda block: block["number"])
             
             logger.debug(f"📝 Step 1.4: Text extracted - {len(text.strip())} chars, {len(text_blocks)} text blocks, {len(image_blocks)} image blocks")
             
@@ -474,33 +517,76 @@ class PDFProcessor:
             logger.error(f"Error extracting page content: {e}")
             return None
     
-    def _get_cached_pdf_document(self, pdf_data: str) -> Tuple[fitz.Document, bytes]:
+    def open_pdf_document(self, pdf_data: Union[str, bytes, PDFHandle]) -> PDFHandle:
+        """
+        Open pdf_data through the shared document cache and return this caller's handle
+        
+        Decodes and fingerprints the PDF once; pass the handle (not the raw data) to
+        per-page work and release() it when the request is done. Given a handle, returns a
+        second reference to the same document without decoding or hashing again.
+        
+        Args:
+            pdf_data: PDFHandle, raw PDF bytes, base64 encoded PDF data or data URL
+        """
+        if isinstance(pdf_data, PDFHandle):
+            return pdf_data.share()
+        return self._pdf_cache.open(self.to_pdf_bytes(pdf_data))
+    
+    def _get_cached_pdf_document(self, pdf_data: Union[str, bytes, PDFHandle]) -> Tuple[fitz.Document, bytes]:
         """
         Get or create cached PDF document to avoid reopening for each page
         
+        A PDFHandle resolves directly, with no decoding, hashing or cache traffic. Raw
+        data is decoded and fingerprinted on every call and this processor keeps one
+        reference per fingerprint until release_pdf_document(pdf_data) or clear_pdf_cache();
+        callers processing many pages should open a handle with open_pdf_document instead.
+        
         Args:
-            pdf_data: Base64 encoded PDF data or data URL
+            pdf_data: PDFHandle, raw PDF bytes, base64 encoded PDF data or data URL
             
         Returns:
             Tuple of (PDF document, PDF bytes)
         """
-        base64_data = self.extract_base64_from_data_url(pdf_data)
-        pdf_bytes = base64.b64decode(base64_data)
+        if isinstance(pdf_data, PDFHandle):
+            return pdf_data.document, pdf_data.pdf_bytes
         
-        # Create hash for caching (use first 16 bytes + size for faster hashing)
-        pdf_hash = hashlib.md5(pdf_bytes).hexdigest()
+        pdf_bytes = self.to_pdf_bytes(pdf_data)
+        fingerprint = fingerprint_pdf_bytes(pdf_bytes)
+        with self._pdf_handles_lock:
+            handle = self._pdf_handles.get(fingerprint)
+        if handle is not None:
+            return handle.document, handle.pdf_bytes
         
-        if pdf_hash not in self._pdf_cache:
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-            if not pdf_document:
-                raise ValueError("Failed to open PDF document")
-            self._pdf_cache[pdf_hash] = pdf_document
-            self._pdf_bytes_cache[pdf_hash] = pdf_bytes
-            logger.debug(f"📄 Cached PDF document (hash: {pdf_hash[:8]}..., pages: {len(pdf_document)})")
+        handle = self._pdf_cache.open(pdf_bytes, fingerprint)
+        with self._pdf_handles_lock:
+            existing = self._pdf_handles.setdefault(fingerprint, handle)
+        if existing is not handle:
+            # Another page thread registered this PDF first; keep only one reference
+            handle.release()
+        return existing.document, existing.pdf_bytes
+    
+    def release_pdf_document(self, pdf_data: Union[str, bytes, PDFHandle]):
+        """
+        Release a handle from open_pdf_document, or the reference taken for raw pdf_data.
         
-        return self._pdf_cache[pdf_hash], self._pdf_bytes_cache[pdf_hash]
+        The document stays cached for other requests using the same PDF and is only
+        closed once unreferenced and evicted by the cache's byte budget.
+        """
+        if isinstance(pdf_data, PDFHandle):
+            pdf_data.release()
+            return
+        fingerprint = fingerprint_pdf_bytes(self.to_pdf_bytes(pdf_data))
+        with self._pdf_handles_lock:
+            handle = self._pdf_handles.pop(fingerprint, None)
+        if handle is not None:
+            handle.release()
+            logger.debug(f"🔓 Released cached PDF document ({fingerprint[:16]}...)")
+    
+    def get_pdf_cache_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and size of the shared PDF document cache"""
+        return self._pdf_cache.stats()
     
-    def step1_get_pdf_page(self, pdf_data: str, page_number: int) -> Optional[Tuple[fitz.Document, fitz.Page]]:
+    def step1_get_pdf_page(self, pdf_data: Union[str, bytes, PDFHandle], page_number: int) -> Optional[Tuple[fitz.Document, fitz.Page]]:
         """
         Step 1: PDF caching & page extraction
         Returns: (pdf_document, page) tuple or None
@@ -520,14 +606,13 @@ class PDFProcessor:
             logger.error(f"Error in Step 1 for page {page_number + 1}: {e}")
             return None
     
-    def step1_7_decode_base64_pdf_fallback(self, pdf_data: str) -> Optional[bytes]:
+    def step1_7_decode_base64_pdf_fallback(self, pdf_data: Union[str, bytes]) -> Optional[bytes]:
         """
         Step 1.7 (Fallback): Decode Base64 PDF Data
         Returns: PDF bytes or None
         """
         try:
-            base64_data = self.extract_base64_from_data_url(pdf_data)
-            pdf_bytes = base64.b64decode(base64_data)
+            pdf_bytes = self.to_pdf_bytes(pdf_data)
             logger.debug(f"📄 Step 1.7 (Fallback): Base64 PDF data decoded ({len(pdf_bytes)} bytes)")
             return pdf_bytes
         except Exception as e:
@@ -573,8 +658,10 @@ class PDFProcessor:
         Returns: Pixmap or None
         """
         try:
-            mat = fitz.Matrix(5, 5)  # 5x scaling (360 DPI for 72 DPI base)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
+            # 5x scaling (360 DPI for 72 DPI base). Pages of a cached document that type detection
+            # is also rendering (within a render scope) are rasterized only once.
+            fingerprint = self._pdf_cache.fingerprint_of(page.parent)
+            pix = self._render_cache.get_pixmap(fingerprint, page, self.RENDER_SCALE)
             logger.debug(f"🖼️ Step 1.10: Page rendered to pixmap ({pix.width}x{pix.height})")
             return pix
         except Exception as e:
@@ -727,11 +814,14 @@ class PDFProcessor:
 
     # Watermark removal logic removed as per user request
     
-    def _encode_image_simple(self, image: Image.Image) -> str:
+    def _encode_image_bytes(self, image: Image.Image) -> PageImage:
         """
         Optimized image encoding - uses JPEG for RGB images, PNG for grayscale
         JPEG encoding is ~3-5x faster than PNG and produces smaller files for RGB
         PNG preserves grayscale quality better and is lossless
+        
+        Returns the encoded bytes; base64 is only produced at the edge (LLM request
+        body / API response) via PageImage.to_data_url().
         """
         buf = io.BytesIO()
 
@@ -739,7 +829,7 @@ class PDFProcessor:
         if image.mode == 'L':
             # Grayscale image - use PNG for better quality and lossless compression
             image.save(buf, format="PNG", optimize=True)
-            logger.debug(f"Encoded grayscale image: {len(buf.getvalue())} bytes in PNG format")
+            mime_type = "image/png"
         else:
             # RGB or other formats - use JPEG
             if image.mode not in ("RGB", "L"):
@@ -748,16 +838,15 @@ class PDFProcessor:
             # Use JPEG with quality 90 for faster encoding (~3-5x faster than PNG)
             # Quality 90 provides excellent text clarity while being much faster
             image.save(buf, format="JPEG", quality=90, optimize=False)
-            logger.debug(f"Encoded RGB image: {len(buf.getvalue())} bytes in JPEG format (quality=90)")
+            mime_type = "image/jpeg"
 
-        img_bytes = buf.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode("utf-8")
+        encoded = PageImage(data=buf.getvalue(), mime_type=mime_type)
+        logger.debug(f"Encoded {image.mode} image: {len(encoded)} bytes as {mime_type}")
+        return encoded
 
-        # Return appropriate data URL based on format
-        if image.mode == 'L':
-            return f"data:image/png;base64,{img_base64}"
-        else:
-            return f"data:image/jpeg;base64,{img_base64}"
+    def _encode_image_simple(self, image: Image.Image) -> str:
+        """Encode image and return it as a data URL (PNG for grayscale, JPEG otherwise)"""
+        return self._encode_image_bytes(image).to_data_url()
 
     async def convert_pdf_to_images(self, pdf_data: str) -> List[str]:
         """
@@ -770,11 +859,15 @@ class PDFProcessor:
         Returns:
             List of base64 encoded image data URLs
         """
+        pdf_handle = None
         try:
             from ...core.config import settings
             
+            # Decode and open the PDF once; every page below renders from this handle
+            pdf_handle = self.open_pdf_document(pdf_data)
+            
             # Get page count first
-            page_count = self.get_pdf_page_count(pdf_data)
+            page_count = self.get_pdf_page_count(pdf_handle)
             if page_count == 0:
                 logger.warning("PDF has no pages")
                 return []
@@ -797,7 +890,7 @@ class PDFProcessor:
                         from concurrent.futures import Future
                         future: Future = thread_pool.submit(
                             self.convert_pdf_page_to_image,
-                            pdf_data,
+                            pdf_handle,
                             page_num
                         )
                         image_data = await asyncio.wrap_future(future)
@@ -836,16 +929,14 @@ class PDFProcessor:
                     logger.debug("✅ Thread pool shut down in convert_pdf_to_images")
                 except Exception as e:
                     logger.warning(f"⚠️ Error shutting down thread pool: {e}")
-                
-                # CRITICAL FIX #2: Always clear PDF cache, even on errors
-                try:
-                    self.clear_pdf_cache()
-                except Exception as e:
-                    logger.warning(f"⚠️ Error clearing PDF cache: {e}")
             
         except Exception as e:
             logger.error(f"Error converting PDF to images: {e}")
             return []
+        finally:
+            # CRITICAL FIX #2: Always release the cached PDF, even on errors
+            if pdf_handle is not None:
+                pdf_handle.release()
 
     def convert_signature_coordinates(
         self,
@@ -1065,19 +1156,16 @@ class PDFProcessor:
     
     def clear_pdf_cache(self):
         """
-        Clear PDF document cache (call after processing complete)
-        This closes all cached PDF documents and frees memory
+        Release every PDF cache reference this processor took for raw pdf_data
+        Handles from open_pdf_document belong to their callers and are not touched.
+        Documents still used by other requests are not closed.
         """
-        for pdf_hash, pdf_document in self._pdf_cache.items():
-            try:
-                pdf_document.close()
-                logger.debug(f"🔒 Closed cached PDF document (hash: {pdf_hash[:8]}...)")
-            except Exception as e:
-                logger.warning(f"⚠️ Error closing PDF document (hash: {pdf_hash[:8]}...): {e}")
-        
-        self._pdf_cache.clear()
-        self._pdf_bytes_cache.clear()
-        logger.debug("🧹 Cleared PDF document cache")
+        with self._pdf_handles_lock:
+            handles = list(self._pdf_handles.values())
+            self._pdf_handles.clear()
+        for handle in handles:
+            handle.release()
+        logger.debug(f"🧹 Released {len(handles)} cached PDF document reference(s)")
 
     def _create_debug_image_with_all_bboxes(self, page_image_data: str, signatures: List[dict]):
         """
@@ -1174,7 +1262,7 @@ class PDFProcessor:
         
         Args:
             page: PyMuPDF page object
-            image_blocks: List of image blocks from page.get_text("dict")["blocks"]
+            image_blocks: Image blocks from step1_4_extract_text_content (or page.get_text("dict")["blocks"])
         
         Returns:
             List of dicts with image data and block metadata
@@ -1,9 +1,12 @@
+import asyncio
 import os
 import httpx
 import logging
+import numpy as np
 from typing import List, Dict, Any, Optional
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from .embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -102,26 +105,26 @@ class SemanticSearchService:
                     "totalFound": 0
                 }
             
-            # Calculate cosine similarity for each document
+            # Calculate cosine similarity for all documents in one matrix-vector product
+            candidates = [
+                doc for doc in documents
+                if isinstance(doc.get('embedding'), list) and len(doc['embedding']) == len(query_embedding)
+            ]
             results = []
-            for doc in documents:
-                if not doc.get('embedding'):
-                    continue
-                
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_embedding, doc['embedding'])
-                
-                if similarity >= threshold:
-                    result = {
-                        **doc,
+            if candidates:
+                similarities = self._cosine_similarities(
+                    query_embedding, np.asarray([doc['embedding'] for doc in candidates], dtype=np.float32)
+                )
+                order = np.argsort(-similarities)[:limit]
+                for position in order:
+                    similarity = float(similarities[position])
+                    if similarity < threshold:
+                        break
+                    results.append({
+                        **candidates[position],
                         "similarity": similarity,
                         "relevanceScore": round(similarity * 100)
-                    }
-                    results.append(result)
-            
-            # Sort by similarity and limit results
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            results = results[:limit]
+                    })
             
             logger.info(f"Found {len(results)} relevant documents")
             
@@ -136,7 +139,14 @@ class SemanticSearchService:
             raise
 
     async def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using LiteLLM."""
+        """Generate embedding for text using LiteLLM (served from the embedding cache when possible)."""
+        model = "azure/text-embedding-ada-002"
+        cache = get_embedding_cache()
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, text, model)
+            if cached is not None:
+                return cached
+        
         async with httpx.AsyncClient() as client:
             headers = {
                 self.litellm_header_name: f"{self.litellm_auth_scheme} {self.litellm_api_key}",
@@ -144,7 +154,7 @@ class SemanticSearchService:
             }
             
             request_body = {
-                "model": "azure/text-embedding-ada-002",
+                "model": model,
                 "input": text
             }
             
@@ -163,18 +173,21 @@ class SemanticSearchService:
                 raise Exception(f"Failed to generate query embedding: {response.status_code}")
             
             embedding_data = response.json()
-            return embedding_data["data"][0]["embedding"]
+            embedding = embedding_data["data"][0]["embedding"]
+            if cache is not None:
+                await asyncio.to_thread(cache.put, text, model, embedding)
+            return embedding
 
     def _cosine_similarity(self, vec_a: List[float], vec_b: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
         if len(vec_a) != len(vec_b):
             raise ValueError("Vectors must have the same length")
         
-        dot_product = sum(a * b for a, b in zip(vec_a, vec_b))
-        norm_a = sum(a * a for a in vec_a) ** 0.5
-        norm_b = sum(b * b for b in vec_b) ** 0.5
-        
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        
-        return dot_product / (norm_a * norm_b)
\ No newline at end of file
+        return float(self._cosine_similarities(vec_a, np.asarray([vec_b], dtype=np.float32))[0])
+    
+    def _cosine_similarities(self, query: List[float], matrix: np.ndarray) -> np.ndarray:
+        """Cosine similarity of query against every row of matrix (zero vectors score 0)."""
+        query_vector = np.asarray(query, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        dots = matrix @ query_vector
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms != 0)
@@ -0,0 +1,138 @@
+"""
+In-process cache of signed storage URLs, filled with batched requests.
+
+Document listings used to call create_signed_url once per document, each a
+separate round trip to Supabase Storage. This cache resolves a whole listing
+with one create_signed_urls call per SIGNED_URL_BATCH_SIZE paths and keeps the
+results until shortly before they expire, so repeated listings and paging
+back and forth reuse them.
+
+A cached URL is only handed out while at least SIGNED_URL_MIN_REMAINING_S of
+its lifetime is left, so clients never receive a URL that is about to expire.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _signed_url_from(entry) -> Optional[str]:
+    """URL from a storage response item (dict or object, key spelling varies by client version)."""
+    if isinstance(entry, dict) or hasattr(entry, 'get'):
+        return entry.get('signedURL') or entry.get('signedUrl') or entry.get('url')
+    return getattr(entry, 'signedURL', None) or getattr(entry, 'signed_url', None)
+
+
+class SignedUrlCache:
+    """Thread-safe LRU of (bucket, path, expires_in) -> signed URL with expiry."""
+
+    def __init__(self, max_entries: int = 50000, min_remaining_s: int = 300, batch_size: int = 500):
+        self.max_entries = max_entries
+        self.min_remaining_s = min_remaining_s
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[str, float]]" = OrderedDict()
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def get_many(self, supabase, bucket: str, paths: Sequence[str], expires_in: int = 3600) -> Dict[str, Optional[str]]:
+        """
+        Signed URLs for paths (None where signing failed).
+
+        Cached URLs are reused while they have min_remaining_s left; the rest
+        are signed with one create_signed_urls request per batch_size paths.
+        """
+        now = time.time()
+        urls: Dict[str, Optional[str]] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for path in dict.fromkeys(paths):
+                key = (bucket, path, expires_in)
+                cached = self._entries.get(key)
+                if cached is not None and cached[1] - now >= self.min_remaining_s:
+                    self._entries.move_to_end(key)
+                    urls[path] = cached[0]
+                    self.hits += 1
+                else:
+                    missing.append(path)
+            self.misses += len(missing)
+
+        for offset in range(0, len(missing), self.batch_size):
+            batch = missing[offset:offset + self.batch_size]
+            signed = self._sign(supabase, bucket, batch, expires_in)
+            expires_at = now + expires_in
+            with self._lock:
+                for path in batch:
+                    url = signed.get(path)
+                    urls[path] = url
+                    if url:
+                        self._remember_locked((bucket, path, expires_in), url, expires_at)
+        return urls
+
+    def _sign(self, supabase, bucket: str, paths: List[str], expires_in: int) -> Dict[str, Optional[str]]:
+        """One batched signing request; falls back to per-path signing if the batch call fails."""
+        self.requests += 1
+        try:
+            response = supabase.storage.from_(bucket).create_signed_urls(paths, expires_in)
+            signed = {}
+            for entry in response or []:
+                path = entry.get('path') if hasattr(entry, 'get') else getattr(entry, 'path', None)
+                if path and not (entry.get('error') if hasattr(entry, 'get') else getattr(entry, 'error', None)):
+                    signed[path] = _signed_url_from(entry)
+            return signed
+        except Exception as e:
+            logger.warning(f"⚠️ Batched signed URL request failed for {len(paths)} paths: {e} - signing one by one")
+
+        signed = {}
+        for path in paths:
+            try:
+                signed[path] = _signed_url_from(supabase.storage.from_(bucket).create_signed_url(path, expires_in))
+            except Exception as e:
+                logger.error(f"Failed to generate signed URL for {path}: {str(e)}")
+        return signed
+
+    def _remember_locked(self, key: Tuple[str, str, int], url: str, expires_at: float):
+        """Insert into the LRU, evicting the oldest entries (caller holds the lock)."""
+        self._entries[key] = (url, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "requests": self.requests,
+            }
+
+
+# ============================================================
+# SINGLETON CACHE
+# ============================================================
+_signed_url_cache: Optional[SignedUrlCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_signed_url_cache() -> SignedUrlCache:
+    """Get the process-wide signed URL cache."""
+    global _signed_url_cache
+    if _signed_url_cache is None:
+        with _cache_lock:
+            if _signed_url_cache is None:
+                from ..core.config import settings
+                _signed_url_cache = SignedUrlCache(
+                    max_entries=settings.SIGNED_URL_CACHE_MAX_ENTRIES,
+                    min_remaining_s=settings.SIGNED_URL_MIN_REMAINING_S,
+                    batch_size=settings.SIGNED_URL_BATCH_SIZE,
+                )
+    return _signed_url_cache
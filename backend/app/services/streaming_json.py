@@ -0,0 +1,206 @@
+"""
+Incremental, lenient JSON parser for streamed LLM responses.
+
+process_api_result waits for the whole response and then runs regex repairs
+(_sanitize_json_content, _repair_truncated_json, _extract_partial_json) over
+the full string; for a 16k-token output that is slow, and on truncation only
+flat key/value pairs survive. IncrementalJSONParser is fed the content deltas
+of an SSE stream as they arrive and builds the value as it goes:
+
+- text before the first '{' / '[' (prose, ```json fences) and after the root
+  value closes is ignored; stray commas and literal control characters inside
+  strings (a common LLM slip) are tolerated;
+- every value that completes at depth <= emit_depth is reported to on_value
+  with its path (("fields", 3) for the fourth element of "fields"), so callers
+  can act on sections before the response ends;
+- containers are attached to their parent as soon as they open, so when the
+  stream stops early, value holds every complete field, row and section;
+  only the scalar or key that was cut off is dropped.
+
+Tokens are matched with one compiled regex and strings decoded by json, so
+parsing keeps pace with the stream and nothing is left to do when it ends.
+"""
+
+import json
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+Path = Tuple[Any, ...]
+ValueCallback = Callable[[Path, Any], None]
+
+_TOKEN = re.compile(
+    r'[\s,:]*(?:'
+    r'(?P<open>[{\[])|(?P<close>[}\]])'
+    r'|(?P<string>"[^"\\]*(?:\\.[^"\\]*)*")'
+    r'|(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+    r'|(?P<literal>true|false|null)'
+    r')',
+    re.S,
+)
+_SEPARATORS = re.compile(r'[\s,:]*')
+_ESCAPE = re.compile(r'\\(["\\/bfnrt]|u[0-9a-fA-F]{4})?')
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _decode_string(token: str) -> str:
+    try:
+        return json.loads(token, strict=False)
+    except json.JSONDecodeError:
+        # Invalid escapes (e.g. "\d" or a short \u sequence): keep the backslash literally
+        repaired = _ESCAPE.sub(lambda m: m.group(0) if m.group(1) else "\\\\", token)
+        return json.loads(repaired, strict=False)
+
+
+class _Frame:
+    __slots__ = ("container", "path", "key")
+
+    def __init__(self, container: Any, path: Path):
+        self.container = container
+        self.path = path
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """Feed text chunks; read value at any time (complete parts only until the root closes)."""
+
+    def __init__(self, on_value: Optional[ValueCallback] = None, emit_depth: int = 2):
+        self.on_value = on_value
+        self.emit_depth = emit_depth
+        self.reset()
+
+    def reset(self):
+        """Discard all state (e.g. before a retried request streams again)."""
+        self._buffer = ""
+        self._stack: List[_Frame] = []
+        self.value: Any = None
+        self.started = False
+        self.complete = False
+        self.chars = 0
+        self._in_string = False  # Stopped at a string that has not closed yet
+
+    @property
+    def truncated(self) -> bool:
+        """True if a root value was started but never closed."""
+        return self.started and not self.complete
+
+    def feed(self, text: str) -> List[Tuple[Path, Any]]:
+        """Consume a chunk; returns the (path, value) events completed by it."""
+        self.chars += len(text)
+        if self.complete or not text:
+            return []
+        self._buffer += text
+        if self._in_string and '"' not in text:
+            return []  # The open string cannot have closed
+        return self._parse(final=False)
+
+    def finish(self) -> List[Tuple[Path, Any]]:
+        """Signal the end of the stream (a trailing root number or literal is completed)."""
+        if self.complete:
+            return []
+        events = self._parse(final=True)
+        self._buffer = ""
+        return events
+
+    # -------------------------------------------------------------------------
+    # Parsing
+    # -------------------------------------------------------------------------
+    def _parse(self, final: bool) -> List[Tuple[Path, Any]]:
+        events: List[Tuple[Path, Any]] = []
+        buffer = self._buffer
+        pos = 0
+        if not self.started:
+            start = min((i for i in (buffer.find("{"), buffer.find("[")) if i >= 0), default=-1)
+            if start < 0:
+                self._buffer = ""
+                return events
+            pos = start
+
+        length = len(buffer)
+        self._in_string = False
+        while pos < length and not self.complete:
+            match = _TOKEN.match(buffer, pos)
+            if match is None or match.lastgroup is None:
+                rest = _SEPARATORS.match(buffer, pos).end()
+                if rest >= length:
+                    pos = length
+                    break
+                if self._may_continue(buffer, rest):
+                    # Cut-off token: wait for the next chunk, or drop it at the end of the stream
+                    pos = length if final else rest
+                    self._in_string = not final and buffer[rest] == '"'
+                    break
+                pos = rest + 1  # Unexpected character: skip it
+                continue
+            kind = match.lastgroup
+            end = match.end()
+            if kind == "number" and final and self._stack and not buffer[end:].strip(".eE+-"):
+                break  # Cut off inside a container: "12" may have been "12.5", drop it
+            if not final and kind in ("number", "literal") and (
+                end == length or (kind == "number" and buffer[end] in ".eE" and end + 2 >= length)
+            ):
+                break  # The token may continue in the next chunk (e.g. "12" of "12.5")
+            pos = end
+            if kind == "open":
+                container = {} if match.group("open") == "{" else []
+                path = self._place(container, events, emit=False)
+                self._stack.append(_Frame(container, path))
+                self.started = True
+            elif kind == "close":
+                if self._stack:
+                    frame = self._stack.pop()
+                    self._emit(frame.path, frame.container, events)
+                    if not self._stack:
+                        self.complete = True
+            elif kind == "string":
+                value = _decode_string(match.group("string"))
+                top = self._stack[-1] if self._stack else None
+                if top is not None and isinstance(top.container, dict) and top.key is None:
+                    top.key = value
+                else:
+                    self._place(value, events)
+            elif kind == "number":
+                token = match.group("number")
+                self._place(float(token) if any(c in token for c in ".eE") else int(token), events)
+            else:
+                self._place(_LITERALS[match.group("literal")], events)
+
+        self._buffer = "" if self.complete else buffer[pos:]
+        return events
+
+    @staticmethod
+    def _may_continue(buffer: str, pos: int) -> bool:
+        """True if buffer[pos:] is the start of a token that has not fully arrived."""
+        if buffer[pos] == '"':
+            return True  # Unterminated string
+        if len(buffer) - pos > 4:
+            return False
+        tail = buffer[pos:]  # A lone "-" or the start of a literal at the end of the chunk
+        return tail == "-" or any(literal.startswith(tail) for literal in _LITERALS)
+
+    def _place(self, value: Any, events: List[Tuple[Path, Any]], emit: bool = True) -> Path:
+        """Attach value to the open container (or make it the root); returns its path."""
+        if not self._stack:
+            self.value = value
+            path: Path = ()
+            if not isinstance(value, (dict, list)):
+                self.started = self.complete = True
+        else:
+            top = self._stack[-1]
+            if isinstance(top.container, list):
+                path = top.path + (len(top.container),)
+                top.container.append(value)
+            elif top.key is not None:
+                path = top.path + (top.key,)
+                top.container[top.key] = value
+                top.key = None
+            else:
+                return top.path  # Value without a key: malformed, dropped
+        if emit:
+            self._emit(path, value, events)
+        return path
+
+    def _emit(self, path: Path, value: Any, events: List[Tuple[Path, Any]]):
+        if 0 < len(path) <= self.emit_depth:
+            events.append((path, value))
+            if self.on_value is not None:
+                self.on_value(path, value)
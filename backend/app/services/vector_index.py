@@ -0,0 +1,332 @@
+"""
+In-process vector index for the manual (Python) similarity search fallback.
+
+When the pgvector RPC is unavailable, SemanticSearchService used to pull every
+chunk of a user (with the full analysis_result JSON of its document), parse each
+embedding and compute cosine similarity one row at a time. This module keeps a
+per-user index instead:
+
+- embeddings live in one contiguous, pre-normalized float32 matrix, so top-k is a
+  single matrix-vector product plus argpartition;
+- the index is loaded once per user and then kept current incrementally as
+  DatabaseService saves or deletes a document's chunks in this process; writes
+  by other workers are picked up by comparing `version` (the user's chunk count
+  and newest created_at) and rebuilding when it changed;
+- large indexes are partitioned IVF-style (spherical k-means centroids) and only
+  the closest partitions are scanned;
+- only chunk identity/text is held; document metadata is fetched for the winners.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkHit:
+    """One search result: a chunk and its cosine similarity to the query."""
+
+    document_id: str
+    chunk_index: int
+    chunk_text: str
+    similarity: float
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class UserVectorIndex:
+    """Pre-normalized float32 embedding matrix for one user's chunks."""
+
+    def __init__(self, ivf_min_rows: int = 20000, ivf_nprobe: int = 8):
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self._lock = threading.RLock()
+        self.dimensions: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._dead = 0
+        self._meta: List[Optional[Tuple[str, int, str]]] = []
+        self._doc_rows: Dict[str, List[int]] = {}
+        # IVF partitioning (built lazily for large indexes)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._ivf_built_at = 0
+        # Chunk-table version the index was built from, and when it was last compared
+        self.version: Optional[Hashable] = None
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def upsert_document(self, document_id: str, chunks: Iterable[Tuple[int, str, Optional[Sequence[float]]]]):
+        """
+        Replace all rows of document_id with chunks of (chunk_index, chunk_text, embedding).
+        
+        A chunk without an embedding (unchanged on an incremental re-index) reuses the
+        vector already indexed for the same text in this document, if any.
+        """
+        with self._lock:
+            previous = {
+                self._meta[row][2]: self._matrix[row].copy()
+                for row in self._doc_rows.get(document_id, [])
+            }
+            rows = []
+            for chunk_index, chunk_text, embedding in chunks:
+                if embedding is None:
+                    embedding = previous.get(chunk_text)
+                if embedding is not None:
+                    rows.append((chunk_index, chunk_text, embedding))
+            self._remove_locked(document_id)
+            if not rows:
+                return
+            try:
+                vectors = np.asarray([embedding for _, _, embedding in rows], dtype=np.float32)
+            except ValueError:
+                vectors = np.zeros(0, dtype=np.float32)
+            if vectors.ndim != 2:
+                logger.warning(f"⚠️ Skipping document {document_id} in vector index: ragged embeddings")
+                return
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+            if vectors.shape[1] != self.dimensions:
+                logger.warning(f"⚠️ Skipping document {document_id} in vector index: {vectors.shape[1]} dims != {self.dimensions}")
+                return
+
+            start = self._size
+            self._reserve_locked(start + len(rows))
+            self._matrix[start:start + len(rows)] = _normalize(vectors)
+            self._alive[start:start + len(rows)] = True
+            self._size += len(rows)
+            self._meta.extend((document_id, chunk_index, chunk_text) for chunk_index, chunk_text, _ in rows)
+            self._doc_rows[document_id] = list(range(start, start + len(rows)))
+
+            if self._centroids is not None:
+                # Assign new rows to their nearest partition; rebuild once the index has doubled
+                new_assignments = np.argmax(self._matrix[start:self._size] @ self._centroids.T, axis=1)
+                self._assignments = np.concatenate([self._assignments, new_assignments])
+                if len(self) > 2 * self._ivf_built_at:
+                    self._drop_ivf_locked()
+
+    def remove_document(self, document_id: str):
+        with self._lock:
+            self._remove_locked(document_id)
+
+    def _remove_locked(self, document_id: str):
+        rows = self._doc_rows.pop(document_id, None)
+        if not rows:
+            return
+        self._alive[rows] = False
+        for row in rows:
+            self._meta[row] = None
+        self._dead += len(rows)
+        if self._dead * 2 > self._size:
+            self._compact_locked()
+
+    def _reserve_locked(self, rows: int):
+        capacity = self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 256)
+        matrix = np.zeros((new_capacity, self.dimensions), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._matrix, self._alive = matrix, alive
+
+    def _compact_locked(self):
+        """Drop tombstoned rows so the matrix stays dense."""
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._meta = [self._meta[row] for row in keep]
+        self._size, self._dead = len(keep), 0
+        self._doc_rows = {}
+        for row, meta in enumerate(self._meta):
+            self._doc_rows.setdefault(meta[0], []).append(row)
+        self._drop_ivf_locked()
+
+    # -------------------------------------------------------------------------
+    # IVF partitioning
+    # -------------------------------------------------------------------------
+    def _drop_ivf_locked(self):
+        self._centroids = None
+        self._assignments = None
+        self._ivf_built_at = 0
+
+    def _build_ivf_locked(self, iterations: int = 8):
+        """Spherical k-means over the live rows (~sqrt(N) partitions)."""
+        live = np.flatnonzero(self._alive[:self._size])
+        n_lists = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= n_lists * 64 else rng.choice(live, n_lists * 64, replace=False)
+        centroids = self._matrix[rng.choice(sample, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(self._matrix[sample] @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = sample[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = self._matrix[members].sum(axis=0)
+            centroids = _normalize(centroids)
+        self._centroids = centroids
+        self._assignments = np.argmax(self._matrix[:self._size] @ centroids.T, axis=1)
+        self._ivf_built_at = len(live)
+        logger.info(f"🧭 Built IVF partitions for vector index ({len(live)} rows, {n_lists} lists)")
+
+    # -------------------------------------------------------------------------
+    # Search
+    # -------------------------------------------------------------------------
+    def search(self, query_embedding: Sequence[float], limit: int, similarity_threshold: float = 0.0) -> List[ChunkHit]:
+        """Top-`limit` chunks by cosine similarity, highest first, at or above the threshold."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            if self.dimensions is None or len(self) == 0 or query.shape != (self.dimensions,) or limit <= 0:
+                return []
+            query = _normalize(query)
+
+            if len(self) >= self.ivf_min_rows and self._centroids is None:
+                self._build_ivf_locked()
+
+            if self._centroids is not None:
+                nprobe = min(self.ivf_nprobe, len(self._centroids))
+                probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+                candidates = np.flatnonzero(np.isin(self._assignments, probe) & self._alive[:self._size])
+            else:
+                candidates = None
+
+            if candidates is None:
+                scores = self._matrix[:self._size] @ query
+                if self._dead:
+                    scores[~self._alive[:self._size]] = -np.inf
+                rows = np.arange(self._size)
+            else:
+                scores = self._matrix[candidates] @ query
+                rows = candidates
+
+            k = min(limit, len(scores))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            hits = []
+            for position in top:
+                score = float(scores[position])
+                if score < similarity_threshold:
+                    break
+                document_id, chunk_index, chunk_text = self._meta[rows[position]]
+                hits.append(ChunkHit(document_id, chunk_index, chunk_text, score))
+            return hits
+
+
+class VectorIndexRegistry:
+    """Process-wide LRU of per-user vector indexes."""
+
+    def __init__(self, max_users: int = 64, ivf_min_rows: int = 20000, ivf_nprobe: int = 8):
+        self.max_users = max_users
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+        self._doc_owner: Dict[str, str] = {}
+
+    def get(self, user_id: str) -> Optional[UserVectorIndex]:
+        """Loaded index for user_id, or None if it has not been built (or was evicted)."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+            return index
+
+    def build(
+        self,
+        user_id: str,
+        rows: Iterable[Tuple[str, int, str, Sequence[float]]],
+        version: Optional[Hashable] = None
+    ) -> UserVectorIndex:
+        """
+        Build and register a user's index from (document_id, chunk_index, chunk_text, embedding) rows.
+        
+        Blocking (reads rows, fills the matrix); call it off the event loop.
+        """
+        by_document: Dict[str, List[Tuple[int, str, Sequence[float]]]] = {}
+        for document_id, chunk_index, chunk_text, embedding in rows:
+            by_document.setdefault(document_id, []).append((chunk_index, chunk_text, embedding))
+
+        index = UserVectorIndex(self.ivf_min_rows, self.ivf_nprobe)
+        for document_id, chunks in by_document.items():
+            index.upsert_document(document_id, chunks)
+        index.version = version
+        index.checked_at = time.monotonic()
+
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            for document_id in by_document:
+                self._doc_owner[document_id] = user_id
+            while len(self._indexes) > self.max_users:
+                evicted_user, _ = self._indexes.popitem(last=False)
+                self._doc_owner = {doc: owner for doc, owner in self._doc_owner.items() if owner != evicted_user}
+        logger.info(f"📇 Built vector index for user {user_id}: {len(index)} chunks from {len(by_document)} documents")
+        return index
+
+    def upsert_document(self, user_id: str, document_id: str, chunks: Iterable[Tuple[int, str, Optional[Sequence[float]]]]):
+        """Replace a document's chunks in its owner's index (no-op if that index is not loaded)."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._doc_owner[document_id] = user_id
+        if index is not None:
+            index.upsert_document(document_id, chunks)
+
+    def remove_document(self, document_id: str):
+        with self._lock:
+            user_id = self._doc_owner.pop(document_id, None)
+            index = self._indexes.get(user_id) if user_id else None
+        if index is not None:
+            index.remove_document(document_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "max_users": self.max_users,
+                "chunks": sum(len(index) for index in self._indexes.values()),
+            }
+
+
+# ============================================================
+# SINGLETON REGISTRY
+# ============================================================
+_vector_index_registry: Optional[VectorIndexRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_vector_index_registry() -> VectorIndexRegistry:
+    """Get the process-wide vector index registry, creating it on first use."""
+    global _vector_index_registry
+    if _vector_index_registry is None:
+        with _registry_lock:
+            if _vector_index_registry is None:
+                from ..core.config import settings
+                _vector_index_registry = VectorIndexRegistry(
+                    settings.VECTOR_INDEX_MAX_USERS,
+                    settings.VECTOR_INDEX_IVF_MIN_ROWS,
+                    settings.VECTOR_INDEX_IVF_NPROBE,
+                )
+    return _vector_index_registry
@@ -0,0 +1,548 @@
+"""
+Out-of-process YOLO inference with cross-document micro-batching.
+
+The YOLO detectors used to run ultralytics inside the API process, one call
+per page on per-request pool_yolo threads; a native crash in the runtime
+killed the whole API, which is why in-process inference is force-disabled.
+This service moves inference into YOLO_SERVICE_WORKERS child processes
+(yolo_onnx_worker, ONNX Runtime on CPU) and feeds them micro-batches:
+
+- callers (pool_yolo threads of any number of concurrent documents) letterbox
+  their page image and enqueue it, then block on a Future;
+- a batcher thread groups queued pages per model and hands a batch to the
+  workers once YOLO_BATCH_MAX_SIZE pages are waiting or the oldest page has
+  waited YOLO_BATCH_MAX_WAIT_MS, whichever comes first;
+- one dispatcher thread per worker process sends the batch over a Pipe and
+  resolves the Futures with boxes mapped back to each page's coordinates.
+
+A worker that dies or exceeds YOLO_SERVICE_TIMEOUT_S is killed and restarted
+(models are reloaded); the pages of a crashed batch are retried one at a time
+so a single poison page fails alone. After YOLO_SERVICE_MAX_RESTARTS
+consecutive failures the service stops accepting work and callers get
+YoloServiceUnavailable, which the detectors turn into "no detections".
+"""
+
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+LETTERBOX_FILL = 114  # Padding gray used by ultralytics letterbox
+
+
+class YoloServiceUnavailable(RuntimeError):
+    """The inference workers are stopped or kept crashing."""
+
+
+class YoloWorkerError(RuntimeError):
+    """A batch failed inside (or killed) a worker process."""
+
+
+@dataclass
+class _Request:
+    key: str
+    image: Any  # uint8 [H, W, 3] letterboxed to the model input size
+    scale: float
+    pad: Tuple[float, float]
+    size: Tuple[int, int]  # original (width, height)
+    deadline: float
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class _ModelSpec:
+    key: str
+    path: str
+    conf: float
+    iou: float
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+class YoloModelHandle:
+    """What a detector holds instead of an ultralytics YOLO object."""
+
+    def __init__(self, service: "YoloInferenceService", spec: _ModelSpec):
+        self._service = service
+        self.key = spec.key
+        self.path = spec.path
+        self.names: Dict[int, str] = dict(spec.info.get("names", {}))
+        self.imgsz: Tuple[int, int] = tuple(spec.info.get("imgsz", (640, 640)))
+
+    def detect(self, images: List[Image.Image], return_exceptions: bool = False) -> List[Any]:
+        """
+        Detections per image: [{"bbox": [x0, y0, x1, y1], "confidence", "class_id"}].
+
+        Boxes are in the image's own pixel coordinates. Raises
+        YoloServiceUnavailable / YoloWorkerError if inference failed or no
+        result came back within result_timeout_s, or with return_exceptions
+        puts the exception in place of that image's list.
+        """
+        deadline = time.monotonic() + self._service.result_timeout_s
+        futures: List[Any] = []
+        for image in images:
+            try:
+                futures.append(self._service.submit(self.key, image))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                futures.append(e)
+        results = []
+        for future in futures:
+            if isinstance(future, Exception):
+                results.append(future)
+                continue
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                error = YoloWorkerError(f"no YOLO result within {self._service.result_timeout_s:.0f}s")
+                if not return_exceptions:
+                    raise error
+                results.append(error)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+class _Worker:
+    """One inference process and the parent end of its Pipe."""
+
+    def __init__(self, ctx, index: int, threads: int):
+        self.ctx = ctx
+        self.index = index
+        self.threads = threads
+        self.process = None
+        self.conn = None
+        self.loaded: set = set()
+        self.lock = threading.Lock()  # Held by whoever is talking to the process
+
+    def start(self):
+        from .yolo_onnx_worker import worker_main
+
+        parent_conn, child_conn = self.ctx.Pipe(duplex=True)
+        self.process = self.ctx.Process(
+            target=worker_main, args=(child_conn, self.threads),
+            name=f"yolo-onnx-worker-{self.index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.loaded = set()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def call(self, message: tuple, timeout: float):
+        """Send one message and wait for its reply; raises YoloWorkerError on crash or timeout."""
+        try:
+            self.conn.send(message)
+            if not self.conn.poll(timeout):
+                raise YoloWorkerError(f"worker {self.index} timed out after {timeout:.0f}s")
+            return self.conn.recv()
+        except (EOFError, OSError, BrokenPipeError) as e:
+            exitcode = self.process.exitcode if self.process else None
+            raise YoloWorkerError(f"worker {self.index} died (exit code {exitcode}): {type(e).__name__}") from e
+
+    def kill(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(timeout=5)
+            self.process = None
+
+    def stop(self):
+        if self.alive():
+            try:
+                self.conn.send(("stop",))
+                self.process.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+        self.kill()
+
+
+class YoloInferenceService:
+    """Micro-batching front end for a pool of ONNX Runtime worker processes."""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        threads_per_worker: int = 2,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 15,
+        timeout_s: float = 60,
+        load_timeout_s: float = 120,
+        max_restarts: int = 5,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms / 1000)
+        self.timeout_s = timeout_s
+        # A caller's wait covers queueing behind one batch plus its own; a dispatcher
+        # that never resolves a page must not hang the pool_yolo thread forever.
+        self.result_timeout_s = timeout_s * 2 + self.max_wait_s
+        self.load_timeout_s = load_timeout_s
+        self.max_restarts = max_restarts
+
+        ctx = multiprocessing.get_context("spawn")  # No fork of the API's threads and native state
+        self._workers = [_Worker(ctx, i, threads_per_worker) for i in range(max(1, workers))]
+        self._models: Dict[str, _ModelSpec] = {}
+        self._handles: Dict[Tuple[str, str, float, float], YoloModelHandle] = {}
+        self._load_lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Deque[_Request]] = {}
+        self._dispatch: "queue.Queue[Optional[List[_Request]]]" = queue.Queue(maxsize=len(self._workers))
+        self._threads: List[threading.Thread] = []
+        self._batch_ids = itertools.count(1)
+        self._stopped = False
+        self._unavailable: Optional[str] = None
+        self._consecutive_failures = 0
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.failed_images = 0
+        self.restarts = 0
+        self.inference_time_s = 0.0
+        self.queue_wait_s = 0.0
+
+    # ------------------------------------------------------------------
+    # Model registration
+    # ------------------------------------------------------------------
+    def load_model(self, key: str, path: str, conf: float, iou: float) -> YoloModelHandle:
+        """
+        Register an ONNX model and load it in every worker.
+
+        Idempotent for the same (key, path, conf, iou), so each detector
+        instance can call it. Raises YoloWorkerError if the model cannot be
+        loaded (bad file, unsupported output layout).
+        """
+        handle_key = (key, path, conf, iou)
+        with self._load_lock:
+            if handle_key in self._handles:
+                return self._handles[handle_key]
+            if self._unavailable:
+                raise YoloServiceUnavailable(self._unavailable)
+            registered = self._models.get(key)
+            if registered is not None and (registered.path, registered.conf, registered.iou) != (path, conf, iou):
+                raise ValueError(f"YOLO model key '{key}' is already registered for {registered.path}")
+
+            spec = _ModelSpec(key=key, path=path, conf=conf, iou=iou)
+            # Load in the first worker here (surfaces errors to the caller); the
+            # dispatchers load it into the others before their first batch.
+            worker = self._workers[0]
+            with self._cond:
+                self._start_threads_locked()
+            with worker.lock:
+                self._ensure_loaded(worker, spec)
+            self._models[key] = spec
+            handle = YoloModelHandle(self, spec)
+            self._handles[handle_key] = handle
+            return handle
+
+    def _ensure_loaded(self, worker: _Worker, spec: _ModelSpec):
+        if spec.key in worker.loaded and worker.alive():
+            return
+        if not worker.alive():
+            if worker.process is not None:
+                logger.warning(f"🔄 YOLO inference worker {worker.index} exited (code {worker.process.exitcode}) - restarting")
+                with self._stats_lock:
+                    self.restarts += 1
+            worker.kill()
+            worker.start()
+        reply = worker.call(("load", spec.key, spec.path, spec.conf, spec.iou), self.load_timeout_s)
+        if reply[0] != "loaded":
+            raise YoloWorkerError(f"Failed to load {spec.path}: {reply[2]}")
+        spec.info = reply[2]
+        worker.loaded.add(spec.key)
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+    def submit(self, key: str, image: Image.Image) -> Future:
+        """Letterbox image and queue it for the next batch of model `key`."""
+        if self._unavailable:
+            raise YoloServiceUnavailable(self._unavailable)
+        if self._stopped:
+            raise YoloServiceUnavailable("YOLO inference service is shut down")
+        spec = self._models[key]
+        request = self._letterbox(key, image, tuple(spec.info.get("imgsz", (640, 640))))
+        with self._cond:
+            self._pending.setdefault(key, deque()).append(request)
+            self._cond.notify()
+        return request.future
+
+    def _letterbox(self, key: str, image: Image.Image, imgsz: Tuple[int, int]) -> _Request:
+        import numpy as np
+
+        if image.mode == "RGBA":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[3])
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        target_h, target_w = imgsz
+        width, height = image.size
+        scale = min(target_w / width, target_h / height)
+        new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+        pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+
+        canvas = np.full((target_h, target_w, 3), LETTERBOX_FILL, dtype=np.uint8)
+        left, top = int(round(pad_x - 0.1)), int(round(pad_y - 0.1))
+        resized = image if (new_w, new_h) == (width, height) else image.resize((new_w, new_h), Image.BILINEAR)
+        canvas[top:top + new_h, left:left + new_w] = np.asarray(resized, dtype=np.uint8)
+        return _Request(
+            key=key, image=canvas, scale=scale, pad=(left, top), size=(width, height),
+            deadline=time.monotonic() + self.max_wait_s
+        )
+
+    def _start_threads_locked(self):
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._batch_loop, name="yolo-batcher", daemon=True))
+        for worker in self._workers:
+            self._threads.append(threading.Thread(
+                target=self._dispatch_loop, args=(worker,), name=f"yolo-dispatch-{worker.index}", daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+
+    def _batch_loop(self):
+        """Cut batches per model on size or deadline and hand them to the dispatchers."""
+        while True:
+            with self._cond:
+                batch = None
+                while batch is None:
+                    if self._stopped:
+                        return
+                    now = time.monotonic()
+                    next_deadline = None
+                    for requests in self._pending.values():
+                        if not requests:
+                            continue
+                        if len(requests) >= self.max_batch_size or requests[0].deadline <= now:
+                            batch = [requests.popleft() for _ in range(min(self.max_batch_size, len(requests)))]
+                            break
+                        if next_deadline is None or requests[0].deadline < next_deadline:
+                            next_deadline = requests[0].deadline
+                    if batch is None:
+                        self._cond.wait(None if next_deadline is None else max(0.0, next_deadline - now))
+            # Blocks while every worker is busy; pages keep queueing meanwhile
+            self._dispatch.put(batch)
+
+    def _dispatch_loop(self, worker: _Worker):
+        while True:
+            batch = self._dispatch.get()
+            if batch is None:
+                return
+            try:
+                with worker.lock:
+                    self._dispatch_batch(worker, batch)
+            except Exception as e:
+                # Anything but a worker failure (bad input, restart error) fails this batch only
+                logger.error(f"❌ YOLO dispatcher {worker.index} failed batch of {len(batch)}: {e}")
+                self._fail(batch, e)
+
+    def _dispatch_batch(self, worker: _Worker, batch: List[_Request]):
+        if self._unavailable:
+            self._fail(batch, YoloServiceUnavailable(self._unavailable))
+            return
+        try:
+            self._run_batch(worker, batch)
+            return
+        except YoloWorkerError as e:
+            self._on_worker_failure(worker, e)
+            if len(batch) == 1:
+                self._fail(batch, e)
+                return
+        # Retry one page at a time so only a page that crashes the worker fails
+        for request in batch:
+            if self._unavailable:
+                self._fail([request], YoloServiceUnavailable(self._unavailable))
+                continue
+            try:
+                self._run_batch(worker, [request])
+            except YoloWorkerError as retry_error:
+                self._on_worker_failure(worker, retry_error)
+                self._fail([request], retry_error)
+
+    def _run_batch(self, worker: _Worker, batch: List[_Request]):
+        import numpy as np
+
+        spec = self._models[batch[0].key]
+        self._ensure_loaded(worker, spec)
+
+        started = time.monotonic()
+        batch_id = next(self._batch_ids)
+        reply = worker.call(("infer", batch_id, spec.key, np.stack([r.image for r in batch])), self.timeout_s)
+        elapsed = time.monotonic() - started
+        if reply[0] != "result" or reply[1] != batch_id or len(reply[2]) != len(batch):
+            # Inference raised inside the worker: the process is fine, the batch is not
+            error = reply[2] if reply[0] == "error" else f"unexpected reply {reply[0]!r} for batch of {len(batch)}"
+            logger.error(f"❌ YOLO worker {worker.index} failed batch of {len(batch)}: {error}")
+            self._fail(batch, YoloWorkerError(str(error)))
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.images += len(batch)
+            self.inference_time_s += elapsed
+            self.queue_wait_s += sum(max(0.0, started - (r.deadline - self.max_wait_s)) for r in batch)
+            self._consecutive_failures = 0
+
+        for request, detections in zip(batch, reply[2]):
+            request.future.set_result(self._unletterbox(request, detections))
+
+    @staticmethod
+    def _unletterbox(request: _Request, detections) -> List[Dict[str, Any]]:
+        pad_x, pad_y = request.pad
+        width, height = request.size
+        results = []
+        for x0, y0, x1, y1, confidence, class_id in detections:
+            results.append({
+                "bbox": [
+                    min(max((x0 - pad_x) / request.scale, 0.0), width),
+                    min(max((y0 - pad_y) / request.scale, 0.0), height),
+                    min(max((x1 - pad_x) / request.scale, 0.0), width),
+                    min(max((y1 - pad_y) / request.scale, 0.0), height),
+                ],
+                "confidence": confidence,
+                "class_id": class_id,
+            })
+        return results
+
+    def _on_worker_failure(self, worker: _Worker, error: Exception):
+        """Kill and restart a crashed or stuck worker; give up after max_restarts in a row."""
+        logger.error(f"❌ YOLO inference worker {worker.index} failed: {error}")
+        worker.kill()
+        with self._stats_lock:
+            self._consecutive_failures += 1
+            self.restarts += 1
+            failures = self._consecutive_failures
+        if failures > self.max_restarts:
+            self._unavailable = f"YOLO inference workers failed {failures} times in a row (last: {error})"
+            logger.error(f"❌ {self._unavailable} - YOLO detection disabled until restart")
+            self._drain_pending()
+            return
+        try:
+            worker.start()
+            logger.warning(f"🔄 Restarted YOLO inference worker {worker.index} (pid {worker.process.pid})")
+        except Exception as e:
+            logger.error(f"❌ Could not restart YOLO inference worker {worker.index}: {e}")
+
+    def _fail(self, batch: List[_Request], error: Exception):
+        with self._stats_lock:
+            self.failed_images += len(batch)
+        for request in batch:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def _drain_pending(self):
+        with self._cond:
+            pending = [r for requests in self._pending.values() for r in requests]
+            self._pending.clear()
+        self._fail(pending, YoloServiceUnavailable(self._unavailable or "YOLO inference service is shut down"))
+
+    def _drain_dispatch(self):
+        """Fail batches cut but not yet picked up by a dispatcher."""
+        error = YoloServiceUnavailable("YOLO inference service is shut down")
+        while True:
+            try:
+                batch = self._dispatch.get_nowait()
+            except queue.Empty:
+                return
+            if batch:
+                self._fail(batch, error)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self.batches
+            return {
+                "workers": len(self._workers),
+                "alive_workers": sum(1 for w in self._workers if w.alive()),
+                "available": self._unavailable is None and not self._stopped,
+                "batches": batches,
+                "images": self.images,
+                "avg_batch_size": round(self.images / batches, 2) if batches else 0.0,
+                "avg_batch_ms": round(self.inference_time_s / batches * 1000, 1) if batches else 0.0,
+                "avg_queue_wait_ms": round(self.queue_wait_s / self.images * 1000, 1) if self.images else 0.0,
+                "failed_images": self.failed_images,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self):
+        """Fail queued pages, stop the threads and the worker processes."""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        self._drain_pending()
+        self._drain_dispatch()
+        if self._threads:
+            # The batcher may have been blocked putting one last batch; let it exit, then fail that too
+            self._threads[0].join(timeout=self.timeout_s)
+            self._drain_dispatch()
+        for _ in self._workers:
+            try:
+                self._dispatch.put(None, timeout=self.timeout_s)
+            except queue.Full:
+                break
+        for thread in self._threads[1:]:
+            thread.join(timeout=self.timeout_s)
+        for worker in self._workers:
+            worker.stop()
+        logger.info(f"🛑 YOLO inference service stopped: {self.stats()}")
+
+
+# ============================================================
+# SINGLETON SERVICE
+# ============================================================
+_yolo_inference_service: Optional[YoloInferenceService] = None
+_service_lock = threading.Lock()
+
+
+def get_yolo_inference_service() -> YoloInferenceService:
+    """Get the process-wide YOLO inference service (workers start on first model load)."""
+    global _yolo_inference_service
+    if _yolo_inference_service is None:
+        with _service_lock:
+            if _yolo_inference_service is None:
+                from ..core.config import settings
+                _yolo_inference_service = YoloInferenceService(
+                    workers=settings.YOLO_SERVICE_WORKERS,
+                    threads_per_worker=settings.YOLO_SERVICE_THREADS,
+                    max_batch_size=settings.YOLO_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.YOLO_BATCH_MAX_WAIT_MS,
+                    timeout_s=settings.YOLO_SERVICE_TIMEOUT_S,
+                    load_timeout_s=settings.YOLO_SERVICE_LOAD_TIMEOUT_S,
+                    max_restarts=settings.YOLO_SERVICE_MAX_RESTARTS,
+                )
+    return _yolo_inference_service
+
+
+def shutdown_yolo_inference_service():
+    """Stop the worker processes if the service was ever started."""
+    global _yolo_inference_service
+    with _service_lock:
+        service, _yolo_inference_service = _yolo_inference_service, None
+    if service is not None:
+        service.shutdown()
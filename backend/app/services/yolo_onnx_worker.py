@@ -0,0 +1,191 @@
+"""
+YOLO ONNX inference worker process.
+
+Runs in a child process started by YoloInferenceService (spawn), so a crash in
+the native runtime takes down this process only, never the API. It imports
+nothing from the app: numpy and onnxruntime only.
+
+Protocol over a duplex multiprocessing Pipe (parent -> worker / worker -> parent):
+
+    ("load", key, path, conf, iou)     ("loaded", key, info) | ("load_error", key, message)
+    ("infer", batch_id, key, images)   ("result", batch_id, detections) | ("error", batch_id, message)
+    ("stop",)
+
+`images` is a uint8 array [B, H, W, 3] already letterboxed to the model's
+input size; detections are per image lists of (x0, y0, x1, y1, confidence,
+class_id) in that letterboxed space. Ultralytics YOLOv8+ exports ([B, 4+nc, N])
+and YOLOv5 exports ([B, N, 5+nc]) without embedded NMS are supported.
+"""
+
+import ast
+import os
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_IMGSZ = 640
+MAX_CANDIDATES = 30000  # Boxes passed to NMS per image (after the confidence filter)
+MAX_DETECTIONS = 300
+MAX_WH = 7680  # Class offset for class-aware NMS
+
+
+class _Model:
+    """One ONNX Runtime session plus the decode parameters for its output."""
+
+    def __init__(self, path: str, conf: float, iou: float, threads: int):
+        import numpy as np
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, threads)
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.conf = conf
+        self.iou = iou
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        self.static_batch = batch if isinstance(batch, int) and batch > 0 else None
+        self.imgsz = (
+            height if isinstance(height, int) else DEFAULT_IMGSZ,
+            width if isinstance(width, int) else DEFAULT_IMGSZ,
+        )
+
+        metadata = self.session.get_modelmeta().custom_metadata_map or {}
+        try:
+            names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        except (ValueError, SyntaxError):
+            names = {}
+        self.names: Dict[int, str] = {int(k): str(v) for k, v in dict(names).items()}
+
+        # Validate the output layout with one blank image (also warms the session up)
+        blank = np.full((1, self.imgsz[0], self.imgsz[1], 3), 114, dtype=np.uint8)
+        self.layout: Optional[str] = None
+        self.layout = self._resolve_layout(self._run(blank)[0].shape)
+        if not self.names:
+            classes = self._num_columns - (4 if self.layout == "v8" else 5)
+            self.names = {i: str(i) for i in range(classes)}
+
+    def _resolve_layout(self, shape: Tuple[int, ...]) -> str:
+        if len(shape) != 3:
+            raise ValueError(f"Unsupported YOLO output shape {shape} (expected 3 dimensions, no embedded NMS)")
+        _, a, b = shape
+        if self.names:
+            classes = len(self.names)
+            for transposed, columns, layout in ((True, a, "v8"), (False, b, "v5"), (False, b, "v8")):
+                if columns == classes + (4 if layout == "v8" else 5):
+                    self._transposed, self._num_columns = transposed, columns
+                    return layout
+            raise ValueError(f"Output shape {shape} does not match {classes} declared classes")
+        # No class names: predictions always outnumber per-box values
+        self._num_columns = min(a, b)
+        self._transposed = a == self._num_columns  # v8: [B, 4+nc, N]
+        return "v8" if self._transposed else "v5"
+
+    def info(self) -> Dict[str, Any]:
+        return {"names": self.names, "imgsz": self.imgsz, "static_batch": self.static_batch, "layout": self.layout}
+
+    def _run(self, images):
+        import numpy as np
+
+        tensor = images.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        if self.static_batch is None:
+            return [self.session.run(None, {self.input_name: tensor})[0]]
+        outputs = []
+        for start in range(0, len(tensor), self.static_batch):
+            chunk = tensor[start:start + self.static_batch]
+            count = len(chunk)
+            if count < self.static_batch:
+                chunk = np.concatenate([chunk, np.zeros((self.static_batch - count,) + chunk.shape[1:], dtype=chunk.dtype)])
+            outputs.append(self.session.run(None, {self.input_name: chunk})[0][:count])
+        return outputs
+
+    def infer(self, images) -> List[List[Tuple[float, float, float, float, float, int]]]:
+        import numpy as np
+
+        output = np.concatenate(self._run(images))
+        if self._transposed:
+            output = output.transpose(0, 2, 1)  # -> [B, N, values]
+        return [self._decode(predictions) for predictions in output]
+
+    def _decode(self, predictions) -> List[Tuple[float, float, float, float, float, int]]:
+        import numpy as np
+
+        if self.layout == "v5":
+            scores_all = predictions[:, 5:] * predictions[:, 4:5]
+        else:
+            scores_all = predictions[:, 4:]
+        class_ids = scores_all.argmax(axis=1)
+        scores = scores_all[np.arange(len(scores_all)), class_ids]
+        keep = scores >= self.conf
+        if not keep.any():
+            return []
+        boxes, scores, class_ids = predictions[keep, :4], scores[keep], class_ids[keep]
+        if len(scores) > MAX_CANDIDATES:
+            top = scores.argsort()[::-1][:MAX_CANDIDATES]
+            boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+
+        # xywh (center) -> xyxy
+        xyxy = np.empty_like(boxes)
+        xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+        xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+        xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+        xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+        kept = _nms(xyxy + (class_ids[:, None] * MAX_WH), scores, self.iou)[:MAX_DETECTIONS]
+        return [
+            (float(xyxy[i, 0]), float(xyxy[i, 1]), float(xyxy[i, 2]), float(xyxy[i, 3]), float(scores[i]), int(class_ids[i]))
+            for i in kept
+        ]
+
+
+def _nms(boxes, scores, iou_threshold: float) -> List[int]:
+    """Greedy non-maximum suppression; indices of kept boxes by descending score."""
+    import numpy as np
+
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x1 - x0).clip(0) * (y1 - y0).clip(0)
+    order = scores.argsort()[::-1]
+    kept = []
+    while order.size:
+        best = order[0]
+        kept.append(int(best))
+        rest = order[1:]
+        width = (np.minimum(x1[best], x1[rest]) - np.maximum(x0[best], x0[rest])).clip(0)
+        height = (np.minimum(y1[best], y1[rest]) - np.maximum(y0[best], y0[rest])).clip(0)
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return kept
+
+
+def worker_main(conn, threads: int):
+    """Serve load/infer requests on conn until "stop" or the parent goes away."""
+    # Keep BLAS/OpenMP pools in step with the ONNX Runtime thread budget
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, str(max(1, threads)))
+
+    models: Dict[str, _Model] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return  # Parent exited
+
+        kind = message[0]
+        if kind == "stop":
+            return
+        if kind == "load":
+            _, key, path, conf, iou = message
+            try:
+                models[key] = _Model(path, conf, iou, threads)
+                conn.send(("loaded", key, models[key].info()))
+            except Exception as e:
+                conn.send(("load_error", key, f"{type(e).__name__}: {e}"))
+        elif kind == "infer":
+            _, batch_id, key, images = message
+            try:
+                conn.send(("result", batch_id, models[key].infer(images)))
+            except Exception as e:
+                conn.send(("error", batch_id, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}"))
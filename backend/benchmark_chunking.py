@@ -0,0 +1,124 @@
+"""
+Chunking benchmark: fixed 1500-char windows vs structure-aware, token-budgeted chunks
+
+For a few synthetic analysis results (form, invoice with line items, long bank
+statement) reports:
+- chunk count (= embedding inputs per re-index)
+- recall: share of facts (fields, and table rows as whole records) that appear
+  unbroken in at least one chunk; a fact cut across a window boundary, or lost
+  to truncation, cannot be retrieved
+
+No embedding API calls are made.
+
+    python benchmark_chunking.py
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# EmbeddingService validates these on init; chunking itself never calls the API
+os.environ.setdefault("LITELLM_API_URL", "http://localhost/chat/completions")
+os.environ.setdefault("LITELLM_API_KEY", "benchmark")
+
+from app.services.modules.embedding_service import EmbeddingService
+
+
+def field(value):
+    return {"value": value, "confidence": 0.95}
+
+
+def sample_documents():
+    form = {
+        "hierarchical_data": {
+            "applicant_details": {
+                "full_name": field("Priya Raman"),
+                "date_of_birth": field("1989-04-12"),
+                "address": field("14 Lake View Road, Chennai 600042"),
+                "phone": field("+91 98400 12345"),
+            },
+            "employment": {
+                "employer": field("Northwind Traders Pvt Ltd"),
+                "designation": field("Senior Analyst"),
+                "annual_income": field("1,840,000 INR"),
+            },
+            "declaration": {"signed": field("Yes"), "date": field("2024-02-01")},
+            "remarks": {
+                f"note_{i}": field(f"Applicant confirmed item {i} of the supporting documents during the branch visit; original copies were verified by the officer on duty and returned.")
+                for i in range(12)
+            },
+        }
+    }
+    invoice = {
+        "hierarchical_data": {
+            "invoice_header": {
+                "invoice_number": field("INV-2024-00981"),
+                "invoice_date": field("2024-03-15"),
+                "vendor": field("Contoso Industrial Supplies"),
+                "bill_to": field("Fabrikam Manufacturing, Plant 3, Pune"),
+            },
+            "line_items": [
+                {"description": f"Hydraulic fitting type {i}", "quantity": i % 7 + 1, "unit_price": f"{120 + i * 3}.00", "amount": f"{(i % 7 + 1) * (120 + i * 3)}.00"}
+                for i in range(40)
+            ],
+            "totals": {"subtotal": field("98,450.00"), "gst": field("17,721.00"), "total": field("116,171.00")},
+        }
+    }
+    statement = {
+        "hierarchical_data": {
+            "account_summary": {
+                "account_holder": field("Daniel Okafor"),
+                "account_number": field("XXXX-XXXX-4471"),
+                "statement_period": field("2024-01-01 to 2024-03-31"),
+                "opening_balance": field("4,210.55"),
+                "closing_balance": field("6,987.10"),
+            },
+            "transactions": [
+                {"date": f"2024-0{1 + i // 140}-{1 + i % 28:02d}", "description": f"POS PURCHASE MERCHANT {i:04d} CITY CENTRE", "debit": f"{(i * 37) % 500}.25", "credit": "", "balance": f"{4000 + i * 11}.10"}
+                for i in range(400)
+            ],
+        }
+    }
+    return {"form": form, "invoice": invoice, "bank_statement": statement}
+
+
+def facts(analysis_result):
+    """Smallest retrievable facts: every field, and every table row as a whole record."""
+    found = []
+
+    def walk(data):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if isinstance(value, dict) and "value" in value:
+                    found.append(f"{key.replace('_', ' ').title()}: {value['value']}")
+                elif isinstance(value, (dict, list)):
+                    walk(value)
+        elif isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict):
+                    # A row is only retrievable if all of its cells are in the same chunk
+                    found.append(" ".join(f"{k}: {v}" for k, v in item.items()))
+                else:
+                    walk(item)
+
+    walk(analysis_result.get("hierarchical_data", {}))
+    return found
+
+
+def recall(chunks, expected):
+    return sum(1 for fact in expected if any(fact in chunk for chunk in chunks)) / max(1, len(expected))
+
+
+def main():
+    service = EmbeddingService()
+    print(f"{'document':<16}{'fixed chunks':>14}{'fixed recall':>14}{'struct chunks':>15}{'struct recall':>15}")
+    for name, analysis_result in sample_documents().items():
+        expected = facts(analysis_result)
+        fixed = service.chunk_text(service.convert_analysis_result_to_text(analysis_result), chunk_size=1500, overlap=200)
+        structured = [c["chunk"] for c in service.chunk_analysis_result(analysis_result)]
+        print(f"{name:<16}{len(fixed):>14}{recall(fixed, expected):>14.1%}{len(structured):>15}{recall(structured, expected):>15.1%}")
+
+
+if __name__ == "__main__":
+    main()
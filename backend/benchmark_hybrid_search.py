@@ -0,0 +1,177 @@
+"""
+Search benchmark: vector-only vs BM25-only vs hybrid (reciprocal-rank fusion)
+
+Builds a synthetic corpus of invoice / tax documents rendered the way the
+structure-aware chunker renders fields ("Invoice Number: INV-2024-00981"), then
+runs two query sets against the in-process indexes:
+
+- identifier queries: an invoice number, NPWP or NIK, with and without its
+  separators (exactly one relevant document);
+- descriptive queries: vendor + product (every document with both is relevant).
+
+Reports recall@10 and per-query latency, with a substring scan over all chunk
+text (the local equivalent of an ILIKE search) as the baseline.
+
+No embedding API calls are made: the stand-in embedding is a hashed bag of
+words in which every token containing a digit maps to the same feature, which
+mimics how dense models blur exact identifiers.
+
+    python benchmark_hybrid_search.py --documents 3000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.lexical_index import UserLexicalIndex, reciprocal_rank_fusion
+from app.services.vector_index import UserVectorIndex
+
+DIMENSIONS = 256
+VENDORS = [
+    "Contoso Industrial", "Fabrikam Manufacturing", "Northwind Traders", "Tailspin Logistics", "Adventure Works",
+    "Wide World Importers", "Litware Systems", "Proseware Consulting", "Woodgrove Supplies", "Lamna Healthcare",
+    "Alpine Ski House", "Coho Winery", "Margie Travel", "Fourth Coffee", "Humongous Insurance",
+    "Blue Yonder Airlines", "Graphic Design Institute", "Trey Research", "Relecloud Networks", "Bellows College",
+]
+PRODUCTS = [
+    "hydraulic fittings", "steel pipes", "office chairs", "laser printers", "network switches", "safety helmets",
+    "copper wire", "diesel generators", "forklift batteries", "conveyor belts", "paint thinner", "welding rods",
+    "solar panels", "air compressors", "ceramic tiles", "fire extinguishers", "water pumps", "timber planks",
+    "cement bags", "cable trays",
+]
+CITIES = ["Jakarta", "Surabaya", "Bandung", "Medan", "Semarang", "Makassar", "Denpasar", "Pune", "Chennai", "Leeds"]
+
+
+def embed(text: str) -> np.ndarray:
+    """Stand-in dense embedding: hashed bag of words, all digit-bearing tokens share one feature."""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        feature = "<num>" if any(ch.isdigit() for ch in token) else token
+        vector[zlib.crc32(feature.encode()) % DIMENSIONS] += 1.0
+    return vector
+
+
+def build_corpus(documents: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for doc in range(documents):
+        vendor, city = rng.choice(VENDORS), rng.choice(CITIES)
+        products = rng.sample(PRODUCTS, 2)
+        invoice = f"INV-{2020 + doc % 5}-{rng.randrange(10 ** 5):05d}"
+        npwp = f"{rng.randrange(100):02d}.{rng.randrange(1000):03d}.{rng.randrange(1000):03d}.{rng.randrange(10)}-{rng.randrange(1000):03d}.000"
+        nik = "".join(str(rng.randrange(10)) for _ in range(16))
+        header = (
+            f"invoice_header:\n  Invoice Number: {invoice}\n  Vendor: {vendor}\n  Vendor NPWP: {npwp}\n"
+            f"  Customer NIK: {nik}\n  Bill To: Plant {doc % 40}, {city}\n  Invoice Date: 2024-{1 + doc % 12:02d}-{1 + doc % 28:02d}"
+        )
+        items = "\n".join(
+            f"line_items row {row + 1}: description: {product} | quantity: {rng.randrange(1, 50)} | amount: {rng.randrange(100, 9999)}.00"
+            for row, product in enumerate(products)
+        )
+        corpus.append({
+            "id": f"doc-{doc:05d}",
+            # A small invoice fits the chunk token budget whole; the long tail document gets a second chunk
+            "chunks": [header + "\n" + items] if doc % 10 else [header, items],
+            "invoice": invoice, "npwp": npwp, "nik": nik, "vendor": vendor, "products": products,
+        })
+    return corpus
+
+
+def build_queries(corpus, count: int, seed: int = 11):
+    rng = random.Random(seed)
+    identifier, descriptive = [], []
+    for doc in rng.sample(corpus, count):
+        kind = rng.choice(["invoice", "invoice_compact", "npwp", "npwp_digits", "nik"])
+        if kind == "invoice":
+            query = f"invoice {doc['invoice']}"
+        elif kind == "invoice_compact":
+            query = doc["invoice"].replace("-", "")
+        elif kind == "npwp":
+            query = f"NPWP {doc['npwp']}"
+        elif kind == "npwp_digits":
+            query = re.sub(r"\D", "", doc["npwp"])
+        else:
+            query = f"NIK {doc['nik']}"
+        identifier.append((query, {doc["id"]}))
+
+        product = rng.choice(doc["products"])
+        relevant = {d["id"] for d in corpus if d["vendor"] == doc["vendor"] and product in d["products"]}
+        descriptive.append((f"{doc['vendor']} {product}", relevant))
+    return identifier, descriptive
+
+
+def documents_of(keys, limit: int = 10):
+    """Distinct document ids from ranked (document_id, chunk_index) keys."""
+    return list(dict.fromkeys(document_id for document_id, _ in keys))[:limit]
+
+
+def recall_at(ranked_documents, relevant, k: int = 10) -> float:
+    return len(set(ranked_documents[:k]) & relevant) / min(k, len(relevant))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.documents)
+    vector_index, lexical_index = UserVectorIndex(), UserLexicalIndex()
+    start = time.perf_counter()
+    for doc in corpus:
+        vector_index.upsert_document(doc["id"], [(i, text, embed(text)) for i, text in enumerate(doc["chunks"])])
+    vector_build = time.perf_counter() - start
+    start = time.perf_counter()
+    for doc in corpus:
+        lexical_index.upsert_document(doc["id"], list(enumerate(doc["chunks"])))
+    lexical_build = time.perf_counter() - start
+    print(f"📚 {args.documents} documents, {len(lexical_index)} chunks | index build: vector {vector_build:.2f}s, BM25 {lexical_build:.2f}s")
+
+    all_chunks = [(doc["id"], i, text.lower()) for doc in corpus for i, text in enumerate(doc["chunks"])]
+
+    for name, queries in zip(("identifier", "descriptive"), build_queries(corpus, args.queries)):
+        recall = {"scan": 0.0, "vector": 0.0, "bm25": 0.0, "hybrid": 0.0}
+        latency = {"scan": 0.0, "vector": 0.0, "bm25": 0.0, "fusion": 0.0}
+        for query, relevant in queries:
+            start = time.perf_counter()
+            needle = query.lower()
+            scan_keys = [(d, i) for d, i, text in all_chunks if needle in text]
+            latency["scan"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            vector_keys = [(h.document_id, h.chunk_index) for h in vector_index.search(embed(query), args.candidates)]
+            latency["vector"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            lexical_keys = [(h.document_id, h.chunk_index) for h in lexical_index.search(query, args.candidates)]
+            latency["bm25"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            fused_keys = [key for key, _ in reciprocal_rank_fusion([vector_keys, lexical_keys])]
+            latency["fusion"] += time.perf_counter() - start
+
+            recall["scan"] += recall_at(documents_of(scan_keys), relevant)
+            recall["vector"] += recall_at(documents_of(vector_keys), relevant)
+            recall["bm25"] += recall_at(documents_of(lexical_keys), relevant)
+            recall["hybrid"] += recall_at(documents_of(fused_keys), relevant)
+
+        n = len(queries)
+        print(f"\n{name} queries ({n})")
+        print(f"  recall@10   scan {recall['scan'] / n:6.1%} | vector {recall['vector'] / n:6.1%} | bm25 {recall['bm25'] / n:6.1%} | hybrid {recall['hybrid'] / n:6.1%}")
+        print(
+            f"  ms/query    scan {latency['scan'] / n * 1000:6.2f} | vector {latency['vector'] / n * 1000:6.2f} | "
+            f"bm25 {latency['bm25'] / n * 1000:6.2f} | fusion {latency['fusion'] / n * 1000:6.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Streaming JSON parse benchmark
+
+Compares the two ways an extraction response can be turned into a result:
+
+- repair pipeline: LLMClient.process_api_result on the full content once the
+  response has ended (sanitize -> json.loads -> truncation repair -> partial
+  key/value extraction);
+- streaming: the content fed to IncrementalJSONParser in --delta-chars deltas
+  as they would arrive over SSE, then LLMClient.process_streamed_result.
+
+The documents are synthetic without_template_extraction outputs of about
+--tokens output tokens (sections of fields plus line-item tables, with literal
+newlines inside some strings as models often emit). Reports, per run:
+
+- parse time: all CPU spent turning the content into a result;
+- post-stream latency: work left after the last byte arrived (the whole
+  pipeline for the repair path, finish() + normalization for streaming);
+- for responses cut off at 50% / 90% of their length: leaf values recovered
+  out of those present in the received text.
+
+    python benchmark_json_streaming.py --tokens 16000 --documents 20
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.modules.llm_client import LLMClient
+from app.services.streaming_json import IncrementalJSONParser
+
+TASK = "without_template_extraction"
+WORDS = ("invoice", "account", "balance", "payment", "total", "customer", "address", "reference",
+         "amount", "period", "statement", "branch", "deposit", "charge", "interest", "summary")
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_document(rng: random.Random, target_chars: int) -> dict:
+    """Sections of fields and tables until the serialized document reaches target_chars."""
+    document, size, index = {}, 0, 0
+    while size < target_chars:
+        index += 1
+        if index % 3 == 0:
+            rows = [{
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "description": _text(rng, rng.randint(3, 8)),
+                "amount": round(rng.uniform(-5000, 5000), 2),
+                "balance": round(rng.uniform(0, 90000), 2),
+            } for _ in range(rng.randint(10, 30))]
+            document[f"transactions_{index}"] = rows
+        else:
+            document[f"section_{index}"] = {
+                f"{rng.choice(WORDS)}_{field}": (
+                    _text(rng, 4) + "\n" + _text(rng, 4) if rng.random() < 0.2 else _text(rng, rng.randint(1, 6))
+                ) for field in range(rng.randint(6, 16))
+            }
+        document["has_signature"] = False
+        size = len(json.dumps(document, indent=2))
+    return document
+
+
+def to_content(document: dict) -> str:
+    """Pretty-printed JSON with literal newlines inside strings (invalid JSON the pipeline has to repair)."""
+    return json.dumps(document, indent=2).replace("\\n", "\n")
+
+
+def leaf_ends(value, level: int = 0, pieces=None, ends=None):
+    """Serialize value exactly like to_content, recording after which piece each leaf value ends."""
+    pieces = [] if pieces is None else pieces
+    ends = [] if ends is None else ends
+    if isinstance(value, (dict, list)) and value:
+        is_dict = isinstance(value, dict)
+        pieces.append("{" if is_dict else "[")
+        items = list(value.items()) if is_dict else [(None, item) for item in value]
+        for position, (key, item) in enumerate(items):
+            pieces.append(("," if position else "") + "\n" + "  " * (level + 1) + (json.dumps(key) + ": " if is_dict else ""))
+            leaf_ends(item, level + 1, pieces, ends)
+        pieces.append("\n" + "  " * level + ("}" if is_dict else "]"))
+    else:
+        pieces.append(json.dumps(value).replace("\\n", "\n"))
+        ends.append(len(pieces))
+    return pieces, ends
+
+
+def available_leaves(document: dict, cut: int) -> int:
+    """Leaf values whose text lies entirely inside the first cut characters of the content."""
+    pieces, ends = leaf_ends(document)
+    offsets = list(itertools.accumulate(len(piece) for piece in pieces))
+    return sum(1 for end in ends if offsets[end - 1] <= cut)
+
+
+def count_leaves(value) -> int:
+    if isinstance(value, dict):
+        return sum(count_leaves(v) for k, v in value.items() if not str(k).startswith("_"))
+    if isinstance(value, list):
+        return sum(count_leaves(v) for v in value)
+    return 1
+
+
+def response(content: str, finish_reason: str) -> dict:
+    return {"model": "benchmark", "choices": [{"message": {"content": content}, "finish_reason": finish_reason}], "usage": {}}
+
+
+def run_repair(client: LLMClient, content: str, finish_reason: str):
+    start = time.perf_counter()
+    try:
+        result = client.process_api_result(response(content, finish_reason), TASK)
+    except ValueError:
+        result = None
+    elapsed = time.perf_counter() - start
+    return result, elapsed, elapsed
+
+
+def run_streaming(client: LLMClient, content: str, finish_reason: str, delta_chars: int):
+    parser = IncrementalJSONParser()
+    start = time.perf_counter()
+    for offset in range(0, len(content), delta_chars):
+        parser.feed(content[offset:offset + delta_chars])
+    streamed = time.perf_counter()
+    parser.finish()
+    result = client.process_streamed_result(response(content, finish_reason), parser, TASK)
+    end = time.perf_counter()
+    return result, end - start, end - streamed
+
+
+def recovered(result) -> int:
+    if not isinstance(result, dict):
+        return 0
+    return count_leaves(result.get("_parsed", result.get("hierarchical_data", {})))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=16000, help="Approximate output tokens per response")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--delta-chars", type=int, default=20, help="Characters per streamed delta")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)  # the repair pipeline logs every fallback it tries
+
+    rng = random.Random(args.seed)
+    documents = [make_document(rng, args.tokens * 4) for _ in range(args.documents)]
+    client = LLMClient.__new__(LLMClient)  # only the parsing methods are used; no provider configuration needed
+    sizes = [len(to_content(d)) for d in documents]
+    print(f"{len(documents)} responses, {statistics.mean(sizes) / 1024:.0f} KB / ~{statistics.mean(sizes) / 4:.0f} tokens each, "
+          f"{args.delta_chars}-char deltas")
+
+    for label, fraction in (("complete", 1.0), ("truncated 90%", 0.9), ("truncated 50%", 0.5)):
+        stats = {"repair": ([], [], []), "streaming": ([], [], [])}
+        available = []
+        for document in documents:
+            content = to_content(document)
+            cut = int(len(content) * fraction)
+            content = content[:cut]
+            finish_reason = "stop" if fraction == 1.0 else "length"
+            available.append(available_leaves(document, cut))
+            for name, runner in (
+                ("repair", lambda: run_repair(client, content, finish_reason)),
+                ("streaming", lambda: run_streaming(client, content, finish_reason, args.delta_chars)),
+            ):
+                result, total, post = runner()
+                stats[name][0].append(total)
+                stats[name][1].append(post)
+                stats[name][2].append(recovered(result))
+
+        print(f"\n{label}: {sum(available)} leaf values in the received text")
+        for name, (totals, posts, values) in stats.items():
+            print(f"  {name:<10} parse {statistics.mean(totals) * 1000:8.2f} ms | post-stream {statistics.mean(posts) * 1000:8.2f} ms"
+                  f" | recovered {sum(values)}/{sum(available)} ({100 * sum(values) / max(1, sum(available)):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
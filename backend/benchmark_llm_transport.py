@@ -0,0 +1,154 @@
+"""
+LLM transport load test against the mock LLM server
+
+Starts mock_llm_server.py, then sends --pages chat-completion requests from
+--threads worker threads (the LLM pool of the page pipeline) in three modes:
+
+- legacy: a per-thread HTTP session as LLMClient used to have; a non-200
+  response fails the call, which the page pipeline retries once;
+- fixed-retry: the same, retrying 429s after a fixed 1s / 2s / 4s (every
+  throttled thread comes back at the same moment);
+- transport: LLMTransport.post_json_sync (token buckets, AIMD concurrency,
+  jittered backoff honoring Retry-After).
+
+Reports completed / failed pages, 429s seen by the server, wall time, latency
+percentiles, peak concurrency at the server and the adapted concurrency limit.
+
+    python benchmark_llm_transport.py --pages 400 --threads 100 --rpm 1200 --max-concurrency 24
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.llm_transport import LLMTransport
+
+MODEL = "mock/extraction-model"
+REQUEST_BODY = {
+    "model": MODEL,
+    "messages": [{"role": "user", "content": [{"type": "text", "text": "Extract the fields of this page. " * 40}]}],
+    "max_tokens": 32000,
+    "temperature": 0.1,
+}
+
+
+def start_server(args) -> subprocess.Popen:
+    server = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_llm_server.py"),
+        "--port", str(args.port), "--rpm", str(args.rpm), "--window", str(args.window),
+        "--max-concurrency", str(args.max_concurrency), "--soft-concurrency", str(args.soft_concurrency),
+        "--latency", str(args.latency),
+    ])
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/stats", timeout=1.0)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Mock LLM server did not start")
+
+
+def run_session(url: str, args, attempts: int, retry_throttled: bool):
+    local = threading.local()
+
+    def call(_):
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(timeout=90.0)
+        start = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                response = local.client.post(url, json=REQUEST_BODY)
+                if response.status_code == 200:
+                    return True, time.perf_counter() - start
+                if not retry_throttled:
+                    continue
+            except httpx.TransportError:
+                pass
+            if attempt < attempts - 1:
+                time.sleep(2 ** attempt)
+        return False, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        return list(pool.map(call, range(args.pages))), None
+
+
+def run_legacy(url: str, args):
+    return run_session(url, args, attempts=2, retry_throttled=False)  # one page-level retry
+
+
+def run_fixed_retry(url: str, args):
+    return run_session(url, args, attempts=4, retry_throttled=True)
+
+
+def run_transport(url: str, args):
+    transport = LLMTransport(SimpleNamespace(
+        LLM_RATE_LIMIT_RPM=args.client_rpm, LLM_RATE_LIMIT_TPM=0, LLM_MODEL_RATE_LIMITS="",
+        LLM_MAX_CONCURRENCY=args.threads, LLM_MIN_CONCURRENCY=2, LLM_INITIAL_CONCURRENCY=16,
+        LLM_MAX_RETRIES=6, LLM_BACKOFF_BASE_S=0.5, LLM_BACKOFF_MAX_S=10.0,
+        LLM_REQUEST_TIMEOUT_S=90.0, LLM_OUTPUT_TOKEN_ESTIMATE=2000, LLM_IMAGE_TOKEN_ESTIMATE=1300,
+    ))
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            transport.post_json_sync(url, REQUEST_BODY, {"Authorization": "Bearer mock"})
+            return True, time.perf_counter() - start
+        except Exception:
+            return False, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(call, range(args.pages)))
+    return results, transport.stats().get(MODEL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--port", type=int, default=4010)
+    parser.add_argument("--rpm", type=int, default=1200, help="Server-side requests/min limit")
+    parser.add_argument("--window", type=float, default=10.0)
+    parser.add_argument("--client-rpm", type=int, default=0, help="Client-side requests/min budget (0 = rely on AIMD only)")
+    parser.add_argument("--max-concurrency", type=int, default=24)
+    parser.add_argument("--soft-concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)  # per-retry warnings would drown the report
+
+    server = start_server(args)
+    url = f"http://127.0.0.1:{args.port}/v1/chat/completions"
+    try:
+        for name, runner in (("legacy", run_legacy), ("fixed-retry", run_fixed_retry), ("transport", run_transport)):
+            httpx.post(f"http://127.0.0.1:{args.port}/stats/reset")
+            start = time.perf_counter()
+            results, limiter = runner(url, args)
+            wall = time.perf_counter() - start
+            server_stats = httpx.get(f"http://127.0.0.1:{args.port}/stats").json()
+            latencies = sorted(duration for ok, duration in results if ok)
+            completed = len(latencies)
+            print(f"\n{name}: {completed}/{args.pages} pages completed, {args.pages - completed} failed in {wall:.1f}s")
+            print(f"  server: {server_stats['ok']} ok, {server_stats['throttled']} throttled (429), peak in-flight {server_stats['peak']}")
+            if latencies:
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                print(f"  latency  p50 {statistics.median(latencies):.2f}s | p95 {p95:.2f}s")
+            if limiter:
+                print(f"  limiter: {limiter}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Memory benchmark: base64 data-URL page pipeline vs raw bytes (PageImage) pipeline
+
+Builds a synthetic multi-page PDF, then for each mode renders every page, encodes
+it and keeps the encoded images alive (as the page pipeline does until stage 9),
+reporting peak RSS and wall time. Each mode runs in its own process so MuPDF's
+native buffers (invisible to tracemalloc) are counted and one mode's peak does
+not hide the other's.
+
+    python benchmark_pdf_memory.py --pages 50 --scale 2.0
+"""
+import argparse
+import base64
+import gc
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.pdf_processor import PDFProcessor
+
+
+def build_synthetic_pdf(pages: int) -> bytes:
+    """Text-heavy pages with a few shapes so rendered images are not trivially compressible"""
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        for line in range(60):
+            page.insert_text((40, 40 + line * 12), f"Page {page_index + 1} line {line + 1}: " + "lorem ipsum dolor sit amet " * 3, fontsize=8)
+        page.draw_rect(fitz.Rect(300, 600, 560, 780), color=(0, 0, 0), width=1.5)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def render_pages(processor: PDFProcessor, pdf_data, pages: int, scale: float, as_bytes: bool) -> list:
+    encoded = []
+    for page_number in range(pages):
+        # The string path decoded the data URL and reopened the PDF per page (fallback step 1.7/1.8)
+        if as_bytes:
+            pdf_document = pdf_data.document
+        else:
+            pdf_document = fitz.open(stream=processor.step1_7_decode_base64_pdf_fallback(pdf_data), filetype="pdf")
+        pix = pdf_document[page_number].get_pixmap(matrix=fitz.Matrix(scale, scale))
+        image = processor.step1_11_convert_pixmap_to_pil(pix)
+        encoded.append(processor._encode_image_bytes(image) if as_bytes else processor._encode_image_simple(image))
+        if not as_bytes:
+            pdf_document.close()
+    return encoded
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux /proc), falling back to the peak elsewhere"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run(mode: str, pdf_bytes: bytes, pages: int, scale: float):
+    processor = PDFProcessor()
+    gc.collect()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    if mode == "bytes":
+        with processor.open_pdf_document(pdf_bytes) as pdf_handle:
+            encoded = render_pages(processor, pdf_handle, pages, scale, as_bytes=True)
+        payload = sum(len(image.data) for image in encoded)
+    else:
+        pdf_data = "data:application/pdf;base64," + base64.b64encode(pdf_bytes).decode("ascii")
+        encoded = render_pages(processor, pdf_data, pages, scale, as_bytes=False)
+        payload = sum(len(image) for image in encoded)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(f"{mode:>7}: peak RSS {peak:7.1f} MB (+{peak - baseline:6.1f} MB over baseline) | "
+          f"held images {payload / 1024 / 1024:7.1f} MB | {elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--scale", type=float, default=2.0)
+    parser.add_argument("--mode", choices=("string", "bytes"), help=argparse.SUPPRESS)  # Child process
+    args = parser.parse_args()
+
+    pdf_bytes = build_synthetic_pdf(args.pages)
+    if args.mode:
+        run(args.mode, pdf_bytes, args.pages, args.scale)
+        return
+
+    print(f"📄 Synthetic PDF: {args.pages} pages, {len(pdf_bytes) / 1024:.0f} KB, render scale {args.scale}x")
+    for mode in ("string", "bytes"):
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--pages", str(args.pages), "--scale", str(args.scale), "--mode", mode],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
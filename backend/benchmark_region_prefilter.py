@@ -0,0 +1,295 @@
+"""
+Region pre-filter benchmark: recall loss vs YOLO calls saved (Stage 1.6)
+
+Runs RegionPrefilter.analyze on labelled pages and reports, per kind
+(signature / face):
+
+- page recall: labelled pages the pre-filter still sends to YOLO;
+- box recall: labelled boxes that are also inside the region YOLO would see
+  (the ROI crop, or the full page) - 1 - box recall is the recall the
+  pre-filter can cost the detector at most;
+- skipped: unlabelled pages on which YOLO is no longer run;
+- throughput: detector pages per second before/after, counting the
+  pre-filter's own time. Detector cost comes from --onnx (an exported model,
+  timed with the inference worker's ONNX Runtime session) or --detector-ms.
+
+Pages go through PDFProcessor._apply_text_enhancement first, exactly like
+Stage 4. Without --labels a synthetic set is generated: scanned (noisy, one
+page-sized image block) and born-digital (clean, photo as its own image
+block) forms with typed text, rules, signature lines, cursive signatures and
+ID photos. A real set is a JSON-lines manifest, one page per line:
+
+    {"image": "page1.png", "signatures": [[x0, y0, x1, y1]], "faces": [],
+     "image_blocks": [[x0, y0, x1, y1]], "page_size": [612, 792]}
+
+(boxes in image pixels, image_blocks/page_size in PDF points and optional).
+
+    python benchmark_region_prefilter.py --pages 80
+    python benchmark_region_prefilter.py --labels samples/manifest.jsonl --onnx models/signature_detector.onnx
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.pdf_processor import PDFProcessor
+from app.services.modules.parallel_page_processor.region_prefilter import RegionPrefilter
+
+PAGE_PT = (612, 792)  # US Letter
+WORDS = ("account name date amount total policy number address invoice payment customer "
+         "reference period balance signature applicant declaration statement holder").split()
+
+
+# ----------------------------------------------------------------------
+# Synthetic labelled pages
+# ----------------------------------------------------------------------
+def _font(size: int):
+    return ImageFont.load_default(size=size)
+
+
+def _text_block(draw, rng, x, y, width, lines, size):
+    font = _font(size)
+    for _ in range(lines):
+        words, line_x = [], x
+        while True:
+            word = rng.choice(WORDS)
+            advance = draw.textlength(word + " ", font=font)
+            if line_x + advance > x + width:
+                break
+            words.append(word)
+            line_x += advance
+        draw.text((x, y), " ".join(words), fill=(20, 20, 20), font=font)
+        y += int(size * 1.5)
+    return y
+
+
+def _table(draw, rng, x, y, width, rows, size):
+    cols = rng.randint(3, 5)
+    row_h = int(size * 1.8)
+    for r in range(rows + 1):
+        draw.line((x, y + r * row_h, x + width, y + r * row_h), fill=(30, 30, 30), width=3)
+    for c in range(cols + 1):
+        cx = x + c * width // cols
+        draw.line((cx, y, cx, y + rows * row_h), fill=(30, 30, 30), width=3)
+    font = _font(size)
+    for r in range(rows):
+        for c in range(cols):
+            draw.text((x + c * width // cols + 12, y + r * row_h + size // 3), rng.choice(WORDS), fill=(20, 20, 20), font=font)
+    return y + rows * row_h
+
+
+def _signature(draw, rng, x, y, width, height):
+    """Cursive scribble; returns its bounding box."""
+    ink = rng.choice([(15, 15, 60), (10, 10, 10), (30, 40, 140), (90, 90, 110)])
+    stroke = rng.randint(4, 9)
+    xs, ys = [], []
+    pen_x = x
+    for _ in range(rng.randint(1, 3)):  # first name / last name / flourish
+        points = []
+        span = width // rng.randint(2, 3)
+        loops = rng.randint(4, 9)
+        for i in range(loops * 12 + 1):
+            t = i / 12
+            px = pen_x + span * t / loops + rng.uniform(-3, 3)
+            py = y + height / 2 + math.sin(t * 2 * math.pi) * height * rng.uniform(0.25, 0.5) + rng.uniform(-4, 4)
+            points.append((px, py))
+        draw.line(points, fill=ink, width=stroke, joint="curve")
+        xs += [p[0] for p in points]
+        ys += [p[1] for p in points]
+        pen_x += span + rng.randint(20, 60)
+    return [int(min(xs)) - stroke, int(min(ys)) - stroke, int(max(xs)) + stroke, int(max(ys)) + stroke]
+
+
+def _photo(image, rng, x, y, width, height):
+    """ID-style portrait pasted at (x, y); returns the face box."""
+    photo = Image.new("RGB", (width, height), tuple(rng.randint(150, 220) for _ in range(3)))
+    draw = ImageDraw.Draw(photo)
+    skin = rng.choice([(230, 190, 160), (190, 140, 100), (120, 80, 55)])
+    hair = rng.choice([(30, 20, 10), (90, 60, 30), (200, 170, 100), (60, 60, 60)])
+    cx, cy = width // 2, int(height * 0.45)
+    fw, fh = int(width * 0.32), int(height * 0.3)
+    draw.ellipse((cx - fw * 1.6, height * 0.72, cx + fw * 1.6, height * 1.3), fill=tuple(rng.randint(20, 120) for _ in range(3)))
+    draw.ellipse((cx - fw * 1.1, cy - fh * 1.25, cx + fw * 1.1, cy + fh * 0.4), fill=hair)
+    draw.ellipse((cx - fw, cy - fh, cx + fw, cy + fh), fill=skin)
+    for ex in (-0.4, 0.4):
+        draw.ellipse((cx + ex * fw - 12, cy - 0.15 * fh - 7, cx + ex * fw + 12, cy - 0.15 * fh + 7), fill=(40, 30, 30))
+    draw.arc((cx - fw * 0.35, cy + fh * 0.25, cx + fw * 0.35, cy + fh * 0.6), 20, 160, fill=(120, 40, 40), width=5)
+    noise = Image.effect_noise((width, height), rng.uniform(10, 30)).convert("RGB")
+    photo = Image.blend(photo, noise, 0.12).filter(ImageFilter.GaussianBlur(rng.uniform(1, 3)))
+    image.paste(photo, (x, y))
+    return [x + cx - fw, y + cy - fh, x + cx + fw, y + cy + fh]
+
+
+def make_page(rng: random.Random, kind: str, scanned: bool, scale: float = 5.0):
+    """(RGB page image, labels) for one synthetic page of the given kind."""
+    width, height = int(PAGE_PT[0] * scale), int(PAGE_PT[1] * scale)
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    margin, size = int(0.08 * width), rng.choice([34, 40, 46])
+    labels = {"signatures": [], "faces": []}
+    photo_box = None
+
+    y = margin
+    draw.text((margin, y), " ".join(rng.choice(WORDS) for _ in range(3)).upper(), fill=(0, 0, 0), font=_font(size * 2))
+    y += size * 4
+    text_width = width - 2 * margin
+    if kind in ("photo", "both"):
+        pw, ph = int(width * 0.2), int(width * 0.26)
+        px = width - margin - pw
+        face = _photo(image, rng, px, y, pw, ph)
+        labels["faces"].append(face)
+        photo_box = [px, y, px + pw, y + ph]
+        text_width = px - margin - size
+    if kind != "blank":
+        y = _text_block(draw, rng, margin, y, text_width, rng.randint(6, 12), size) + size
+        y = max(y, photo_box[3] + size if photo_box else 0)
+        if rng.random() < 0.6:
+            y = _table(draw, rng, margin, y, width - 2 * margin, rng.randint(3, 8), size) + size * 2
+        y = _text_block(draw, rng, margin, y, width - 2 * margin, rng.randint(3, 10), size) + size * 2
+
+    sig_y = min(y, height - margin - size * 8)
+    font = _font(size)
+    draw.text((margin, sig_y + size * 4), "Signature:", fill=(20, 20, 20), font=font)
+    line_x0 = margin + int(draw.textlength("Signature: ", font=font))
+    draw.line((line_x0, sig_y + size * 5, line_x0 + int(width * 0.35), sig_y + size * 5), fill=(20, 20, 20), width=3)
+    if kind in ("signature", "both"):
+        labels["signatures"].append(_signature(draw, rng, line_x0 + 20, sig_y + size, int(width * 0.3), int(size * 4)))
+
+    if scanned:
+        noise = Image.effect_noise((width, height), 18).convert("RGB")
+        image = Image.blend(image, noise, 0.08).filter(ImageFilter.GaussianBlur(0.8))
+        image = image.rotate(rng.uniform(-0.6, 0.6), fillcolor=(255, 255, 255))
+        blocks = [[0, 0, PAGE_PT[0], PAGE_PT[1]]]
+    else:
+        blocks = [[v / scale for v in photo_box]] if photo_box else []
+    labels["image_blocks"] = blocks
+    labels["page_size"] = list(PAGE_PT)
+    return image, labels
+
+
+def synthetic_set(pages: int, seed: int):
+    rng = random.Random(seed)
+    kinds = ["text"] * 40 + ["signature"] * 25 + ["photo"] * 15 + ["both"] * 10 + ["blank"] * 10
+    for i in range(pages):
+        scanned = i % 2 == 0
+        kind = rng.choice(kinds)
+        image, labels = make_page(rng, kind, scanned)
+        yield f"{'scanned' if scanned else 'born-digital'}-{i:03d}-{kind}", image, labels
+
+
+def manifest_set(path: str):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            image = Image.open(os.path.join(base, entry["image"])).convert("RGB")
+            yield entry["image"], image, entry
+
+
+# ----------------------------------------------------------------------
+# Evaluation
+# ----------------------------------------------------------------------
+def covered(box, roi, min_overlap: float = 0.9) -> bool:
+    """Whether at least min_overlap of box lies inside roi (None = full page)."""
+    if roi is None:
+        return True
+    ix = max(0, min(box[2], roi[2]) - max(box[0], roi[0]))
+    iy = max(0, min(box[3], roi[3]) - max(box[1], roi[1]))
+    area = max(1, (box[2] - box[0]) * (box[3] - box[1]))
+    return ix * iy / area >= min_overlap
+
+
+def detector_ms(onnx_path: str, runs: int = 10) -> float:
+    """Median single-page latency of an exported model (letterboxed 640 input)."""
+    import numpy as np
+    from app.services.yolo_onnx_worker import _Model
+
+    model = _Model(onnx_path, conf=0.1, iou=0.45, threads=2)
+    page = np.full((1, model.imgsz[0], model.imgsz[1], 3), 200, dtype=np.uint8)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.infer(page)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=80, help="Synthetic pages (ignored with --labels)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--labels", help="JSON-lines manifest of a labelled sample set")
+    parser.add_argument("--onnx", help="Exported YOLO model to time the detector with")
+    parser.add_argument("--detector-ms", type=float, default=150.0, help="Detector cost per page when --onnx is not given")
+    parser.add_argument("--max-roi-fraction", type=float, default=0.6)
+    parser.add_argument("--verbose", action="store_true", help="List pages where labelled boxes were missed")
+    args = parser.parse_args()
+
+    processor = PDFProcessor()
+    prefilter = RegionPrefilter(max_roi_fraction=args.max_roi_fraction)
+    pages = manifest_set(args.labels) if args.labels else synthetic_set(args.pages, args.seed)
+
+    totals = {kind: {"pages": 0, "labelled": 0, "kept": 0, "boxes": 0, "boxes_hit": 0, "unlabelled": 0, "skipped": 0, "roi": 0}
+              for kind in ("signature", "face")}
+    analysis_ms, threshold_ms = [], []
+    for name, image, labels in pages:
+        start = time.perf_counter()
+        thresholded = processor._apply_text_enhancement(image)
+        threshold_ms.append((time.perf_counter() - start) * 1000)
+        blocks = labels.get("image_blocks")
+        blocks = [{"type": 1, "bbox": bbox} for bbox in blocks] if blocks is not None else None  # Step 1.4 shape
+        page_size = tuple(labels["page_size"]) if labels.get("page_size") else None
+        regions = prefilter.analyze(thresholded, blocks, page_size)
+        if regions is None:
+            sys.exit("OpenCV/numpy not available - the pre-filter is disabled")
+        analysis_ms.append(regions.elapsed_ms)
+
+        for kind, boxes, needed, roi in (
+            ("signature", labels.get("signatures", []), regions.needs_signature, regions.signature_roi),
+            ("face", labels.get("faces", []), regions.needs_face, regions.face_roi),
+        ):
+            stats = totals[kind]
+            stats["pages"] += 1
+            stats["roi"] += 1 if needed and roi is not None else 0
+            if boxes:
+                stats["labelled"] += 1
+                stats["kept"] += 1 if needed else 0
+                stats["boxes"] += len(boxes)
+                hits = sum(1 for box in boxes if needed and covered(box, roi))
+                stats["boxes_hit"] += hits
+                if args.verbose and hits < len(boxes):
+                    print(f"  missed {kind}: {name} (kept={needed}, roi={roi}, labels={boxes})")
+            else:
+                stats["unlabelled"] += 1
+                stats["skipped"] += 0 if needed else 1
+
+    det_ms = detector_ms(args.onnx) if args.onnx else args.detector_ms
+    pre_ms = statistics.mean(analysis_ms)
+    print(f"\n{len(analysis_ms)} pages | pre-filter {pre_ms:.1f} ms/page (median {statistics.median(analysis_ms):.1f}) "
+          f"| thresholding (Stage 4, already paid) {statistics.mean(threshold_ms):.1f} ms/page "
+          f"| detector {det_ms:.1f} ms/page ({'measured' if args.onnx else 'assumed'})")
+    for kind, stats in totals.items():
+        page_recall = stats["kept"] / stats["labelled"] if stats["labelled"] else float("nan")
+        box_recall = stats["boxes_hit"] / stats["boxes"] if stats["boxes"] else float("nan")
+        skipped = stats["skipped"] / stats["unlabelled"] if stats["unlabelled"] else float("nan")
+        runs = stats["pages"] - stats["skipped"] - (stats["labelled"] - stats["kept"])
+        before = stats["pages"] * det_ms
+        after = stats["pages"] * pre_ms + runs * det_ms
+        print(f"  {kind:<9} page recall {page_recall:6.1%} | box recall {box_recall:6.1%} "
+              f"({stats['boxes_hit']}/{stats['boxes']}) | skipped {skipped:6.1%} of {stats['unlabelled']} unlabelled pages "
+              f"| ROI crops {stats['roi']} | YOLO runs {runs}/{stats['pages']} | throughput x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Text extraction benchmark: two-pass get_text vs single TextPage (step 1.4)
+
+Compares, per page:
+
+- two-pass: page.get_text("text") then page.get_text("dict")["blocks"], as
+  step 1.4 used to do (two full parses; "dict" copies every image's bytes);
+- single-pass: PDFProcessor.step1_4_extract_text_content (one TextPage, image
+  blocks as metadata only).
+
+Two synthetic corpora are built: "born-digital" (text pages with a small logo
+image) and "scanned" (one full-page photo-like JPEG per page, no text). Real
+files can be added with --pdf. Reports mean time per page and Python
+allocations per page (peak while extracting and the size of the result kept).
+
+    python benchmark_text_extraction.py --pages 30 --runs 3
+    python benchmark_text_extraction.py --pdf statement.pdf scan.pdf
+"""
+import argparse
+import gc
+import io
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.pdf_processor import PDFProcessor
+
+
+def _jpeg(rng: random.Random, width: int, height: int, quality: int = 85) -> bytes:
+    """Noisy gradient image, so JPEG compression stays realistic for a scan."""
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.frombytes("RGB", (width // 4, height // 4), rng.randbytes((width // 4) * (height // 4) * 3))
+    image = Image.blend(image, noise.resize((width, height)), 0.35)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def build_born_digital(pages: int, rng: random.Random) -> bytes:
+    doc = fitz.open()
+    logo = _jpeg(rng, 240, 80)
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(40, 30, 160, 70), stream=logo)
+        for block in range(12):
+            for line in range(5):
+                y = 90 + block * 58 + line * 10
+                page.insert_text((40, y), f"Page {page_index + 1} section {block + 1}: " + "lorem ipsum dolor sit amet " * 3, fontsize=8)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def build_scanned(pages: int, rng: random.Random) -> bytes:
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=_jpeg(rng, 1275, 1650))  # Letter page at 150 DPI
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def two_pass(page: fitz.Page) -> dict:
+    text = page.get_text("text")
+    blocks = page.get_text("dict")["blocks"]
+    return {
+        "text": text,
+        "blocks": blocks,
+        "text_blocks": [b for b in blocks if b.get("type") == 0],
+        "image_blocks": [b for b in blocks if b.get("type") == 1],
+    }
+
+
+def measure(extract, pdf_document) -> tuple:
+    """(seconds, peak bytes, retained bytes) per page, averaged over the document."""
+    times, peaks, retained = [], [], []
+    for page in pdf_document:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = extract(page)
+        times.append(time.perf_counter() - start)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        retained.append(current)
+        del result
+    return statistics.mean(times), statistics.mean(peaks), statistics.mean(retained)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=30, help="Pages per synthetic corpus")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--pdf", nargs="*", default=[], help="Additional PDF files to measure")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = {
+        "born-digital": build_born_digital(args.pages, rng),
+        "scanned": build_scanned(args.pages, rng),
+    }
+    for path in args.pdf:
+        with open(path, "rb") as handle:
+            corpora[os.path.basename(path)] = handle.read()
+
+    processor = PDFProcessor()
+    modes = (("two-pass", two_pass), ("single-pass", processor.step1_4_extract_text_content))
+
+    for name, pdf_bytes in corpora.items():
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            print(f"\n{name}: {len(pdf_document)} pages, {len(pdf_bytes) / 1024 / 1024:.1f} MB")
+            for label, extract in modes:
+                runs = [measure(extract, pdf_document) for _ in range(args.runs)]
+                seconds = statistics.median(run[0] for run in runs)
+                peak = statistics.median(run[1] for run in runs)
+                kept = statistics.median(run[2] for run in runs)
+                print(f"  {label:<12} {seconds * 1000:8.2f} ms/page | peak {peak / 1024:9.1f} KB/page | result {kept / 1024:9.1f} KB/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Mock OpenAI-compatible LLM server for load testing the LLM transport
+
+Serves POST /v1/chat/completions the way a rate-limited provider behind LiteLLM
+does:
+
+- requests over --rpm (sliding window of --window seconds, scaled to a minute)
+  or over --max-concurrency in flight are rejected with 429 + Retry-After;
+- latency is --latency +/- --jitter seconds, growing linearly once more than
+  --soft-concurrency requests are in flight (the provider slowing down before
+  it starts rejecting);
+- a successful response carries a small JSON document (--fields fields) and
+  token usage; with "stream": true it is sent as SSE chunks of --chunk-chars
+  characters, --chunk-delay seconds apart.
+
+GET /stats returns counters (ok, throttled, peak concurrency), POST /stats/reset clears them.
+
+Point the backend at it with LITELLM_API_URL=http://127.0.0.1:4010 and any LITELLM_API_KEY.
+
+    python mock_llm_server.py --port 4010 --rpm 600 --max-concurrency 24
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Mock LLM server")
+    state = {"in_flight": 0, "peak": 0, "ok": 0, "throttled": 0, "tokens": 0}
+    admitted = deque()  # admission times inside the rate window
+    window_limit = max(1, round(args.rpm * args.window / 60)) if args.rpm else 0
+
+    def retry_after() -> float:
+        if window_limit and len(admitted) >= window_limit:
+            return max(0.1, admitted[0] + args.window - time.monotonic())
+        return args.retry_after
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        now = time.monotonic()
+        while admitted and now - admitted[0] > args.window:
+            admitted.popleft()
+        if (window_limit and len(admitted) >= window_limit) or state["in_flight"] >= args.max_concurrency:
+            state["throttled"] += 1
+            wait = retry_after()
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": f"{wait:.2f}"},
+                content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+            )
+        admitted.append(now)
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            overload = max(0, state["in_flight"] - args.soft_concurrency) / max(1, args.soft_concurrency)
+            latency = max(0.0, random.uniform(args.latency - args.jitter, args.latency + args.jitter)) * (1 + overload)
+            await asyncio.sleep(latency)
+        finally:
+            state["in_flight"] -= 1
+
+        content = json.dumps({
+            "mock": True,
+            "latency": round(latency, 3),
+            "fields": [{"label": f"Field {i}", "value": f"Value {i}"} for i in range(args.fields)],
+        }, indent=2)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        state["ok"] += 1
+        state["tokens"] += prompt_tokens + completion_tokens
+        response_id = f"mock-{state['ok']}"
+        model = body.get("model", "mock")
+
+        if body.get("stream"):
+            async def events():
+                for start in range(0, len(content), args.chunk_chars):
+                    chunk = {"id": response_id, "model": model, "choices": [{
+                        "index": 0, "delta": {"content": content[start:start + args.chunk_chars]}, "finish_reason": None,
+                    }]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if args.chunk_delay:
+                        await asyncio.sleep(args.chunk_delay)
+                final = {"id": response_id, "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(final)}\n\n"
+                yield f"data: {json.dumps({'id': response_id, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": response_id,
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return state
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        state.update({"peak": state["in_flight"], "ok": 0, "throttled": 0, "tokens": 0})
+        admitted.clear()
+        return state
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4010)
+    parser.add_argument("--rpm", type=int, default=600, help="Requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=10.0, help="Sliding window (seconds) the rpm limit is enforced over")
+    parser.add_argument("--max-concurrency", type=int, default=24, help="In-flight requests before 429")
+    parser.add_argument("--soft-concurrency", type=int, default=16, help="In-flight requests before latency starts to grow")
+    parser.add_argument("--latency", type=float, default=0.8, help="Mean response latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Latency jitter (seconds)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After for concurrency rejections (seconds)")
+    parser.add_argument("--fields", type=int, default=5, help="Fields in each response document")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per SSE chunk for streamed responses")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Delay between SSE chunks (seconds)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
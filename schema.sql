@@ -163,6 +163,7 @@ CREATE TABLE public.document_chunks (
   chunk_embedding USER-DEFINED,
   token_count integer,
   created_at timestamp with time zone NOT NULL DEFAULT now(),
+  chunk_hash text,
   CONSTRAINT document_chunks_pkey PRIMARY KEY (id),
   CONSTRAINT document_chunks_document_id_fkey FOREIGN KEY (document_id) REFERENCES public.documents(id)
 );
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -172,6 +172,31 @@ const FEATURE_TABS: FeatureTab[] = [
   { id: 'migration', label: 'Migration', icon: Upload, description: 'Migrate docs from Google Drive, OneDrive, FileNet', badge: 'New', category: 'admin' },
 ];
 
+// Documents per request to the paginated listing; more are fetched with "Load more"
+const DOCUMENT_PAGE_SIZE = 100;
+// Sorts the listing endpoint can apply server-side (others sort the loaded pages only)
+const SERVER_SORTS = ['created_at', 'name', 'size'];
+// Typing pause before the listing is re-fetched with the search query
+const SEARCH_DEBOUNCE_MS = 300;
+
+interface DocumentStats {
+  total: number;
+  totalSize: number;
+  aiProcessed: number;
+  avgImportance: number;
+  exact: boolean; // false: only the loaded pages are counted
+}
+
+const EMPTY_DOCUMENT_STATS: DocumentStats = { total: 0, totalSize: 0, aiProcessed: 0, avgImportance: 0, exact: true };
+
+const summarizeDocuments = (docs: Document[], exact: boolean): DocumentStats => ({
+  total: docs.length,
+  totalSize: docs.reduce((sum, doc) => sum + (doc.file_size || 0), 0),
+  aiProcessed: docs.filter(doc => doc.processing_status === 'completed').length,
+  avgImportance: docs.length > 0 ? docs.reduce((sum, doc) => sum + (doc.insights?.importance_score || 0), 0) / docs.length : 0,
+  exact
+});
+
 export const DocumentManager: React.FC = () => {
   // Active Feature Tab
   const [activeFeature, setActiveFeature] = useState('documents');
@@ -195,19 +220,29 @@ export const DocumentManager: React.FC = () => {
   const [chatbotMinimized, setChatbotMinimized] = useState(false);
   const [selectedDocument, setSelectedDocument] = useState<Document | null>(null);
   const [showDocumentViewer, setShowDocumentViewer] = useState(false);
-  const [documentStats, setDocumentStats] = useState({
-    total: 0,
-    totalSize: 0,
-    aiProcessed: 0
-  });
+  const [documentStats, setDocumentStats] = useState<DocumentStats>(EMPTY_DOCUMENT_STATS);
   const [refreshCounter, setRefreshCounter] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [serverSearch, setServerSearch] = useState('');
+  const fetchSeq = useRef(0);
   const { toast } = useToast();
   const { searchDocuments, isSearching, results: semanticResults, clearResults } = useSemanticSearch();
   const { types: documentTypes, loading: typesLoading, refreshTypes } = useDocumentTypes();
 
+  // Search and sort run on the server so they cover every document, not just the loaded pages
+  const serverSort = SERVER_SORTS.includes(sortBy) ? sortBy : 'created_at';
+  const serverOrder = serverSort === sortBy ? sortOrder : 'desc';
+
+  useEffect(() => {
+    if (isSemanticSearch) return;
+    const timer = setTimeout(() => setServerSearch(searchQuery.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchQuery, isSemanticSearch]);
+
   useEffect(() => {
     fetchDocuments();
-  }, [selectedFolder, selectedDocumentType, refreshCounter]);
+  }, [selectedFolder, selectedDocumentType, refreshCounter, serverSearch, serverSort, serverOrder]);
 
   useEffect(() => {
     if (!isSemanticSearch) {
@@ -221,9 +256,24 @@ export const DocumentManager: React.FC = () => {
     }
   }, [semanticResults, isSemanticSearch]);
 
+  const userDocumentsUrl = (userId: string, cursor?: string | null) => {
+    const params = new URLSearchParams({
+      document_type: selectedDocumentType,
+      include: 'extracted_text,analysis_result',
+      limit: String(DOCUMENT_PAGE_SIZE),
+      sort: serverSort,
+      order: serverOrder
+    });
+    if (serverSearch) params.set('search', serverSearch);
+    if (cursor) params.set('cursor', cursor);
+    return `${API_BASE_URL}/api/v1/documents/${userId}?${params.toString()}`;
+  };
+
   const fetchDocuments = async () => {
+    const seq = ++fetchSeq.current;
     try {
       setLoading(true);
+      setNextCursor(null);
       const { data: user } = await supabase.auth.getUser();
       if (!user.user) return;
 
@@ -237,7 +287,7 @@ export const DocumentManager: React.FC = () => {
         response = await fetch(`${API_BASE_URL}/api/v1/folders/${selectedFolder}/documents`);
       } else {
         console.log('Fetching all documents for user:', user.user.id);
-        response = await fetch(`${API_BASE_URL}/api/v1/documents/${user.user.id}?document_type=${selectedDocumentType}`);
+        response = await fetch(userDocumentsUrl(user.user.id));
       }
       
       console.log('Response status:', response.status);
@@ -247,38 +297,64 @@ export const DocumentManager: React.FC = () => {
         const errorText = await response.text();
         console.error('Error details:', errorText);
         setDocuments([]);
-        setDocumentStats({
-          total: 0,
-          totalSize: 0,
-          aiProcessed: 0
-        });
+        setDocumentStats(EMPTY_DOCUMENT_STATS);
         return;
       }
 
       const data = await response.json();
+      if (seq !== fetchSeq.current) return; // A newer search/sort/filter request superseded this one
       console.log('📦 Received data:', data);
       console.log('📊 Documents count:', data.documents?.length || 0);
       
-      setDocuments(data.documents || []);
-      setDocumentStats({
-        total: data.total_documents || 0,
-        totalSize: data.total_size || 0,
-        aiProcessed: data.documents?.filter((d: any) => d.processing_status === 'completed').length || 0
-      });
+      const docs: Document[] = data.documents || [];
+      setDocuments(docs);
+      setNextCursor(data.next_cursor || null);
+      // Totals over every matching document come with the first page; without them count what is loaded
+      const totals = data.totals;
+      setDocumentStats(totals ? {
+        total: totals.total_documents || 0,
+        totalSize: totals.total_size || 0,
+        aiProcessed: totals.processed_documents || 0,
+        avgImportance: totals.avg_importance || 0,
+        exact: true
+      } : summarizeDocuments(docs, !data.next_cursor));
       
     } catch (error) {
       console.error('Error fetching documents:', error);
       setDocuments([]);
-      setDocumentStats({
-        total: 0,
-        totalSize: 0,
-        aiProcessed: 0
-      });
+      setDocumentStats(EMPTY_DOCUMENT_STATS);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMoreDocuments = async () => {
+    if (!nextCursor || loadingMore) return;
+    const seq = fetchSeq.current;
+    try {
+      setLoadingMore(true);
+      const { data: user } = await supabase.auth.getUser();
+      if (!user.user) return;
+
+      const response = await fetch(userDocumentsUrl(user.user.id, nextCursor));
+      if (!response.ok) {
+        console.error('Failed to fetch more documents:', response.status);
+        return;
+      }
+
+      const data = await response.json();
+      if (seq !== fetchSeq.current) return; // The listing was re-fetched meanwhile
+      const loaded = [...documents, ...(data.documents || [])];
+      setDocuments(loaded);
+      setNextCursor(data.next_cursor || null);
+      setDocumentStats(prev => prev.exact ? prev : summarizeDocuments(loaded, !data.next_cursor));
+    } catch (error) {
+      console.error('Error fetching more documents:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filterAndSortDocuments = () => {
     if (isSemanticSearch && semanticResults.length > 0) {
       setFilteredDocuments(semanticResults.map(result => ({
@@ -421,21 +497,8 @@ export const DocumentManager: React.FC = () => {
     }
   };
 
-  const getDocumentStats = () => {
-    const totalDocs = documents.length;
-    const processedDocs = documents.filter(doc => doc.processing_status === 'completed').length;
-    const totalSize = documents.reduce((sum, doc) => sum + doc.file_size, 0);
-    const avgImportance = documents.reduce((sum, doc) => sum + (doc.insights?.importance_score || 0), 0) / totalDocs;
-
-    return {
-      totalDocs,
-      processedDocs,
-      totalSize: (totalSize / (1024 * 1024)).toFixed(1) + ' MB',
-      avgImportance: totalDocs > 0 ? (avgImportance * 100).toFixed(0) + '%' : '0%'
-    };
-  };
-
-  const stats = getDocumentStats();
+  // Stats cards fall back to the loaded pages when the server sent no totals
+  const statsLabel = (label: string) => documentStats.exact ? label : `${label} (loaded)`;
   const activeTab = FEATURE_TABS.find(t => t.id === activeFeature);
   const isDocumentsView = activeFeature === 'documents';
 
@@ -661,7 +724,7 @@ export const DocumentManager: React.FC = () => {
                       <FileText className="w-8 h-8 text-blue-600" />
                       <div>
                         <p className="text-2xl font-bold text-blue-900 dark:text-blue-100">{documentStats.total}</p>
-                        <p className="text-sm text-blue-700 dark:text-blue-300">Total Documents</p>
+                        <p className="text-sm text-blue-700 dark:text-blue-300">{statsLabel('Total Documents')}</p>
                       </div>
                     </div>
                   </CardContent>
@@ -673,7 +736,7 @@ export const DocumentManager: React.FC = () => {
                       <TrendingUp className="w-8 h-8 text-green-600" />
                       <div>
                         <p className="text-2xl font-bold text-green-900 dark:text-green-100">{documentStats.aiProcessed}</p>
-                        <p className="text-sm text-green-700 dark:text-green-300">AI Processed</p>
+                        <p className="text-sm text-green-700 dark:text-green-300">{statsLabel('AI Processed')}</p>
                       </div>
                     </div>
                   </CardContent>
@@ -684,8 +747,8 @@ export const DocumentManager: React.FC = () => {
                     <div className="flex items-center gap-3">
                       <Star className="w-8 h-8 text-purple-600" />
                       <div>
-                        <p className="text-2xl font-bold text-purple-900 dark:text-purple-100">{stats.avgImportance}</p>
-                        <p className="text-sm text-purple-700 dark:text-purple-300">Avg Importance</p>
+                        <p className="text-2xl font-bold text-purple-900 dark:text-purple-100">{(documentStats.avgImportance * 100).toFixed(0)}%</p>
+                        <p className="text-sm text-purple-700 dark:text-purple-300">{statsLabel('Avg Importance')}</p>
                       </div>
                     </div>
                   </CardContent>
@@ -699,7 +762,7 @@ export const DocumentManager: React.FC = () => {
                         <p className="text-2xl font-bold text-orange-900 dark:text-orange-100">
                           {(documentStats.totalSize / 1024 / 1024).toFixed(1)} MB
                         </p>
-                        <p className="text-sm text-orange-700 dark:text-orange-300">Total Size</p>
+                        <p className="text-sm text-orange-700 dark:text-orange-300">{statsLabel('Total Size')}</p>
                       </div>
                     </div>
                   </CardContent>
@@ -838,6 +901,14 @@ export const DocumentManager: React.FC = () => {
                       onRefresh={fetchDocuments}
                     />
                   )}
+
+                  {nextCursor && !isSemanticSearch && (
+                    <div className="flex justify-center mt-4">
+                      <Button variant="outline" onClick={loadMoreDocuments} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more documents'}
+                      </Button>
+                    </div>
+                  )}
                 </>
               )}
             </div>
@@ -0,0 +1,55 @@
+-- Incremental re-indexing of document_chunks
+-- Migration: 20260113000000_document_chunk_hash_diff.sql
+--
+-- Stores a content hash per chunk so a reprocessed/edited document only embeds and
+-- writes the chunks whose text changed, and adds a function that applies the
+-- resulting diff (deletes, index moves, inserts) in one transaction.
+
+ALTER TABLE public.document_chunks
+ADD COLUMN IF NOT EXISTS chunk_hash text;
+
+COMMENT ON COLUMN public.document_chunks.chunk_hash IS 'Content hash of chunk_text (BLAKE2b-128 hex), used to diff chunks on re-index';
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document_hash
+    ON public.document_chunks (document_id, chunk_hash);
+
+CREATE OR REPLACE FUNCTION apply_document_chunk_diff(
+    p_document_id uuid,
+    p_delete_ids uuid[] DEFAULT '{}',
+    p_reindex jsonb DEFAULT '[]'::jsonb,  -- [{"id": uuid, "chunk_index": int, "chunk_hash": text}]
+    p_insert jsonb DEFAULT '[]'::jsonb    -- [{"chunk_index", "chunk_text", "chunk_hash", "chunk_embedding", "token_count"}]
+)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted_count integer;
+BEGIN
+    DELETE FROM document_chunks
+    WHERE document_id = p_document_id
+      AND id = ANY(p_delete_ids);
+
+    UPDATE document_chunks dc
+    SET chunk_index = (r->>'chunk_index')::integer,
+        chunk_hash = r->>'chunk_hash'
+    FROM jsonb_array_elements(p_reindex) AS r
+    WHERE dc.id = (r->>'id')::uuid
+      AND dc.document_id = p_document_id;
+
+    INSERT INTO document_chunks (document_id, chunk_index, chunk_text, chunk_hash, chunk_embedding, token_count)
+    SELECT
+        p_document_id,
+        (r->>'chunk_index')::integer,
+        r->>'chunk_text',
+        r->>'chunk_hash',
+        (r->'chunk_embedding')::text::vector,
+        (r->>'token_count')::integer
+    FROM jsonb_array_elements(p_insert) AS r;
+
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+    RETURN inserted_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION apply_document_chunk_diff TO authenticated;
+GRANT EXECUTE ON FUNCTION apply_document_chunk_diff TO service_role;
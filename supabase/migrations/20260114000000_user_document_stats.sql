@@ -0,0 +1,48 @@
+-- Totals for the paginated document listing
+-- Migration: 20260114000000_user_document_stats.sql
+--
+-- The listing returns documents in keyset pages; the stats cards need totals over
+-- every matching document, computed here in one aggregate instead of by loading
+-- all rows. Filters mirror GET /documents/{user_id} (document_type, search).
+
+CREATE OR REPLACE FUNCTION get_user_document_stats(
+    p_user_id uuid,
+    p_document_type text DEFAULT NULL,
+    p_search text DEFAULT NULL  -- Case-insensitive substring of file name, extracted text or summary
+)
+RETURNS TABLE (
+    total_documents bigint,
+    total_size bigint,
+    processed_documents bigint,
+    avg_importance numeric
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH matching AS (
+        SELECT d.file_size, d.processing_status, d.analysis_result
+        FROM documents d
+        WHERE d.user_id = p_user_id
+          AND d.is_deleted IS NOT TRUE
+          AND (p_document_type IS NULL OR p_document_type = 'all' OR d.document_type = p_document_type)
+          AND (
+              p_search IS NULL OR p_search = ''
+              OR d.file_name ILIKE '%' || p_search || '%'
+              OR d.extracted_text ILIKE '%' || p_search || '%'
+              OR d.analysis_result->>'summary' ILIKE '%' || p_search || '%'
+          )
+    )
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(file_size), 0)::bigint,
+        COUNT(*) FILTER (WHERE processing_status = 'completed'),
+        COALESCE(AVG(
+            CASE WHEN jsonb_typeof(analysis_result->'importance_score') = 'number'
+                 THEN (analysis_result->>'importance_score')::numeric
+                 ELSE 0 END
+        ), 0)
+    FROM matching;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_user_document_stats TO authenticated;
+GRANT EXECUTE ON FUNCTION get_user_document_stats TO service_role;